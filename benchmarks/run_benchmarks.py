@@ -0,0 +1,313 @@
+"""
+Benchmarks de leitura, filtro, busca de vale, log e gráfico (v14).
+
+Usa espectros sintéticos (lpg.synthetic) com semente fixa, então duas
+execuções na mesma máquina medem exatamente o mesmo trabalho. O resultado vai
+para um JSON (mediana, mínimo e média de cada caso, mais versões das
+bibliotecas) que pode ser comparado com uma execução anterior:
+
+    python benchmarks/run_benchmarks.py --output antes.json
+    python benchmarks/run_benchmarks.py --output depois.json --compare antes.json
+
+Com --compare, casos mais lentos que o limite (--threshold) são listados e o
+código de saída é 1.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+import matplotlib
+matplotlib.use('Agg') # Desenho fora da tela, sem Tk
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import scipy
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from lpg import core, synthetic # noqa: E402
+from lpg.loader import read_spectrum # noqa: E402
+from lpg.render import render_filtered_plots # noqa: E402
+from lpg.streaming import StreamingValleyDetector # noqa: E402
+
+# Tamanhos padrão (e os do modo --quick)
+DEFAULT_POINTS = (5000, 50000, 500000)
+DEFAULT_FILES = 200
+DEFAULT_LOG_ROWS = (100, 10000, 100000)
+QUICK_POINTS = (5000, 50000)
+QUICK_FILES = 50
+QUICK_LOG_ROWS = (100, 10000)
+BENCH_GROUPS = ('load', 'filter', 'batch', 'log', 'plot', 'stream', 'render')
+XLSX_MAX_LOG_ROWS = 10000 # Logs .xlsx maiores que isso levam minutos só para serem criados
+
+RENDER_IMAGES = 10 # Imagens PNG (300 dpi) por medição no caso 'render'
+STREAM_CHUNK = 256 # Amostras por bloco no caso de fluxo contínuo
+APPEND_ROWS = 10 # Linhas acrescentadas ao log em cada medição (um lote pequeno)
+
+
+def measure(func, repeat=5, warmup=1):
+    """Executa func 'warmup' vezes sem medir e 'repeat' vezes medindo. Devolve as estatísticas em segundos."""
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {'median_s': statistics.median(times), 'min_s': min(times),
+            'mean_s': statistics.fmean(times), 'repeat': repeat}
+
+
+# ===================================================================
+# CASOS
+# ===================================================================
+
+def bench_load(workdir, n_points, repeat):
+    """Leitura de um arquivo de texto: caminho original (detect_delimiter + np.loadtxt) e leitor rápido."""
+    filepath = synthetic.write_spectrum_files(os.path.join(workdir, f'load_{n_points}'), 1, n_points)[0]
+    return [
+        ('load_loadtxt', {'points': n_points}, measure(lambda: core.load_spectrum_loadtxt(filepath), repeat)),
+        ('load_fast', {'points': n_points}, measure(lambda: read_spectrum(filepath), repeat)),
+    ]
+
+
+def bench_filter_valley(n_points, repeat, windows=(21, 201)):
+    """savgol_filter + busca do vale num espectro."""
+    wavelengths, intensity_matrix, _ = synthetic.lpg_batch(1, n_points)
+    intensities = intensity_matrix[0]
+    results = []
+    for window_size in windows:
+        def run():
+            filtered = core.filter_spectrum(intensities, window_size, 3)
+            core.find_valley(wavelengths, filtered, 1530.0, 1570.0)
+        results.append(('filter_valley', {'points': n_points, 'window': window_size}, measure(run, repeat)))
+    return results
+
+
+def bench_batch(n_files, n_points, repeat):
+    """Lote vetorizado (process_batch) numa grade comum."""
+    wavelengths, intensity_matrix, _ = synthetic.lpg_batch(n_files, n_points)
+    wavelength_list = [wavelengths] * n_files
+    intensity_list = list(intensity_matrix)
+    run = lambda: core.process_batch(wavelength_list, intensity_list, 21, 3, 1530.0, 1570.0)
+    return [('process_batch', {'files': n_files, 'points': n_points}, measure(run, repeat))]
+
+
+def bench_stream(n_points, repeat):
+    """Fluxo contínuo: espectro inteiro entregue em blocos de STREAM_CHUNK amostras ao filtro incremental."""
+    wavelengths, intensity_matrix, _ = synthetic.lpg_batch(1, n_points)
+    intensities = intensity_matrix[0]
+    detector = StreamingValleyDetector(21, 3, 1530.0, 1570.0)
+
+    def run():
+        detector.reset()
+        for start in range(0, n_points, STREAM_CHUNK):
+            detector.push(wavelengths[start:start + STREAM_CHUNK], intensities[start:start + STREAM_CHUNK])
+        detector.finish()
+
+    stats = measure(run, repeat)
+    # Latência por bloco: tempo do espectro dividido pelo número de blocos
+    stats['per_chunk_s'] = stats['median_s'] / -(-n_points // STREAM_CHUNK)
+    return [('stream_valley', {'points': n_points, 'chunk': STREAM_CHUNK}, stats)]
+
+
+def bench_render(workdir, n_points, repeat):
+    """Imagens "só filtro" de um lote (figura reaproveitada, num só processo): tempo de RENDER_IMAGES PNGs."""
+    wavelengths, intensity_matrix, _ = synthetic.lpg_batch(RENDER_IMAGES, n_points)
+    jobs = [(os.path.join(workdir, f'render_{k}.png'), f'espectro_{k}.txt', (wavelengths, intensities))
+            for k, intensities in enumerate(intensity_matrix)]
+    options = {'window_size': 21, 'poly_order': 3, 'range_start': 1530.0, 'range_end': 1570.0}
+    run = lambda: list(render_filtered_plots(jobs, options, workers=1))
+    return [('render_batch', {'points': n_points, 'images': RENDER_IMAGES}, measure(run, repeat))]
+
+
+def _log_rows(n_rows):
+    timestamp = core.make_timestamp(with_millis=True)
+    return pd.DataFrame([core.make_log_row(timestamp, 1550.0 + i * 1e-4, -25.0, 'BENCH', f'espectro_{i}.txt')
+                         for i in range(n_rows)], columns=core.LOG_COLUMNS)
+
+
+def bench_log_append(workdir, log_sizes, repeat):
+    """Acréscimo de APPEND_ROWS linhas a logs já com 'log_sizes' linhas (.csv, .sqlite e .xlsx)."""
+    df_append = _log_rows(APPEND_ROWS)
+    results = []
+    for extension in ('.csv', '.sqlite', '.xlsx'):
+        for n_rows in log_sizes:
+            if extension == '.xlsx' and n_rows > XLSX_MAX_LOG_ROWS:
+                continue
+            log_filepath = os.path.join(workdir, f'log_{n_rows}{extension}')
+            core.append_to_log(_log_rows(n_rows), log_filepath)
+            stats = measure(lambda: core.append_to_log(df_append, log_filepath), repeat)
+            results.append(('log_append', {'format': extension, 'log_rows': n_rows, 'rows': APPEND_ROWS}, stats))
+    return results
+
+
+class _EntryValue:
+    """Substitui um tk.Entry (só .get()) no gráfico fora da tela."""
+
+    def __init__(self, value=''):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+def _offscreen_spectrum_view():
+    """Objeto com o estado usado por LpgFilterApp.plot_data, desenhando numa figura Agg."""
+    import filtro_savitzkygolay as gui
+
+    view = types.SimpleNamespace()
+    view.fig, view.ax = plt.subplots()
+    view.canvas = view.fig.canvas
+    view.ax.set_title("Carregue um ou mais arquivos para começar")
+    view.lod_lines = []
+    view.color_original = 'black'
+    view.color_filtrado = 'red'
+    view.active_filename = 'sintetico.txt'
+    view.active_valley_wl = None
+    view.active_valley_intensity = None
+    view.range_start_entry = _EntryValue('1530')
+    view.range_end_entry = _EntryValue('1570')
+    view.resonances_entry = _EntryValue('')
+    view.active_resonances = None
+    for name in ('plot_data', '_annotate_valley', '_lod_bins', '_plot_decimated', '_update_lod'):
+        setattr(view, name, getattr(gui.LpgFilterApp, name).__get__(view))
+    return view
+
+
+def bench_plot(n_points, repeat):
+    """plot_data (original + filtrado + anotação) desenhado por completo no backend Agg."""
+    wavelengths, intensity_matrix, _ = synthetic.lpg_batch(1, n_points)
+    intensities = intensity_matrix[0]
+    filtered = core.filter_spectrum(intensities, 21, 3)
+    view = _offscreen_spectrum_view()
+    view.active_valley_wl, view.active_valley_intensity = core.find_valley(wavelengths, filtered, 1530.0, 1570.0)
+
+    def run():
+        view.plot_data(wavelengths, intensities, "Sinal Original", wavelengths, filtered, "Sinal Filtrado")
+        view.canvas.draw()
+
+    stats = measure(run, repeat)
+    plt.close(view.fig)
+    return [('plot_data', {'points': n_points}, stats)]
+
+
+# ===================================================================
+# EXECUÇÃO E COMPARAÇÃO
+# ===================================================================
+
+def environment_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': core.make_timestamp(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'pandas': pd.__version__,
+        'matplotlib': matplotlib.__version__,
+    }
+
+
+def run_benchmarks(points, n_files, log_sizes, repeat, selected=None, progress=None):
+    """Executa os grupos de casos BENCH_GROUPS). Devolve a lista de resultados."""
+    selected = set(selected or BENCH_GROUPS)
+    groups = []
+    with tempfile.TemporaryDirectory(prefix='lpg_bench_') as workdir:
+        for n_points in points:
+            if 'load' in selected: groups.append(lambda n=n_points: bench_load(workdir, n, repeat))
+            if 'filter' in selected: groups.append(lambda n=n_points: bench_filter_valley(n, repeat))
+            if 'plot' in selected: groups.append(lambda n=n_points: bench_plot(n, repeat))
+            if 'stream' in selected: groups.append(lambda n=n_points: bench_stream(n, repeat))
+        if 'batch' in selected: groups.append(lambda: bench_batch(n_files, min(points), repeat))
+        if 'render' in selected: groups.append(lambda: bench_render(workdir, min(points), repeat))
+        if 'log' in selected: groups.append(lambda: bench_log_append(workdir, log_sizes, repeat))
+
+        results = []
+        for group in groups:
+            for name, params, stats in group():
+                result = {'benchmark': name, 'params': params, **stats}
+                results.append(result)
+                if progress: progress(result)
+    return results
+
+
+def _result_key(result):
+    return result['benchmark'], json.dumps(result['params'], sort_keys=True)
+
+
+def compare_results(current, baseline, threshold=0.2):
+    """Compara medianas com uma execução anterior. Devolve [(resultado, razão atual/anterior, regrediu)]."""
+    previous = {_result_key(r): r for r in baseline}
+    comparison = []
+    for result in current:
+        old = previous.get(_result_key(result))
+        if old is None or old['median_s'] <= 0:
+            continue
+        ratio = result['median_s'] / old['median_s']
+        comparison.append((result, ratio, ratio > 1.0 + threshold))
+    return comparison
+
+
+def _format_result(result):
+    params = ', '.join(f'{k}={v}' for k, v in result['params'].items())
+    return f"{result['benchmark']:<14} {params:<40} {result['median_s'] * 1000:10.2f} ms"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmarks do filtro LPG com espectros sintéticos.")
+    parser.add_argument('-o', '--output', default='benchmark_results.json', help="Arquivo JSON de saída.")
+    parser.add_argument('--compare', default=None, metavar='JSON', help="Resultado anterior para comparação.")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Aumento relativo da mediana considerado regressão (padrão: 0.2 = 20%%).")
+    parser.add_argument('--points', type=int, nargs='+', default=None, help="Pontos por espectro.")
+    parser.add_argument('--files', type=int, default=None, help="Espectros no caso de lote.")
+    parser.add_argument('--log-rows', type=int, nargs='+', default=None, help="Tamanhos de log para o acréscimo.")
+    parser.add_argument('--repeat', type=int, default=5, help="Repetições medidas por caso (padrão: 5).")
+    parser.add_argument('--only', nargs='+', choices=BENCH_GROUPS, default=None,
+                        help="Executa só estes grupos.")
+    parser.add_argument('--quick', action='store_true', help="Tamanhos menores, para uma verificação rápida.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    points = args.points or (QUICK_POINTS if args.quick else DEFAULT_POINTS)
+    n_files = args.files or (QUICK_FILES if args.quick else DEFAULT_FILES)
+    log_sizes = args.log_rows or (QUICK_LOG_ROWS if args.quick else DEFAULT_LOG_ROWS)
+
+    results = run_benchmarks(points, n_files, log_sizes, args.repeat, args.only,
+                             progress=lambda r: print(_format_result(r), file=sys.stderr))
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment_info(), 'results': results}, f, indent=2)
+    print(f"Resultados gravados em {args.output}.", file=sys.stderr)
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare, encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    regressions = 0
+    for result, ratio, regressed in compare_results(results, baseline, args.threshold):
+        regressions += regressed
+        print(f"{_format_result(result)}  x{ratio:5.2f}{'  REGRESSÃO' if regressed else ''}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
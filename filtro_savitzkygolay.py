@@ -1,22 +1,103 @@
+import time
+STARTUP_TIME = time.perf_counter() # v14: referência do relatório de inicialização (antes dos demais imports)
+
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk, colorchooser
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
-from scipy.signal import savgol_filter
+import collections
 import os
-from datetime import datetime
-import re # Para extrair o delimitador
+import queue
+import sys
+import threading
+
+from lpg import core, downsample, logstore # v14: núcleo de processamento sem GUI (também usado pela CLI)
+from lpg.batch_export import BatchExportWriter, make_export_params
+from lpg.lazy import LazyModule, preload
+from lpg.ingest import DEFAULT_INGEST_PORT, SpectrumServer, process_received
+from lpg.loader import load_spectra
+from lpg.log_analysis import DEFAULT_ROLLING_HOURS, read_log_series
+from lpg.log_writer import LogWriter
+from lpg.preview import FilterResultCache, PreviewWorker, compute_filter_result
+from lpg.profiling import NULL_PROFILER, StageProfiler, StartupTimer
+from lpg.result_cache import ResultCache, process_batch_cached, result_params
+from lpg.resonances import has_any_valley, make_resonance_row, parse_ranges, process_batch_resonances
+from lpg.spectrum_cache import SpectrumCache
+from lpg.spectrum_store import SpectrumStore
+from lpg.sweep import SWEEP_COLUMNS, ParameterSweep, parse_int_list
+from lpg.watch import FolderWatcher, process_new_file
+
+# v14: Dependências pesadas importadas no primeiro uso (a janela abre antes delas)
+pd = LazyModule('pandas')
+mpl_figure = LazyModule('matplotlib.figure')
+backend_tkagg = LazyModule('matplotlib.backends.backend_tkagg')
+render = LazyModule('lpg.render')
+
+# v14: Lote em thread de trabalho
+BATCH_POLL_MS = 100     # Intervalo de leitura da fila de progresso (atualizações da UI limitadas a ~10/s)
+BATCH_CHUNK_ROWS = 64   # Espectros por bloco: define a granularidade do progresso e do cancelamento
+
+# v14: Observação de pasta
+WATCH_POLL_MS = 1000            # Intervalo entre verificações da pasta
+WATCH_MAX_FILES_PER_TICK = 20   # Limita o trabalho por verificação para a UI continuar responsiva
+
+# v14: Recepção de espectros por TCP
+INGEST_POLL_MS = 100               # Intervalo de processamento dos espectros recebidos
+INGEST_MAX_SPECTRA_PER_TICK = 1000 # Espectros processados (num único lote vetorizado) por verificação
+
+# v14: Nível de detalhe do gráfico do espectro (mínimo e máximo por pixel)
+LOD_MIN_BINS = 200  # Blocos mínimos, mesmo com o gráfico ainda sem tamanho definido
+
+# v14: Varredura de parâmetros (janela x ordem)
+SWEEP_CHUNK_ROWS = 256  # Espectros carregados por vez durante a varredura
+SWEEP_METRICS = {       # Métrica do mapa de calor -> (coluna da tabela, melhor valor: 'min', 'max' ou None)
+    'Ruído do vale (nm)': ('ruido_vale (nm)', 'min'),
+    'Desvio padrão do vale (nm)': ('vale_std (nm)', 'min'),
+    'Deriva (nm/arquivo)': ('deriva (nm/arquivo)', None), # Deriva real da amostra: sem "melhor"
+    'Profundidade média (dB)': ('profundidade_media (dB)', 'max'),
+}
+
+# v14: Pré-visualização ao vivo
+PREVIEW_DEBOUNCE_MS = 150 # Espera após a última tecla antes de refiltrar
+PREVIEW_POLL_MS = 20      # Intervalo de leitura da fila de resultados enquanto um cálculo está pendente
+
+# v14: Gravação do log em segundo plano
+LOG_POLL_MS = 250         # Intervalo de leitura dos eventos de gravação enquanto há linhas pendentes
+LOG_CLOSE_TIMEOUT_S = 5.0 # Espera máxima pela última gravação ao fechar (o resto fica no diário)
+
+# v14: Histórico do log inteiro
+HISTORY_POLL_MS = 100          # Intervalo de leitura da fila da thread de leitura do log
+HISTORY_ZOOM_DEBOUNCE_MS = 50  # Espera após zoom/pan antes de refazer a redução (LTTB)
+HISTORY_MIN_POINTS = 200       # Pontos mínimos da redução, mesmo com o gráfico ainda sem tamanho definido
+
+# v14: Inicialização rápida
+STARTUP_POLL_MS = 50 # Intervalo de verificação da pré-carga do matplotlib
+STARTUP_FIGURE_MODULES = ('matplotlib.figure', 'matplotlib.backends.backend_tkagg')
+STARTUP_PRELOAD_MODULES = ('scipy.signal', 'scipy.ndimage', 'pandas', 'lpg.render')
+STARTUP_REPORT = os.environ.get('LPG_STARTUP_REPORT', '') not in ('', '0') # Relatório de tempos na saída de erro
+# Figuras criadas no primeiro acesso a um dos seus atributos: método que cria -> atributos
+LAZY_FIGURE_ATTRS = {
+    '_build_spectrum_figure': ('fig', 'ax', 'canvas', 'toolbar'),
+    '_build_time_series_figure': ('ts_fig', 'ts_ax', 'ts_ax2', 'ts_canvas', 'ts_toolbar', 'ts_wl_line', 'ts_int_line',
+                                  'ts_wl_segment', 'ts_int_segment', 'ts_background', 'ts_resonance_lines'),
+    '_build_sweep_figure': ('sweep_fig', 'sweep_ax', 'sweep_canvas'),
+    '_build_history_figure': ('history_fig', 'history_ax_wl', 'history_ax_int', 'history_canvas', 'history_toolbar',
+                              'history_wl_line', 'history_wl_mean_line', 'history_int_line', 'history_int_mean_line'),
+}
+_FIGURE_BUILDER_BY_ATTR = {attr: builder for builder, attrs in LAZY_FIGURE_ATTRS.items() for attr in attrs}
 
 class LpgFilterApp:
-    def __init__(self, master):
+    def __init__(self, master, startup_timer=None):
         """
         Configura a interface gráfica principal (GUI) do aplicativo.
         v13.0: Adiciona processamento em lote, barra de progresso e separador de "Análise Temporal".
+        v14.0: Aquisição contínua (observação de pasta e recepção por TCP), lote em segundo plano,
+               caches, varredura de parâmetros e várias ressonâncias. As figuras (e o matplotlib)
+               só são criadas depois que a janela aparece.
         """
         self.master = master
-        master.title("Filtro Savitzky-Golay (v13.0 - Processamento em Lote)")
+        self.startup_timer = startup_timer or StartupTimer()
+        self._built_figures = set()
+        master.title("Filtro Savitzky-Golay (v14.0 - Aquisição Contínua)")
         master.geometry("1200x800")
 
         # --- Variáveis de Estado ---
@@ -28,6 +109,7 @@ class LpgFilterApp:
         
         self.active_valley_wl = None
         self.active_valley_intensity = None
+        self.active_resonances = None # v14: {nome: (comprimento de onda, intensidade, proeminência) ou None}
         self.log_filepath = None
         
         self.color_original = 'black'
@@ -38,6 +120,64 @@ class LpgFilterApp:
         
         # v13: Para guardar os resultados do lote
         self.last_batch_results = None 
+        
+        # v14: Tabela da última varredura de parâmetros
+        self.last_sweep_results = None
+        
+        # v14: Estado do lote em segundo plano
+        self.batch_thread = None
+        self.batch_queue = None
+        self.batch_cancel_event = None
+        self.batch_start_time = None
+        self.batch_profiler = NULL_PROFILER # v14: medição por etapa (desligada por padrão)
+        
+        # v14: Cache binário de espectros (chave: caminho, tamanho e data de modificação)
+        self.spectrum_cache = SpectrumCache()
+        
+        # v14: Resultados do lote em disco (chave: conteúdo do espectro + parâmetros); aberto no primeiro lote
+        self.result_cache = None
+        
+        # v14: Espectros carregados sob demanda, num cache LRU limitado em bytes
+        self.spectrum_store = SpectrumStore(read_func=self._read_spectrum)
+        
+        # v14: Observação de pasta
+        self.folder_watcher = None
+        self.watch_params = None
+        self.watch_backlog = collections.deque()
+        self.watch_count = 0
+        
+        # v14: Recepção por TCP
+        self.ingest_server = None
+        self.ingest_params = None
+        self.ingest_count = 0
+        self.ingest_rate = (0.0, 0) # (instante, recebidos) da última medição de taxa
+        
+        # v14: Buffer da série temporal (índice, comprimento de onda, intensidade), cresce por duplicação
+        self.ts_buffer = np.empty((256, 3))
+        self.ts_count = 0
+        
+        # v14: Pré-visualização ao vivo e resultados do filtro por (arquivo, parâmetros)
+        self.filter_results = FilterResultCache()
+        self.preview_worker = None      # Thread criada na primeira pré-visualização
+        self.preview_after_id = None    # Pré-visualização agendada (debounce)
+        self.preview_generation = None  # Pedido cujo resultado está sendo esperado
+        self.preview_polling = False    # Leitura da fila de resultados agendada
+        
+        # v14: Gravação do log em segundo plano (a thread e o diário abrem depois da janela)
+        self.log_writer = None
+        self.log_polling = False
+        
+        # v14: Histórico do log inteiro (LogSeries + estatísticas móveis), lido numa thread
+        self.history_series = None
+        self.history_rolling = None
+        self.history_queue = None
+        self.history_band = None      # Faixa média ± desvio, recriada a cada zoom
+        self.history_view = None      # (início, fim, n_pontos) da última redução
+        self.history_after_id = None
+        self.history_status_prefix = ''
+        
+        # v14: Linhas do espectro com os dados completos, reduzidas à resolução da tela
+        self.lod_lines = []
 
         # --- Estrutura Principal (Grid) ---
         main_frame = tk.Frame(master)
@@ -83,7 +223,17 @@ class LpgFilterApp:
 
         # --- Botão Carregar (dentro de self.control_frame) ---
         self.load_button = tk.Button(self.control_frame, text="Carregar Arquivo(s) (.txt)", command=self.load_files)
-        self.load_button.pack(fill='x', pady=(5, 10), padx=5)
+        self.load_button.pack(fill='x', pady=(5, 0), padx=5)
+
+        # v14: Cache binário (.npy) dos espectros já lidos
+        self.use_cache_var = tk.BooleanVar(value=True)
+        self.use_cache_check = tk.Checkbutton(self.control_frame, text="Usar cache binário (.npy) dos espectros", variable=self.use_cache_var)
+        self.use_cache_check.pack(anchor='w', pady=(0, 0), padx=5)
+
+        # v14: Carregamento sob demanda (a lista guarda só caminhos; memória limitada)
+        self.lazy_load_var = tk.BooleanVar(value=False)
+        self.lazy_load_check = tk.Checkbutton(self.control_frame, text="Carregar espectros sob demanda (pouca memória)", variable=self.lazy_load_var)
+        self.lazy_load_check.pack(anchor='w', pady=(0, 10), padx=5)
 
         # --- Frame: Customização do Gráfico (v10) ---
         color_frame = tk.LabelFrame(self.control_frame, text="Customização do Gráfico")
@@ -120,6 +270,11 @@ class LpgFilterApp:
         self.normalize_check = tk.Checkbutton(filter_grid, text="Normalizar", variable=self.normalize_var)
         self.normalize_check.grid(row=0, column=2, sticky='w', padx=5)
 
+        # v14: Filtra só a faixa de busca (mais meia janela): o vale é o mesmo, com uma fração do trabalho
+        self.roi_var = tk.BooleanVar(value=False)
+        self.roi_check = tk.Checkbutton(filter_grid, text="Só a faixa (ROI)", variable=self.roi_var)
+        self.roi_check.grid(row=1, column=2, sticky='w', padx=5)
+
         tk.Label(filter_grid, text="Buscar Vale de (nm):").grid(row=2, column=0, sticky='w', pady=(8,2))
         self.range_start_entry = tk.Entry(filter_grid, width=7)
         self.range_start_entry.grid(row=2, column=1, sticky='w', padx=5)
@@ -128,6 +283,26 @@ class LpgFilterApp:
         self.range_end_entry = tk.Entry(filter_grid, width=7)
         self.range_end_entry.grid(row=3, column=1, sticky='w', padx=5)
 
+        # v14: Várias ressonâncias (substituem a faixa única quando preenchidas)
+        tk.Label(filter_grid, text="Ressonâncias (nome:início-fim; ...):").grid(row=4, column=0, columnspan=3, sticky='w', pady=(8,2))
+        self.resonances_entry = tk.Entry(filter_grid, width=36)
+        self.resonances_entry.grid(row=5, column=0, columnspan=3, sticky='we', padx=(0,5))
+        tk.Label(filter_grid, text="Proeminência mín. (dB):").grid(row=6, column=0, sticky='w', pady=2)
+        self.min_prominence_entry = tk.Entry(filter_grid, width=7)
+        self.min_prominence_entry.insert(0, "0")
+        self.min_prominence_entry.grid(row=6, column=1, sticky='w', padx=5)
+
+        # v14: Refiltra enquanto os campos são editados (com atraso e fora da thread do Tk)
+        self.live_preview_var = tk.BooleanVar(value=False)
+        self.live_preview_check = tk.Checkbutton(filter_frame, text="Pré-visualização ao vivo", variable=self.live_preview_var,
+                                                 command=self._on_live_preview_toggle)
+        self.live_preview_check.pack(anchor='w', padx=5)
+        for entry in (self.window_entry, self.order_entry, self.range_start_entry, self.range_end_entry,
+                      self.resonances_entry, self.min_prominence_entry):
+            entry.bind('<KeyRelease>', self._schedule_preview)
+        self.normalize_check.config(command=self._schedule_preview)
+        self.roi_check.config(command=self._schedule_preview)
+
         self.process_button = tk.Button(filter_frame, text="Aplicar Filtro (Ficheiro Único)", command=self.process_and_plot, state='disabled')
         self.process_button.pack(fill='x', padx=5, pady=(5, 10))
 
@@ -139,9 +314,12 @@ class LpgFilterApp:
         self.sample_name_entry = tk.Entry(log_frame)
         self.sample_name_entry.pack(fill='x', padx=5, pady=(0, 5))
 
-        self.set_log_button = tk.Button(log_frame, text="Definir Arquivo de Log (.xlsx/.csv)", command=self.set_log_file)
+        self.set_log_button = tk.Button(log_frame, text="Definir Arquivo de Log (.xlsx/.csv/.sqlite)", command=self.set_log_file)
         self.set_log_button.pack(fill='x', padx=5, pady=5)
 
+        self.export_log_button = tk.Button(log_frame, text="Exportar Log para Excel (.xlsx)", command=self.export_log_excel, state='disabled')
+        self.export_log_button.pack(fill='x', padx=5, pady=5)
+
         self.log_valley_button = tk.Button(log_frame, text="Registrar Vale Único no Log", command=self.log_single_valley_data, state='disabled')
         self.log_valley_button.pack(fill='x', padx=5, pady=5)
         
@@ -154,6 +332,8 @@ class LpgFilterApp:
         tk.Label(log_frame, text="Arquivo de Log:", anchor='w').pack(fill='x', padx=5, pady=(5,0))
         self.log_file_label = tk.Label(log_frame, text="Nenhum definido", fg="gray", anchor='w', justify='left', relief='sunken', borderwidth=1)
         self.log_file_label.pack(fill='x', padx=5, pady=(0, 5))
+        self.log_status_label = tk.Label(log_frame, text="", fg="gray", anchor='w', justify='left', wraplength=260)
+        self.log_status_label.pack(fill='x', padx=5, pady=(0, 5))
 
         # --- NOVO (v13): Barra de Progresso ---
         progress_frame = tk.LabelFrame(self.control_frame, text="Progresso do Lote")
@@ -162,7 +342,89 @@ class LpgFilterApp:
         self.progress_bar.pack(fill='x', padx=5, pady=5)
         self.progress_label = tk.Label(progress_frame, text="Aguardando lote...", anchor='w')
         self.progress_label.pack(fill='x', padx=5, pady=(0,5))
-
+        self.cancel_batch_button = tk.Button(progress_frame, text="Cancelar Lote", command=self.cancel_batch, state='disabled')
+        self.cancel_batch_button.pack(fill='x', padx=5, pady=(0,5))
+        
+        # v14: Medição de tempo e memória por etapa
+        self.profile_batch_var = tk.BooleanVar(value=False)
+        self.profile_batch_check = tk.Checkbutton(progress_frame, text="Medir tempo e memória por etapa (perfil)", variable=self.profile_batch_var)
+        self.profile_batch_check.pack(anchor='w', padx=5)
+        self.profile_label = tk.Label(progress_frame, text="", anchor='w', justify='left', font=("Courier", 8))
+        self.profile_label.pack(fill='x', padx=5, pady=(0,5))
+
+        # v14: Todos os espectros do lote (original + filtrado) num único arquivo
+        self.export_spectra_var = tk.BooleanVar(value=False)
+        self.export_spectra_check = tk.Checkbutton(progress_frame, text="Exportar espectros do lote (.npz/.h5/.parquet)", variable=self.export_spectra_var)
+        self.export_spectra_check.pack(anchor='w', padx=5)
+
+        # v14: Reaproveita vales de espectros já processados com os mesmos parâmetros
+        self.use_result_cache_var = tk.BooleanVar(value=True)
+        self.use_result_cache_check = tk.Checkbutton(progress_frame, text="Reusar resultados já calculados (cache)", variable=self.use_result_cache_var)
+        self.use_result_cache_check.pack(anchor='w', padx=5, pady=(0,5))
+
+        # --- NOVO (v14): Observação de Pasta (Aquisição Contínua) ---
+        watch_frame = tk.LabelFrame(self.control_frame, text="Observação de Pasta (Aquisição Contínua)")
+        watch_frame.pack(fill='x', pady=5, padx=5)
+        self.start_watch_button = tk.Button(watch_frame, text="Observar Pasta...", command=self.start_watch)
+        self.start_watch_button.pack(fill='x', padx=5, pady=5)
+        self.stop_watch_button = tk.Button(watch_frame, text="Parar Observação", command=self.stop_watch, state='disabled')
+        self.stop_watch_button.pack(fill='x', padx=5, pady=(0,5))
+        self.watch_label = tk.Label(watch_frame, text="Inativo", anchor='w', justify='left')
+        self.watch_label.pack(fill='x', padx=5, pady=(0,5))
+
+        # --- NOVO (v14): Recepção por Rede (TCP) ---
+        ingest_frame = tk.LabelFrame(self.control_frame, text="Recepção por Rede (TCP)")
+        ingest_frame.pack(fill='x', pady=5, padx=5)
+        ingest_grid = tk.Frame(ingest_frame)
+        ingest_grid.pack(fill='x', padx=5, pady=5)
+        tk.Label(ingest_grid, text="Porta:").grid(row=0, column=0, sticky='w')
+        self.ingest_port_entry = tk.Entry(ingest_grid, width=8)
+        self.ingest_port_entry.insert(0, str(DEFAULT_INGEST_PORT))
+        self.ingest_port_entry.grid(row=0, column=1, sticky='w', padx=5)
+        self.start_ingest_button = tk.Button(ingest_frame, text="Receber Espectros", command=self.start_ingest)
+        self.start_ingest_button.pack(fill='x', padx=5, pady=(0,5))
+        self.stop_ingest_button = tk.Button(ingest_frame, text="Parar Recepção", command=self.stop_ingest, state='disabled')
+        self.stop_ingest_button.pack(fill='x', padx=5, pady=(0,5))
+        self.ingest_label = tk.Label(ingest_frame, text="Inativo", anchor='w', justify='left')
+        self.ingest_label.pack(fill='x', padx=5, pady=(0,5))
+
+        # --- NOVO (v14): Varredura de Parâmetros ---
+        sweep_frame = tk.LabelFrame(self.control_frame, text="Varredura de Parâmetros (Janela x Ordem)")
+        sweep_frame.pack(fill='x', pady=5, padx=5)
+        sweep_grid = tk.Frame(sweep_frame)
+        sweep_grid.pack(fill='x', padx=5, pady=5)
+        tk.Label(sweep_grid, text="Janelas:").grid(row=0, column=0, sticky='w', pady=2)
+        self.sweep_windows_entry = tk.Entry(sweep_grid, width=14)
+        self.sweep_windows_entry.insert(0, "5-45:2")
+        self.sweep_windows_entry.grid(row=0, column=1, sticky='w', padx=5)
+        tk.Label(sweep_grid, text="Ordens:").grid(row=1, column=0, sticky='w', pady=2)
+        self.sweep_orders_entry = tk.Entry(sweep_grid, width=14)
+        self.sweep_orders_entry.insert(0, "2-5")
+        self.sweep_orders_entry.grid(row=1, column=1, sticky='w', padx=5)
+        tk.Label(sweep_grid, text="Mapa de calor:").grid(row=2, column=0, sticky='w', pady=2)
+        self.sweep_metric_var = tk.StringVar(value=next(iter(SWEEP_METRICS)))
+        self.sweep_metric_combo = ttk.Combobox(sweep_grid, textvariable=self.sweep_metric_var, values=list(SWEEP_METRICS), state='readonly', width=24)
+        self.sweep_metric_combo.grid(row=2, column=1, sticky='w', padx=5)
+        self.sweep_metric_combo.bind('<<ComboboxSelected>>', lambda event: self._plot_sweep_heatmap())
+        self.sweep_button = tk.Button(sweep_frame, text="Executar Varredura no Lote", command=self.run_parameter_sweep, state='disabled')
+        self.sweep_button.pack(fill='x', padx=5, pady=(0,5))
+        self.save_sweep_button = tk.Button(sweep_frame, text="Salvar Tabela da Varredura", command=self.save_sweep_table, state='disabled')
+        self.save_sweep_button.pack(fill='x', padx=5, pady=(0,5))
+
+
+        # --- NOVO (v14): Histórico do Log ---
+        history_frame = tk.LabelFrame(self.control_frame, text="Histórico do Log (Log Inteiro)")
+        history_frame.pack(fill='x', pady=5, padx=5)
+        history_grid = tk.Frame(history_frame)
+        history_grid.pack(fill='x', padx=5, pady=5)
+        tk.Label(history_grid, text="Janela móvel (h):").grid(row=0, column=0, sticky='w')
+        self.history_window_entry = tk.Entry(history_grid, width=8)
+        self.history_window_entry.insert(0, f"{DEFAULT_ROLLING_HOURS:g}")
+        self.history_window_entry.grid(row=0, column=1, sticky='w', padx=5)
+        self.history_button = tk.Button(history_frame, text="Abrir Histórico do Log...", command=self.open_log_history)
+        self.history_button.pack(fill='x', padx=5, pady=(0,5))
+        self.history_label = tk.Label(history_frame, text="", anchor='w', justify='left', wraplength=260)
+        self.history_label.pack(fill='x', padx=5, pady=(0,5))
 
         # --- Frame: Arquivos de Espectro (v3) ---
         list_frame = tk.LabelFrame(self.control_frame, text="Arquivos de Espectro")
@@ -205,6 +467,10 @@ class LpgFilterApp:
         self.include_range_check = tk.Checkbutton(check_frame, text="Incluir Faixa (Linhas)", variable=self.include_range_var)
         self.include_range_check.pack(side='left', padx=5)
 
+        # v14: A mesma imagem para todos os arquivos carregados (pool de processos)
+        self.batch_images_button = tk.Button(save_filtered_img_frame, text="Salvar Imagens do Lote (Só Filtro)...", command=self.save_batch_filtered_plots, state='disabled')
+        self.batch_images_button.pack(fill='x', padx=5, pady=5)
+
 
         # --- Coluna da Direita: Gráfico (COM SEPARADORES v13) ---
         self.graph_frame = tk.Frame(main_frame, bg='white')
@@ -216,17 +482,110 @@ class LpgFilterApp:
         self.notebook.pack(fill='both', expand=True)
         
         # --- Separador 1: Espectro Atual ---
-        spectrum_tab = tk.Frame(self.notebook, bg='white')
-        self.notebook.add(spectrum_tab, text='Espectro Atual')
+        self.spectrum_tab = tk.Frame(self.notebook, bg='white')
+        self.notebook.add(self.spectrum_tab, text='Espectro Atual')
+        
+        self.spectrum_tab.grid_rowconfigure(0, weight=1)
+        self.spectrum_tab.grid_columnconfigure(0, weight=1)
+        # v14: Figura criada em _finish_startup (_build_spectrum_figure)
+        
+        # --- Separador 2: Análise Temporal ---
+        self.time_series_tab = tk.Frame(self.notebook, bg='white')
+        self.notebook.add(self.time_series_tab, text='Análise Temporal', state='disabled')
+        
+        self.time_series_tab.grid_rowconfigure(0, weight=1)
+        self.time_series_tab.grid_columnconfigure(0, weight=1)
+
+        # v14: Figura criada no primeiro uso (_build_time_series_figure)
         
-        spectrum_tab.grid_rowconfigure(0, weight=1)
-        spectrum_tab.grid_columnconfigure(0, weight=1)
+        # --- Separador 3 (v14): Varredura de Parâmetros ---
+        self.sweep_tab = tk.Frame(self.notebook, bg='white')
+        self.notebook.add(self.sweep_tab, text='Varredura', state='disabled')
+        self.sweep_tab.grid_rowconfigure(0, weight=3)
+        self.sweep_tab.grid_rowconfigure(1, weight=1)
+        self.sweep_tab.grid_columnconfigure(0, weight=1)
+        
+        # v14: Figura do mapa de calor criada no primeiro uso (_build_sweep_figure)
+        
+        # --- Separador 4 (v14): Histórico do Log ---
+        self.history_tab = tk.Frame(self.notebook, bg='white')
+        self.notebook.add(self.history_tab, text='Histórico do Log', state='disabled')
+        self.history_tab.grid_rowconfigure(0, weight=1)
+        self.history_tab.grid_columnconfigure(0, weight=1)
+        # v14: Figura criada no primeiro uso (_build_history_figure)
+        
+        sweep_table_frame = tk.Frame(self.sweep_tab)
+        sweep_table_frame.grid(row=1, column=0, sticky="nsew")
+        self.sweep_table = ttk.Treeview(sweep_table_frame, columns=SWEEP_COLUMNS, show='headings', height=6)
+        for column in SWEEP_COLUMNS:
+            self.sweep_table.heading(column, text=column)
+            self.sweep_table.column(column, width=90, anchor='e')
+        sweep_table_scroll = ttk.Scrollbar(sweep_table_frame, orient='vertical', command=self.sweep_table.yview)
+        self.sweep_table.configure(yscrollcommand=sweep_table_scroll.set)
+        sweep_table_scroll.pack(side='right', fill='y')
+        self.sweep_table.pack(side='left', fill='both', expand=True)
+
+        # v14: Matplotlib, pandas e SciPy ficam para depois do primeiro desenho da janela
+        self.startup_timer.mark('janela construída')
+        master.after_idle(self._finish_startup)
+
+    # ===================================================================
+    # v14: INICIALIZAÇÃO RÁPIDA (FIGURAS SOB DEMANDA)
+    # ===================================================================
 
-        self.fig, self.ax = plt.subplots()
-        self.canvas = FigureCanvasTkAgg(self.fig, master=spectrum_tab)
+    def __getattr__(self, name):
+        """Cria a figura no primeiro acesso a um dos seus atributos (ex: self.ts_ax), de qualquer método."""
+        builder = _FIGURE_BUILDER_BY_ATTR.get(name)
+        if builder is None or builder in self.__dict__.get('_built_figures', ()):
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        self._ensure_figure(builder)
+        return self.__dict__[name]
+
+    def _ensure_figure(self, builder):
+        """Chama o método 'builder' (de LAZY_FIGURE_ATTRS) se a figura ainda não existe."""
+        if builder not in self._built_figures:
+            self._built_figures.add(builder)
+            getattr(self, builder)()
+
+    def _finish_startup(self):
+        """
+        Primeiro ciclo ocioso: a janela já está desenhada e responde. O matplotlib é
+        importado numa thread e a figura do espectro é criada quando ele termina.
+        """
+        self.startup_timer.mark('janela interativa')
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
+        self._get_log_writer() # Regrava as linhas que uma sessão anterior deixou pendentes
+        self._figure_preload = preload(*STARTUP_FIGURE_MODULES)
+        self._poll_figure_preload()
+
+    def _poll_figure_preload(self):
+        if self._figure_preload.is_alive():
+            self.master.after(STARTUP_POLL_MS, self._poll_figure_preload)
+            return
+        self._ensure_figure('_build_spectrum_figure') # Já pode ter sido criada por um acesso antecipado
+        self.startup_timer.mark('figura do espectro')
+        preload(*STARTUP_PRELOAD_MODULES, on_done=self._on_preload_done) # Primeiro filtro/lote sem esperar imports
+
+    def _on_preload_done(self, errors):
+        """Chamado da thread de pré-carga: só registra o tempo (sem tocar no Tk)."""
+        self.startup_timer.mark('pré-carga concluída')
+        if STARTUP_REPORT:
+            report = self.startup_timer.format_report()
+            for name, error in errors.items():
+                report += f"\nfalha ao pré-carregar {name}: {error}"
+            print(f"[inicialização]\n{report}", file=sys.stderr)
+
+    def _new_figure(self):
+        """Figura e eixo para embutir no Tk (sem pyplot: nada de gerenciador de figuras global)."""
+        fig = mpl_figure.Figure()
+        return fig, fig.add_subplot()
+
+    def _build_spectrum_figure(self):
+        self.fig, self.ax = self._new_figure()
+        self.canvas = backend_tkagg.FigureCanvasTkAgg(self.fig, master=self.spectrum_tab)
         self.canvas.get_tk_widget().grid(row=0, column=0, sticky="nsew")
         
-        self.toolbar = NavigationToolbar2Tk(self.canvas, spectrum_tab, pack_toolbar=False)
+        self.toolbar = backend_tkagg.NavigationToolbar2Tk(self.canvas, self.spectrum_tab, pack_toolbar=False)
         self.toolbar.update()
         self.toolbar.grid(row=1, column=0, sticky="ew")
         
@@ -235,28 +594,70 @@ class LpgFilterApp:
         self.ax.set_ylabel("Potência (dB)")
         self.ax.grid(True, linestyle=':', alpha=0.7)
         self.fig.tight_layout()
-        
-        # --- Separador 2: Análise Temporal ---
-        self.time_series_tab = tk.Frame(self.notebook, bg='white')
-        self.notebook.add(self.time_series_tab, text='Análise Temporal', state='disabled')
-        
-        self.time_series_tab.grid_rowconfigure(0, weight=1)
-        self.time_series_tab.grid_columnconfigure(0, weight=1)
+        self.canvas.mpl_connect('resize_event', lambda event: self._update_lod())
+        self.canvas.draw_idle()
 
-        self.ts_fig, self.ts_ax = plt.subplots()
-        self.ts_canvas = FigureCanvasTkAgg(self.ts_fig, master=self.time_series_tab)
+    def _build_time_series_figure(self):
+        self.ts_fig, self.ts_ax = self._new_figure()
+        self.ts_canvas = backend_tkagg.FigureCanvasTkAgg(self.ts_fig, master=self.time_series_tab)
         self.ts_canvas.get_tk_widget().grid(row=0, column=0, sticky="nsew")
         
-        self.ts_toolbar = NavigationToolbar2Tk(self.ts_canvas, self.time_series_tab, pack_toolbar=False)
+        self.ts_toolbar = backend_tkagg.NavigationToolbar2Tk(self.ts_canvas, self.time_series_tab, pack_toolbar=False)
         self.ts_toolbar.update()
         self.ts_toolbar.grid(row=1, column=0, sticky="ew")
         
+        # v14: Artistas persistentes num único eixo gêmeo, atualizados com set_data
+        self.ts_ax2 = self.ts_ax.twinx()
+        self.ts_wl_line, = self.ts_ax.plot([], [], 'o-', color='blue', label='Comprimento de Onda (nm)')
+        self.ts_int_line, = self.ts_ax2.plot([], [], 's--', color='red', alpha=0.6, label='Intensidade (dB)')
+        # Segmentos "animated" (fora do desenho normal) para desenhar só os pontos novos por blitting
+        self.ts_wl_segment, = self.ts_ax.plot([], [], 'o-', color='blue', animated=True)
+        self.ts_int_segment, = self.ts_ax2.plot([], [], 's--', color='red', alpha=0.6, animated=True)
+        self.ts_background = None
+        self.ts_canvas.mpl_connect('draw_event', self._on_ts_draw)
+        self.ts_resonance_lines = [] # v14: pares (Δλ, intensidade) por ressonância, criados sob demanda
+        
         self.ts_ax.set_title("Processe um lote para ver a análise temporal")
         self.ts_ax.set_xlabel("Índice do Arquivo (Tempo)")
-        self.ts_ax.set_ylabel("Comprimento de Onda do Vale (nm)")
+        self.ts_ax.set_ylabel("Comprimento de Onda do Vale (nm)", color='blue')
+        self.ts_ax.tick_params(axis='y', labelcolor='blue')
+        self.ts_ax2.set_ylabel("Intensidade do Vale (dB)", color='red')
+        self.ts_ax2.tick_params(axis='y', labelcolor='red')
         self.ts_ax.grid(True, linestyle=':', alpha=0.7)
         self.ts_fig.tight_layout()
 
+    def _build_sweep_figure(self):
+        self.sweep_fig, self.sweep_ax = self._new_figure()
+        self.sweep_canvas = backend_tkagg.FigureCanvasTkAgg(self.sweep_fig, master=self.sweep_tab)
+        self.sweep_canvas.get_tk_widget().grid(row=0, column=0, sticky="nsew")
+
+    def _build_history_figure(self):
+        self.history_fig = mpl_figure.Figure()
+        self.history_ax_wl = self.history_fig.add_subplot(2, 1, 1)
+        self.history_ax_int = self.history_fig.add_subplot(2, 1, 2, sharex=self.history_ax_wl)
+        self.history_canvas = backend_tkagg.FigureCanvasTkAgg(self.history_fig, master=self.history_tab)
+        self.history_canvas.get_tk_widget().grid(row=0, column=0, sticky="nsew")
+        
+        self.history_toolbar = backend_tkagg.NavigationToolbar2Tk(self.history_canvas, self.history_tab, pack_toolbar=False)
+        self.history_toolbar.update()
+        self.history_toolbar.grid(row=1, column=0, sticky="ew")
+        
+        # Linhas persistentes: só os dados (reduzidos por LTTB à parte visível) mudam a cada zoom
+        self.history_wl_line, = self.history_ax_wl.plot([], [], '-', color='blue', lw=0.6, alpha=0.5, label='Vale')
+        self.history_wl_mean_line, = self.history_ax_wl.plot([], [], '-', color='navy', lw=1.5, label='Média móvel')
+        self.history_int_line, = self.history_ax_int.plot([], [], '-', color='red', lw=0.6, alpha=0.5, label='Vale')
+        self.history_int_mean_line, = self.history_ax_int.plot([], [], '-', color='darkred', lw=1.5, label='Média móvel')
+        
+        self.history_ax_wl.set_ylabel("Comprimento de Onda do Vale (nm)", color='blue')
+        self.history_ax_int.set_ylabel("Intensidade do Vale (dB)", color='red')
+        self.history_ax_int.set_xlabel("Horário")
+        self.history_ax_int.xaxis_date() # x em dias desde 1970 (datas do matplotlib)
+        for ax in (self.history_ax_wl, self.history_ax_int):
+            ax.grid(True, linestyle=':', alpha=0.7)
+        self.history_ax_wl.callbacks.connect('xlim_changed', lambda ax: self._schedule_history_view())
+        self.history_canvas.mpl_connect('resize_event', lambda event: self._schedule_history_view())
+        self.history_fig.tight_layout()
+
     # ===================================================================
     # FUNÇÕES DE LÓGICA
     # ===================================================================
@@ -275,16 +676,6 @@ class LpgFilterApp:
                 self.process_and_plot(re_plot_only=True)
 
 
-    def detect_delimiter(self, filepath):
-        try:
-            with open(filepath, 'r') as f:
-                first_line = f.readline()
-            if ';' in first_line: return ';'
-            if re.search(r'\d,\d', first_line): return None
-            if ',' in first_line: return ','
-            return None
-        except Exception: return None
-
     def load_files(self):
         filepaths = filedialog.askopenfilenames(
             title="Selecione o(s) arquivo(s) de espectro",
@@ -295,26 +686,29 @@ class LpgFilterApp:
         self.reset_data(clear_plot=False)
         
         try:
-            for filepath in filepaths:
-                delimiter = self.detect_delimiter(filepath)
-                try: data = np.loadtxt(filepath, delimiter=delimiter)
-                except Exception: data = np.loadtxt(filepath)
+            if self.lazy_load_var.get():
+                # v14: só caminho e metadados; os arrays são lidos em _get_spectrum
+                entries = [{'path': filepath, 'size': os.path.getsize(filepath)} for filepath in filepaths]
+            else:
+                # v14: leitura rápida, em paralelo num pool de threads
+                spectra = load_spectra(filepaths, read_func=self._read_spectrum)
+                entries = [{'path': filepath, 'wavelength': wavelength, 'intensity': intensity}
+                           for filepath, (wavelength, intensity) in zip(filepaths, spectra)]
 
-                if data.ndim != 2 or data.shape[1] < 2:
-                    raise ValueError(f"O arquivo {os.path.basename(filepath)} não parece ter duas colunas.")
-                
-                data = data[:, :2]
-                filename = os.path.basename(filepath)
+            for entry in entries:
+                filename = os.path.basename(entry['path'])
                 if filename in self.loaded_data:
                     filename = f"{filename}_({len(self.loaded_data)})"
                 
-                self.loaded_data[filename] = {'wavelength': data[:, 0], 'intensity': data[:, 1]}
+                self.loaded_data[filename] = entry
                 self.file_listbox.insert('end', filename)
 
             if self.file_listbox.size() > 0:
                 self.file_listbox.select_set(0)
                 self.on_file_select(None)
                 self.batch_process_button.config(state='normal') # Ativa o botão de lote
+                self.sweep_button.config(state='normal')
+                self.batch_images_button.config(state='normal')
 
         except Exception as e:
             messagebox.showerror("Erro ao Carregar Arquivo", f"Não foi possível ler os arquivos:\n{e}")
@@ -325,28 +719,47 @@ class LpgFilterApp:
         if not selected_indices: return
             
         selected_filename = self.file_listbox.get(selected_indices[0])
+        self._cancel_preview() # v14: uma pré-visualização do arquivo anterior não pode chegar depois da troca
         
         if selected_filename in self.loaded_data:
-            data = self.loaded_data[selected_filename]
+            try:
+                wavelength, intensity = self._get_spectrum(self.loaded_data[selected_filename])
+            except Exception as e:
+                messagebox.showerror("Erro ao Carregar Arquivo", f"Não foi possível ler {selected_filename}:\n{e}")
+                return
             self.active_filename = selected_filename
-            self.active_wavelength = data['wavelength']
-            self.active_intensity = data['intensity']
+            self.active_wavelength = wavelength
+            self.active_intensity = intensity
+            self.process_button.config(state='normal')
+            self.notebook.select(0) # Volta para o separador do espectro
             
-            self.active_filtered_intensity = None
-            self.active_valley_wl = None
-            self.active_valley_intensity = None
-            self.save_full_spectrum_button.config(state='disabled')
-            self.save_full_image_button.config(state='disabled')
-            self.save_filtered_image_button.config(state='disabled')
-            self.log_valley_button.config(state='disabled')
-            self.valley_info_label.config(text="Vale do Espectro: N/A")
+            # v14: Arquivo já filtrado com os parâmetros atuais: o resultado guardado é mostrado na hora
+            params = self._read_preview_params()
+            cached = self.filter_results.get(self._filter_result_key(params)) if params is not None else None
+            if cached is not None:
+                self._set_filter_result(cached)
+                self.process_and_plot(re_plot_only=True)
+                return
             
+            self._clear_filter_result()
             self.plot_data(self.active_wavelength, self.active_intensity, "Sinal Original")
-            self.process_button.config(state='normal')
-            self.notebook.select(0) # Volta para o separador do espectro
+            if self.live_preview_var.get(): self._run_preview()
+
+    def _read_spectrum(self, filepath):
+        """(v14) Lê um espectro, pelo cache binário (.npy) se ativado."""
+        if self.use_cache_var.get():
+            return self.spectrum_cache.load(filepath)
+        return core.load_spectrum(filepath)
+
+    def _get_spectrum(self, entry):
+        """(v14) Arrays de uma entrada da lista: já em memória ou lidos sob demanda pelo SpectrumStore."""
+        if 'wavelength' in entry:
+            return entry['wavelength'], entry['intensity']
+        return self.spectrum_store.get(entry['path'])
 
     def reset_data(self, clear_plot=True):
         self.loaded_data.clear()
+        self.spectrum_store.clear()
         self.file_listbox.delete(0, 'end')
         self.active_wavelength = None
         self.active_intensity = None
@@ -354,6 +767,9 @@ class LpgFilterApp:
         self.active_filtered_intensity = None
         self.active_valley_wl = None
         self.active_valley_intensity = None
+        self.active_resonances = None
+        self.filter_results.clear() # v14: nomes de arquivo podem voltar com outro conteúdo
+        self._cancel_preview()
         
         self.process_button.config(state='disabled')
         self.save_full_spectrum_button.config(state='disabled')
@@ -361,11 +777,14 @@ class LpgFilterApp:
         self.save_filtered_image_button.config(state='disabled')
         self.log_valley_button.config(state='disabled')
         self.batch_process_button.config(state='disabled')
+        self.sweep_button.config(state='disabled')
+        self.batch_images_button.config(state='disabled')
         
         self.valley_info_label.config(text="Vale do Espectro: N/A")
         
         if clear_plot:
             self.ax.clear()
+            self.lod_lines = []
             self.ax.set_title("Carregue um arquivo para começar")
             self.ax.set_xlabel("Comprimento de Onda (nm)")
             self.ax.set_ylabel("Potência (dB)")
@@ -373,13 +792,7 @@ class LpgFilterApp:
             self.fig.tight_layout()
             self.canvas.draw()
             
-            self.ts_ax.clear()
-            self.ts_ax.set_title("Processe um lote para ver a análise temporal")
-            self.ts_ax.set_xlabel("Índice do Arquivo (Tempo)")
-            self.ts_ax.set_ylabel("Comprimento de Onda do Vale (nm)")
-            self.ts_ax.grid(True, linestyle=':', alpha=0.7)
-            self.ts_fig.tight_layout()
-            self.ts_canvas.draw()
+            self._reset_time_series("Processe um lote para ver a análise temporal")
             self.notebook.add(self.time_series_tab, state='disabled')
 
     def _get_filter_params(self):
@@ -391,21 +804,19 @@ class LpgFilterApp:
             messagebox.showerror("Erro de Parâmetro", "Janela e Ordem devem ser números inteiros.")
             return None
 
-        if window_size % 2 == 0:
-            window_size += 1
+        valid_window, valid_order = core.validate_filter_params(window_size, poly_order)
+        if valid_window != window_size:
+            window_size = valid_window
             self.window_entry.delete(0, 'end'); self.window_entry.insert(0, str(window_size))
         
-        if poly_order >= window_size:
-            poly_order = max(1, window_size - 2)
+        if valid_order != poly_order:
+            poly_order = valid_order
             self.order_entry.delete(0, 'end'); self.order_entry.insert(0, str(poly_order))
-        elif poly_order < 1:
-             poly_order = 1
-             self.order_entry.delete(0, 'end'); self.order_entry.insert(0, str(poly_order))
 
         try:
             # Usa min/max dos *dados ativos* como fallback se os campos estiverem vazios
-            wl_min = min(self.active_wavelength) if self.active_wavelength is not None else 0
-            wl_max = max(self.active_wavelength) if self.active_wavelength is not None else 1
+            wl_min = np.min(self.active_wavelength) if self.active_wavelength is not None else 0
+            wl_max = np.max(self.active_wavelength) if self.active_wavelength is not None else 1
             
             range_start = float(self.range_start_entry.get()) if self.range_start_entry.get() else wl_min
             range_end = float(self.range_end_entry.get()) if self.range_end_entry.get() else wl_max
@@ -419,21 +830,15 @@ class LpgFilterApp:
             
         return window_size, poly_order, range_start, range_end, self.normalize_var.get()
 
-    def _find_valley(self, wavelengths, intensities, range_start, range_end):
-        """Helper para encontrar o vale dentro de uma faixa."""
-        range_mask = (wavelengths >= range_start) & (wavelengths <= range_end)
-        
-        if not np.any(range_mask):
-            return None # Faixa inválida
-        
-        wavelength_in_range = wavelengths[range_mask]
-        intensity_in_range = intensities[range_mask]
-        
-        min_intensity_index_local = np.argmin(intensity_in_range)
-        valley_intensity = intensity_in_range[min_intensity_index_local]
-        valley_wl = wavelength_in_range[min_intensity_index_local]
-        
-        return valley_wl, valley_intensity
+    def _get_resonance_params(self):
+        """(v14) Faixas nomeadas e proeminência mínima. Devolve ([], 0.0) sem ressonâncias, ou None se inválido."""
+        try:
+            ranges = parse_ranges(self.resonances_entry.get())
+            min_prominence = float(self.min_prominence_entry.get() or 0)
+        except ValueError as e:
+            messagebox.showerror("Erro de Parâmetro", f"Ressonâncias inválidas:\n{e}")
+            return None
+        return ranges, min_prominence
 
     def process_and_plot(self, re_plot_only=False):
         if self.active_wavelength is None or self.active_intensity is None:
@@ -445,44 +850,24 @@ class LpgFilterApp:
             if params is None: return # Erro na validação
             
             window_size, poly_order, range_start, range_end, normalize = params
+            resonance_params = self._get_resonance_params()
+            if resonance_params is None: return
+            ranges, min_prominence = resonance_params
 
+            roi = self.roi_var.get()
+            key = self._filter_result_key((window_size, poly_order, range_start, range_end, normalize, ranges, min_prominence, roi))
+            self._cancel_preview() # O resultado pedido agora substitui qualquer pré-visualização pendente
             try:
-                data_to_filter = self.active_intensity.copy()
-                if normalize:
-                    data_to_filter = data_to_filter - np.max(data_to_filter)
-                
-                sinal_filtrado = savgol_filter(data_to_filter, window_size, poly_order)
-                self.active_filtered_intensity = sinal_filtrado
-                
-                # --- Encontra o Vale (Dentro da Faixa) ---
-                valley_result = self._find_valley(self.active_wavelength, sinal_filtrado, range_start, range_end)
-                
-                if valley_result is None:
-                    self.active_valley_wl = None
-                    self.active_valley_intensity = None
-                    info_text = "Vale do Espectro: Faixa inválida"
-                else:
-                    self.active_valley_wl, self.active_valley_intensity = valley_result
-                    info_text = f"Vale: {self.active_valley_intensity:.2f} dB @ {self.active_valley_wl:.2f} nm"
-                
-                # Atualiza UI
-                self.valley_info_label.config(text=info_text)
-                self.save_full_spectrum_button.config(state='normal')
-                self.save_full_image_button.config(state='normal')
-                self.save_filtered_image_button.config(state='normal')
-                self.log_valley_button.config(state='normal' if self.active_valley_wl is not None else 'disabled')
-
+                result = self.filter_results.get(key) # v14: mesmo arquivo e parâmetros já calculados
+                if result is None:
+                    result = compute_filter_result(self.active_wavelength, self.active_intensity, window_size, poly_order,
+                                                   range_start, range_end, normalize, ranges, min_prominence, roi)
+                    self.filter_results.put(key, result)
             except Exception as e:
                 messagebox.showerror("Erro no Filtro", f"Não foi possível aplicar o filtro:\n{e}")
-                self.active_filtered_intensity = None
-                self.active_valley_wl = None
-                self.active_valley_intensity = None
-                self.valley_info_label.config(text="Vale do Espectro: Erro")
-                self.save_full_spectrum_button.config(state='disabled')
-                self.save_full_image_button.config(state='disabled')
-                self.save_filtered_image_button.config(state='disabled')
-                self.log_valley_button.config(state='disabled')
+                self._clear_filter_result("Vale do Espectro: Erro")
                 return
+            self._set_filter_result(result)
 
         # --- (Re)Plotagem ---
         original_plot_data = self.active_intensity
@@ -492,49 +877,184 @@ class LpgFilterApp:
         original_label = "Sinal Original" + (" (Normalizado)" if self.normalize_var.get() else "")
         filtered_label = "Sinal Filtrado" + (" (Normalizado)" if self.normalize_var.get() else "")
 
+        w_filt, i_filt = self.active_wavelength, self.active_filtered_intensity
+        if i_filt is not None and (np.isnan(i_filt[0]) or np.isnan(i_filt[-1])): # v14: ROI, NaN fora da faixa filtrada
+            finite = np.flatnonzero(np.isfinite(i_filt))
+            if finite.size: w_filt, i_filt = w_filt[finite[0]:finite[-1] + 1], i_filt[finite[0]:finite[-1] + 1]
+
         self.plot_data(
             w_orig=self.active_wavelength,
             i_orig=original_plot_data,
             label_orig=original_label,
-            w_filt=self.active_wavelength if self.active_filtered_intensity is not None else None,
-            i_filt=self.active_filtered_intensity,
+            w_filt=w_filt if i_filt is not None else None,
+            i_filt=i_filt,
             label_filt=filtered_label
         )
 
 
+    def _set_filter_result(self, result):
+        """(v14) Torna ativo um resultado de compute_filter_result e atualiza o texto do vale e os botões."""
+        filtered, valley_result, resonances = result
+        self.active_filtered_intensity = filtered
+        self.active_resonances = resonances # v14: com ressonâncias, o mesmo sinal filtrado serve a todas as faixas
+        if valley_result is None:
+            self.active_valley_wl = None
+            self.active_valley_intensity = None
+            info_text = "Vale do Espectro: Faixa inválida"
+        else:
+            self.active_valley_wl, self.active_valley_intensity = valley_result
+            info_text = f"Vale: {self.active_valley_intensity:.2f} dB @ {self.active_valley_wl:.2f} nm"
+        if resonances:
+            info_text = "\n".join(f"{name}: {valley[1]:.2f} dB @ {valley[0]:.2f} nm" if valley else f"{name}: sem vale"
+                                  for name, valley in resonances.items())
+        
+        # Atualiza UI
+        self.valley_info_label.config(text=info_text)
+        self.save_full_spectrum_button.config(state='normal')
+        self.save_full_image_button.config(state='normal')
+        self.save_filtered_image_button.config(state='normal')
+        self.log_valley_button.config(state='normal' if self.active_valley_wl is not None else 'disabled')
+
+    def _clear_filter_result(self, info_text="Vale do Espectro: N/A"):
+        self.active_filtered_intensity = None
+        self.active_valley_wl = None
+        self.active_valley_intensity = None
+        self.active_resonances = None
+        self.valley_info_label.config(text=info_text)
+        self.save_full_spectrum_button.config(state='disabled')
+        self.save_full_image_button.config(state='disabled')
+        self.save_filtered_image_button.config(state='disabled')
+        self.log_valley_button.config(state='disabled')
+
+    # ===================================================================
+    # v14: PRÉ-VISUALIZAÇÃO AO VIVO
+    # ===================================================================
+
+    def _filter_result_key(self, params):
+        """Chave do cache de resultados: arquivo ativo + (janela, ordem, início, fim, normalizar, faixas, proeminência, ROI)."""
+        window_size, poly_order, range_start, range_end, normalize, ranges, min_prominence, roi = params
+        return (self.active_filename, window_size, poly_order, float(range_start), float(range_end), normalize,
+                tuple(ranges), min_prominence, roi)
+
+    def _read_preview_params(self):
+        """
+        Parâmetros dos campos sem avisos nem correções nos campos (o usuário pode estar digitando).
+        Mesmos valores de _get_filter_params/_get_resonance_params; None se algum campo estiver incompleto.
+        """
+        if self.active_wavelength is None: return None
+        try:
+            window_size, poly_order = core.validate_filter_params(int(self.window_entry.get()), int(self.order_entry.get()))
+            range_start = float(self.range_start_entry.get()) if self.range_start_entry.get() else np.min(self.active_wavelength)
+            range_end = float(self.range_end_entry.get()) if self.range_end_entry.get() else np.max(self.active_wavelength)
+            ranges = parse_ranges(self.resonances_entry.get())
+            min_prominence = float(self.min_prominence_entry.get() or 0)
+        except ValueError:
+            return None
+        if range_start >= range_end: return None
+        return (window_size, poly_order, range_start, range_end, self.normalize_var.get(), ranges, min_prominence,
+                self.roi_var.get())
+
+    def _on_live_preview_toggle(self):
+        """Ligar agenda uma pré-visualização; desligar descarta a agendada ou em cálculo."""
+        if self.live_preview_var.get():
+            self._schedule_preview()
+        else:
+            self._cancel_preview()
+
+    def _schedule_preview(self, event=None):
+        """Reagenda a pré-visualização a cada alteração: só roda PREVIEW_DEBOUNCE_MS após a última."""
+        if self.preview_after_id is not None:
+            self.master.after_cancel(self.preview_after_id)
+            self.preview_after_id = None
+        if self.live_preview_var.get() and self.active_intensity is not None:
+            self.preview_after_id = self.master.after(PREVIEW_DEBOUNCE_MS, self._run_preview)
+
+    def _run_preview(self):
+        """Mostra o resultado guardado ou pede o cálculo à thread de pré-visualização."""
+        self.preview_after_id = None
+        params = self._read_preview_params()
+        if params is None: return # Campo incompleto: mantém o último resultado na tela
+        key = self._filter_result_key(params)
+        cached = self.filter_results.get(key)
+        if cached is not None:
+            self._cancel_preview()
+            self._set_filter_result(cached)
+            self.process_and_plot(re_plot_only=True)
+            return
+
+        if self.preview_worker is None:
+            self.preview_worker = PreviewWorker(self.filter_results)
+        window_size, poly_order, range_start, range_end, normalize, ranges, min_prominence, roi = params
+        self.preview_generation = self.preview_worker.submit(key, self.active_wavelength, self.active_intensity, dict(
+            window_size=window_size, poly_order=poly_order, range_start=range_start, range_end=range_end,
+            normalize=normalize, ranges=ranges, min_prominence=min_prominence, roi=roi))
+        if not self.preview_polling:
+            self.preview_polling = True
+            self.master.after(PREVIEW_POLL_MS, self._poll_preview_queue)
+
+    def _cancel_preview(self):
+        """Descarta a pré-visualização agendada ou em cálculo (o resultado, se vier, é ignorado)."""
+        if self.preview_after_id is not None:
+            self.master.after_cancel(self.preview_after_id)
+            self.preview_after_id = None
+        if self.preview_worker is not None:
+            self.preview_worker.cancel()
+        self.preview_generation = None
+
+    def _poll_preview_queue(self):
+        """Lê os resultados da thread; só o do pedido mais recente é desenhado (os obsoletos são descartados)."""
+        latest = None
+        try:
+            while True:
+                message = self.preview_worker.result_queue.get_nowait()
+                if message[1] == self.preview_generation: latest = message
+        except queue.Empty:
+            pass
+
+        if latest is None and self.preview_generation is not None:
+            self.master.after(PREVIEW_POLL_MS, self._poll_preview_queue)
+            return
+        self.preview_polling = False
+        if latest is None: return # Pedido cancelado
+        self.preview_generation = None
+        if latest[2][0] != self.active_filename: return # Resultado de outro arquivo (a seleção mudou)
+        if latest[0] == 'preview_error':
+            self.valley_info_label.config(text=f"Pré-visualização: {latest[3]}")
+            return
+        self._set_filter_result(latest[3])
+        self.process_and_plot(re_plot_only=True)
+
     def plot_data(self, w_orig, i_orig, label_orig, w_filt=None, i_filt=None, label_filt=None):
         if not self.ax.get_title().startswith("Carregue"):
             xlim = self.ax.get_xlim(); ylim = self.ax.get_ylim()
         else: xlim = None; ylim = None
 
         self.ax.clear()
-        self.ax.plot(w_orig, i_orig, '.', color=self.color_original, markersize=2, label=label_orig)
+        self.lod_lines = []
+        self._plot_decimated(w_orig, i_orig, '.', color=self.color_original, markersize=2, label=label_orig)
         
         if w_filt is not None and i_filt is not None and label_filt is not None:
-            self.ax.plot(w_filt, i_filt, '-', color=self.color_filtrado, linewidth=2, label=label_filt)
-
-            if self.active_valley_wl is not None:
+            self._plot_decimated(w_filt, i_filt, '-', color=self.color_filtrado, linewidth=2, label=label_filt)
+
+            if self.active_resonances:
+                # v14: uma anotação por ressonância encontrada
+                for name, valley in self.active_resonances.items():
+                    if valley is not None:
+                        self._annotate_valley(valley[0], valley[1], f"{name}: {valley[1]:.2f} dB\n@ {valley[0]:.2f} nm")
+            elif self.active_valley_wl is not None:
                 wv_min = self.active_valley_wl
                 int_min = self.active_valley_intensity
-                text_label = f"Vale: {int_min:.2f} dB\n@ {wv_min:.2f} nm"
-                
-                try:
-                    self.ax.annotate(text_label,
-                        xy=(wv_min, int_min),
-                        xytext=(wv_min + (self.ax.get_xlim()[1] - self.ax.get_xlim()[0]) * 0.05, int_min + abs(int_min)*0.1),
-                        ha='left', va='bottom',
-                        arrowprops=dict(arrowstyle='->', color=self.color_filtrado, connectionstyle='arc3,rad=0.3'),
-                        bbox=dict(boxstyle='round,pad=0.3', fc=self.color_filtrado, alpha=0.2),
-                        color='black'
-                    )
-                except Exception: pass # Ignora erro de anotação
+                self._annotate_valley(wv_min, int_min, f"Vale: {int_min:.2f} dB\n@ {wv_min:.2f} nm")
 
             try:
-                range_start = float(self.range_start_entry.get()) if self.range_start_entry.get() else None
-                range_end = float(self.range_end_entry.get()) if self.range_end_entry.get() else None
+                if self.active_resonances:
+                    range_limits = [limit for _, start, end in parse_ranges(self.resonances_entry.get()) for limit in (start, end)]
+                else:
+                    range_start = float(self.range_start_entry.get()) if self.range_start_entry.get() else None
+                    range_end = float(self.range_end_entry.get()) if self.range_end_entry.get() else None
+                    range_limits = [limit for limit in (range_start, range_end) if limit]
                 plot_ymin, plot_ymax = self.ax.get_ylim()
-                if range_start: self.ax.vlines(range_start, plot_ymin, plot_ymax, colors='blue', linestyles='dashed', alpha=0.5)
-                if range_end: self.ax.vlines(range_end, plot_ymin, plot_ymax, colors='blue', linestyles='dashed', alpha=0.5)
+                if range_limits: self.ax.vlines(range_limits, plot_ymin, plot_ymax, colors='blue', linestyles='dashed', alpha=0.5)
             except Exception: pass
 
         self.ax.set_title(f"Espectro de: {self.active_filename}")
@@ -543,51 +1063,421 @@ class LpgFilterApp:
         self.ax.legend()
         self.ax.grid(True, linestyle=':', alpha=0.7)
         
+        # ax.clear() remove os callbacks: reconecta a redução ao zoom/pan da barra de navegação
+        self.ax.callbacks.connect('xlim_changed', self._update_lod)
         if xlim and ylim: self.ax.set_xlim(xlim); self.ax.set_ylim(ylim)
         
         self.fig.tight_layout()
-        self.canvas.draw()
+        self.canvas.draw_idle()
+
+    def _annotate_valley(self, wv_min, int_min, text_label):
+        try:
+            self.ax.annotate(text_label,
+                xy=(wv_min, int_min),
+                xytext=(wv_min + (self.ax.get_xlim()[1] - self.ax.get_xlim()[0]) * 0.05, int_min + abs(int_min)*0.1),
+                ha='left', va='bottom',
+                arrowprops=dict(arrowstyle='->', color=self.color_filtrado, connectionstyle='arc3,rad=0.3'),
+                bbox=dict(boxstyle='round,pad=0.3', fc=self.color_filtrado, alpha=0.2),
+                color='black'
+            )
+        except Exception: pass # Ignora erro de anotação
+
+    def _lod_bins(self):
+        """Número de blocos da redução: um por pixel de largura do gráfico."""
+        return max(int(self.ax.get_window_extent().width), LOD_MIN_BINS)
+
+    def _plot_decimated(self, x, y, *args, **kwargs):
+        """
+        (v14) Plota (x, y) reduzido a mínimo/máximo por pixel. Os dados completos ficam
+        em self.lod_lines e a parte visível é recalculada a cada zoom/pan (_update_lod).
+        """
+        x = np.asarray(x); y = np.asarray(y)
+        x_sorted = downsample.is_sorted(x)
+        n_bins = self._lod_bins()
+        x_view, y_view, view_range = downsample.decimate_for_view(x, y, -np.inf, np.inf, n_bins, x_sorted)
+        line, = self.ax.plot(x_view, y_view, *args, **kwargs)
+        self.lod_lines.append({'line': line, 'x': x, 'y': y, 'sorted': x_sorted, 'view': (view_range, n_bins)})
+        return line
+
+    def _update_lod(self, ax=None):
+        """Recalcula a redução das linhas para os limites atuais (callback de 'xlim_changed' e de redimensionamento)."""
+        if not self.lod_lines: return
+        n_bins = self._lod_bins()
+        x_min, x_max = sorted(self.ax.get_xlim())
+        changed = False
+        for entry in self.lod_lines:
+            view_range = downsample.visible_range(entry['x'], x_min, x_max, entry['sorted'])
+            if (view_range, n_bins) == entry['view']: continue # Mesma parte visível: nada a refazer
+            start, end = view_range
+            x_view, y_view = downsample.minmax_decimate(entry['x'][start:end], entry['y'][start:end], n_bins)
+            entry['line'].set_data(x_view, y_view)
+            entry['view'] = (view_range, n_bins)
+            changed = True
+        if changed: self.canvas.draw_idle()
         
     def _plot_time_series(self, ts_data):
         """Plota os dados da análise temporal no separador 'Análise Temporal'."""
-        self.ts_ax.clear()
-        
+        if isinstance(ts_data, dict): # v14: várias ressonâncias
+            self._plot_resonance_time_series(ts_data)
+            return
         if not ts_data:
-            self.ts_ax.set_title("Nenhum dado válido encontrado no lote.")
-            self.ts_canvas.draw()
+            self._reset_time_series("Nenhum dado válido encontrado no lote.")
             return
 
-        indices = [d[0] for d in ts_data]
-        wavelengths = [d[1] for d in ts_data]
-        intensities = [d[2] for d in ts_data]
+        # v14: Reaproveita as linhas e o eixo gêmeo existentes (set_data em arrays NumPy)
+        self._clear_resonance_lines()
+        data = np.asarray(ts_data, dtype=float)
+        self.ts_buffer = data.copy()
+        self.ts_count = len(data)
+        self.ts_wl_line.set_data(data[:, 0], data[:, 1])
+        self.ts_int_line.set_data(data[:, 0], data[:, 2])
+        self._set_time_series_limits(data)
+
+        self.ts_ax.set_title(f"Análise Temporal de {len(data)} Pontos")
+        self.ts_background = None
+        self.ts_canvas.draw_idle()
         
-        # Plot do Comprimento de Onda
-        self.ts_ax.plot(indices, wavelengths, 'o-', color='blue', label='Comprimento de Onda (nm)')
-        self.ts_ax.set_xlabel("Índice do Arquivo (Tempo)")
+        # Ativa e seleciona o separador
+        self.notebook.add(self.time_series_tab, state='normal')
+        self.notebook.select(1)
+
+    def _plot_resonance_time_series(self, series):
+        """
+        (v14) Uma linha por ressonância: deslocamento Δλ (em relação ao primeiro arquivo) no
+        eixo da esquerda e intensidade do vale no eixo gêmeo, com a mesma cor.
+        """
+        series = {name: np.asarray(points, dtype=float).reshape(-1, 3) for name, points in series.items()}
+        if not any(len(data) for data in series.values()):
+            self._reset_time_series("Nenhum dado válido encontrado no lote.")
+            return
+
+        self._reset_time_series(f"Análise Temporal de {len(series)} Ressonâncias")
+        self.ts_ax.set_ylabel("Deslocamento do Vale Δλ (nm)", color='black')
+        self.ts_ax.tick_params(axis='y', labelcolor='black')
+        self.ts_ax2.set_ylabel("Intensidade do Vale (dB)", color='black')
+        self.ts_ax2.tick_params(axis='y', labelcolor='black')
+
+        handles = []
+        shifted = []
+        for k, (name, data) in enumerate(series.items()):
+            if len(data) == 0: continue
+            shift = data.copy()
+            shift[:, 1] -= data[0, 1]
+            shifted.append(shift)
+            wl_line, int_line = self._resonance_lines(k)
+            wl_line.set_data(shift[:, 0], shift[:, 1]); wl_line.set_label(f"{name} Δλ")
+            int_line.set_data(shift[:, 0], shift[:, 2]); int_line.set_label(f"{name} (dB)")
+            handles += [wl_line, int_line]
+
+        self._set_time_series_limits(np.vstack(shifted))
+        self.ts_ax.legend(handles=handles, loc='best', fontsize=8)
+        self.ts_canvas.draw_idle()
+        self.notebook.add(self.time_series_tab, state='normal')
+        self.notebook.select(1)
+
+    def _resonance_lines(self, k):
+        """Linhas persistentes da k-ésima ressonância (criadas na primeira vez)."""
+        while len(self.ts_resonance_lines) <= k:
+            color = f"C{len(self.ts_resonance_lines)}"
+            wl_line, = self.ts_ax.plot([], [], 'o-', color=color, markersize=3)
+            int_line, = self.ts_ax2.plot([], [], 's--', color=color, alpha=0.5, markersize=3)
+            self.ts_resonance_lines.append((wl_line, int_line))
+        return self.ts_resonance_lines[k]
+
+    def _clear_resonance_lines(self):
+        """Esvazia as linhas de ressonâncias e volta aos rótulos da série de vale único."""
+        for wl_line, int_line in self.ts_resonance_lines:
+            wl_line.set_data([], []); int_line.set_data([], [])
+        if self.ts_ax.get_legend() is not None: self.ts_ax.get_legend().remove()
         self.ts_ax.set_ylabel("Comprimento de Onda do Vale (nm)", color='blue')
         self.ts_ax.tick_params(axis='y', labelcolor='blue')
-        
-        # Cria um segundo eixo Y para a Intensidade
-        ax2 = self.ts_ax.twinx()
-        ax2.plot(indices, intensities, 's--', color='red', alpha=0.6, label='Intensidade (dB)')
-        ax2.set_ylabel("Intensidade do Vale (dB)", color='red')
-        ax2.tick_params(axis='y', labelcolor='red')
+        self.ts_ax2.set_ylabel("Intensidade do Vale (dB)", color='red')
+        self.ts_ax2.tick_params(axis='y', labelcolor='red')
+
+    def _reset_time_series(self, title):
+        """(v14) Esvazia a série temporal mantendo os mesmos artistas e eixos."""
+        self.ts_buffer = np.empty((256, 3))
+        self.ts_count = 0
+        for line in (self.ts_wl_line, self.ts_int_line, self.ts_wl_segment, self.ts_int_segment):
+            line.set_data([], [])
+        self._clear_resonance_lines()
+        self.ts_ax.set_title(title)
+        self.ts_background = None
+        self.ts_canvas.draw_idle()
+
+    def _on_ts_draw(self, event):
+        """Guarda o fundo (já com as linhas) após cada desenho completo, para o blitting."""
+        self.ts_background = self.ts_canvas.copy_from_bbox(self.ts_fig.bbox)
+
+    def _set_time_series_limits(self, data, x_headroom=0.0):
+        """Ajusta os limites aos dados; 'x_headroom' reserva espaço à direita (fração do intervalo) para pontos futuros."""
+        x_lo, x_hi = np.nanmin(data[:, 0]), np.nanmax(data[:, 0])
+        x_span = max(x_hi - x_lo, 1.0)
+        self.ts_ax.set_xlim(x_lo - 0.02 * x_span, x_hi + (0.02 + x_headroom) * x_span)
+
+        for ax, column in ((self.ts_ax, 1), (self.ts_ax2, 2)):
+            y_lo, y_hi = np.nanmin(data[:, column]), np.nanmax(data[:, column])
+            y_pad = 0.1 * (y_hi - y_lo) if y_hi > y_lo else 0.5
+            ax.set_ylim(y_lo - y_pad, y_hi + y_pad)
+
+    def _fits_time_series_view(self, points):
+        """Verifica se os pontos cabem nos limites atuais dos dois eixos."""
+        x_lo, x_hi = self.ts_ax.get_xlim()
+        if points[:, 0].min() < x_lo or points[:, 0].max() > x_hi: return False
+        for ax, column in ((self.ts_ax, 1), (self.ts_ax2, 2)):
+            y_lo, y_hi = ax.get_ylim()
+            if points[:, column].min() < y_lo or points[:, column].max() > y_hi: return False
+        return True
+
+    def _append_time_series(self, points):
+        """
+        (v14) Acrescenta pontos (índice, comprimento de onda, intensidade) à série.
+        Se os pontos cabem nos limites atuais, só o trecho novo é desenhado sobre o fundo
+        guardado (blitting), com custo independente do tamanho da série. Caso contrário, os
+        limites crescem com folga (o redesenho completo fica raro) e a figura é redesenhada.
+        """
+        if not points: return
+
+        previous_count = self.ts_count
+        needed = previous_count + len(points)
+        if needed > len(self.ts_buffer):
+            grown = np.empty((max(needed, 2 * len(self.ts_buffer)), 3))
+            grown[:previous_count] = self.ts_buffer[:previous_count]
+            self.ts_buffer = grown
+        self.ts_buffer[previous_count:needed] = points
+        self.ts_count = needed
+
+        data = self.ts_buffer[:self.ts_count]
+        self.ts_wl_line.set_data(data[:, 0], data[:, 1])
+        self.ts_int_line.set_data(data[:, 0], data[:, 2])
+
+        new = data[previous_count:]
+        if previous_count == 0 or not self._fits_time_series_view(new):
+            self._set_time_series_limits(data, x_headroom=1.0)
+            self.ts_background = None
+
+        if self.ts_background is None:
+            self.ts_canvas.draw_idle() # _on_ts_draw guarda o novo fundo
+            return
 
-        self.ts_ax.set_title(f"Análise Temporal de {len(indices)} Pontos")
-        self.ts_ax.grid(True, linestyle=':', alpha=0.7)
-        self.ts_fig.tight_layout()
-        self.ts_canvas.draw()
-        
-        # Ativa e seleciona o separador
+        # Blitting: fundo guardado + trecho novo (ligado ao último ponto anterior)
+        segment = data[previous_count - 1:]
+        self.ts_canvas.restore_region(self.ts_background)
+        self.ts_wl_segment.set_data(segment[:, 0], segment[:, 1])
+        self.ts_int_segment.set_data(segment[:, 0], segment[:, 2])
+        self.ts_ax.draw_artist(self.ts_wl_segment)
+        self.ts_ax2.draw_artist(self.ts_int_segment)
+        self.ts_canvas.blit(self.ts_fig.bbox)
+        self.ts_background = self.ts_canvas.copy_from_bbox(self.ts_fig.bbox)
+
+    # ===================================================================
+    # OBSERVAÇÃO DE PASTA (v14)
+    # ===================================================================
+
+    def start_watch(self):
+        """Começa a observar uma pasta: cada arquivo novo é filtrado, registrado no log e plotado."""
+        params = self._get_filter_params()
+        if params is None: return # Erro na validação
+        window_size, poly_order, range_start, range_end, normalize = params
+        resonance_params = self._get_resonance_params()
+        if resonance_params is None: return
+        # Sem faixa definida, cada espectro usa o próprio intervalo completo
+        if not self.range_start_entry.get(): range_start = None
+        if not self.range_end_entry.get(): range_end = None
+
+        if self.ingest_server is not None:
+            messagebox.showwarning("Recepção Ativa", "Pare a recepção por TCP antes de observar uma pasta.")
+            return
+
+        if not self.log_filepath:
+            messagebox.showwarning("Sem Log", "Defina um arquivo de Log primeiro.")
+            self.set_log_file()
+            if not self.log_filepath: return
+
+        sample_name = self.sample_name_entry.get()
+        if not sample_name:
+            messagebox.showwarning("Sem Amostra", "Por favor, insira um 'Nome da Amostra' para a aquisição.")
+            return
+
+        directory = filedialog.askdirectory(title="Selecione a pasta onde o OSA grava os espectros")
+        if not directory: return
+
+        try:
+            self.folder_watcher = FolderWatcher(directory)
+        except OSError as e:
+            messagebox.showerror("Erro ao Observar Pasta", f"Não foi possível acessar a pasta:\n{e}")
+            return
+
+        self.watch_params = (window_size, poly_order, range_start, range_end, normalize, sample_name, resonance_params,
+                             self.roi_var.get())
+        self.watch_backlog.clear()
+        self.watch_count = 0
+        self.start_watch_button.config(state='disabled')
+        self.stop_watch_button.config(state='normal')
+        self.watch_label.config(text=f"Observando: {os.path.basename(directory) or directory}")
+        self._reset_time_series(f"Aquisição Contínua: {os.path.basename(directory) or directory}")
         self.notebook.add(self.time_series_tab, state='normal')
-        self.notebook.select(1)
+        self.master.after(WATCH_POLL_MS, self._poll_watch)
 
+    def stop_watch(self):
+        if self.folder_watcher is not None:
+            self.folder_watcher.close()
+        self.folder_watcher = None
+        self.start_watch_button.config(state='normal')
+        self.stop_watch_button.config(state='disabled')
+        self.watch_label.config(text=f"Inativo ({self.watch_count} arquivos processados)")
+
+    def _poll_watch(self):
+        """Processa os arquivos novos (no máximo WATCH_MAX_FILES_PER_TICK por vez) e reagenda."""
+        if self.folder_watcher is None: return
+
+        try:
+            self.watch_backlog.extend(self.folder_watcher.poll())
+        except OSError as e:
+            self.stop_watch()
+            messagebox.showerror("Erro ao Observar Pasta", f"A pasta deixou de estar acessível:\n{e}")
+            return
+
+        window_size, poly_order, range_start, range_end, normalize, sample_name, (ranges, min_prominence), roi = self.watch_params
+        rows = []
+        points = []
+        last_error = None
+        for _ in range(min(len(self.watch_backlog), WATCH_MAX_FILES_PER_TICK)):
+            filepath = self.watch_backlog.popleft()
+            try:
+                row = process_new_file(filepath, window_size, poly_order, range_start, range_end,
+                                       normalize, sample_name, read_func=self._read_spectrum,
+                                       ranges=ranges, min_prominence=min_prominence, roi=roi)
+            except Exception as e:
+                last_error = f"{os.path.basename(filepath)}: {e}"
+                continue
+            if row is None: continue
+
+            rows.append(row)
+            # Com ressonâncias, a série acompanha a primeira (colunas originais do log)
+            if not np.isnan(row['comprimento_onda_filtrado (nm)']):
+                points.append((self.watch_count, row['comprimento_onda_filtrado (nm)'], row['intensidade_filtrada_vale (dB)']))
+            self.watch_count += 1
+
+        if rows:
+            if not self._append_to_log(rows):
+                self.stop_watch() # Evita repetir o erro a cada verificação
+                return
+            self._append_time_series(points)
+
+        status = f"Observando: {self.watch_count} arquivos processados"
+        if self.watch_backlog: status += f" ({len(self.watch_backlog)} na fila)"
+        if last_error: status += f"\nÚltimo erro: {last_error}"
+        self.watch_label.config(text=status)
+        self.master.after(WATCH_POLL_MS, self._poll_watch)
+
+    # ===================================================================
+    # RECEPÇÃO POR TCP (v14)
+    # ===================================================================
+
+    def start_ingest(self):
+        """Abre a porta TCP: cada espectro recebido é filtrado, registrado no log e plotado, sem passar pelo disco."""
+        params = self._get_filter_params()
+        if params is None: return # Erro na validação
+        window_size, poly_order, range_start, range_end, normalize = params
+        resonance_params = self._get_resonance_params()
+        if resonance_params is None: return
+        # Sem faixa definida, cada espectro usa o próprio intervalo completo
+        if not self.range_start_entry.get(): range_start = None
+        if not self.range_end_entry.get(): range_end = None
+
+        if self.folder_watcher is not None:
+            messagebox.showwarning("Observação Ativa", "Pare a observação de pasta antes de receber por TCP.")
+            return
+
+        if not self.log_filepath:
+            messagebox.showwarning("Sem Log", "Defina um arquivo de Log primeiro.")
+            self.set_log_file()
+            if not self.log_filepath: return
+
+        sample_name = self.sample_name_entry.get()
+        if not sample_name:
+            messagebox.showwarning("Sem Amostra", "Por favor, insira um 'Nome da Amostra' para a aquisição.")
+            return
+
+        try:
+            port = int(self.ingest_port_entry.get())
+            self.ingest_server = SpectrumServer(port=port).start()
+        except ValueError:
+            messagebox.showerror("Erro de Parâmetro", "A porta deve ser um número inteiro.")
+            return
+        except OSError as e:
+            messagebox.showerror("Erro ao Abrir Porta", f"Não foi possível abrir a porta {port}:\n{e}")
+            return
+
+        self.ingest_params = (window_size, poly_order, range_start, range_end, normalize, sample_name, resonance_params,
+                              self.roi_var.get())
+        self.ingest_count = 0
+        self.ingest_rate = (time.perf_counter(), 0)
+        self.start_ingest_button.config(state='disabled')
+        self.stop_ingest_button.config(state='normal')
+        self.start_watch_button.config(state='disabled')
+        self.ingest_label.config(text=f"Recebendo na porta {self.ingest_server.port}")
+        self._reset_time_series(f"Recepção TCP: porta {self.ingest_server.port}")
+        self.notebook.add(self.time_series_tab, state='normal')
+        self.master.after(INGEST_POLL_MS, self._poll_ingest)
+
+    def stop_ingest(self):
+        if self.ingest_server is None: return
+        server = self.ingest_server
+        server.stop()
+        self._process_received(server.take()) # O que já chegou também vai para o log
+        self.ingest_server = None
+        self.start_ingest_button.config(state='normal')
+        self.stop_ingest_button.config(state='disabled')
+        self.start_watch_button.config(state='normal')
+        self.ingest_label.config(text=f"Inativo ({self.ingest_count} espectros recebidos)")
+
+    def _poll_ingest(self):
+        """Processa os espectros recebidos desde a última verificação (um lote vetorizado) e reagenda."""
+        server = self.ingest_server
+        if server is None: return
+
+        try:
+            self._process_received(server.take(INGEST_MAX_SPECTRA_PER_TICK))
+        except Exception as e:
+            self.stop_ingest()
+            messagebox.showerror("Erro na Recepção", f"Não foi possível processar os espectros recebidos:\n{e}")
+            return
+
+        now = time.perf_counter()
+        last_time, last_count = self.ingest_rate
+        if now - last_time >= 1.0:
+            self.ingest_rate = (now, self.ingest_count)
+            rate = (self.ingest_count - last_count) / (now - last_time)
+            status = f"Porta {server.port}: {self.ingest_count} espectros ({rate:.0f}/s)"
+            if server.pending(): status += f", {server.pending()} na fila"
+            if server.errors: status += f"\nÚltimo erro: {server.last_error}"
+            self.ingest_label.config(text=status)
+        self.master.after(INGEST_POLL_MS, self._poll_ingest)
+
+    def _process_received(self, spectra):
+        if not spectra: return
+        window_size, poly_order, range_start, range_end, normalize, sample_name, resonance_params, roi = self.ingest_params
+        ranges, min_prominence = resonance_params
+        rows = process_received(spectra, window_size, poly_order, range_start, range_end, normalize, sample_name,
+                                ranges, min_prominence, roi)
+        points = []
+        for k, row in enumerate(rows):
+            # Com ressonâncias, a série acompanha a primeira (colunas originais do log)
+            if row is not None and not np.isnan(row['comprimento_onda_filtrado (nm)']):
+                points.append((self.ingest_count + k, row['comprimento_onda_filtrado (nm)'], row['intensidade_filtrada_vale (dB)']))
+        self.ingest_count += len(spectra)
+
+        rows = [row for row in rows if row is not None]
+        if rows: self._append_to_log(rows)
+        self._append_time_series(points)
 
     # ===================================================================
     # FUNÇÕES DE SALVAMENTO (v13)
     # ===================================================================
 
-    def _ask_save_filepath(self, title, initial_filename):
+    def _ask_save_filepath(self, title, initial_filename, filetypes=None):
         # Pega a extensão padrão do nome inicial
         default_ext = os.path.splitext(initial_filename)[1]
         
@@ -596,17 +1486,12 @@ class LpgFilterApp:
             initialfile=initial_filename,
             # ADICIONA defaultextension para forçar a extensão se o usuário esquecer
             defaultextension=default_ext,
-            filetypes=[("Arquivo Excel", "*.xlsx"), ("Arquivo CSV (separado por ;)", "*.csv"), ("Todos os arquivos", "*.*")]
+            filetypes=filetypes or [("Arquivo Excel", "*.xlsx"), ("Arquivo CSV (separado por ;)", "*.csv"), ("Todos os arquivos", "*.*")]
         )
 
     def _write_to_file(self, df, filepath):
         try:
-            if filepath.endswith('.xlsx'):
-                df.to_excel(filepath, index=False, sheet_name='Dados')
-            elif filepath.endswith('.csv'):
-                df.to_csv(filepath, index=False, sep=';', decimal='.')
-            else:
-                raise ValueError(f"Extensão de arquivo não suportada: {filepath}")
+            core.write_to_file(df, filepath)
             return True
         except PermissionError:
              messagebox.showerror("Erro de Permissão", f"Não foi possível salvar.\nO arquivo '{os.path.basename(filepath)}' está aberto?\n\nFeche-o e tente novamente.")
@@ -615,31 +1500,97 @@ class LpgFilterApp:
             messagebox.showerror("Erro ao Salvar", f"Não foi possível salvar o arquivo:\n{e}")
             return False
 
-    def _append_to_log(self, df_to_append):
-        """Helper central para ler, adicionar e salvar no arquivo de log."""
+    def _append_to_log(self, rows, profiler=NULL_PROFILER):
+        """
+        Helper central para registrar linhas (dicts) no arquivo de log.
+        v14: só enfileira; a gravação (com novas tentativas enquanto o arquivo estiver aberto
+        em outro programa) roda em segundo plano, e o andamento aparece abaixo do log.
+        Devolve o threading.Event sinalizado quando as linhas saem da fila (False sem log);
+        a gravação entra como etapa 'log' de 'profiler'.
+        """
         if not self.log_filepath:
             messagebox.showwarning("Sem Log", "Defina um arquivo de Log primeiro.")
             self.set_log_file()
             if not self.log_filepath:
                 return False
         
-        try:
-            df_log = None
-            if os.path.exists(self.log_filepath):
-                if self.log_filepath.endswith('.xlsx'):
-                    df_log = pd.read_excel(self.log_filepath)
-                else:
-                    df_log = pd.read_csv(self.log_filepath, sep=';')
-                
-                df_log = pd.concat([df_log, df_to_append], ignore_index=True)
+        done = self._get_log_writer().submit(self.log_filepath, rows, profiler)
+        self._set_log_status()
+        self._start_log_polling()
+        return done
+
+    # ===================================================================
+    # v14: GRAVAÇÃO DO LOG EM SEGUNDO PLANO
+    # ===================================================================
+
+    def _get_log_writer(self):
+        if self.log_writer is None:
+            self.log_writer = LogWriter()
+            self._start_log_polling() # A thread avisa ('log_recovered') se houver linhas de uma sessão anterior
+        return self.log_writer
+
+    def _set_log_status(self, text=None, color='gray'):
+        if text is None:
+            text = f"Gravando no log: {self.log_writer.pending_count()} linhas pendentes..."
+        self.log_status_label.config(text=text, fg=color)
+
+    def _start_log_polling(self):
+        if not self.log_polling:
+            self.log_polling = True
+            self.master.after(LOG_POLL_MS, self._poll_log_writer)
+
+    def _poll_log_writer(self):
+        """Mostra os eventos da thread de gravação; para de ler quando nada mais está pendente."""
+        error = None
+        while True:
+            try:
+                event = self.log_writer.events.get_nowait()
+            except queue.Empty:
+                break
+            kind, log_filepath, n_rows = event[:3]
+            name = os.path.basename(log_filepath)
+            if kind == 'log_recovered':
+                self._set_log_status(f"{n_rows} linhas pendentes da última sessão recuperadas para {name}; gravando...")
+            elif kind == 'log_written':
+                pending = event[3]
+                text = f"{n_rows} linhas gravadas em {name}."
+                if pending: text += f" {pending} pendentes..."
+                self._set_log_status(text)
+            elif kind == 'log_retry':
+                delay, message = event[3:]
+                self._set_log_status(f"'{name}' bloqueado (aberto em outro programa?): {n_rows} linhas aguardando, "
+                                     f"nova tentativa em {delay:.0f} s.\n{message}", color='red')
             else:
-                df_log = df_to_append
-            
-            return self._write_to_file(df_log, self.log_filepath)
-        
-        except Exception as e:
-            messagebox.showerror("Erro ao Salvar Log", f"Ocorreu um erro inesperado ao aceder ao log:\n{e}")
-            return False
+                error = (name, n_rows, event[3])
+
+        if error is not None:
+            name, n_rows, message = error
+            self._set_log_status(f"{n_rows} linhas recusadas por {name}.", color='red')
+            messagebox.showerror("Erro ao Salvar Log",
+                                 f"{n_rows} linhas não puderam ser gravadas em '{name}':\n{message}\n\n"
+                                 f"Elas foram guardadas em:\n{self.log_writer.journal.filepath}")
+
+        if (self.log_writer.recovered is None or self.log_writer.pending_count()
+                or not self.log_writer.events.empty()):
+            self.master.after(LOG_POLL_MS, self._poll_log_writer)
+        else:
+            self.log_polling = False
+
+    def on_close(self):
+        """Fecha a janela depois de uma última tentativa de gravar o log; o que sobrar fica no diário."""
+        if self.ingest_server is not None:
+            self.stop_ingest() # Registra o que já foi recebido
+        if self.folder_watcher is not None:
+            self.stop_watch()
+        if self.log_writer is not None: # Sempre encerra: libera a trava do diário
+            if self.log_writer.pending_count():
+                self._set_log_status("Gravando o log antes de fechar...")
+                self.master.update_idletasks()
+            left = self.log_writer.stop(LOG_CLOSE_TIMEOUT_S)
+            if left:
+                messagebox.showwarning("Log Pendente", f"{left} linhas ainda não foram gravadas no log.\n"
+                                       "Elas serão gravadas na próxima vez que o programa for aberto.")
+        self.master.destroy()
 
     def save_full_spectrum(self):
         if self.active_filtered_intensity is None or self.active_wavelength is None:
@@ -660,13 +1611,36 @@ class LpgFilterApp:
             messagebox.showinfo("Sucesso", f"Espectro completo salvo em:\n{filepath}")
 
     def set_log_file(self):
-        filepath = self._ask_save_filepath("Definir arquivo de Log de Vales", "log_vales_lpg.xlsx")
+        # v14: .csv e SQLite são gravados só por acréscimo (custo constante por registro)
+        filepath = self._ask_save_filepath("Definir arquivo de Log de Vales", "log_vales_lpg.xlsx", filetypes=[
+            ("Arquivo Excel", "*.xlsx"), ("Arquivo CSV (separado por ;)", "*.csv"),
+            ("Banco SQLite", "*.sqlite *.db"), ("Todos os arquivos", "*.*")])
         if filepath:
             self.log_filepath = filepath
             display_path = os.path.basename(filepath)
             if len(self.log_filepath) > 40:
                 display_path = f"...{self.log_filepath[-40:]}"
             self.log_file_label.config(text=display_path, fg="black")
+            self.export_log_button.config(state='normal' if logstore.is_append_only(filepath) else 'disabled')
+
+    def export_log_excel(self):
+        """(v14) Exporta o log .csv/SQLite para um arquivo .xlsx."""
+        if not self.log_filepath or not os.path.exists(self.log_filepath):
+            messagebox.showwarning("Sem Log", "O arquivo de Log ainda não existe.")
+            return
+
+        suggested_filename = f"{os.path.splitext(os.path.basename(self.log_filepath))[0]}.xlsx"
+        filepath = self._ask_save_filepath("Exportar Log para Excel", suggested_filename,
+                                           filetypes=[("Arquivo Excel", "*.xlsx")])
+        if not filepath: return
+
+        try:
+            logstore.export_log_to_excel(self.log_filepath, filepath)
+            messagebox.showinfo("Sucesso", f"Log exportado para:\n{filepath}")
+        except PermissionError:
+            messagebox.showerror("Erro de Permissão", f"Não foi possível salvar.\nO arquivo '{os.path.basename(filepath)}' está aberto?\n\nFeche-o e tente novamente.")
+        except Exception as e:
+            messagebox.showerror("Erro ao Exportar Log", f"Não foi possível exportar o log:\n{e}")
 
     def log_single_valley_data(self):
         """Adiciona o vale ÚNICO atual como uma nova linha no arquivo de log."""
@@ -679,19 +1653,13 @@ class LpgFilterApp:
             messagebox.showwarning("Sem Amostra", "Por favor, insira um nome para a amostra.")
             return
             
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        new_data_row = {
-            'horario': [timestamp],
-            'comprimento_onda_filtrado (nm)': [self.active_valley_wl],
-            'intensidade_filtrada_vale (dB)': [self.active_valley_intensity],
-            'amostra': [sample_name],
-            'arquivo_origem': [self.active_filename]
-        }
-        df_new_row = pd.DataFrame(new_data_row)
-        
-        if self._append_to_log(df_new_row):
-            messagebox.showinfo("Sucesso", f"Vale único registrado com sucesso em:\n{os.path.basename(self.log_filepath)}")
+        if self.active_resonances:
+            new_data_row = make_resonance_row(core.make_timestamp(), self.active_resonances, sample_name, self.active_filename)
+        else:
+            new_data_row = core.make_log_row(core.make_timestamp(), self.active_valley_wl,
+                                             self.active_valley_intensity, sample_name, self.active_filename)
+        if self._append_to_log([new_data_row]):
+            messagebox.showinfo("Sucesso", f"Vale único enviado para o log:\n{os.path.basename(self.log_filepath)}")
             
     def batch_process_and_log(self):
         """(v13) Processa TODOS os arquivos na lista e os registra no log."""
@@ -704,6 +1672,8 @@ class LpgFilterApp:
         params = self._get_filter_params()
         if params is None: return # Erro na validação
         window_size, poly_order, range_start, range_end, normalize = params
+        resonance_params = self._get_resonance_params()
+        if resonance_params is None: return
 
         if not self.log_filepath:
             messagebox.showwarning("Sem Log", "Defina um arquivo de Log primeiro.")
@@ -718,85 +1688,404 @@ class LpgFilterApp:
         if not messagebox.askyesno("Confirmar Lote", f"Você está prestes a processar e registrar {len(self.loaded_data)} arquivos no log.\n\nArquivo de Log: {os.path.basename(self.log_filepath)}\nAmostra Base: {base_sample_name}\n\nContinuar?"):
             return
 
+        export_path = None
+        if self.export_spectra_var.get():
+            export_path = self._ask_save_filepath("Exportar espectros do lote", f"{base_sample_name}_espectros.npz", filetypes=[
+                ("NumPy comprimido", "*.npz"), ("HDF5 (requer h5py)", "*.h5 *.hdf5"), ("Parquet (requer pyarrow)", "*.parquet")])
+            if not export_path: return
+
         # 2. Configura UI para processamento
+        filenames = list(self.loaded_data.keys()) # Pega a ordem da lista
         self.progress_bar['value'] = 0
-        self.progress_bar['maximum'] = len(self.loaded_data)
-        self.progress_label.config(text=f"Iniciando lote de {len(self.loaded_data)} arquivos...")
-        self.master.update_idletasks()
-        
+        self.progress_bar['maximum'] = len(filenames)
+        self.progress_label.config(text=f"Iniciando lote de {len(filenames)} arquivos...")
+        self._set_batch_running(True)
+
+        # 3. Processamento numa thread de trabalho (v14); a UI só lê a fila em _poll_batch_queue
+        entries = [self.loaded_data[f] for f in filenames]
+        self.batch_profiler = StageProfiler() if self.profile_batch_var.get() else NULL_PROFILER
+        self.batch_profiler.start()
+        self.profile_label.config(text="")
+        result_cache = None
+        if self.use_result_cache_var.get():
+            if self.result_cache is None: self.result_cache = ResultCache()
+            result_cache = self.result_cache
+            result_cache.reset_stats()
+
+        self.batch_queue = queue.Queue()
+        self.batch_cancel_event = threading.Event()
+        self.batch_start_time = time.perf_counter()
+        self.batch_thread = threading.Thread(
+            target=self._batch_worker,
+            args=(filenames, entries, self._get_spectrum, params, base_sample_name,
+                  self.batch_queue, self.batch_cancel_event, self.batch_profiler, resonance_params, export_path,
+                  result_cache, self.roi_var.get()),
+            daemon=True)
+        self.batch_thread.start()
+        self.master.after(BATCH_POLL_MS, self._poll_batch_queue)
+
+    @staticmethod
+    def _batch_worker(filenames, entries, get_spectrum, params, base_sample_name, result_queue, cancel_event,
+                      profiler=NULL_PROFILER, resonance_params=([], 0.0), export_path=None, result_cache=None, roi=False):
+        """
+        (v14) Executa o lote fora da thread do Tk. Só comunica com a UI pela fila.
+        Os espectros são obtidos bloco a bloco com 'get_spectrum' (lidos sob demanda, em
+        paralelo, se não estiverem em memória), então só um bloco fica carregado de cada vez.
+        Com ressonâncias nomeadas, cada espectro é filtrado uma vez e buscado em todas as faixas.
+        Com 'export_path', os espectros originais e filtrados de cada bloco vão para o arquivo
+        de exportação assim que o bloco é processado.
+        Com 'result_cache' (lpg.result_cache), só os espectros novos ou alterados são calculados.
+        Com 'roi', só a faixa de busca (ou das ressonâncias) mais meia janela é filtrada.
+        """
+        window_size, poly_order, range_start, range_end, normalize = params
+        ranges, min_prominence = resonance_params
         batch_results_list = []
-        time_series_plot_data = [] # (index, valley_wl, valley_intensity)
-        
-        # 3. Loop de Processamento
+        # (index, valley_wl, valley_intensity); com ressonâncias, uma lista dessas por nome
+        time_series_plot_data = {name: [] for name, _, _ in ranges} if ranges else []
+        exporter = None
+        export_status = None
+        filtered_chunks = []
+        filtered_callback = (lambda first, wavelengths, filtered: filtered_chunks.append((wavelengths, filtered))
+                             ) if export_path else None
+        cache_params = result_params(window_size, poly_order, range_start, range_end, normalize, ranges, min_prominence, roi)
+
+        def compute(wavelength_list, intensity_list, filtered_callback):
+            if ranges:
+                return process_batch_resonances(
+                    wavelength_list, intensity_list, window_size, poly_order, ranges, normalize, min_prominence,
+                    chunk_rows=BATCH_CHUNK_ROWS, cancel_event=cancel_event, profiler=profiler,
+                    filtered_callback=filtered_callback, roi=roi)
+            return core.process_batch(
+                wavelength_list, intensity_list, window_size, poly_order, range_start, range_end, normalize,
+                chunk_rows=BATCH_CHUNK_ROWS, cancel_event=cancel_event, profiler=profiler,
+                filtered_callback=filtered_callback, roi=roi)
+
         try:
-            filenames = list(self.loaded_data.keys()) # Pega a ordem da lista
-            for i, filename in enumerate(filenames):
-                data = self.loaded_data[filename]
-                wavelengths = data['wavelength']
-                intensities = data['intensity']
-                
-                # Aplica filtro
-                data_to_filter = intensities.copy()
-                if normalize:
-                    data_to_filter = data_to_filter - np.max(data_to_filter)
-                
-                sinal_filtrado = savgol_filter(data_to_filter, window_size, poly_order)
-                
-                # Encontra vale
-                valley_result = self._find_valley(wavelengths, sinal_filtrado, range_start, range_end)
-                
-                if valley_result:
-                    valley_wl, valley_intensity = valley_result
-                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3] # Timestamp com milissegundos
-                    
-                    new_row = {
-                        'horario': timestamp,
-                        'comprimento_onda_filtrado (nm)': valley_wl,
-                        'intensidade_filtrada_vale (dB)': valley_intensity,
-                        'amostra': base_sample_name, # Nome da amostra é o mesmo para todo o lote
-                        'arquivo_origem': filename
-                    }
-                    batch_results_list.append(new_row)
-                    time_series_plot_data.append( (i, valley_wl, valley_intensity) )
-                
-                # Atualiza UI
-                self.progress_bar['value'] = i + 1
-                self.progress_label.config(text=f"Processando: {filename}")
-                self.master.update_idletasks()
+            valley_results = []
+            for chunk_start in range(0, len(entries), BATCH_CHUNK_ROWS):
+                if cancel_event.is_set(): break
+                chunk_entries = entries[chunk_start:chunk_start + BATCH_CHUNK_ROWS]
+                with profiler.stage('leitura', item=f"{chunk_start}-{chunk_start + len(chunk_entries) - 1}",
+                                    files=len(chunk_entries)):
+                    spectra = load_spectra(chunk_entries, read_func=get_spectrum)
+                # Vetorizado quando todos os espectros do bloco têm a mesma grade
+                wavelength_list = [wavelength for wavelength, _ in spectra]
+                intensity_list = [intensity for _, intensity in spectra]
+                if result_cache is not None:
+                    chunk_results = process_batch_cached(result_cache, wavelength_list, intensity_list, cache_params,
+                                                         compute, filtered_callback, profiler)
+                else:
+                    chunk_results = compute(wavelength_list, intensity_list, filtered_callback)
+                valley_results.extend(chunk_results)
+
+                if export_path and export_status is None:
+                    try:
+                        with profiler.stage('exportacao', item=f"{chunk_start}-{chunk_start + len(chunk_results) - 1}",
+                                            files=len(chunk_results)):
+                            if exporter is None:
+                                exporter = BatchExportWriter(export_path, wavelength_list[0], make_export_params(
+                                    window_size, poly_order, range_start, range_end, normalize, ranges, min_prominence),
+                                    chunk_rows=BATCH_CHUNK_ROWS)
+                            LpgFilterApp._export_chunk(exporter, filtered_chunks, intensity_list, chunk_results,
+                                                       filenames[chunk_start:], base_sample_name)
+                    except (ValueError, OSError, ImportError) as e:
+                        export_status = f"Exportação dos espectros interrompida: {e}"
+                filtered_chunks.clear()
+                result_queue.put(('progress', len(valley_results)))
+
+            with profiler.stage('dataframe', item='linhas', files=len(valley_results)):
+                for i, (filename, valley_result) in enumerate(zip(filenames, valley_results)):
+                    if ranges:
+                        if has_any_valley(valley_result):
+                            batch_results_list.append(make_resonance_row(core.make_timestamp(with_millis=True), valley_result,
+                                                                         base_sample_name, filename))
+                            for name, valley in valley_result.items():
+                                if valley is not None: time_series_plot_data[name].append((i, valley[0], valley[1]))
+                    elif valley_result:
+                        valley_wl, valley_intensity = valley_result
+                        timestamp = core.make_timestamp(with_millis=True) # Timestamp com milissegundos
+                        
+                        # Nome da amostra é o mesmo para todo o lote
+                        new_row = core.make_log_row(timestamp, valley_wl, valley_intensity, base_sample_name, filename)
+                        batch_results_list.append(new_row)
+                        time_series_plot_data.append( (i, valley_wl, valley_intensity) )
+
+            if exporter is not None:
+                exporter.close()
+                if export_status is None:
+                    export_status = f"{exporter.n_spectra} espectros exportados para {os.path.basename(export_path)}."
+            cache_status = result_cache.format_stats() if result_cache is not None else None
+            result_queue.put(('done', len(valley_results), batch_results_list, time_series_plot_data, export_status,
+                              cache_status))
 
         except Exception as e:
-            messagebox.showerror("Erro no Processamento em Lote", f"Ocorreu um erro durante o processamento:\n{e}")
+            result_queue.put(('error', str(e)))
+        finally:
+            if exporter is not None: exporter.close() # Fecha o arquivo mesmo em erro (close é idempotente)
+
+    @staticmethod
+    def _export_chunk(exporter, filtered_chunks, intensity_list, chunk_results, filenames, base_sample_name):
+        """(v14) Grava os espectros de um bloco do lote, com a linha de log de cada um (NaN se não houver vale)."""
+        timestamp = core.make_timestamp(with_millis=True)
+        row = 0
+        for wavelengths, filtered in filtered_chunks:
+            n_rows = min(len(filtered), len(chunk_results) - row) # Cancelamento: só as linhas com resultado
+            if n_rows <= 0: break
+            metadata = []
+            for i in range(row, row + n_rows):
+                result = chunk_results[i]
+                if isinstance(result, dict):
+                    metadata.append(make_resonance_row(timestamp, result, base_sample_name, filenames[i]))
+                else:
+                    valley_wl, valley_intensity = result if result else (np.nan, np.nan)
+                    metadata.append(core.make_log_row(timestamp, valley_wl, valley_intensity, base_sample_name, filenames[i]))
+            exporter.append(np.vstack(intensity_list[row:row + n_rows]), filtered[:n_rows], metadata, wavelengths)
+            row += n_rows
+
+    def _poll_batch_queue(self):
+        """(v14) Lê a fila do lote a cada BATCH_POLL_MS e atualiza progresso, taxa e ETA."""
+        last_progress = None
+        finished = None
+        try:
+            while True:
+                message = self.batch_queue.get_nowait()
+                if message[0] == 'progress':
+                    last_progress = message[1]
+                else:
+                    finished = message
+        except queue.Empty:
+            pass
+
+        if last_progress is not None and finished is None:
+            total = self.progress_bar['maximum']
+            elapsed = time.perf_counter() - self.batch_start_time
+            rate = last_progress / elapsed if elapsed > 0 else 0.0
+            eta = (total - last_progress) / rate if rate > 0 else 0.0
+            self.progress_bar['value'] = last_progress
+            self.progress_label.config(text=f"{last_progress}/{total} arquivos | {rate:.1f} arq/s | ETA {eta:.0f} s")
+
+        if finished is None:
+            self.master.after(BATCH_POLL_MS, self._poll_batch_queue)
+            return
+
+        self._set_batch_running(False)
+        if finished[0] == 'error':
+            messagebox.showerror("Erro no Processamento em Lote", f"Ocorreu um erro durante o processamento:\n{finished[1]}")
             self.progress_label.config(text="Erro no lote.")
+            self._report_batch_profile()
+            return
+
+        if finished[0] == 'sweep_done':
+            self._finish_sweep(finished[1], cancelled=self.batch_cancel_event.is_set())
+            return
+
+        if finished[0] == 'images_done':
+            self._finish_batch_images(*finished[1:], cancelled=self.batch_cancel_event.is_set())
             return
 
+        _, n_processed, batch_results_list, time_series_plot_data, export_status, cache_status = finished
+        self.progress_bar['value'] = n_processed
+        self._finish_batch(batch_results_list, time_series_plot_data, cancelled=self.batch_cancel_event.is_set(),
+                           export_status=export_status, cache_status=cache_status)
+
+    def _finish_batch(self, batch_results_list, time_series_plot_data, cancelled=False, export_status=None,
+                      cache_status=None):
+        """Grava no log e plota os resultados do lote (ou o que foi calculado até o cancelamento)."""
+        status = "Lote cancelado" if cancelled else "Lote concluído"
+        # v14: resultado da exportação dos espectros e acertos/falhas do cache de resultados
+        export_note = "".join(f"\n\n{note}" for note in (export_status, cache_status) if note)
+        cache_line = f"\n{cache_status}" if cache_status else ""
+
         # 4. Salva resultados
         if not batch_results_list:
-            messagebox.showwarning("Nenhum Resultado", "Processamento concluído, mas nenhum vale foi encontrado na faixa especificada.")
-            self.progress_label.config(text="Lote concluído. Nenhum vale encontrado.")
+            if not cancelled:
+                messagebox.showwarning("Nenhum Resultado", "Processamento concluído, mas nenhum vale foi encontrado na faixa especificada." + export_note)
+            self.progress_label.config(text=f"{status}. Nenhum vale encontrado.{cache_line}")
+            self._report_batch_profile()
             return
             
-        df_batch = pd.DataFrame(batch_results_list)
+        profiler = self.batch_profiler
+        n_valleys = len(batch_results_list)
+        # v14: a gravação roda na thread do log, que a mede (etapa 'log'); o perfil sai quando ela termina
+        log_saved = self._append_to_log(batch_results_list, profiler)
+        if log_saved and profiler.enabled:
+            self.batch_profiler = NULL_PROFILER
+            self.profile_label.config(text="Perfil: aguardando a gravação do log...")
+            self._report_batch_profile_when_written(profiler, log_saved)
+        else:
+            self._report_batch_profile()
         
-        if self._append_to_log(df_batch):
-            self.progress_label.config(text=f"Lote concluído! {len(df_batch)} vales registrados.")
-            messagebox.showinfo("Lote Concluído", f"{len(df_batch)} vales foram processados e registrados com sucesso em:\n{os.path.basename(self.log_filepath)}")
+        if log_saved:
+            self.progress_label.config(text=f"{status}! {n_valleys} vales enviados para o log.{cache_line}")
+            messagebox.showinfo(status, f"{n_valleys} vales foram processados e enviados para o log:\n{os.path.basename(self.log_filepath)}{export_note}")
             
             # 5. Plota a análise temporal
             self.last_batch_results = time_series_plot_data
             self._plot_time_series(self.last_batch_results)
             
         else:
-            self.progress_label.config(text="Erro ao salvar o log do lote.")
+            self.progress_label.config(text="Sem arquivo de Log: resultados do lote não registrados.")
+
+    def _report_batch_profile_when_written(self, profiler, log_written):
+        """(v14) Espera a thread do log gravar as linhas do lote antes de fechar o perfil."""
+        if log_written.is_set():
+            self._report_batch_profile(profiler)
+        else:
+            self.master.after(LOG_POLL_MS, self._report_batch_profile_when_written, profiler, log_written)
+
+    def _report_batch_profile(self, profiler=None):
+        """(v14) Encerra a medição do lote, mostra o resumo e grava o perfil (JSON/CSV) ao lado do log."""
+        if profiler is None:
+            profiler = self.batch_profiler
+            self.batch_profiler = NULL_PROFILER
+        if not profiler.enabled: return
+        profiler.stop()
+        summary = profiler.format_summary()
+        try:
+            base_path = f"{os.path.splitext(self.log_filepath)[0]}_perfil_{time.strftime('%Y%m%d_%H%M%S')}"
+            json_path, _ = profiler.write(base_path)
+            summary += f"\nPerfil: {os.path.basename(json_path)} (+ .csv)"
+        except OSError as e:
+            summary += f"\nNão foi possível gravar o perfil: {e}"
+        self.profile_label.config(text=summary)
+
+    def cancel_batch(self):
+        """(v14) Pede à thread do lote para parar; os resultados já calculados são mantidos."""
+        if self.batch_cancel_event is not None:
+            self.batch_cancel_event.set()
+            self.cancel_batch_button.config(state='disabled')
+            self.progress_label.config(text="Cancelando...")
+
+    def _set_batch_running(self, running):
+        """Bloqueia os controles que alteram os dados enquanto o lote roda."""
+        state = 'disabled' if running else 'normal'
+        self.batch_process_button.config(state=state)
+        self.sweep_button.config(state=state)
+        self.batch_images_button.config(state=state)
+        self.load_button.config(state=state)
+        self.cancel_batch_button.config(state='normal' if running else 'disabled')
             
+    # ===================================================================
+    # VARREDURA DE PARÂMETROS (v14)
+    # ===================================================================
+
+    def run_parameter_sweep(self):
+        """Avalia todos os pares (janela, ordem) sobre os arquivos carregados numa thread de trabalho."""
+        if not self.loaded_data:
+            messagebox.showwarning("Sem Dados", "Nenhum arquivo carregado para a varredura.")
+            return
+        params = self._get_filter_params()
+        if params is None: return # Erro na validação
+        _, _, range_start, range_end, normalize = params
+
+        try:
+            windows = parse_int_list(self.sweep_windows_entry.get())
+            orders = parse_int_list(self.sweep_orders_entry.get())
+            sweep = ParameterSweep(windows, orders, range_start, range_end, normalize)
+        except ValueError as e:
+            messagebox.showerror("Erro de Parâmetro", f"Janelas e ordens devem ser listas de inteiros (ex: 5-45:2 ou 2,3,4).\n{e}")
+            return
+
+        entries = list(self.loaded_data.values())
+        self.progress_bar['value'] = 0
+        self.progress_bar['maximum'] = len(entries)
+        self.progress_label.config(text=f"Varredura de {len(sweep.pairs)} pares em {len(entries)} arquivos...")
+        self._set_batch_running(True)
+
+        # Mesma fila e cancelamento do lote: _poll_batch_queue trata a mensagem 'sweep_done'
+        self.batch_queue = queue.Queue()
+        self.batch_cancel_event = threading.Event()
+        self.batch_start_time = time.perf_counter()
+        self.batch_thread = threading.Thread(
+            target=self._sweep_worker,
+            args=(sweep, entries, self._get_spectrum, self.batch_queue, self.batch_cancel_event),
+            daemon=True)
+        self.batch_thread.start()
+        self.master.after(BATCH_POLL_MS, self._poll_batch_queue)
+
+    @staticmethod
+    def _sweep_worker(sweep, entries, get_spectrum, result_queue, cancel_event):
+        """Carrega os espectros em blocos e acumula os vales de todos os pares. Só comunica pela fila."""
+        try:
+            for chunk_start in range(0, len(entries), SWEEP_CHUNK_ROWS):
+                if cancel_event.is_set(): break
+                spectra = load_spectra(entries[chunk_start:chunk_start + SWEEP_CHUNK_ROWS], read_func=get_spectrum)
+                completed = sweep.add([wavelength for wavelength, _ in spectra], [intensity for _, intensity in spectra],
+                                      cancel_event)
+                result_queue.put(('progress', sweep.n_files))
+                if not completed: break
+            result_queue.put(('sweep_done', sweep.results()))
+        except Exception as e:
+            result_queue.put(('error', str(e)))
+
+    def _finish_sweep(self, df_sweep, cancelled=False):
+        """Mostra a tabela e o mapa de calor da varredura no separador 'Varredura'."""
+        self.last_sweep_results = df_sweep
+        status = "Varredura cancelada" if cancelled else "Varredura concluída"
+        elapsed = time.perf_counter() - self.batch_start_time
+        self.progress_label.config(text=f"{status}: {len(df_sweep)} pares em {elapsed:.1f} s.")
+        self.save_sweep_button.config(state='normal')
+
+        self.sweep_table.delete(*self.sweep_table.get_children())
+        for row in df_sweep.itertuples(index=False):
+            self.sweep_table.insert('', 'end', values=[f"{value:.6g}" if isinstance(value, float) else value for value in row])
+
+        self._plot_sweep_heatmap()
+        self.notebook.add(self.sweep_tab, state='normal')
+        self.notebook.select(2)
+
+    def _plot_sweep_heatmap(self):
+        """Mapa de calor (ordem x janela) da métrica escolhida, com o melhor par marcado."""
+        if self.last_sweep_results is None: return
+        metric, goal = SWEEP_METRICS[self.sweep_metric_var.get()]
+        grid = self.last_sweep_results.pivot(index='ordem', columns='janela', values=metric)
+        values = grid.to_numpy(dtype=float)
+
+        self.sweep_fig.clear()
+        self.sweep_ax = self.sweep_fig.add_subplot(111)
+        image = self.sweep_ax.imshow(values, aspect='auto', origin='lower', cmap='viridis', interpolation='nearest')
+        self.sweep_fig.colorbar(image, ax=self.sweep_ax, label=self.sweep_metric_var.get())
+        self.sweep_ax.set_xticks(range(len(grid.columns)), [str(w) for w in grid.columns])
+        self.sweep_ax.set_yticks(range(len(grid.index)), [str(o) for o in grid.index])
+        self.sweep_ax.set_xlabel("Janela")
+        self.sweep_ax.set_ylabel("Ordem do Polinômio")
+
+        self.sweep_ax.set_title(self.sweep_metric_var.get())
+        if goal is not None and np.any(np.isfinite(values)):
+            best = np.nanargmax(values) if goal == 'max' else np.nanargmin(values)
+            best_order, best_window = np.unravel_index(best, values.shape)
+            self.sweep_ax.plot(best_window, best_order, 'r*', markersize=14)
+            self.sweep_ax.set_title(f"{self.sweep_metric_var.get()} | melhor: janela {grid.columns[best_window]}, "
+                                    f"ordem {grid.index[best_order]}")
+        self.sweep_fig.tight_layout()
+        self.sweep_canvas.draw_idle()
+
+    def save_sweep_table(self):
+        if self.last_sweep_results is None:
+            messagebox.showwarning("Sem Dados", "Nenhuma varredura para salvar.")
+            return
+        filepath = self._ask_save_filepath("Salvar tabela da varredura", "varredura_parametros.xlsx")
+        if not filepath: return
+        if self._write_to_file(self.last_sweep_results, filepath):
+            messagebox.showinfo("Sucesso", f"Tabela da varredura salva em:\n{filepath}")
+
     def save_plot_image(self):
         try:
-            # Verifica qual separador está ativo
-            if self.notebook.index(self.notebook.select()) == 0:
-                # Separador Espectro
-                self.canvas.toolbar.save_figure()
-            else:
-                # Separador Análise Temporal
-                self.ts_canvas.toolbar.save_figure()
+            # v14: Figura do separador ativo, localizada pelo separador (e não pela posição)
+            tab_canvases = {
+                str(self.spectrum_tab): ('canvas', "espectro.png"),
+                str(self.time_series_tab): ('ts_canvas', "analise_temporal.png"),
+                str(self.sweep_tab): ('sweep_canvas', "varredura_parametros.png"),
+                str(self.history_tab): ('history_canvas', "historico_log.png"),
+            }
+            canvas_attr, suggested_filename = tab_canvases[str(self.notebook.select())]
+            canvas = getattr(self, canvas_attr)
+            if canvas.toolbar is not None:
+                canvas.toolbar.save_figure()
+            else: # Separador sem barra de navegação (Varredura)
+                filepath = self._ask_save_filepath("Salvar imagem do gráfico", suggested_filename,
+                                                   filetypes=[("Imagem PNG", "*.png"), ("Imagem PDF", "*.pdf"), ("Imagem SVG", "*.svg")])
+                if filepath: canvas.figure.savefig(filepath, dpi=300)
         except Exception as e:
             messagebox.showerror("Erro ao Salvar Imagem", f"Ocorreu um erro: {e}")
 
@@ -816,7 +2105,8 @@ class LpgFilterApp:
         if not filepath: return
 
         try:
-            fig_temp, ax_temp = plt.subplots(figsize=(10, 6))
+            fig_temp = mpl_figure.Figure(figsize=(10, 6)) # v14: sem pyplot (nada a fechar depois)
+            ax_temp = fig_temp.add_subplot()
             ax_temp.plot(self.active_wavelength, self.active_filtered_intensity, '-', 
                          color=self.color_filtrado, linewidth=2, label="Sinal Filtrado")
 
@@ -850,15 +2140,224 @@ class LpgFilterApp:
 
             fig_temp.tight_layout()
             fig_temp.savefig(filepath, dpi=300)
-            plt.close(fig_temp)
             messagebox.showinfo("Sucesso", f"Imagem (apenas filtro) salva em:\n{filepath}")
 
         except Exception as e:
             messagebox.showerror("Erro ao Salvar Imagem", f"Não foi possível salvar a imagem:\n{e}")
-            if 'fig_temp' in locals(): plt.close(fig_temp)
+
+    def save_batch_filtered_plots(self):
+        """(v14) Salva a imagem 'só filtro' de todos os arquivos carregados numa pasta, em paralelo."""
+        if not self.loaded_data:
+            messagebox.showwarning("Sem Dados", "Nenhum arquivo carregado.")
+            return
+        params = self._get_filter_params()
+        if params is None: return
+        window_size, poly_order, range_start, range_end, normalize = params
+        resonance_params = self._get_resonance_params()
+        if resonance_params is None: return
+        ranges, min_prominence = resonance_params
+
+        output_dir = filedialog.askdirectory(title="Pasta para as imagens do lote")
+        if not output_dir: return
+
+        options = {
+            'window_size': window_size, 'poly_order': poly_order, 'normalize': normalize,
+            'range_start': range_start, 'range_end': range_end, 'ranges': ranges, 'min_prominence': min_prominence,
+            'include_annotation': self.include_annotation_var.get(), 'include_range': self.include_range_var.get(),
+            'color': self.color_filtrado,
+            'xlim': self.ax.get_xlim() if self.active_filtered_intensity is not None else None, # Zoom atual (eixo x)
+            'read_func': self.spectrum_cache if self.use_cache_var.get() else core.load_spectrum,
+        }
+        # Arquivos sob demanda são lidos nos próprios processos do pool; os demais vão como arrays
+        jobs = [(os.path.join(output_dir, f"{os.path.splitext(filename)[0]}_grafico_filtrado.png"),
+                 f"Espectro Filtrado de: {filename}",
+                 (entry['wavelength'], entry['intensity']) if 'wavelength' in entry else entry['path'])
+                for filename, entry in self.loaded_data.items()]
+
+        self.progress_bar['value'] = 0
+        self.progress_bar['maximum'] = len(jobs)
+        self.progress_label.config(text=f"Gerando {len(jobs)} imagens...")
+        self._set_batch_running(True)
+
+        self.batch_queue = queue.Queue()
+        self.batch_cancel_event = threading.Event()
+        self.batch_start_time = time.perf_counter()
+        self.batch_thread = threading.Thread(
+            target=self._render_worker, args=(jobs, options, self.batch_queue, self.batch_cancel_event), daemon=True)
+        self.batch_thread.start()
+        self.master.after(BATCH_POLL_MS, self._poll_batch_queue)
+
+    @staticmethod
+    def _render_worker(jobs, options, result_queue, cancel_event):
+        """Distribui as imagens pelo pool de processos. Só comunica pela fila."""
+        try:
+            n_saved = 0
+            errors = []
+            for k, (image_path, error) in enumerate(render.render_filtered_plots(jobs, options, cancel_event=cancel_event)):
+                if error is None: n_saved += 1
+                else: errors.append(f"{os.path.basename(image_path)}: {error}")
+                result_queue.put(('progress', k + 1))
+            result_queue.put(('images_done', n_saved, errors))
+        except Exception as e:
+            result_queue.put(('error', str(e)))
+
+    def _finish_batch_images(self, n_saved, errors, cancelled=False):
+        status = "Imagens canceladas" if cancelled else "Imagens concluídas"
+        elapsed = time.perf_counter() - self.batch_start_time
+        self.progress_label.config(text=f"{status}: {n_saved} salvas em {elapsed:.1f} s.")
+        if errors:
+            messagebox.showwarning(status, f"{len(errors)} imagens não puderam ser salvas:\n" + "\n".join(errors[:10]))
+
+
+    # ===================================================================
+    # HISTÓRICO DO LOG (v14)
+    # ===================================================================
+
+    def open_log_history(self):
+        """Lê o log inteiro numa thread e mostra vale e intensidade pelo horário real, com médias móveis."""
+        try:
+            window_hours = float(self.history_window_entry.get().replace(',', '.'))
+            if window_hours <= 0: raise ValueError
+        except ValueError:
+            messagebox.showerror("Erro de Parâmetro", "A janela móvel deve ser um número de horas maior que zero.")
+            return
+
+        initial = self.log_filepath or ''
+        filepath = filedialog.askopenfilename(
+            title="Abrir log de vales", initialdir=os.path.dirname(initial) or None,
+            initialfile=os.path.basename(initial),
+            filetypes=[("Logs de vales", "*.csv *.sqlite *.sqlite3 *.db *.xlsx"), ("Todos os arquivos", "*.*")])
+        if not filepath: return
+
+        self.history_button.config(state='disabled')
+        self.history_label.config(text=f"Lendo {os.path.basename(filepath)}...")
+        self.history_queue = queue.Queue()
+        threading.Thread(target=self._history_worker, args=(filepath, window_hours, self.history_queue),
+                         daemon=True).start()
+        self.master.after(HISTORY_POLL_MS, self._poll_history_queue)
+
+    @staticmethod
+    def _history_worker(filepath, window_hours, result_queue):
+        """Lê o log em blocos e calcula as estatísticas móveis. Só comunica pela fila."""
+        try:
+            start = time.perf_counter()
+            series = read_log_series(filepath, progress_callback=lambda n: result_queue.put(('progress', n)))
+            result_queue.put(('progress_stats', len(series)))
+            rolling = series.rolling(window_hours)
+            result_queue.put(('history_done', filepath, series, rolling, window_hours, time.perf_counter() - start))
+        except Exception as e:
+            result_queue.put(('error', str(e)))
+
+    def _poll_history_queue(self):
+        finished = None
+        while True:
+            try:
+                message = self.history_queue.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == 'progress':
+                self.history_label.config(text=f"Lendo: {message[1]:,} linhas...".replace(',', '.'))
+            elif message[0] == 'progress_stats':
+                self.history_label.config(text=f"Calculando médias móveis de {message[1]:,} registros...".replace(',', '.'))
+            else:
+                finished = message
+
+        if finished is None:
+            self.master.after(HISTORY_POLL_MS, self._poll_history_queue)
+            return
+
+        self.history_button.config(state='normal')
+        if finished[0] == 'error':
+            self.history_label.config(text="Erro ao ler o log.")
+            messagebox.showerror("Erro ao Ler Log", f"Não foi possível ler o log:\n{finished[1]}")
+            return
+        self._show_log_history(*finished[1:])
+
+    def _show_log_history(self, filepath, series, rolling, window_hours, elapsed):
+        self.history_series = series
+        self.history_rolling = rolling
+        self.history_view = None
+        if len(series) == 0:
+            self.history_label.config(text="O log não tem vales com horário válido.")
+            return
+
+        times = series.times / 86400.0 # dias desde 1970 (datas do matplotlib)
+        self.history_ax_wl.set_title(f"{os.path.basename(filepath)}: {len(series):,} registros "
+                                     f"(média móvel de {window_hours:g} h)".replace(',', '.'))
+        self.history_ax_wl.set_xlim(times[0], times[-1] if times[-1] > times[0] else times[0] + 1.0 / 24)
+        self.history_ax_wl.set_ylim(*self._padded_limits(series.wavelengths))
+        self.history_ax_int.set_ylim(*self._padded_limits(series.intensities))
+        self.history_status_prefix = f"{len(series):,} registros lidos em {elapsed:.1f} s.".replace(',', '.')
+        self.notebook.add(self.history_tab, state='normal')
+        self.notebook.select(self.history_tab)
+        self._update_history_view()
+
+    @staticmethod
+    def _padded_limits(values):
+        finite = values[np.isfinite(values)]
+        if not len(finite): return 0.0, 1.0
+        low, high = float(finite.min()), float(finite.max())
+        pad = (high - low) * 0.05 or 0.5
+        return low - pad, high + pad
+
+    def _schedule_history_view(self):
+        """Zoom/pan: refaz a redução depois de HISTORY_ZOOM_DEBOUNCE_MS sem novas mudanças."""
+        if self.history_series is None: return
+        if self.history_after_id is not None:
+            self.master.after_cancel(self.history_after_id)
+        self.history_after_id = self.master.after(HISTORY_ZOOM_DEBOUNCE_MS, self._update_history_view)
+
+    def _update_history_view(self):
+        """Reduz a parte visível por LTTB (um ponto por pixel) e atualiza linhas, faixa de desvio e resumo."""
+        self.history_after_id = None
+        series = self.history_series
+        if series is None or len(series) == 0: return
+        x_min, x_max = sorted(self.history_ax_wl.get_xlim())
+        n_points = max(int(self.history_ax_wl.get_window_extent().width), HISTORY_MIN_POINTS)
+        start, end = downsample.visible_range(series.times, x_min * 86400.0, x_max * 86400.0)
+        if (start, end, n_points) == self.history_view: return
+        self.history_view = (start, end, n_points)
+
+        times = series.times[start:end]
+        days = times / 86400.0
+        rolling = self.history_rolling
+        for line, values in ((self.history_wl_line, series.wavelengths), (self.history_wl_mean_line, rolling['media_wl']),
+                             (self.history_int_line, series.intensities), (self.history_int_mean_line, rolling['media_int'])):
+            values = values[start:end]
+            indices = downsample.lttb_indices(times, downsample.fill_nan(values), n_points) # Sem aviso com a janela toda NaN
+            line.set_data(days[indices], values[indices])
+
+        # Faixa média ± desvio móvel, nos mesmos pontos da média
+        mean, std = rolling['media_wl'][start:end], np.nan_to_num(rolling['std_wl'][start:end])
+        indices = downsample.lttb_indices(times, downsample.fill_nan(mean), n_points)
+        if self.history_band is not None: self.history_band.remove()
+        self.history_band = self.history_ax_wl.fill_between(days[indices], (mean - std)[indices], (mean + std)[indices],
+                                                            color='blue', alpha=0.15, lw=0, label='± desvio móvel')
+        self.history_ax_wl.legend(loc='upper left', fontsize='small')
+        self._update_history_summary()
+        self.history_canvas.draw_idle()
+
+    def _update_history_summary(self):
+        """Resumo da parte visível: registros, média, desvio, deriva (nm/h) e a deriva móvel no fim dela."""
+        series = self.history_series
+        if series is None: return
+        x_min, x_max = sorted(self.history_ax_wl.get_xlim())
+        summary = series.summary(x_min * 86400.0, x_max * 86400.0)
+        if not summary['n']:
+            self.history_label.config(text=f"{self.history_status_prefix}\nNenhum registro na parte visível.")
+            return
+        _, end = series.view(x_min * 86400.0, x_max * 86400.0)
+        rolling_drift = self.history_rolling['deriva_wl'][end - 1]
+        self.history_label.config(text=(
+            f"{self.history_status_prefix}\nVisível: {summary['n']:,} registros".replace(',', '.') +
+            f"\nVale: {summary['media_wl']:.4f} ± {summary['std_wl']:.4f} nm"
+            f"\nDeriva: {summary['deriva_wl']:+.4g} nm/h (móvel no fim: {rolling_drift:+.4g} nm/h)"
+            f"\nIntensidade média: {summary['media_int']:.2f} dB"))
 
 
 if __name__ == "__main__":
+    startup_timer = StartupTimer(STARTUP_TIME)
+    startup_timer.mark('imports')
     root = tk.Tk()
-    app = LpgFilterApp(root)
+    app = LpgFilterApp(root, startup_timer)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+Pacote de processamento de espectros LPG sem interface gráfica.
+
+    python -m lpg --help
+
+v14: os nomes abaixo são importados no primeiro acesso (PEP 562), então
+"from lpg import core" não carrega matplotlib, pandas nem SciPy.
+"""
+import importlib
+
+# Nome exportado -> submódulo que o define
+_EXPORTS = {
+    'BatchExportWriter': 'batch_export',
+    'open_batch_export': 'batch_export',
+    'LOG_COLUMNS': 'core',
+    'append_to_log': 'core',
+    'detect_delimiter': 'core',
+    'filter_spectrum': 'core',
+    'filter_spectrum_roi': 'core',
+    'find_valley': 'core',
+    'load_spectrum': 'core',
+    'load_spectrum_loadtxt': 'core',
+    'make_log_row': 'core',
+    'make_timestamp': 'core',
+    'process_batch': 'core',
+    'process_files': 'core',
+    'process_spectrum': 'core',
+    'range_index': 'core',
+    'roi_columns': 'core',
+    'validate_filter_params': 'core',
+    'write_to_file': 'core',
+    'SpectrumServer': 'ingest',
+    'encode_spectrum': 'ingest',
+    'process_received': 'ingest',
+    'replay_files': 'ingest',
+    'LazyModule': 'lazy',
+    'preload': 'lazy',
+    'load_spectra': 'loader',
+    'parse_spectrum_text': 'loader',
+    'read_spectrum': 'loader',
+    'sniff_format': 'loader',
+    'LogSeries': 'log_analysis',
+    'drift_rate': 'log_analysis',
+    'read_log_series': 'log_analysis',
+    'LogJournal': 'log_writer',
+    'LogWriter': 'log_writer',
+    'CsvLogStore': 'logstore',
+    'SqliteLogStore': 'logstore',
+    'export_log_to_excel': 'logstore',
+    'open_log_store': 'logstore',
+    'read_log': 'logstore',
+    'FilterResultCache': 'preview',
+    'PreviewWorker': 'preview',
+    'compute_filter_result': 'preview',
+    'NULL_PROFILER': 'profiling',
+    'StageProfiler': 'profiling',
+    'StartupTimer': 'profiling',
+    'FilteredPlotRenderer': 'render',
+    'render_filtered_plots': 'render',
+    'find_resonances': 'resonances',
+    'make_resonance_row': 'resonances',
+    'parse_ranges': 'resonances',
+    'process_batch_resonances': 'resonances',
+    'ranges_span': 'resonances',
+    'resonance_columns': 'resonances',
+    'ResultCache': 'result_cache',
+    'process_batch_cached': 'result_cache',
+    'SavgolFilter': 'savgol',
+    'default_filter': 'savgol',
+    'savgol_filter': 'savgol',
+    'SpectrumCache': 'spectrum_cache',
+    'SpectrumStore': 'spectrum_store',
+    'OnlineValleyTracker': 'streaming',
+    'StreamingSavgol': 'streaming',
+    'StreamingValleyDetector': 'streaming',
+    'ParameterSweep': 'sweep',
+    'parse_int_list': 'sweep',
+    'sweep_parameters': 'sweep',
+    'FolderWatcher': 'watch',
+    'process_new_file': 'watch',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,351 @@
+"""
+Exportação de um lote inteiro de espectros num único arquivo (v14).
+
+A grade de comprimento de onda é gravada uma vez; as intensidades originais e
+filtradas de todos os arquivos viram duas matrizes (arquivos x pontos) gravadas
+em blocos comprimidos de 'chunk_rows' linhas, junto com uma tabela de metadados
+por arquivo (nome, vale...) e os parâmetros do filtro. Formatos, pela extensão:
+
+  * .npz      (padrão, só NumPy): um membro comprimido por bloco e por matriz;
+  * .h5/.hdf5 (requer h5py): datasets com chunks e gzip;
+  * .parquet  (requer pyarrow): uma linha por espectro, um row group por bloco.
+
+open_batch_export lê um espectro ou uma fatia carregando só os blocos
+necessários:
+
+    with open_batch_export('lote.npz') as export:
+        filtrado = export.read(100, 200)             # espectros 100 a 199
+        original = export.spectrum(5, kind='original')
+"""
+import json
+import zipfile
+
+import numpy as np
+
+from .core import make_timestamp
+from .lazy import LazyModule
+from .resonances import format_ranges
+
+pd = LazyModule('pandas')
+
+EXPORT_FORMATS = {'.npz': 'npz', '.h5': 'hdf5', '.hdf5': 'hdf5', '.parquet': 'parquet'}
+KINDS = ('original', 'filtrado')
+DEFAULT_CHUNK_ROWS = 64
+HDF5_CHUNK_BYTES = 1024 ** 2 # Tamanho-alvo de um chunk HDF5 (linhas por chunk diminuem em espectros longos)
+NPZ_COMPRESS_LEVEL = 1 # zlib: níveis maiores custam várias vezes o tempo e ganham pouco em dados ruidosos
+FORMAT_VERSION = 1
+
+
+def export_format(filepath):
+    """Formato ('npz', 'hdf5' ou 'parquet') pela extensão do arquivo."""
+    extension = filepath[filepath.rfind('.'):].lower() if '.' in filepath else ''
+    if extension not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportação não suportado: '{extension}' (use .npz, .h5 ou .parquet).")
+    return EXPORT_FORMATS[extension]
+
+
+def make_export_params(window_size, poly_order, range_start, range_end, normalize, ranges=None, min_prominence=0.0):
+    """Parâmetros do processamento gravados junto com o lote."""
+    params = {'janela': window_size, 'ordem': poly_order, 'faixa_inicio': range_start, 'faixa_fim': range_end,
+              'normalizar': bool(normalize)}
+    if ranges:
+        params['ressonancias'] = format_ranges(ranges)
+        params['proeminencia_min'] = min_prominence
+    return params
+
+
+def _import_optional(module_name, extension):
+    try:
+        return __import__(module_name, fromlist=['_'])
+    except ImportError:
+        package = module_name.split('.')[0]
+        raise ImportError(f"Exportar para {extension} requer o pacote '{package}' (pip install {package}).") from None
+
+
+def _metadata_arrays(metadata):
+    """Colunas da tabela de metadados como arrays sem objetos Python (texto vira unicode)."""
+    arrays = {}
+    for column in metadata.columns:
+        values = metadata[column].to_numpy()
+        arrays[column] = values.astype(str) if values.dtype == object else values
+    return arrays
+
+
+# ===================================================================
+# ESCRITA
+# ===================================================================
+
+class _NpzWriter:
+    def __init__(self, filepath, wavelengths, attrs, chunk_rows):
+        self._zip = zipfile.ZipFile(filepath, 'w', zipfile.ZIP_DEFLATED, allowZip64=True,
+                                    compresslevel=NPZ_COMPRESS_LEVEL)
+        self._write('comprimento_onda', wavelengths)
+
+    def _write(self, name, array):
+        with self._zip.open(name + '.npy', 'w', force_zip64=True) as f:
+            np.lib.format.write_array(f, np.asanyarray(array), allow_pickle=False)
+
+    def write_chunk(self, chunk_index, original, filtered, metadata):
+        self._write(f'original/{chunk_index:06d}', original)
+        self._write(f'filtrado/{chunk_index:06d}', filtered)
+
+    def close(self, metadata, attrs):
+        for column, values in _metadata_arrays(metadata).items():
+            self._write(f'metadados/{column}', values)
+        self._write('atributos', np.array(json.dumps(attrs, ensure_ascii=False)))
+        self._zip.close()
+
+
+class _Hdf5Writer:
+    def __init__(self, filepath, wavelengths, attrs, chunk_rows):
+        h5py = _import_optional('h5py', '.h5')
+        self._h5py = h5py
+        self._file = h5py.File(filepath, 'w')
+        self._file.create_dataset('comprimento_onda', data=wavelengths)
+        n_points = len(wavelengths)
+        rows_per_chunk = max(1, min(chunk_rows, HDF5_CHUNK_BYTES // (8 * n_points)))
+        for kind in KINDS:
+            self._file.create_dataset(kind, shape=(0, n_points), maxshape=(None, n_points), dtype='f8',
+                                      chunks=(rows_per_chunk, n_points), compression='gzip', shuffle=True)
+
+    def write_chunk(self, chunk_index, original, filtered, metadata):
+        for kind, matrix in zip(KINDS, (original, filtered)):
+            dataset = self._file[kind]
+            start = dataset.shape[0]
+            dataset.resize(start + len(matrix), axis=0)
+            dataset[start:] = matrix
+
+    def close(self, metadata, attrs):
+        group = self._file.create_group('metadados')
+        group.attrs['colunas'] = json.dumps(list(metadata.columns), ensure_ascii=False) # Grupos HDF5 ordenam por nome
+        for column, values in _metadata_arrays(metadata).items():
+            if values.dtype.kind == 'U':
+                group.create_dataset(column, data=values.astype(object), dtype=self._h5py.string_dtype())
+            else:
+                group.create_dataset(column, data=values)
+        self._file.attrs['atributos'] = json.dumps(attrs, ensure_ascii=False)
+        self._file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, filepath, wavelengths, attrs, chunk_rows):
+        self._pa = _import_optional('pyarrow', '.parquet')
+        self._pq = _import_optional('pyarrow.parquet', '.parquet')
+        self._filepath = filepath
+        self._n_points = len(wavelengths)
+        self._chunk_rows = chunk_rows
+        # Grade e atributos vão nos metadados do esquema (a grade em bytes float64, sem perda)
+        self._schema_metadata = {b'lpg_comprimento_onda': np.asarray(wavelengths, dtype='<f8').tobytes(),
+                                 b'lpg_atributos': json.dumps(attrs, ensure_ascii=False).encode('utf-8')}
+        self._writer = None
+
+    def write_chunk(self, chunk_index, original, filtered, metadata):
+        pa = self._pa
+        table = pa.Table.from_pandas(metadata, preserve_index=False)
+        for kind, matrix in zip(KINDS, (original, filtered)):
+            values = pa.array(np.ascontiguousarray(matrix, dtype=float).ravel())
+            table = table.append_column(kind, pa.FixedSizeListArray.from_arrays(values, self._n_points))
+        if self._writer is None:
+            schema = table.schema.with_metadata(self._schema_metadata)
+            self._writer = self._pq.ParquetWriter(self._filepath, schema, compression='zstd')
+        else: # Mesmos tipos do primeiro bloco (ex: coluna só com NaN/None neste bloco)
+            table = table.cast(self._writer.schema)
+        self._writer.write_table(table, row_group_size=self._chunk_rows)
+
+    def close(self, metadata, attrs):
+        if self._writer is None: # Lote vazio: grava só o esquema
+            self.write_chunk(0, np.empty((0, self._n_points)), np.empty((0, self._n_points)), metadata)
+        self._writer.close()
+
+
+_WRITERS = {'npz': _NpzWriter, 'hdf5': _Hdf5Writer, 'parquet': _ParquetWriter}
+
+
+class BatchExportWriter:
+    """
+    Grava um lote bloco a bloco: append(originais, filtrados, metadados) pode ser
+    chamado com qualquer número de linhas; as linhas são reagrupadas em blocos de
+    'chunk_rows'. Todos os espectros devem estar na grade 'wavelengths'.
+    """
+
+    def __init__(self, filepath, wavelengths, params=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+        self.filepath = filepath
+        self.format = export_format(filepath)
+        self.wavelengths = np.asarray(wavelengths, dtype=float)
+        self.chunk_rows = chunk_rows
+        self.attrs = {'formato': 'lpg_lote', 'versao': FORMAT_VERSION, 'criado_em': make_timestamp(),
+                      'linhas_por_bloco': chunk_rows, 'parametros': params or {}}
+        self.n_spectra = 0
+        self._backend = _WRITERS[self.format](filepath, self.wavelengths, self.attrs, chunk_rows)
+        self._pending = [] # (originais, filtrados, metadados) ainda sem bloco completo
+        self._n_pending = 0
+        self._n_chunks = 0
+        self._metadata = []
+
+    def append(self, original, filtered, metadata=None, wavelengths=None):
+        """
+        Acrescenta linhas (matrizes n x pontos) e os metadados de cada uma (lista de dicts
+        ou DataFrame). Com 'wavelengths', confere se a grade é a mesma do arquivo.
+        """
+        if wavelengths is not None and not np.array_equal(wavelengths, self.wavelengths):
+            raise ValueError("Exportação em lote: todos os espectros devem ter a mesma grade de comprimento de onda.")
+        original = np.atleast_2d(np.asarray(original, dtype=float))
+        filtered = np.atleast_2d(np.asarray(filtered, dtype=float))
+        n_points = len(self.wavelengths)
+        if original.shape != filtered.shape or original.shape[1] != n_points:
+            raise ValueError(f"Exportação em lote: todos os espectros devem ter a mesma grade ({n_points} pontos).")
+        if metadata is None:
+            metadata = [{}] * len(original)
+        metadata = pd.DataFrame(metadata).reset_index(drop=True)
+        if len(metadata) != len(original):
+            raise ValueError("Número de linhas de metadados diferente do número de espectros.")
+
+        self._pending.append((original, filtered, metadata))
+        self._n_pending += len(original)
+        while self._n_pending >= self.chunk_rows:
+            self._flush(self.chunk_rows)
+
+    def _flush(self, n_rows):
+        original = np.vstack([p[0] for p in self._pending])
+        filtered = np.vstack([p[1] for p in self._pending])
+        metadata = pd.concat([p[2] for p in self._pending], ignore_index=True)
+        if n_rows < len(original): # Sobra fica para o próximo bloco
+            self._pending = [(original[n_rows:], filtered[n_rows:], metadata.iloc[n_rows:].reset_index(drop=True))]
+        else:
+            self._pending = []
+        self._n_pending = len(original) - n_rows
+        chunk_metadata = metadata.iloc[:n_rows].reset_index(drop=True)
+        self._backend.write_chunk(self._n_chunks, original[:n_rows], filtered[:n_rows], chunk_metadata)
+        self._metadata.append(chunk_metadata)
+        self._n_chunks += 1
+        self.n_spectra += n_rows
+
+    def close(self):
+        """Grava o bloco incompleto, os metadados e os atributos, e fecha o arquivo."""
+        if self._backend is None:
+            return
+        if self._n_pending:
+            self._flush(self._n_pending)
+        metadata = pd.concat(self._metadata, ignore_index=True) if self._metadata else pd.DataFrame()
+        self.attrs['n_espectros'] = self.n_spectra
+        self._backend.close(metadata, self.attrs)
+        self._backend = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# ===================================================================
+# LEITURA
+# ===================================================================
+
+class BatchExportReader:
+    """Acesso a um lote exportado: wavelengths, params, metadata (DataFrame), read(início, fim) e spectrum(i)."""
+
+    def __init__(self, wavelengths, attrs, metadata, n_spectra):
+        self.wavelengths = wavelengths
+        self.attrs = attrs
+        self.params = attrs.get('parametros', {})
+        self.metadata = metadata
+        self.n_spectra = n_spectra
+
+    def __len__(self):
+        return self.n_spectra
+
+    def read(self, start=0, stop=None, kind='filtrado'):
+        """Matriz (linhas x pontos) dos espectros start..stop-1 ('original' ou 'filtrado')."""
+        if kind not in KINDS:
+            raise ValueError(f"kind deve ser um de {KINDS}.")
+        start, stop, _ = slice(start, stop).indices(self.n_spectra)
+        if stop <= start:
+            return np.empty((0, len(self.wavelengths)))
+        return self._read_rows(start, stop, kind)
+
+    def spectrum(self, index, kind='filtrado'):
+        """Um espectro (vetor de intensidades); índices negativos contam do fim."""
+        if not -self.n_spectra <= index < self.n_spectra:
+            raise IndexError(f"Espectro {index} fora do lote ({self.n_spectra} espectros).")
+        index %= self.n_spectra
+        return self._read_rows(index, index + 1, kind)[0]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class _NpzReader(BatchExportReader):
+    def __init__(self, filepath):
+        self._npz = np.load(filepath, allow_pickle=False) # Membros só são lidos quando acessados
+        attrs = json.loads(str(self._npz['atributos']))
+        columns = [key.split('/', 1)[1] for key in self._npz.files if key.startswith('metadados/')]
+        metadata = pd.DataFrame({column: self._npz[f'metadados/{column}'] for column in columns})
+        self._chunk_rows = attrs['linhas_por_bloco']
+        super().__init__(self._npz['comprimento_onda'], attrs, metadata, attrs['n_espectros'])
+
+    def _read_rows(self, start, stop, kind):
+        first_chunk, last_chunk = start // self._chunk_rows, (stop - 1) // self._chunk_rows
+        blocks = [self._npz[f'{kind}/{chunk:06d}'] for chunk in range(first_chunk, last_chunk + 1)]
+        offset = first_chunk * self._chunk_rows
+        return np.concatenate(blocks)[start - offset:stop - offset]
+
+    def close(self):
+        self._npz.close()
+
+
+class _Hdf5Reader(BatchExportReader):
+    def __init__(self, filepath):
+        h5py = _import_optional('h5py', '.h5')
+        self._file = h5py.File(filepath, 'r')
+        attrs = json.loads(self._file.attrs['atributos'])
+        group = self._file['metadados']
+        metadata = pd.DataFrame({column: (group[column].asstr()[()] if group[column].dtype == object
+                                          else group[column][()]) for column in json.loads(group.attrs['colunas'])})
+        super().__init__(self._file['comprimento_onda'][()], attrs, metadata, self._file['filtrado'].shape[0])
+
+    def _read_rows(self, start, stop, kind):
+        return self._file[kind][start:stop]
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetReader(BatchExportReader):
+    def __init__(self, filepath):
+        pq = _import_optional('pyarrow.parquet', '.parquet')
+        self._file = pq.ParquetFile(filepath)
+        schema_metadata = self._file.schema_arrow.metadata
+        attrs = json.loads(schema_metadata[b'lpg_atributos'].decode('utf-8'))
+        wavelengths = np.frombuffer(schema_metadata[b'lpg_comprimento_onda'], dtype='<f8').copy()
+        columns = [name for name in self._file.schema_arrow.names if name not in KINDS]
+        metadata = self._file.read(columns=columns).to_pandas() if columns else pd.DataFrame()
+        row_counts = [self._file.metadata.row_group(i).num_rows for i in range(self._file.num_row_groups)]
+        self._group_starts = np.concatenate(([0], np.cumsum(row_counts)))
+        super().__init__(wavelengths, attrs, metadata, int(self._group_starts[-1]))
+
+    def _read_rows(self, start, stop, kind):
+        first_group = int(np.searchsorted(self._group_starts, start, side='right')) - 1
+        last_group = int(np.searchsorted(self._group_starts, stop, side='left')) - 1
+        groups = list(range(first_group, last_group + 1))
+        column = self._file.read_row_groups(groups, columns=[kind]).column(kind).combine_chunks()
+        matrix = column.flatten().to_numpy().reshape(-1, len(self.wavelengths))
+        offset = int(self._group_starts[first_group])
+        return matrix[start - offset:stop - offset]
+
+    def close(self):
+        self._file.close()
+
+
+_READERS = {'npz': _NpzReader, 'hdf5': _Hdf5Reader, 'parquet': _ParquetReader}
+
+
+def open_batch_export(filepath):
+    """Abre um lote exportado (.npz, .h5 ou .parquet) para leitura por espectro ou por fatia."""
+    return _READERS[export_format(filepath)](filepath)
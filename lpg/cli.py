@@ -0,0 +1,360 @@
+"""
+Linha de comando para processamento em lote sem Tk (v14).
+
+Exemplo:
+    python -m lpg dados/ --window 21 --order 3 --start 1500 --end 1600 \\
+        --normalize --sample LPG01 --log resultados.csv --workers 8
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+from .batch_export import BatchExportWriter, make_export_params
+from .core import (LOG_COLUMNS, append_to_log, load_spectrum, make_log_row, make_timestamp, process_batch,
+                   process_files, validate_filter_params, write_to_file)
+from .ingest import DEFAULT_INGEST_PORT, SpectrumServer, parse_address, process_received, replay_files
+from .lazy import LazyModule
+from .logstore import export_log_to_excel
+from .resonances import has_any_valley, make_resonance_row, parse_ranges, process_batch_resonances, resonance_columns
+from .spectrum_cache import SpectrumCache
+from .sweep import ParameterSweep, parse_int_list
+from .watch import DEFAULT_POLL_INTERVAL, FolderWatcher, process_new_file
+
+pd = LazyModule('pandas') # import só no primeiro uso (--help e --replay não esperam o pandas)
+
+
+def expand_inputs(inputs, pattern='*.txt'):
+    """Expande diretórios (usando 'pattern'), globs e arquivos numa lista ordenada e sem repetições."""
+    filepaths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = sorted(glob.glob(os.path.join(item, pattern)))
+        elif glob.has_magic(item):
+            matches = sorted(glob.glob(item, recursive=True))
+        else:
+            matches = [item]
+        filepaths.extend(m for m in matches if os.path.isfile(m))
+
+    seen = set()
+    return [fp for fp in filepaths if not (fp in seen or seen.add(fp))]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m lpg',
+        description="Filtro Savitzky-Golay e busca de vale em lote para espectros LPG (sem interface gráfica).",
+    )
+    parser.add_argument('inputs', nargs='*', help="Diretórios, arquivos ou padrões glob (ex: 'dados/*.txt').")
+    parser.add_argument('--pattern', default='*.txt', help="Padrão usado dentro de diretórios (padrão: *.txt).")
+    parser.add_argument('-w', '--window', type=int, default=21, help="Janela do filtro, ímpar (padrão: 21).")
+    parser.add_argument('-o', '--order', type=int, default=3, help="Ordem do polinômio (padrão: 3).")
+    parser.add_argument('--start', type=float, default=None, help="Início da faixa de busca do vale (nm).")
+    parser.add_argument('--end', type=float, default=None, help="Fim da faixa de busca do vale (nm).")
+    parser.add_argument('--resonances', type=parse_ranges, default=None, metavar='FAIXAS',
+                        help="Várias ressonâncias nomeadas (ex: 'LP05:1520-1540; LP06:1550-1570'): "
+                             "um vale (mais proeminente) por faixa, com colunas próprias no log.")
+    parser.add_argument('--min-prominence', type=float, default=0.0,
+                        help="Com --resonances, proeminência mínima do vale em dB (padrão: 0).")
+    parser.add_argument('-n', '--normalize', action='store_true', help="Normaliza o pico do espectro para 0 dB.")
+    parser.add_argument('--roi', action='store_true',
+                        help="Filtra só a faixa de busca (ou das ressonâncias) mais meia janela: mesmo vale, "
+                             "bem menos trabalho. Com --export-spectra o filtrado fica NaN fora da faixa.")
+    parser.add_argument('-s', '--sample', default='', help="Nome da amostra gravado no log.")
+    parser.add_argument('-l', '--log', default=None,
+                        help="Arquivo de log (.xlsx/.csv/.sqlite). Sem ele, os resultados vão para a saída padrão.")
+    parser.add_argument('--export-excel', default=None, metavar='XLSX',
+                        help="Exporta o log (.csv/.sqlite) para este .xlsx ao final (pode ser usado sem entradas).")
+    parser.add_argument('--export-spectra', default=None, metavar='ARQUIVO',
+                        help="Grava todos os espectros (original e filtrado), os vales e os parâmetros num único "
+                             "arquivo .npz, .h5 (h5py) ou .parquet (pyarrow). Processa no processo atual, em blocos.")
+    parser.add_argument('--cache-dir', default=None,
+                        help="Diretório do cache binário de espectros (padrão: ~/.cache/lpg_filter/spectra).")
+    parser.add_argument('--no-cache', action='store_true', help="Não usa o cache binário (.npy) de espectros.")
+    parser.add_argument('--watch', action='store_true',
+                        help="Observa o diretório de entrada e processa só os arquivos que chegarem (Ctrl+C para parar).")
+    parser.add_argument('--watch-existing', action='store_true',
+                        help="Com --watch, processa também os arquivos que já estão no diretório.")
+    parser.add_argument('--interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f"Com --watch, intervalo entre verificações em segundos (padrão: {DEFAULT_POLL_INTERVAL}).")
+    parser.add_argument('--serve', nargs='?', const=f':{DEFAULT_INGEST_PORT}', default=None, metavar='HOST:PORTA',
+                        help=f"Recebe espectros por TCP (binário ou texto, lpg.ingest) e registra cada vale "
+                             f"(padrão: 127.0.0.1:{DEFAULT_INGEST_PORT}; Ctrl+C para parar).")
+    parser.add_argument('--replay', default=None, metavar='HOST:PORTA',
+                        help="Simulador de OSA: envia os espectros dos arquivos de entrada para um servidor --serve.")
+    parser.add_argument('--rate', type=float, default=100.0,
+                        help="Com --replay, espectros por segundo (padrão: 100; 0 = o mais rápido possível).")
+    parser.add_argument('--repeat', type=int, default=1, help="Com --replay, quantas vezes enviar os arquivos.")
+    parser.add_argument('--text', action='store_true', help="Com --replay, envia em texto em vez de binário.")
+    parser.add_argument('--sweep-windows', type=parse_int_list, default=None, metavar='LISTA',
+                        help="Varredura: janelas a testar (ex: '5-45:2' ou '11,21,31'). Usa --order se --sweep-orders faltar.")
+    parser.add_argument('--sweep-orders', type=parse_int_list, default=None, metavar='LISTA',
+                        help="Varredura: ordens a testar (ex: '2-6'). Usa --window se --sweep-windows faltar.")
+    parser.add_argument('--sweep-output', default=None, metavar='ARQUIVO',
+                        help="Grava a tabela da varredura em .csv/.xlsx (padrão: saída padrão).")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="Número de processos (padrão: número de CPUs; 1 = sem pool).")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    window_size, poly_order = validate_filter_params(args.window, args.order)
+    if args.start is not None and args.end is not None and args.start >= args.end:
+        parser.error("O início da faixa deve ser menor que o fim.")
+
+    if args.export_excel and not args.log:
+        parser.error("--export-excel requer --log.")
+    if args.serve is not None:
+        return run_serve(args, window_size, poly_order)
+    if not args.inputs:
+        if not args.export_excel:
+            parser.error("Informe ao menos um diretório, arquivo ou padrão glob.")
+        export_log_to_excel(args.log, args.export_excel)
+        return 0
+
+    read_func = load_spectrum if args.no_cache else SpectrumCache(args.cache_dir)
+
+    if args.watch:
+        if len(args.inputs) != 1 or not os.path.isdir(args.inputs[0]):
+            parser.error("--watch requer exatamente um diretório de entrada.")
+        return run_watch(args, window_size, poly_order, read_func)
+
+    filepaths = expand_inputs(args.inputs, args.pattern)
+    if not filepaths:
+        print("Nenhum arquivo encontrado.", file=sys.stderr)
+        return 1
+
+    if args.replay:
+        host, port = parse_address(args.replay)
+        n_sent, elapsed = replay_files(filepaths, host, port, args.rate, args.text, args.repeat, read_func)
+        print(f"{n_sent} espectros enviados para {host}:{port} em {elapsed:.2f} s "
+              f"({n_sent / max(elapsed, 1e-9):.0f}/s).", file=sys.stderr)
+        return 0
+    if args.sweep_windows or args.sweep_orders:
+        # A varredura roda no processo atual e sempre filtra só a faixa (mesmo vale que o espectro inteiro)
+        if args.workers is not None:
+            parser.error("--workers não se aplica à varredura (--sweep-windows/--sweep-orders), que roda no processo atual.")
+        if args.roi:
+            parser.error("--roi não se aplica à varredura (--sweep-windows/--sweep-orders): ela já filtra só a faixa.")
+        return run_sweep(args, filepaths, read_func)
+    if args.resonances or args.export_spectra:
+        return run_chunked(args, filepaths, window_size, poly_order, read_func)
+
+    rows = []
+    n_errors = 0
+    results = process_files(filepaths, window_size, poly_order, args.start, args.end,
+                            args.normalize, workers=args.workers,
+                            read_func=read_func, roi=args.roi)
+    for filepath, valley_result, error in results:
+        if error is not None:
+            n_errors += 1
+            print(f"Erro em {filepath}: {error}", file=sys.stderr)
+            continue
+        if valley_result is None:
+            print(f"Sem vale na faixa: {filepath}", file=sys.stderr)
+            continue
+
+        valley_wl, valley_intensity = valley_result
+        rows.append(make_log_row(make_timestamp(with_millis=True), valley_wl, valley_intensity,
+                                 args.sample, os.path.basename(filepath)))
+
+    _write_rows(args, rows, LOG_COLUMNS, len(filepaths))
+    return 2 if n_errors else 0
+
+
+def _write_rows(args, rows, columns, n_files):
+    """Acrescenta as linhas ao log (--log) ou escreve-as na saída padrão."""
+    df_batch = pd.DataFrame(rows, columns=columns)
+    if args.log:
+        if rows:
+            append_to_log(df_batch, args.log)
+        print(f"{len(rows)} de {n_files} vales registrados em {args.log}.", file=sys.stderr)
+        if args.export_excel:
+            export_log_to_excel(args.log, args.export_excel)
+    else:
+        df_batch.to_csv(sys.stdout, index=False, sep=';', decimal='.')
+
+
+def run_chunked(args, filepaths, window_size, poly_order, read_func, chunk_files=256):
+    """
+    Lote no processo atual, em blocos de 'chunk_files' arquivos: usado com várias
+    ressonâncias (um filtro por espectro, um vale por faixa nomeada) e com
+    --export-spectra (os espectros filtrados de cada bloco vão direto para o arquivo).
+    """
+    columns = resonance_columns([name for name, _, _ in args.resonances]) if args.resonances else LOG_COLUMNS
+    params = make_export_params(window_size, poly_order, args.start, args.end, args.normalize,
+                                args.resonances, args.min_prominence)
+    exporter = None
+    rows = []
+    n_errors = 0
+    try:
+        for chunk_start in range(0, len(filepaths), chunk_files):
+            chunk = filepaths[chunk_start:chunk_start + chunk_files]
+            spectra = []
+            for filepath in chunk:
+                try:
+                    spectra.append((filepath, read_func(filepath)))
+                except Exception as e:
+                    n_errors += 1
+                    print(f"Erro em {filepath}: {e}", file=sys.stderr)
+            if not spectra:
+                continue
+
+            wavelength_list = [s[0] for _, s in spectra]
+            intensity_list = [s[1] for _, s in spectra]
+            filtered_chunks = []
+            filtered_callback = (lambda first, wavelengths, filtered: filtered_chunks.append((first, wavelengths, filtered))
+                                 ) if args.export_spectra else None
+            if args.resonances:
+                results = process_batch_resonances(wavelength_list, intensity_list, window_size, poly_order,
+                                                   args.resonances, args.normalize, args.min_prominence,
+                                                   chunk_rows=chunk_files, filtered_callback=filtered_callback,
+                                                   roi=args.roi)
+            else:
+                results = process_batch(wavelength_list, intensity_list, window_size, poly_order, args.start, args.end,
+                                        args.normalize, chunk_rows=chunk_files, filtered_callback=filtered_callback,
+                                        roi=args.roi)
+
+            timestamp = make_timestamp(with_millis=True)
+            chunk_rows = [_result_row(args, timestamp, result, os.path.basename(filepath))
+                          for (filepath, _), result in zip(spectra, results)]
+            for (filepath, _), result, row in zip(spectra, results, chunk_rows):
+                if _has_valley(result):
+                    rows.append(row)
+                else:
+                    print(f"Sem vale na faixa: {filepath}", file=sys.stderr)
+
+            for first, wavelengths, filtered in filtered_chunks:
+                if exporter is None:
+                    exporter = BatchExportWriter(args.export_spectra, wavelengths, params)
+                exporter.append(np.vstack(intensity_list[first:first + len(filtered)]), filtered,
+                                chunk_rows[first:first + len(filtered)], wavelengths)
+    finally:
+        if exporter is not None:
+            exporter.close()
+            print(f"{exporter.n_spectra} espectros exportados para {args.export_spectra}.", file=sys.stderr)
+
+    _write_rows(args, rows, columns, len(filepaths))
+    return 2 if n_errors else 0
+
+
+def _has_valley(result):
+    return has_any_valley(result) if isinstance(result, dict) else result is not None
+
+
+def _result_row(args, timestamp, result, filename):
+    """Linha de log de um resultado (NaN se não houver vale: as linhas também servem de metadados da exportação)."""
+    if isinstance(result, dict):
+        return make_resonance_row(timestamp, result, args.sample, filename)
+    valley_wl, valley_intensity = result if result is not None else (np.nan, np.nan)
+    return make_log_row(timestamp, valley_wl, valley_intensity, args.sample, filename)
+
+
+def run_watch(args, window_size, poly_order, read_func):
+    """Modo de observação: processa e registra cada arquivo novo assim que ele estabiliza."""
+    watcher = FolderWatcher(args.inputs[0], args.pattern, include_existing=args.watch_existing)
+    mode = "notificações do sistema" if watcher.backend == 'watchdog' else "polling"
+    print(f"Observando {args.inputs[0]} ({args.pattern}, {mode}) a cada {args.interval:g} s. Ctrl+C para parar.",
+          file=sys.stderr)
+
+    header_written = False
+    columns = resonance_columns([name for name, _, _ in args.resonances]) if args.resonances else LOG_COLUMNS
+    try:
+        while True:
+            for filepath in watcher.poll():
+                try:
+                    row = process_new_file(filepath, window_size, poly_order, args.start, args.end,
+                                           args.normalize, args.sample, read_func=read_func,
+                                           ranges=args.resonances, min_prominence=args.min_prominence,
+                                           roi=args.roi)
+                except Exception as e:
+                    print(f"Erro em {filepath}: {e}", file=sys.stderr)
+                    continue
+                if row is None:
+                    print(f"Sem vale na faixa: {filepath}", file=sys.stderr)
+                    continue
+
+                df_row = pd.DataFrame([row], columns=columns)
+                if args.log:
+                    append_to_log(df_row, args.log)
+                else:
+                    df_row.to_csv(sys.stdout, index=False, header=not header_written, sep=';', decimal='.')
+                    sys.stdout.flush()
+                    header_written = True
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    return 0
+
+
+def run_serve(args, window_size, poly_order, poll_interval=0.1):
+    """Modo servidor: recebe espectros por TCP e registra os vales em lotes, a cada 'poll_interval' s."""
+    host, port = parse_address(args.serve)
+    server = SpectrumServer(host, port).start()
+    print(f"Recebendo espectros em {host}:{server.port}. Ctrl+C para parar.", file=sys.stderr)
+
+    header_written = False
+    columns = resonance_columns([name for name, _, _ in args.resonances]) if args.resonances else LOG_COLUMNS
+    n_errors = 0
+    try:
+        while True:
+            time.sleep(poll_interval)
+            if server.errors != n_errors:
+                n_errors = server.errors
+                print(f"Conexão encerrada: {server.last_error}", file=sys.stderr)
+            rows = [row for row in process_received(server.take(), window_size, poly_order, args.start, args.end,
+                                                    args.normalize, args.sample, args.resonances,
+                                                    args.min_prominence, args.roi) if row is not None]
+            if not rows:
+                continue
+
+            df_rows = pd.DataFrame(rows, columns=columns)
+            if args.log:
+                append_to_log(df_rows, args.log)
+            else:
+                df_rows.to_csv(sys.stdout, index=False, header=not header_written, sep=';', decimal='.')
+                sys.stdout.flush()
+                header_written = True
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    print(f"{server.received} espectros recebidos.", file=sys.stderr)
+    return 0
+
+
+def run_sweep(args, filepaths, read_func, chunk_files=256):
+    """
+    Varredura janela x ordem sobre os arquivos; grava ou imprime a tabela de estabilidade do vale.
+    Arquivos que não podem ser lidos são informados e ficam de fora, como em run_chunked.
+    """
+    sweep = ParameterSweep(args.sweep_windows or [args.window], args.sweep_orders or [args.order],
+                           args.start, args.end, args.normalize)
+    print(f"Varrendo {len(sweep.pairs)} pares (janela, ordem) em {len(filepaths)} arquivos...", file=sys.stderr)
+    n_errors = 0
+    for chunk_start in range(0, len(filepaths), chunk_files):
+        spectra = []
+        for filepath in filepaths[chunk_start:chunk_start + chunk_files]:
+            try:
+                spectra.append(read_func(filepath))
+            except Exception as e:
+                n_errors += 1
+                print(f"Erro em {filepath}: {e}", file=sys.stderr)
+        if spectra:
+            sweep.add([wavelength for wavelength, _ in spectra], [intensity for _, intensity in spectra])
+
+    df_sweep = sweep.results()
+    if args.sweep_output:
+        write_to_file(df_sweep, args.sweep_output)
+        print(f"Tabela da varredura gravada em {args.sweep_output}.", file=sys.stderr)
+    else:
+        df_sweep.to_csv(sys.stdout, index=False, sep=';', decimal='.')
+    return 2 if n_errors else 0
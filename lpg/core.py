@@ -0,0 +1,428 @@
+"""
+Núcleo de processamento sem interface gráfica (v14).
+
+Contém o carregamento dos espectros, o filtro Savitzky-Golay, a busca do vale
+e a escrita do log. É usado tanto pela GUI (LpgFilterApp) quanto pela linha de
+comando (python -m lpg), garantindo resultados idênticos nos dois caminhos
+(e no lote, que filtra matrizes de espectros). O filtro é o lpg.savgol, que
+coincide com scipy.signal.savgol_filter até o arredondamento.
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from .downsample import is_sorted
+from .lazy import LazyModule
+from .loader import read_spectrum
+from .profiling import NULL_PROFILER
+from .savgol import default_filter, savgol_filter # v14: kernels em cache, convolução direta ou por FFT
+
+pd = LazyModule('pandas') # v14: import só no primeiro uso (a janela da GUI abre sem esperar o pandas)
+
+# Colunas do arquivo de log de vales (mesma ordem usada pela GUI)
+LOG_COLUMNS = [
+    'horario',
+    'comprimento_onda_filtrado (nm)',
+    'intensidade_filtrada_vale (dB)',
+    'amostra',
+    'arquivo_origem',
+]
+
+
+# ===================================================================
+# CARREGAMENTO
+# ===================================================================
+
+def detect_delimiter(filepath):
+    """Detecta o delimitador pela primeira linha (';', ',' ou espaço)."""
+    try:
+        with open(filepath, 'r') as f:
+            first_line = f.readline()
+        if ';' in first_line: return ';'
+        if re.search(r'\d,\d', first_line): return None
+        if ',' in first_line: return ','
+        return None
+    except Exception: return None
+
+
+def load_spectrum(filepath):
+    """
+    Lê um arquivo de espectro e devolve (comprimento_onda, intensidade).
+    Usa o leitor rápido (lpg.loader); se ele não reconhecer o formato, volta ao np.loadtxt.
+    """
+    try:
+        return read_spectrum(filepath)
+    except (ValueError, UnicodeDecodeError):
+        return load_spectrum_loadtxt(filepath)
+
+
+def load_spectrum_loadtxt(filepath):
+    """Caminho de leitura original: detect_delimiter + np.loadtxt (com nova tentativa sem delimitador)."""
+    delimiter = detect_delimiter(filepath)
+    try: data = np.loadtxt(filepath, delimiter=delimiter)
+    except Exception: data = np.loadtxt(filepath)
+
+    if data.ndim != 2 or data.shape[1] < 2:
+        raise ValueError(f"O arquivo {os.path.basename(filepath)} não parece ter duas colunas.")
+
+    data = data[:, :2]
+    return data[:, 0], data[:, 1]
+
+
+# ===================================================================
+# FILTRO E BUSCA DO VALE
+# ===================================================================
+
+def validate_filter_params(window_size, poly_order):
+    """Corrige janela (ímpar) e ordem do polinômio, como a GUI faz nos campos."""
+    if window_size % 2 == 0:
+        window_size += 1
+
+    if poly_order >= window_size:
+        poly_order = max(1, window_size - 2)
+    elif poly_order < 1:
+        poly_order = 1
+
+    return window_size, poly_order
+
+
+def filter_spectrum(intensities, window_size, poly_order, normalize=False):
+    """Aplica (opcionalmente) a normalização ao pico e o filtro Savitzky-Golay."""
+    data_to_filter = intensities.copy()
+    if normalize:
+        data_to_filter = data_to_filter - np.max(data_to_filter)
+
+    return savgol_filter(data_to_filter, window_size, poly_order)
+
+
+def find_valley(wavelengths, intensities, range_start, range_end):
+    """Encontra o vale (mínimo) dentro de uma faixa. Devolve None se a faixa for inválida."""
+    index = range_index(wavelengths, range_start, range_end) # v14: searchsorted no eixo ordenado
+
+    if index is None:
+        return None # Faixa inválida
+
+    wavelength_in_range = wavelengths[index]
+    intensity_in_range = intensities[index]
+
+    min_intensity_index_local = np.argmin(intensity_in_range)
+    valley_intensity = intensity_in_range[min_intensity_index_local]
+    valley_wl = wavelength_in_range[min_intensity_index_local]
+
+    return valley_wl, valley_intensity
+
+
+def resolve_range(wavelengths, range_start, range_end):
+    """Usa min/max do espectro quando a faixa não foi informada (None)."""
+    if range_start is None: range_start = min(wavelengths)
+    if range_end is None: range_end = max(wavelengths)
+    return range_start, range_end
+
+
+def process_spectrum(wavelengths, intensities, window_size, poly_order, range_start, range_end, normalize=False,
+                     roi=False):
+    """
+    Filtra um espectro e busca o vale. Devolve (sinal_filtrado, vale ou None).
+    v14: com roi=True só a faixa de busca (mais meia janela) é filtrada; fora dela o sinal é NaN.
+    """
+    range_start, range_end = resolve_range(wavelengths, range_start, range_end)
+    if roi:
+        sinal_filtrado = filter_spectrum_roi(wavelengths, intensities, window_size, poly_order,
+                                             range_start, range_end, normalize)
+    else:
+        sinal_filtrado = filter_spectrum(intensities, window_size, poly_order, normalize)
+    valley_result = find_valley(wavelengths, sinal_filtrado, range_start, range_end)
+    return sinal_filtrado, valley_result
+
+
+# ===================================================================
+# LOTE VETORIZADO (GRADE COMUM)
+# ===================================================================
+
+def has_shared_grid(wavelength_list):
+    """Verifica se todos os espectros usam exatamente o mesmo eixo de comprimento de onda."""
+    if not wavelength_list:
+        return False
+    first = wavelength_list[0]
+    for wavelengths in wavelength_list[1:]:
+        if wavelengths is first:
+            continue
+        if wavelengths.shape != first.shape or not np.array_equal(wavelengths, first):
+            return False
+    return True
+
+
+def range_index(wavelengths, range_start, range_end, sorted_axis=None):
+    """
+    Índices da faixa de busca num eixo de comprimento de onda, calculados uma vez.
+    Devolve um slice quando a faixa é contígua (caso normal), um array de índices
+    caso contrário, ou None se a faixa estiver vazia.
+    v14: num eixo crescente (o normal num OSA; 'sorted_axis' evita verificar de novo)
+    as bordas saem de np.searchsorted, sem a máscara booleana do eixo inteiro.
+    """
+    if sorted_axis is None:
+        sorted_axis = is_sorted(wavelengths)
+    if sorted_axis:
+        start = int(np.searchsorted(wavelengths, range_start, side='left'))
+        stop = int(np.searchsorted(wavelengths, range_end, side='right'))
+        return slice(start, stop) if stop > start else None
+
+    indices = np.flatnonzero((wavelengths >= range_start) & (wavelengths <= range_end))
+    if indices.size == 0:
+        return None
+    if indices[-1] - indices[0] + 1 == indices.size:
+        return slice(indices[0], indices[-1] + 1)
+    return indices
+
+
+def roi_columns(n_points, index, window_size):
+    """
+    (v14) Colunas a filtrar para uma faixa (índices de range_index): a faixa mais meia janela
+    de cada lado, com pelo menos 'window_size' pontos; com janelas filtradas por FFT, estendida
+    até blocos inteiros da convolução (SavgolFilter.exact_columns). Dentro da faixa o resultado
+    é idêntico, bit a bit, ao do espectro inteiro.
+    Devolve (slice das colunas, posição da faixa dentro delas).
+    """
+    if isinstance(index, slice):
+        first, last = index.start, index.stop - 1
+    else:
+        first, last = int(index[0]), int(index[-1])
+    start, stop = default_filter.exact_columns(n_points, first, last + 1, window_size)
+    if isinstance(index, slice):
+        local = slice(first - start, last - start + 1)
+    else:
+        local = index - start
+    return slice(start, stop), local
+
+
+def filter_spectrum_roi(wavelengths, intensities, window_size, poly_order, range_start, range_end, normalize=False):
+    """
+    (v14) Como filter_spectrum, mas filtra só [range_start, range_end] mais meia janela
+    de cada lado (roi_columns). Devolve o sinal do tamanho do espectro, com NaN fora das colunas filtradas.
+    """
+    filtered = np.full(len(intensities), np.nan)
+    index = range_index(wavelengths, range_start, range_end)
+    if index is None:
+        return filtered # Faixa vazia: nada a filtrar
+    columns, _ = roi_columns(len(intensities), index, window_size)
+    offset = np.max(intensities) if normalize else 0.0 # Normalização pelo máximo do espectro INTEIRO
+    filtered[columns] = savgol_filter(intensities[columns] - offset, window_size, poly_order)
+    return filtered
+
+
+def filter_matrix(intensity_matrix, window_size, poly_order, normalize=False):
+    """Normaliza (máximo por linha) e filtra uma matriz (n_arquivos x n_pontos) numa única chamada."""
+    if normalize:
+        intensity_matrix = intensity_matrix - np.max(intensity_matrix, axis=1, keepdims=True)
+    return savgol_filter(intensity_matrix, window_size, poly_order, axis=1)
+
+
+def find_valleys_matrix(wavelengths, filtered_matrix, index):
+    """Vale de cada linha com um único argmin por linha. Devolve (comprimentos de onda, intensidades)."""
+    wavelength_in_range = wavelengths[index]
+    intensity_in_range = filtered_matrix[:, index]
+
+    min_indices = np.argmin(intensity_in_range, axis=1)
+    valley_intensities = intensity_in_range[np.arange(intensity_in_range.shape[0]), min_indices]
+    valley_wls = wavelength_in_range[min_indices]
+    return valley_wls, valley_intensities
+
+
+def process_batch(wavelength_list, intensity_list, window_size, poly_order, range_start, range_end,
+                  normalize=False, chunk_rows=512, progress_callback=None, cancel_event=None, profiler=None,
+                  filtered_callback=None, roi=False):
+    """
+    Processa um lote de espectros e devolve a lista de vales (ou None), na ordem de entrada.
+
+    Se todos compartilham a mesma grade de comprimento de onda, os espectros são
+    empilhados em blocos de até 'chunk_rows' linhas e filtrados com uma chamada
+    de savgol_filter(axis=1) por bloco. Caso contrário, volta ao caminho por arquivo.
+    'progress_callback(n_processados)' é chamado após cada bloco (ou arquivo).
+    Se 'cancel_event' (threading.Event) for sinalizado, o lote para no próximo
+    bloco e devolve apenas os resultados já calculados (lista mais curta).
+    'profiler' (lpg.profiling.StageProfiler) mede as etapas 'filtro' e 'vale'.
+    'filtered_callback(primeiro_indice, comprimentos_de_onda, matriz_filtrada)' recebe
+    o sinal filtrado de cada bloco (ou de cada arquivo, como matriz de uma linha).
+    v14: com roi=True só a faixa de busca mais meia janela é filtrada (roi_columns); os vales
+    são os mesmos, e o sinal entregue a 'filtered_callback' é NaN fora dessas colunas.
+    """
+    n_files = len(intensity_list)
+    if n_files == 0:
+        return []
+    profiler = profiler or NULL_PROFILER
+
+    if not has_shared_grid(wavelength_list):
+        results = []
+        for i, (wavelengths, intensities) in enumerate(zip(wavelength_list, intensity_list)):
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            file_start, file_end = resolve_range(wavelengths, range_start, range_end)
+            with profiler.stage('filtro', item=i):
+                if roi:
+                    sinal_filtrado = filter_spectrum_roi(wavelengths, intensities, window_size, poly_order,
+                                                         file_start, file_end, normalize)
+                else:
+                    sinal_filtrado = filter_spectrum(intensities, window_size, poly_order, normalize)
+            if filtered_callback: filtered_callback(i, wavelengths, sinal_filtrado[np.newaxis, :])
+            with profiler.stage('vale', item=i):
+                valley_result = find_valley(wavelengths, sinal_filtrado, file_start, file_end)
+            results.append(valley_result)
+            if progress_callback: progress_callback(i + 1)
+        return results
+
+    wavelengths = wavelength_list[0]
+    range_start, range_end = resolve_range(wavelengths, range_start, range_end)
+    index = range_index(wavelengths, range_start, range_end)
+    n_points = len(wavelengths)
+    columns = slice(0, n_points)
+    if roi and index is not None: # Só as colunas da faixa (+ meia janela) entram no filtro
+        columns, index = roi_columns(n_points, index, window_size)
+
+    results = []
+    for chunk_start in range(0, n_files, chunk_rows):
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        chunk = intensity_list[chunk_start:chunk_start + chunk_rows]
+        item = f"{chunk_start}-{chunk_start + len(chunk) - 1}"
+        with profiler.stage('filtro', item=item, files=len(chunk)):
+            if roi and index is not None:
+                roi_matrix = np.vstack([intensities[columns] for intensities in chunk])
+                if normalize: # Máximo do espectro inteiro, como no caminho completo
+                    roi_matrix = roi_matrix - np.array([np.max(intensities) for intensities in chunk])[:, np.newaxis]
+                filtered_matrix = filter_matrix(roi_matrix, window_size, poly_order)
+            else:
+                filtered_matrix = filter_matrix(np.vstack(chunk), window_size, poly_order, normalize)
+        if filtered_callback:
+            if filtered_matrix.shape[1] != n_points:
+                padded = np.full((len(chunk), n_points), np.nan)
+                padded[:, columns] = filtered_matrix
+                filtered_callback(chunk_start, wavelengths, padded)
+            else:
+                filtered_callback(chunk_start, wavelengths, filtered_matrix)
+
+        if index is None:
+            results.extend([None] * len(chunk)) # Faixa inválida
+        else:
+            with profiler.stage('vale', item=item, files=len(chunk)):
+                valley_wls, valley_intensities = find_valleys_matrix(wavelengths[columns], filtered_matrix, index)
+            results.extend(zip(valley_wls, valley_intensities))
+
+        if progress_callback: progress_callback(len(results))
+
+    return results
+
+
+# ===================================================================
+# LOG
+# ===================================================================
+
+def make_timestamp(with_millis=False):
+    """Horário no formato do log (com milissegundos para os lotes)."""
+    if with_millis:
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def make_log_row(timestamp, valley_wl, valley_intensity, sample_name, filename):
+    """Monta uma linha do log de vales."""
+    return {
+        'horario': timestamp,
+        'comprimento_onda_filtrado (nm)': valley_wl,
+        'intensidade_filtrada_vale (dB)': valley_intensity,
+        'amostra': sample_name,
+        'arquivo_origem': filename,
+    }
+
+
+def write_to_file(df, filepath):
+    """Grava um DataFrame em .xlsx ou .csv (separado por ';'). Erros são propagados."""
+    if filepath.endswith('.xlsx'):
+        df.to_excel(filepath, index=False, sheet_name='Dados')
+    elif filepath.endswith('.csv'):
+        df.to_csv(filepath, index=False, sep=';', decimal='.')
+    else:
+        raise ValueError(f"Extensão de arquivo não suportada: {filepath}")
+
+
+def append_to_log(df_to_append, log_filepath):
+    """
+    Adiciona linhas ao log. Logs .csv e SQLite são gravados só por acréscimo
+    (lpg.logstore); o .xlsx é lido por inteiro, concatenado e gravado de novo.
+    """
+    from .logstore import open_log_store # import local: logstore depende de core
+
+    store = open_log_store(log_filepath)
+    if store is not None:
+        store.append(df_to_append)
+        return
+
+    if os.path.exists(log_filepath):
+        df_log = pd.read_excel(log_filepath)
+        df_log = pd.concat([df_log, df_to_append], ignore_index=True)
+    else:
+        df_log = df_to_append
+
+    write_to_file(df_log, log_filepath)
+
+
+# ===================================================================
+# LOTE (POOL DE PROCESSOS)
+# ===================================================================
+
+def _process_chunk_task(task):
+    """
+    Tarefa executada em cada processo: carrega um bloco de arquivos e processa
+    o bloco com process_batch (vetorizado quando a grade é comum).
+    Devolve [(filepath, vale ou None, erro ou None), ...].
+    """
+    filepaths, window_size, poly_order, range_start, range_end, normalize, read_func, roi = task
+
+    results = [None] * len(filepaths)
+    loaded = []
+    for k, filepath in enumerate(filepaths):
+        try:
+            loaded.append((k,) + tuple(read_func(filepath)))
+        except Exception as e:
+            results[k] = (filepath, None, str(e))
+
+    try:
+        valleys = process_batch([w for _, w, _ in loaded], [i for _, _, i in loaded],
+                                window_size, poly_order, range_start, range_end, normalize, roi=roi)
+        for (k, _, _), valley_result in zip(loaded, valleys):
+            results[k] = (filepaths[k], valley_result, None)
+    except Exception:
+        # Um arquivo problemático não deve derrubar o bloco inteiro: refaz um a um
+        for k, wavelengths, intensities in loaded:
+            try:
+                _, valley_result = process_spectrum(wavelengths, intensities, window_size, poly_order,
+                                                    range_start, range_end, normalize, roi)
+                results[k] = (filepaths[k], valley_result, None)
+            except Exception as e:
+                results[k] = (filepaths[k], None, str(e))
+
+    return results
+
+
+def process_files(filepaths, window_size, poly_order, range_start=None, range_end=None,
+                  normalize=False, workers=None, chunksize=64, read_func=load_spectrum, roi=False):
+    """
+    Processa vários arquivos num pool de processos (concurrent.futures).
+    Cada tarefa recebe um bloco de 'chunksize' arquivos, filtrados juntos.
+    'read_func(filepath)' lê cada arquivo (ex: SpectrumCache.load); precisa ser picklable.
+    Gera (filepath, vale ou None, erro ou None) na mesma ordem de 'filepaths'.
+    Com workers=1 tudo roda no processo atual, sem pool. 'roi': ver process_batch.
+    """
+    filepaths = list(filepaths)
+    tasks = [(filepaths[i:i + chunksize], window_size, poly_order, range_start, range_end, normalize, read_func, roi)
+             for i in range(0, len(filepaths), chunksize)]
+
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield from _process_chunk_task(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_results in executor.map(_process_chunk_task, tasks):
+            yield from chunk_results
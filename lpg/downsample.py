@@ -0,0 +1,119 @@
+"""
+Redução de pontos para exibição de espectros longos (v14).
+
+Um traço de OSA de 100k-1M pontos é desenhado numa área de poucos milhares de
+pixels. minmax_decimate divide a parte visível em blocos (um por pixel) e
+mantém apenas o mínimo e o máximo de cada bloco, na ordem original: o
+desenho fica igual ao dos dados completos e vales estreitos não somem.
+
+Para séries temporais longas (o histórico do log), lttb_indices usa o
+Largest-Triangle-Three-Buckets: um ponto por bloco, o que forma o maior
+triângulo com o ponto escolhido no bloco anterior e a média do seguinte.
+Com um ponto por pixel a forma da curva (picos, degraus, deriva) se mantém.
+"""
+import numpy as np
+
+
+def is_sorted(x):
+    """True se x é crescente (permite localizar a parte visível com searchsorted)."""
+    return len(x) < 2 or bool(np.all(x[1:] >= x[:-1]))
+
+
+def visible_range(x, x_min, x_max, x_sorted=True):
+    """
+    Índices (início, fim) da parte de x dentro de [x_min, x_max], com um ponto
+    extra de cada lado para a linha continuar até a borda do gráfico.
+    Sem ordenação conhecida, devolve o intervalo completo.
+    """
+    if not x_sorted:
+        return 0, len(x)
+    start = max(int(np.searchsorted(x, x_min, side='left')) - 1, 0)
+    end = min(int(np.searchsorted(x, x_max, side='right')) + 1, len(x))
+    return start, end
+
+
+def minmax_decimate(x, y, n_bins):
+    """
+    Reduz (x, y) a no máximo 2 * n_bins + 4 pontos: mínimo e máximo de cada
+    bloco de pontos consecutivos, na ordem em que aparecem, mais as pontas.
+    """
+    n_points = len(y)
+    if n_bins <= 0 or n_points <= 2 * n_bins:
+        return x, y
+
+    # Blocos de tamanho arredondado para cima: o resto final é menor que um bloco
+    bin_size = -(-n_points // n_bins)
+    n_bins = n_points // bin_size
+    n_full = bin_size * n_bins
+    blocks = y[:n_full].reshape(n_bins, bin_size)
+    i_min = blocks.argmin(axis=1)
+    i_max = blocks.argmax(axis=1)
+    offsets = np.arange(n_bins) * bin_size
+    indices = np.column_stack((offsets + np.minimum(i_min, i_max),
+                               offsets + np.maximum(i_min, i_max))).ravel()
+
+    if n_full < n_points: # Resto que não completa um bloco
+        tail = y[n_full:]
+        tail_indices = sorted({n_full + int(tail.argmin()), n_full + int(tail.argmax())})
+        indices = np.concatenate((indices, tail_indices))
+
+    # Primeiro e último pontos: a linha vai até as pontas dos dados
+    if indices[0] != 0: indices = np.concatenate(([0], indices))
+    if indices[-1] != n_points - 1: indices = np.concatenate((indices, [n_points - 1]))
+    return x[indices], y[indices]
+
+
+def decimate_for_view(x, y, x_min, x_max, n_bins, x_sorted=True):
+    """Parte visível de (x, y) reduzida a n_bins blocos. Devolve (x, y, (início, fim))."""
+    start, end = visible_range(x, x_min, x_max, x_sorted)
+    x_view, y_view = minmax_decimate(x[start:end], y[start:end], n_bins)
+    return x_view, y_view, (start, end)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Índices dos pontos escolhidos pelo Largest-Triangle-Three-Buckets (no máximo 'n_out',
+    sempre com o primeiro e o último). x crescente e sem NaN em x ou y.
+    """
+    n_points = len(y)
+    if n_out >= n_points or n_out < 3:
+        return np.arange(n_points)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # Blocos internos: os n-2 pontos do meio divididos em n_out-2 blocos
+    edges = (np.arange(n_out - 1) * ((n_points - 2) / (n_out - 2))).astype(np.intp) + 1
+    edges[-1] = n_points - 1
+    counts = np.diff(edges)
+    # Média de cada bloco; o "bloco seguinte" do último é o ponto final
+    mean_x = np.append(np.add.reduceat(x[:-1], edges[:-1]) / counts, x[-1])
+    mean_y = np.append(np.add.reduceat(y[:-1], edges[:-1]) / counts, y[-1])
+
+    indices = np.empty(n_out, dtype=np.intp)
+    indices[0] = 0
+    indices[-1] = n_points - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        # Dobro da área do triângulo (a, ponto do bloco, média do bloco seguinte)
+        areas = np.abs((ax - mean_x[i + 1]) * (y[start:end] - ay) - (ax - x[start:end]) * (mean_y[i + 1] - ay))
+        a = start + int(areas.argmax())
+        indices[i + 1] = a
+    return indices
+
+
+def fill_nan(values):
+    """'values' sem NaN (lttb_indices não os aceita): NaN vira a média dos valores válidos, ou 0 sem nenhum."""
+    values = np.asarray(values, dtype=float)
+    missing = np.isnan(values)
+    if not missing.any():
+        return values
+    valid = values[~missing]
+    return np.where(missing, valid.mean() if len(valid) else 0.0, values)
+
+
+def lttb_for_view(x, y, x_min, x_max, n_out, x_sorted=True):
+    """Parte visível de (x, y) reduzida por LTTB a 'n_out' pontos. Devolve (índices, (início, fim))."""
+    start, end = visible_range(x, x_min, x_max, x_sorted)
+    return start + lttb_indices(x[start:end], y[start:end], n_out), (start, end)
@@ -0,0 +1,279 @@
+"""
+Recepção de espectros por TCP (v14).
+
+Interrogadores que enviam os espectros pela rede não precisam mais gravar
+arquivos temporários só para relê-los: SpectrumServer (asyncio, numa thread
+própria) recebe os espectros direto na memória e os entrega em lotes com
+take(). process_received filtra o lote e acha os vales com process_batch
+(vetorizado quando a grade é comum), como o lote de arquivos.
+
+Cada conexão usa um de dois formatos, reconhecido pelos primeiros bytes:
+
+    * binário: quadros seguidos de
+          'LPGS' | n_pontos (uint32) | tamanho do nome (uint16) | nome (UTF-8)
+          | n_pontos comprimentos de onda (float64) | n_pontos intensidades (float64)
+      tudo little-endian (encode_spectrum monta um quadro);
+    * texto: cada espectro nos mesmos formatos dos arquivos (lpg.loader),
+      terminado por uma linha em branco. Uma primeira linha '# nome' dá o nome.
+
+Quando a fila de espectros não processados chega a 'max_pending', o servidor
+para de ler das conexões até a fila esvaziar: o TCP segura o emissor, em vez
+de espectros serem descartados.
+
+replay_files é o "OSA de mentira" para testes: lê os arquivos uma vez e os
+reenvia para o servidor a uma taxa fixa (python -m lpg ARQUIVOS --replay
+HOST:PORTA --rate 200).
+"""
+import asyncio
+import collections
+import io
+import os
+import re
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+from .core import make_log_row, make_timestamp, process_batch
+from .loader import parse_spectrum_text, read_spectrum
+from .resonances import has_any_valley, make_resonance_row, process_batch_resonances
+
+DEFAULT_INGEST_HOST = '127.0.0.1'
+DEFAULT_INGEST_PORT = 5555
+DEFAULT_MAX_PENDING = 4096  # Espectros recebidos e ainda não processados antes de o servidor parar de ler
+
+FRAME_MAGIC = b'LPGS'
+FRAME_HEADER = struct.Struct('<4sIH') # magia, n_pontos, tamanho do nome
+MAX_FRAME_POINTS = 50_000_000
+TEXT_READ_BYTES = 256 * 1024
+BACKPRESSURE_SLEEP_S = 0.005
+_BLANK_LINE = re.compile(rb'\n[ \t\r]*\n')
+
+
+def encode_spectrum(wavelengths, intensities, name=''):
+    """Quadro binário de um espectro."""
+    wavelengths = np.ascontiguousarray(wavelengths, dtype='<f8')
+    intensities = np.ascontiguousarray(intensities, dtype='<f8')
+    if len(wavelengths) != len(intensities):
+        raise ValueError("Comprimentos de onda e intensidades com tamanhos diferentes.")
+    name_bytes = name.encode('utf-8')[:0xFFFF]
+    return b''.join((FRAME_HEADER.pack(FRAME_MAGIC, len(wavelengths), len(name_bytes)), name_bytes,
+                     wavelengths.tobytes(), intensities.tobytes()))
+
+
+def encode_spectrum_text(wavelengths, intensities, name=''):
+    """Espectro no formato texto ('comprimento;intensidade' por linha), terminado por uma linha em branco."""
+    out = io.StringIO()
+    if name: out.write(f"# {name}\n")
+    np.savetxt(out, np.column_stack((wavelengths, intensities)), fmt='%.10g', delimiter=';')
+    out.write('\n')
+    return out.getvalue().encode('latin-1')
+
+
+def _parse_text_block(block):
+    """Bloco de texto de um espectro -> (nome, comprimentos de onda, intensidades)."""
+    text = block.decode('latin-1')
+    name = ''
+    if text.startswith('#'):
+        first_line = text.split('\n', 1)[0]
+        name = first_line[1:].strip()
+    return (name,) + parse_spectrum_text(text, f"espectro '{name}'" if name else "espectro recebido")
+
+
+class SpectrumServer:
+    """
+    Servidor TCP (asyncio) numa thread. Os espectros recebidos ficam numa fila, lida com take().
+    Contadores: received (espectros), connections (conexões atendidas), errors (conexões
+    encerradas por dados inválidos; a mensagem mais recente fica em last_error).
+    """
+
+    def __init__(self, host=DEFAULT_INGEST_HOST, port=DEFAULT_INGEST_PORT, max_pending=DEFAULT_MAX_PENDING):
+        self.host = host
+        self.port = port
+        self.max_pending = max_pending
+        self.received = 0
+        self.connections = 0
+        self.errors = 0
+        self.last_error = None
+        self._spectra = collections.deque()
+        self._loop = None
+        self._stop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._start_error = None
+
+    def start(self):
+        """Abre a porta (port=0 escolhe uma livre, lida depois em self.port). Falhas de bind sobem como OSError."""
+        self._thread = threading.Thread(target=self._run, name='lpg-ingest', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._start_error is not None:
+            raise self._start_error
+        return self
+
+    def stop(self, timeout=5.0):
+        """Fecha a porta e as conexões. Espectros já recebidos continuam disponíveis em take()."""
+        if self._loop is not None and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._stop.set)
+            self._thread.join(timeout)
+
+    def pending(self):
+        return len(self._spectra)
+
+    def take(self, max_items=None):
+        """Tira da fila até 'max_items' espectros: [(nome, comprimentos de onda, intensidades), ...]."""
+        n_items = len(self._spectra) if max_items is None else min(max_items, len(self._spectra))
+        return [self._spectra.popleft() for _ in range(n_items)]
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self._serve())
+        except OSError as e:
+            self._start_error = e
+        finally:
+            self._ready.set()
+            loop.close()
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with server:
+            await self._stop.wait()
+            # Encerra também as conexões ainda abertas
+            connections = asyncio.all_tasks() - {asyncio.current_task()}
+            for task in connections:
+                task.cancel()
+            await asyncio.gather(*connections, return_exceptions=True)
+
+    async def _handle_connection(self, reader, writer):
+        self.connections += 1
+        try:
+            try:
+                first = await reader.readexactly(len(FRAME_MAGIC))
+            except asyncio.IncompleteReadError as e:
+                first = e.partial
+            if first == FRAME_MAGIC:
+                await self._read_frames(reader)
+            elif first:
+                await self._read_text(reader, first)
+        except ConnectionError:
+            pass
+        except asyncio.IncompleteReadError:
+            self.errors += 1
+            self.last_error = "Conexão encerrada no meio de um quadro."
+        except Exception as e: # Dados inválidos encerram só esta conexão
+            self.errors += 1
+            self.last_error = str(e)
+        finally:
+            writer.close()
+
+    async def _read_frames(self, reader):
+        header_rest = FRAME_HEADER.size - len(FRAME_MAGIC)
+        while True:
+            n_points, name_length = struct.unpack('<IH', await reader.readexactly(header_rest))
+            if n_points > MAX_FRAME_POINTS:
+                raise ValueError(f"Quadro com {n_points} pontos (máximo {MAX_FRAME_POINTS}).")
+            name = (await reader.readexactly(name_length)).decode('utf-8', 'replace')
+            data = np.frombuffer(await reader.readexactly(16 * n_points), dtype='<f8').astype(np.float64)
+            await self._deliver(name, data[:n_points], data[n_points:])
+
+            try:
+                magic = await reader.readexactly(len(FRAME_MAGIC))
+            except asyncio.IncompleteReadError as e:
+                if e.partial: raise ValueError("Conexão encerrada no meio de um quadro.")
+                return
+            if magic != FRAME_MAGIC:
+                raise ValueError("Quadro binário inválido (esperado 'LPGS').")
+
+    async def _read_text(self, reader, buffer):
+        buffer = bytearray(buffer)
+        search_from = 0 # Uma linha em branco que cruze o fim do bloco anterior começa no seu último '\n'
+        while True:
+            chunk = await reader.read(TEXT_READ_BYTES)
+            buffer += chunk
+            start = 0
+            for match in _BLANK_LINE.finditer(buffer, search_from):
+                block = bytes(buffer[start:match.start() + 1])
+                start = match.end()
+                if block.strip():
+                    await self._deliver(*_parse_text_block(block))
+            del buffer[:start]
+            search_from = max(0, buffer.rfind(b'\n'))
+            if not chunk:
+                if bytes(buffer).strip(): # Último espectro, sem linha em branco no fim
+                    await self._deliver(*_parse_text_block(bytes(buffer)))
+                return
+
+    async def _deliver(self, name, wavelengths, intensities):
+        while len(self._spectra) >= self.max_pending and not self._stop.is_set():
+            await asyncio.sleep(BACKPRESSURE_SLEEP_S)
+        self.received += 1
+        self._spectra.append((name or f"tcp_{self.received:06d}", wavelengths, intensities))
+
+
+def process_received(spectra, window_size, poly_order, range_start, range_end, normalize, sample_name,
+                     ranges=None, min_prominence=0.0, roi=False):
+    """
+    Filtra e acha os vales de um lote recebido (lista de take()).
+    Devolve uma linha do log (dict) por espectro, ou None para os espectros sem vale.
+    """
+    if not spectra:
+        return []
+    names = [name for name, _, _ in spectra]
+    wavelength_list = [wavelengths for _, wavelengths, _ in spectra]
+    intensity_list = [intensities for _, _, intensities in spectra]
+    timestamp = make_timestamp(with_millis=True)
+
+    if ranges:
+        results = process_batch_resonances(wavelength_list, intensity_list, window_size, poly_order, ranges,
+                                           normalize, min_prominence, roi=roi)
+        return [make_resonance_row(timestamp, result, sample_name, name) if has_any_valley(result) else None
+                for name, result in zip(names, results)]
+
+    results = process_batch(wavelength_list, intensity_list, window_size, poly_order, range_start, range_end,
+                            normalize, roi=roi)
+    return [make_log_row(timestamp, *result, sample_name, name) if result is not None else None
+            for name, result in zip(names, results)]
+
+
+def parse_address(text, default_port=DEFAULT_INGEST_PORT):
+    """'host:porta', 'host' ou ':porta' -> (host, porta)."""
+    host, _, port = text.rpartition(':') if ':' in text else (text, '', '')
+    return host or DEFAULT_INGEST_HOST, int(port) if port else default_port
+
+
+def replay_files(filepaths, host=DEFAULT_INGEST_HOST, port=DEFAULT_INGEST_PORT, rate=100.0, text=False, repeat=1,
+                 read_func=read_spectrum, progress_callback=None):
+    """
+    Simulador de OSA: lê os arquivos uma vez e envia os espectros para o servidor a 'rate'
+    espectros/s (0 = o mais rápido possível), 'repeat' vezes. Devolve (n_enviados, segundos).
+    """
+    encode = encode_spectrum_text if text else encode_spectrum
+    messages = []
+    for filepath in filepaths:
+        wavelengths, intensities = read_func(filepath)
+        messages.append(encode(wavelengths, intensities, os.path.basename(filepath)))
+    if not messages:
+        return 0, 0.0
+
+    n_sent = 0
+    interval = 1.0 / rate if rate > 0 else 0.0
+    with socket.create_connection((host, port)) as sock:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for message in messages:
+                if interval:
+                    delay = start + n_sent * interval - time.perf_counter()
+                    if delay > 0: time.sleep(delay)
+                sock.sendall(message)
+                n_sent += 1
+                if progress_callback: progress_callback(n_sent)
+        sock.shutdown(socket.SHUT_WR)
+        elapsed = time.perf_counter() - start
+    return n_sent, elapsed
@@ -0,0 +1,64 @@
+"""
+Imports adiados de dependências pesadas (v14).
+
+pandas, scipy.signal/scipy.ndimage e matplotlib somam mais de um segundo de
+import, quase todo gasto antes de a janela aparecer. LazyModule é um
+substituto do módulo que só faz o import no primeiro acesso a um atributo
+(ex: pd.DataFrame); depois disso cada atributo fica guardado no próprio
+objeto e o custo é o de um atributo comum.
+
+preload() importa módulos numa thread em segundo plano, para que o primeiro
+uso (ex: o primeiro filtro) não pague o import enquanto o usuário espera.
+"""
+import importlib
+import threading
+
+
+class LazyModule:
+    """Módulo importado só quando um atributo é usado pela primeira vez."""
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            module = importlib.import_module(self.__dict__['_name'])
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        value = getattr(self._load(), attr)
+        self.__dict__[attr] = value # Próximos acessos não passam mais por __getattr__
+        return value
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'carregado' if self.__dict__['_module'] is not None else 'não carregado'
+        return f"<LazyModule '{self.__dict__['_name']}' ({state})>"
+
+
+def preload(*names, on_done=None):
+    """
+    Importa os módulos 'names' numa thread daemon. 'on_done(erros)' é chamado
+    no fim, da própria thread, com {nome: exceção} dos imports que falharam.
+    """
+    def run():
+        errors = {}
+        for name in names:
+            try:
+                importlib.import_module(name)
+            except Exception as e: # Um import opcional que falha não impede os demais
+                errors[name] = e
+        if on_done is not None:
+            on_done(errors)
+
+    thread = threading.Thread(target=run, name='lpg-preload', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,184 @@
+"""
+Leitor rápido de espectros (v14).
+
+O formato de cada arquivo (delimitador, separador decimal, linhas de
+cabeçalho/rodapé dos exports de OSA) é detectado uma única vez e o bloco
+numérico é convertido por um leitor em C, sem as novas tentativas do caminho
+original. Vários arquivos podem ser carregados em paralelo num pool de threads.
+"""
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Leitor em C: np.loadtxt foi reescrito em C no NumPy 1.23; antes disso usamos o motor C do pandas
+_NUMPY_C_LOADTXT = tuple(int(v) for v in np.__version__.split('.')[:2]) >= (1, 23)
+
+# Limites para a procura de cabeçalho/rodapé (linhas de metadados dos exports de OSA)
+MAX_HEADER_LINES = 200
+MAX_FOOTER_LINES = 200
+
+# Bytes lidos do início/fim do arquivo para detectar o formato sem ler tudo
+HEAD_BYTES = 64 * 1024
+TAIL_BYTES = 4 * 1024
+
+
+def _line_format(line):
+    """
+    Detecta (delimitador, decimal) de uma linha. delimitador None = espaços/tabs.
+    Devolve None se a linha não for uma linha de dados com pelo menos duas colunas numéricas.
+    """
+    stripped = line.strip()
+    if not stripped or stripped.startswith('#'):
+        return None
+
+    if ';' in stripped:
+        delimiter, decimal = ';', (',' if ',' in stripped else '.')
+    elif '\t' in stripped:
+        delimiter, decimal = '\t', (',' if ',' in stripped else '.')
+    elif ',' in stripped:
+        tokens = stripped.split()
+        if len(tokens) >= 2 and '.' not in stripped and all(',' in t for t in tokens[:2]):
+            delimiter, decimal = None, ',' # "1550,12 -20,5"
+        else:
+            delimiter, decimal = ',', '.'
+    else:
+        delimiter, decimal = None, '.'
+
+    if not _is_data_line(stripped, delimiter, decimal):
+        return None
+    return delimiter, decimal
+
+
+def _is_data_line(line, delimiter, decimal):
+    """Verifica se as duas primeiras colunas da linha são números no formato dado."""
+    fields = line.split(delimiter)
+    if len(fields) < 2:
+        return False
+    try:
+        for field in fields[:2]:
+            field = field.strip()
+            if decimal == ',': field = field.replace(',', '.')
+            float(field)
+    except ValueError:
+        return False
+    return True
+
+
+def _find_header(text):
+    """Pula as linhas de cabeçalho. Devolve (inicio do bloco de dados, delimitador, decimal, n_colunas)."""
+    pos = 0
+    for _ in range(MAX_HEADER_LINES):
+        if pos >= len(text):
+            break
+        newline = text.find('\n', pos)
+        if newline == -1: newline = len(text)
+        line = text[pos:newline]
+        fmt = _line_format(line)
+        if fmt is not None:
+            delimiter, decimal = fmt
+            return pos, delimiter, decimal, len(line.strip().split(delimiter))
+        pos = newline + 1
+
+    raise ValueError("Nenhuma linha de dados numéricos encontrada.")
+
+
+def _find_footer(text, start, delimiter, decimal):
+    """Descarta as linhas finais que não são dados no mesmo formato. Devolve o fim do bloco."""
+    end = len(text)
+    for _ in range(MAX_FOOTER_LINES):
+        newline = text.rfind('\n', start, max(start, end - 1))
+        line_start = newline + 1 if newline != -1 else start
+        line = text[line_start:end].strip()
+        if line and _is_data_line(line, delimiter, decimal):
+            break
+        if line_start <= start:
+            break
+        end = line_start
+    return end
+
+
+def sniff_format(text):
+    """
+    Localiza o bloco numérico de um texto de espectro.
+    Devolve (inicio, fim, delimitador, decimal), com inicio/fim como posições em 'text'.
+    """
+    start, delimiter, decimal, _ = _find_header(text)
+    end = _find_footer(text, start, delimiter, decimal)
+    return start, end, delimiter, decimal
+
+
+def _parse_block(block, delimiter, decimal):
+    """Converte o bloco numérico numa matriz float64 com um leitor em C."""
+    if decimal == ',':
+        block = block.replace(',', '.')
+
+    if _NUMPY_C_LOADTXT:
+        return np.loadtxt(io.StringIO(block), delimiter=delimiter, usecols=(0, 1), ndmin=2)
+
+    import pandas as pd
+    df = pd.read_csv(io.StringIO(block), sep=delimiter if delimiter else r'\s+', header=None,
+                     usecols=[0, 1], engine='c', dtype=np.float64, comment='#')
+    return df.to_numpy()
+
+
+def parse_spectrum_text(text, name='espectro'):
+    """Converte o texto de um espectro (mesmos formatos dos arquivos) em (comprimento_onda, intensidade)."""
+    start, end, delimiter, decimal = sniff_format(text)
+    data = _parse_block(text[start:end], delimiter, decimal)
+
+    if data.ndim != 2 or data.shape[1] < 2:
+        raise ValueError(f"O {name} não parece ter duas colunas.")
+
+    return data[:, 0].copy(), data[:, 1].copy()
+
+
+def read_spectrum(filepath):
+    """
+    Lê um arquivo de espectro e devolve (comprimento_onda, intensidade).
+
+    O formato é detectado pelo início do arquivo (HEAD_BYTES) e o rodapé pelo
+    final (TAIL_BYTES). No caso comum (sem rodapé, decimal '.') o leitor em C do
+    NumPy lê o arquivo direto do disco a partir da primeira linha de dados; nos
+    demais casos o arquivo inteiro é lido uma vez e convertido em memória.
+    """
+    with open(filepath, 'rb') as f:
+        head = f.read(HEAD_BYTES)
+        if len(head) < HEAD_BYTES:
+            text, tail = head.decode('latin-1'), None
+        else:
+            f.seek(-TAIL_BYTES, os.SEEK_END)
+            text, tail = None, f.read().decode('latin-1')
+
+    if text is None:
+        head_text = head.decode('latin-1')
+        head_text = head_text[:head_text.rfind('\n') + 1] # descarta a última linha incompleta
+        start, delimiter, decimal, n_columns = _find_header(head_text)
+
+        tail_start = tail.find('\n') + 1
+        if (_NUMPY_C_LOADTXT and decimal == '.'
+                and _find_footer(tail, tail_start, delimiter, decimal) == len(tail)):
+            data = np.loadtxt(filepath, delimiter=delimiter, skiprows=head_text.count('\n', 0, start),
+                              usecols=(0, 1) if n_columns > 2 else None, ndmin=2, encoding='latin-1')
+            return data[:, 0].copy(), data[:, 1].copy()
+
+        with open(filepath, 'rb') as f:
+            text = f.read().decode('latin-1')
+
+    return parse_spectrum_text(text, f"arquivo {os.path.basename(filepath)}")
+
+
+def load_spectra(filepaths, read_func=read_spectrum, workers=None):
+    """
+    Carrega vários arquivos num pool de threads. Devolve [(comprimento_onda, intensidade), ...]
+    na ordem de 'filepaths'; o primeiro erro é propagado.
+    """
+    filepaths = list(filepaths)
+    if workers == 1 or len(filepaths) <= 1:
+        return [read_func(fp) for fp in filepaths]
+
+    if workers is None:
+        workers = min(32, (os.cpu_count() or 1) + 4)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(read_func, filepaths))
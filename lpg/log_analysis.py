@@ -0,0 +1,197 @@
+"""
+Análise temporal do log de vales inteiro (v14).
+
+A aba "Análise Temporal" mostra só o último lote, por índice de arquivo. Aqui
+o log completo (.csv, SQLite ou .xlsx) vira uma LogSeries ordenada pelo
+'horario' real de cada registro:
+
+    * read_log_series lê só as três colunas necessárias, em blocos de
+      LOG_CHUNK_ROWS linhas (o .xlsx, que não tem leitura em blocos, é lido de
+      uma vez), e converte os horários com o parser ISO 8601 vetorizado do
+      pandas. Com o pyarrow instalado, o .csv é lido pelo leitor em blocos do
+      pyarrow, que já converte os horários (~4x mais rápido);
+    * LogSeries.rolling calcula média e desvio padrão móveis e a deriva
+      (inclinação da reta na janela, nm/h) com as janelas por tempo do pandas,
+      em C, sobre milhões de linhas;
+    * LogSeries.summary resume um intervalo de tempo (a parte visível do
+      gráfico) com média, desvio e deriva, localizando o intervalo com
+      searchsorted.
+
+O desenho usa downsample.lttb_indices, recalculado a cada zoom.
+"""
+import os
+import sqlite3
+
+import numpy as np
+
+from .lazy import LazyModule
+from .logstore import SQLITE_EXTENSIONS, SQLITE_TABLE, _quote
+
+pd = LazyModule('pandas')
+
+TIME_COLUMN = 'horario'
+WAVELENGTH_COLUMN = 'comprimento_onda_filtrado (nm)'
+INTENSITY_COLUMN = 'intensidade_filtrada_vale (dB)'
+LOG_COLUMNS_READ = [TIME_COLUMN, WAVELENGTH_COLUMN, INTENSITY_COLUMN]
+LOG_CHUNK_ROWS = 500_000
+ARROW_BLOCK_BYTES = 16 * 1024 * 1024
+DEFAULT_ROLLING_HOURS = 1.0
+
+
+def _iter_log_chunks(filepath, chunk_rows):
+    """DataFrames com (horário, comprimento de onda, intensidade), em blocos de 'chunk_rows' linhas."""
+    lower = filepath.lower()
+    if lower.endswith('.csv'):
+        yield from pd.read_csv(filepath, sep=';', usecols=LOG_COLUMNS_READ, chunksize=chunk_rows,
+                               dtype={WAVELENGTH_COLUMN: np.float64, INTENSITY_COLUMN: np.float64})
+    elif lower.endswith(SQLITE_EXTENSIONS):
+        conn = sqlite3.connect(filepath, timeout=30)
+        try:
+            yield from pd.read_sql_query(f"SELECT {', '.join(_quote(c) for c in LOG_COLUMNS_READ)} FROM {SQLITE_TABLE} "
+                                         "ORDER BY rowid", conn, chunksize=chunk_rows)
+        finally:
+            conn.close()
+    else:
+        yield pd.read_excel(filepath, usecols=LOG_COLUMNS_READ)
+
+
+def _iter_pandas_arrays(filepath, chunk_rows):
+    """Blocos (segundos desde 1970, comprimentos de onda, intensidades) lidos com o pandas."""
+    for chunk in _iter_log_chunks(filepath, chunk_rows):
+        yield (_to_seconds(chunk[TIME_COLUMN]),
+               pd.to_numeric(chunk[WAVELENGTH_COLUMN], errors='coerce').to_numpy(np.float64),
+               pd.to_numeric(chunk[INTENSITY_COLUMN], errors='coerce').to_numpy(np.float64))
+
+
+def _iter_arrow_arrays(filepath):
+    """Blocos do .csv lidos com pyarrow.csv (horários já convertidos). Um horário inválido gera ValueError."""
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    reader = pa_csv.open_csv(
+        filepath, read_options=pa_csv.ReadOptions(block_size=ARROW_BLOCK_BYTES),
+        parse_options=pa_csv.ParseOptions(delimiter=';'),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=LOG_COLUMNS_READ, timestamp_parsers=[pa_csv.ISO8601],
+            column_types={TIME_COLUMN: pa.timestamp('us'), WAVELENGTH_COLUMN: pa.float64(),
+                          INTENSITY_COLUMN: pa.float64()}))
+    for batch in reader:
+        microseconds = batch.column(0).cast(pa.int64()).to_numpy(zero_copy_only=False)
+        yield (microseconds.astype(np.float64) / 1e6,
+               batch.column(1).to_numpy(zero_copy_only=False).astype(np.float64),
+               batch.column(2).to_numpy(zero_copy_only=False).astype(np.float64))
+
+
+def _to_seconds(timestamps):
+    """Horários em texto -> segundos desde 1970 (float, NaN onde o texto não é um horário)."""
+    parsed = pd.to_datetime(timestamps, format='ISO8601', errors='coerce')
+    nanoseconds = parsed.to_numpy('datetime64[ns]').astype(np.int64)
+    return np.where(parsed.isna().to_numpy(), np.nan, nanoseconds / 1e9)
+
+
+def read_log_series(filepath, chunk_rows=LOG_CHUNK_ROWS, progress_callback=None):
+    """
+    Lê o log inteiro numa LogSeries. Linhas sem horário válido ou sem vale são descartadas.
+    'progress_callback(n_linhas_lidas)' é chamado após cada bloco.
+    """
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"O log '{filepath}' não existe.")
+
+    def collect(chunks):
+        times, wavelengths, intensities = [], [], []
+        n_read = 0
+        for chunk_times, chunk_wavelengths, chunk_intensities in chunks:
+            valid = ~(np.isnan(chunk_times) | np.isnan(chunk_wavelengths))
+            times.append(chunk_times[valid])
+            wavelengths.append(chunk_wavelengths[valid])
+            intensities.append(chunk_intensities[valid])
+            n_read += len(chunk_times)
+            if progress_callback: progress_callback(n_read)
+        return times, wavelengths, intensities
+
+    times = None
+    if filepath.lower().endswith('.csv'):
+        try:
+            times, wavelengths, intensities = collect(_iter_arrow_arrays(filepath))
+        except (ImportError, ValueError): # Sem pyarrow, ou horários fora do ISO 8601: lê com o pandas
+            times = None
+    if times is None:
+        times, wavelengths, intensities = collect(_iter_pandas_arrays(filepath, chunk_rows))
+
+    if not times:
+        return LogSeries(np.empty(0), np.empty(0), np.empty(0))
+    return LogSeries(np.concatenate(times), np.concatenate(wavelengths), np.concatenate(intensities))
+
+
+def drift_rate(times, values):
+    """Inclinação da reta de mínimos quadrados, em unidades de 'values' por hora (NaN com menos de 2 pontos)."""
+    valid = ~np.isnan(values)
+    if valid.sum() < 2:
+        return np.nan
+    hours = (times[valid] - times[valid].mean()) / 3600.0
+    denominator = np.dot(hours, hours)
+    if denominator == 0:
+        return np.nan
+    return float(np.dot(hours, values[valid] - values[valid].mean()) / denominator)
+
+
+class LogSeries:
+    """Vales do log ordenados por horário: times (segundos desde 1970), wavelengths e intensities."""
+
+    def __init__(self, times, wavelengths, intensities):
+        if len(times) > 1 and not np.all(times[1:] >= times[:-1]):
+            order = np.argsort(times, kind='stable') # Logs de várias sessões podem se intercalar
+            times, wavelengths, intensities = times[order], wavelengths[order], intensities[order]
+        self.times = times
+        self.wavelengths = wavelengths
+        self.intensities = intensities
+
+    def __len__(self):
+        return len(self.times)
+
+    def rolling(self, window_hours=DEFAULT_ROLLING_HOURS):
+        """
+        Estatísticas móveis na janela de 'window_hours' horas que termina em cada registro:
+        dict com média e desvio do comprimento de onda e da intensidade e a deriva (nm/h).
+        """
+        if len(self) == 0:
+            empty = np.empty(0)
+            return {'media_wl': empty, 'std_wl': empty, 'deriva_wl': empty, 'media_int': empty, 'std_int': empty}
+        # Índice de tempo direto dos segundos (pd.to_datetime(unit='s') é ~100x mais lento)
+        index = pd.DatetimeIndex(np.rint(self.times * 1e9).astype(np.int64).view('datetime64[ns]'))
+        window = pd.Timedelta(hours=window_hours)
+        wavelengths = pd.Series(self.wavelengths, index=index)
+        intensities = pd.Series(self.intensities, index=index)
+        hours = pd.Series((self.times - self.times[0]) / 3600.0, index=index)
+
+        wavelength_window = wavelengths.rolling(window)
+        intensity_window = intensities.rolling(window)
+        drift = wavelengths.rolling(window).cov(hours) / hours.rolling(window).var()
+        return {
+            'media_wl': wavelength_window.mean().to_numpy(),
+            'std_wl': wavelength_window.std().to_numpy(),
+            'deriva_wl': drift.replace([np.inf, -np.inf], np.nan).to_numpy(),
+            'media_int': intensity_window.mean().to_numpy(),
+            'std_int': intensity_window.std().to_numpy(),
+        }
+
+    def view(self, t_min=-np.inf, t_max=np.inf):
+        """Fatia (início, fim) dos registros com horário em [t_min, t_max]."""
+        return (int(np.searchsorted(self.times, t_min, side='left')),
+                int(np.searchsorted(self.times, t_max, side='right')))
+
+    def summary(self, t_min=-np.inf, t_max=np.inf):
+        """Resumo do intervalo: n, média e desvio do comprimento de onda, deriva (nm/h) e intensidade média."""
+        start, end = self.view(t_min, t_max)
+        times = self.times[start:end]
+        wavelengths = self.wavelengths[start:end]
+        intensities = self.intensities[start:end]
+        if len(times) == 0:
+            return {'n': 0, 'media_wl': np.nan, 'std_wl': np.nan, 'deriva_wl': np.nan, 'media_int': np.nan}
+        return {
+            'n': len(times),
+            'media_wl': float(np.mean(wavelengths)),
+            'std_wl': float(np.std(wavelengths)),
+            'deriva_wl': drift_rate(times, wavelengths),
+            'media_int': float(np.nanmean(intensities)) if np.any(~np.isnan(intensities)) else np.nan,
+        }
@@ -0,0 +1,411 @@
+"""
+Gravação do log de vales em segundo plano (v14).
+
+core.append_to_log roda no tempo do chamador: com um .xlsx grande cada
+registro relê e regrava o arquivo inteiro, e com o log aberto no Excel a
+gravação falha (PermissionError) e as linhas se perdem. LogWriter tira essa
+espera da interface:
+
+    * submit() não toca no disco: uma thread própria anota as linhas num
+      diário local (LogJournal, SQLite) assim que chegam, mesmo durante uma
+      gravação demorada. Até essa anotação (normalmente menos de um
+      milissegundo) as linhas só existem na memória: uma queda do processo
+      nesse intervalo as perde;
+    * a thread de gravação junta as linhas que chegam em sequência (vários registros
+      únicos, o lote, a pasta observada) numa única gravação por log;
+    * com o arquivo bloqueado (OSError, "database is locked"), a gravação é
+      repetida com espera crescente (0,5 s, 1 s, 2 s, ... até 30 s);
+    * só depois de gravadas as linhas saem do diário. Linhas pendentes de uma
+      sessão anterior (programa fechado ou interrompido) são regravadas ao
+      abrir o LogWriter seguinte.
+
+Cada LogJournal marca as suas linhas com um dono (pid + sufixo aleatório) e
+mantém travado o arquivo '<diário>.<dono>.lock' enquanto está aberto. Uma
+sessão nova só assume as linhas de donos cujo arquivo de trava ela consegue
+travar (processo encerrado), com um UPDATE único: duas janelas abertas ao
+mesmo tempo não regravam as linhas uma da outra.
+
+Linhas recusadas pelo log (ex: colunas que um .csv existente não tem) ficam
+no diário marcadas com o erro, para não serem repetidas nem perdidas.
+O andamento sai numa fila de eventos:
+
+    ('log_recovered', log, n_linhas)
+    ('log_written', log, n_linhas, n_pendentes)
+    ('log_retry', log, n_linhas, espera_s, mensagem)
+    ('log_error', log, n_linhas, mensagem)
+"""
+import contextlib
+import glob
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+import numpy as np
+
+from .core import append_to_log
+from .lazy import LazyModule
+from .profiling import NULL_PROFILER
+
+pd = LazyModule('pandas')
+
+# Diário das linhas ainda não gravadas (pode ser trocado pela variável de ambiente LPG_LOG_JOURNAL)
+DEFAULT_LOG_JOURNAL_PATH = os.environ.get(
+    'LPG_LOG_JOURNAL', os.path.join(os.path.expanduser('~'), '.cache', 'lpg_filter', 'log_pendente.sqlite'))
+JOURNAL_TABLE = 'pendentes'
+
+COALESCE_SECONDS = 0.2   # Espera por mais linhas antes de gravar
+RETRY_INITIAL_SECONDS = 0.5
+RETRY_MAX_SECONDS = 30.0
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Valor não serializável no log: {value!r}")
+
+
+def _try_lock(filepath):
+    """Abre e trava 'filepath' sem esperar. Devolve o arquivo aberto, ou None se outro processo já o trava."""
+    f = open(filepath, 'a+')
+    try:
+        f.seek(0)
+        if os.name == 'nt':
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def _release_lock(f, filepath):
+    """Destrava, fecha e apaga o arquivo de trava."""
+    try:
+        f.seek(0)
+        if os.name == 'nt':
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    except OSError:
+        pass
+    f.close()
+    try:
+        os.remove(filepath)
+    except OSError:
+        pass
+
+
+class LogJournal:
+    """
+    Linhas do log ainda não gravadas, em SQLite (uma conexão por chamada).
+    Só as linhas deste diário ('owner') são lidas por pending(); claim_orphans() assume as de sessões encerradas.
+    """
+
+    def __init__(self, filepath=None):
+        self.filepath = filepath or DEFAULT_LOG_JOURNAL_PATH
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.enabled = True
+        self._lock = None
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.filepath)), exist_ok=True)
+            self._lock = _try_lock(self._lock_path(self.owner))
+            if self._lock is None:
+                raise OSError("trava do diário indisponível")
+            with self._connect() as conn:
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {JOURNAL_TABLE} "
+                             "(id INTEGER PRIMARY KEY, log TEXT NOT NULL, linha TEXT NOT NULL, criado REAL, erro TEXT, "
+                             "dono TEXT)")
+                columns = [info[1] for info in conn.execute(f"PRAGMA table_info({JOURNAL_TABLE})")]
+                if 'dono' not in columns: # Diário de uma versão anterior: linhas sem dono
+                    conn.execute(f"ALTER TABLE {JOURNAL_TABLE} ADD COLUMN dono TEXT")
+        except (OSError, sqlite3.Error):
+            self.close()
+            self.enabled = False # Sem diário as linhas continuam sendo gravadas, só não sobrevivem a uma queda
+
+    def _lock_path(self, owner):
+        return f"{self.filepath}.{owner}.lock"
+
+    def _connect(self):
+        return sqlite3.connect(self.filepath, timeout=30)
+
+    def _execute(self, sql, rows):
+        if not self.enabled or not rows: return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(sql, rows)
+        except sqlite3.Error:
+            pass
+        finally:
+            conn.close()
+
+    def add(self, log_filepath, rows):
+        """Anota as linhas (dicts) e devolve os ids (None sem diário)."""
+        if not self.enabled:
+            return [None] * len(rows)
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                return [conn.execute(f"INSERT INTO {JOURNAL_TABLE} (log, linha, criado, dono) VALUES (?, ?, ?, ?)",
+                                     (log_filepath, json.dumps(row, default=_json_default), now, self.owner)).lastrowid
+                        for row in rows]
+        except sqlite3.Error:
+            return [None] * len(rows)
+        finally:
+            conn.close()
+
+    def claim_orphans(self):
+        """
+        Assume as linhas pendentes de sessões encerradas (arquivo de trava livre) e as de
+        diários sem dono. Devolve o número de linhas assumidas.
+        """
+        if not self.enabled:
+            return 0
+        conn = self._connect()
+        try:
+            owners = {owner for owner, in conn.execute(f"SELECT DISTINCT dono FROM {JOURNAL_TABLE} WHERE erro IS NULL")}
+            prefix = f"{self.filepath}."
+            owners.update(path[len(prefix):-len('.lock')] for path in glob.glob(f"{glob.escape(self.filepath)}.*.lock"))
+            owners.discard(self.owner)
+
+            claimed = 0
+            for owner in owners:
+                lock_path = None if owner is None else self._lock_path(owner)
+                lock = None if lock_path is None else _try_lock(lock_path)
+                if lock_path is not None and lock is None:
+                    continue # Sessão ainda aberta
+                try:
+                    with conn: # UPDATE único: se duas sessões tentarem, só uma leva as linhas
+                        claimed += conn.execute(f"UPDATE {JOURNAL_TABLE} SET dono = ? WHERE dono IS ? AND erro IS NULL",
+                                                (self.owner, owner)).rowcount
+                finally:
+                    if lock is not None: _release_lock(lock, lock_path)
+            return claimed
+        except (OSError, sqlite3.Error):
+            return 0
+        finally:
+            conn.close()
+
+    def pending(self):
+        """[(id, log, linha), ...] deste diário ainda não gravadas nem recusadas, na ordem de chegada."""
+        if not self.enabled:
+            return []
+        conn = self._connect()
+        try:
+            rows = conn.execute(f"SELECT id, log, linha FROM {JOURNAL_TABLE} WHERE erro IS NULL AND dono = ? ORDER BY id",
+                                (self.owner,)).fetchall()
+        except sqlite3.Error:
+            return []
+        finally:
+            conn.close()
+        return [(entry_id, log_filepath, json.loads(row)) for entry_id, log_filepath, row in rows]
+
+    def remove(self, ids):
+        self._execute(f"DELETE FROM {JOURNAL_TABLE} WHERE id = ?", [(i,) for i in ids if i is not None])
+
+    def mark_failed(self, ids, message):
+        self._execute(f"UPDATE {JOURNAL_TABLE} SET erro = ? WHERE id = ?", [(message, i) for i in ids if i is not None])
+
+    def close(self):
+        """Libera a trava: as linhas que ficaram podem ser assumidas pela próxima sessão."""
+        if self._lock is not None:
+            _release_lock(self._lock, self._lock_path(self.owner))
+            self._lock = None
+
+
+class _Submission:
+    """Linhas de uma chamada a submit(): 'done' é sinalizado quando todas saem da fila (gravadas ou recusadas)."""
+
+    def __init__(self, n_rows, profiler):
+        self.remaining = n_rows
+        self.profiler = profiler
+        self.done = threading.Event()
+
+
+class LogWriter:
+    """
+    Thread que grava no log as linhas recebidas por submit(), agrupadas por arquivo de log.
+    'write_func(df, log_filepath)' faz a gravação (padrão: core.append_to_log).
+    Uma segunda thread anota no diário as linhas recebidas (e recupera as de sessões
+    anteriores); o diário é fechado quando as duas terminam.
+    """
+
+    def __init__(self, journal=None, event_queue=None, write_func=append_to_log, coalesce_seconds=COALESCE_SECONDS,
+                 retry_initial=RETRY_INITIAL_SECONDS, retry_max=RETRY_MAX_SECONDS):
+        self.journal = journal if journal is not None else LogJournal()
+        self.events = event_queue if event_queue is not None else queue.Queue()
+        self.write_func = write_func
+        self.coalesce_seconds = coalesce_seconds
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+        self.written = 0
+        self.recovered = None # Linhas de sessões anteriores (preenchido pela thread do diário)
+        self._incoming = [] # [(log, [linha, ...], _Submission), ...] ainda não anotadas no diário
+        self._pending = OrderedDict() # log -> [(id no diário, linha, _Submission ou None), ...]
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._journal_done = False
+        self._journal_thread = threading.Thread(target=self._run_journal, name='lpg-log-journal', daemon=True)
+        self._thread = threading.Thread(target=self._run, name='lpg-log-writer', daemon=True)
+        self._journal_thread.start()
+        self._thread.start()
+
+    def submit(self, log_filepath, rows, profiler=NULL_PROFILER):
+        """
+        Enfileira as linhas (dicts com as colunas do log) para 'log_filepath'. Não espera a gravação.
+        Devolve um threading.Event sinalizado quando as linhas saem da fila; cada gravação que as
+        inclui é medida como etapa 'log' de 'profiler'.
+        """
+        rows = [dict(row) for row in rows]
+        submission = _Submission(len(rows), profiler)
+        if not rows:
+            submission.done.set()
+            return submission.done
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("A gravação do log já foi encerrada.")
+            self._incoming.append((log_filepath, rows, submission))
+            self._condition.notify_all()
+        return submission.done
+
+    def pending_count(self):
+        with self._condition:
+            return (sum(len(entries) for entries in self._pending.values())
+                    + sum(len(rows) for _, rows, _ in self._incoming))
+
+    def stop(self, timeout=None):
+        """
+        Encerra as threads depois de uma última tentativa de gravar o que estiver pendente.
+        Devolve o número de linhas que ficaram só no diário (regravadas na próxima sessão).
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._journal_thread.join(timeout) # Rápido: as linhas recebidas ficam no diário mesmo com a gravação em curso
+        self._thread.join(timeout)
+        return self.pending_count()
+
+    def _recover(self):
+        """Linhas que sessões anteriores não chegaram a gravar; vão antes das recebidas nesta sessão."""
+        self.journal.claim_orphans()
+        recovered = self.journal.pending()
+        counts = OrderedDict()
+        with self._condition:
+            for entry_id, log_filepath, row in recovered:
+                self._pending.setdefault(log_filepath, []).append((entry_id, row, None))
+                counts[log_filepath] = counts.get(log_filepath, 0) + 1
+            self.recovered = len(recovered)
+            self._condition.notify_all()
+        for log_filepath, n_rows in counts.items():
+            self.events.put(('log_recovered', log_filepath, n_rows))
+
+    def _run_journal(self):
+        """Anota no diário as linhas recebidas por submit() e as passa para a fila de gravação."""
+        try:
+            self._recover()
+            while True:
+                with self._condition:
+                    while not self._incoming and not self._stopped:
+                        self._condition.wait()
+                    if not self._incoming:
+                        return
+                    incoming, self._incoming = self._incoming, []
+                for log_filepath, rows, submission in incoming:
+                    ids = self.journal.add(log_filepath, rows)
+                    with self._condition:
+                        self._pending.setdefault(log_filepath, []).extend(
+                            (entry_id, row, submission) for entry_id, row in zip(ids, rows))
+                        self._condition.notify_all()
+        finally:
+            with self._condition:
+                self._journal_done = True
+                self._condition.notify_all()
+
+    def _run(self):
+        try:
+            self._write_loop()
+        finally:
+            self._journal_thread.join()
+            self.journal.close()
+
+    def _write_loop(self):
+        retry_delay = 0.0
+        deadline = None
+        while True:
+            with self._condition:
+                if not self._pending:
+                    if self._stopped and self._journal_done:
+                        return
+                    self._condition.wait()
+                    continue
+                # Junta o que chegar logo em seguida (ou durante a espera da nova tentativa)
+                if deadline is None:
+                    deadline = time.monotonic() + max(retry_delay, self.coalesce_seconds)
+                remaining = deadline - time.monotonic()
+                if remaining > 0 and not self._stopped:
+                    self._condition.wait(remaining)
+                    continue
+                deadline = None
+                log_filepath, entries = next(iter(self._pending.items()))
+                entries = list(entries)
+
+            ids = [entry_id for entry_id, _, _ in entries]
+            try:
+                with self._profile(log_filepath, entries):
+                    self.write_func(pd.DataFrame([row for _, row, _ in entries]), log_filepath)
+            except (OSError, sqlite3.OperationalError) as e: # Arquivo aberto em outro programa, banco bloqueado
+                if self._stopped:
+                    return # As linhas continuam no diário
+                retry_delay = min(max(2 * retry_delay, self.retry_initial), self.retry_max)
+                with self._condition: # Outros logs não esperam por este
+                    self._pending.move_to_end(log_filepath)
+                self.events.put(('log_retry', log_filepath, len(entries), retry_delay, str(e)))
+                continue
+            except Exception as e:
+                self.journal.mark_failed(ids, str(e))
+                self._take(log_filepath, entries)
+                retry_delay = 0.0
+                self.events.put(('log_error', log_filepath, len(entries), str(e)))
+                continue
+
+            self.journal.remove(ids)
+            self._take(log_filepath, entries)
+            self.written += len(entries)
+            retry_delay = 0.0
+            self.events.put(('log_written', log_filepath, len(entries), self.pending_count()))
+
+    def _profile(self, log_filepath, entries):
+        """Mede a gravação como etapa 'log' de cada perfil com linhas nela."""
+        counts = OrderedDict()
+        for _, _, submission in entries:
+            if submission is not None and submission.profiler.enabled:
+                counts[submission.profiler] = counts.get(submission.profiler, 0) + 1
+        stack = contextlib.ExitStack()
+        for profiler, n_rows in counts.items():
+            stack.enter_context(profiler.stage('log', item=os.path.basename(log_filepath), files=n_rows))
+        return stack
+
+    def _take(self, log_filepath, entries):
+        """Tira da fila as primeiras linhas do log (outras podem ter chegado durante a gravação)."""
+        with self._condition:
+            remaining = self._pending[log_filepath][len(entries):]
+            if remaining:
+                self._pending[log_filepath] = remaining
+            else:
+                del self._pending[log_filepath]
+        for _, _, submission in entries:
+            if submission is not None:
+                submission.remaining -= 1
+                if submission.remaining == 0: submission.done.set()
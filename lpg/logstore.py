@@ -0,0 +1,175 @@
+"""
+Armazenamento do log de vales só por acréscimo (v14).
+
+O caminho original (core.append_to_log com .xlsx) lê o log inteiro, concatena
+e regrava o arquivo a cada registro, ficando mais lento à medida que o log
+cresce. Aqui cada registro custa o mesmo, qualquer que seja o tamanho do log:
+
+    * CsvLogStore:    acrescenta linhas ao final do .csv (cabeçalho só na criação);
+    * SqliteLogStore: insere numa tabela SQLite indexada por horário e amostra.
+
+Os dois exportam para Excel sob demanda (export_excel). Colunas extras (ex:
+ressonâncias nomeadas, lpg.resonances) viram colunas novas da tabela SQLite;
+num .csv já existente elas precisam estar no cabeçalho.
+"""
+import os
+import sqlite3
+
+from .core import LOG_COLUMNS
+from .lazy import LazyModule
+
+pd = LazyModule('pandas')
+
+SQLITE_EXTENSIONS = ('.sqlite', '.sqlite3', '.db')
+SQLITE_TABLE = 'vales'
+_SQLITE_TYPES = {
+    'horario': 'TEXT',
+    'comprimento_onda_filtrado (nm)': 'REAL',
+    'intensidade_filtrada_vale (dB)': 'REAL',
+    'amostra': 'TEXT',
+    'arquivo_origem': 'TEXT',
+}
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class CsvLogStore:
+    """Log em .csv (separado por ';') com escrita só por acréscimo."""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+
+    def _existing_columns(self):
+        """Lê apenas a linha de cabeçalho de um log existente."""
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            header = f.readline().rstrip('\r\n')
+        return header.split(';') if header else None
+
+    def _ends_with_newline(self):
+        with open(self.filepath, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) in (b'\n', b'\r')
+
+    def append(self, df_to_append):
+        """Acrescenta as linhas ao final do arquivo, criando-o (com cabeçalho) se necessário."""
+        if os.path.exists(self.filepath) and os.path.getsize(self.filepath) > 0:
+            columns = self._existing_columns()
+            missing = [c for c in df_to_append.columns if c not in columns]
+            if missing:
+                raise ValueError(f"O log '{os.path.basename(self.filepath)}' não tem as colunas {missing}. "
+                                 "Use um novo arquivo de log para estas colunas.")
+            prefix = '' if self._ends_with_newline() else '\n'
+            # Mantém a ordem de colunas do arquivo existente
+            df_to_append = df_to_append.reindex(columns=columns)
+            text = prefix + df_to_append.to_csv(index=False, header=False, sep=';', decimal='.')
+        else:
+            text = df_to_append.to_csv(index=False, sep=';', decimal='.')
+        self._append_text(text)
+
+    def _append_text(self, text):
+        """
+        Grava 'text' no final do arquivo. Se a gravação falhar no meio, o arquivo volta ao
+        tamanho anterior: uma nova tentativa (LogWriter) não duplica as linhas já gravadas.
+        """
+        data = memoryview(text.encode('utf-8'))
+        with open(self.filepath, 'ab', buffering=0) as f:
+            start = f.seek(0, os.SEEK_END)
+            try:
+                while data:
+                    data = data[f.write(data):]
+            except BaseException:
+                try:
+                    f.truncate(start)
+                except OSError:
+                    pass
+                raise
+
+    def read(self, **kwargs):
+        return pd.read_csv(self.filepath, sep=';', **kwargs)
+
+    def export_excel(self, xlsx_path):
+        self.read().to_excel(xlsx_path, index=False, sheet_name='Dados')
+
+
+class SqliteLogStore:
+    """Log em SQLite com as mesmas colunas do log .xlsx/.csv."""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        with self._connect() as conn:
+            columns_sql = ', '.join(f"{_quote(c)} {_SQLITE_TYPES[c]}" for c in LOG_COLUMNS)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {SQLITE_TABLE} ({columns_sql})")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{SQLITE_TABLE}_horario ON {SQLITE_TABLE} (horario)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{SQLITE_TABLE}_amostra ON {SQLITE_TABLE} (amostra)")
+
+    def _connect(self):
+        return sqlite3.connect(self.filepath, timeout=30)
+
+    def _ensure_columns(self, conn, columns):
+        """Acrescenta à tabela as colunas que ainda não existem (numéricas, exceto as de texto conhecidas)."""
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({SQLITE_TABLE})")}
+        for column in columns:
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {SQLITE_TABLE} ADD COLUMN {_quote(column)} {_SQLITE_TYPES.get(column, 'REAL')}")
+
+    def append(self, df_to_append):
+        """Insere as linhas numa única transação."""
+        columns = LOG_COLUMNS + [c for c in df_to_append.columns if c not in LOG_COLUMNS]
+        df_to_append = df_to_append.reindex(columns=columns)
+        converters = [str if _SQLITE_TYPES.get(c, 'REAL') == 'TEXT' else float for c in columns]
+        rows = [
+            tuple(None if pd.isna(value) else convert(value) for convert, value in zip(converters, row))
+            for row in df_to_append.itertuples(index=False, name=None)
+        ]
+        columns_sql = ', '.join(_quote(c) for c in columns)
+        placeholders = ', '.join('?' * len(columns))
+        conn = self._connect()
+        try:
+            with conn:
+                self._ensure_columns(conn, columns)
+                conn.executemany(f"INSERT INTO {SQLITE_TABLE} ({columns_sql}) VALUES ({placeholders})", rows)
+        finally:
+            conn.close()
+
+    def read(self, **kwargs):
+        conn = self._connect()
+        try:
+            return pd.read_sql_query(f"SELECT * FROM {SQLITE_TABLE} ORDER BY rowid", conn, **kwargs)
+        finally:
+            conn.close()
+
+    def export_excel(self, xlsx_path):
+        self.read().to_excel(xlsx_path, index=False, sheet_name='Dados')
+
+
+def is_append_only(filepath):
+    """Indica se o log pode ser gravado só por acréscimo (.csv e SQLite)."""
+    return filepath.lower().endswith(('.csv',) + SQLITE_EXTENSIONS)
+
+
+def open_log_store(filepath):
+    """Escolhe o armazenamento pela extensão. Devolve None para .xlsx (caminho de regravação)."""
+    lower = filepath.lower()
+    if lower.endswith('.csv'):
+        return CsvLogStore(filepath)
+    if lower.endswith(SQLITE_EXTENSIONS):
+        return SqliteLogStore(filepath)
+    return None
+
+
+def read_log(filepath, **kwargs):
+    """Lê qualquer log de vales (.xlsx, .csv ou SQLite) num DataFrame."""
+    store = open_log_store(filepath)
+    if store is not None:
+        return store.read(**kwargs)
+    return pd.read_excel(filepath, **kwargs)
+
+
+def export_log_to_excel(filepath, xlsx_path):
+    """Exporta um log (.csv ou SQLite) para .xlsx."""
+    store = open_log_store(filepath)
+    if store is None:
+        raise ValueError(f"O log '{os.path.basename(filepath)}' já está em Excel ou tem extensão não suportada.")
+    store.export_excel(xlsx_path)
@@ -0,0 +1,159 @@
+"""
+Pré-visualização ao vivo do filtro (v14).
+
+Com a pré-visualização ligada, cada alteração de janela, ordem ou faixa
+refiltra o espectro ativo. Três peças mantêm a interface fluida:
+
+    * compute_filter_result: filtro + vale (+ ressonâncias) de um espectro,
+      o mesmo cálculo do botão "Aplicar Filtro";
+    * FilterResultCache: LRU limitado em bytes dos resultados por
+      (arquivo, parâmetros), então voltar a um arquivo ou a um conjunto de
+      parâmetros já visto não recalcula nada;
+    * PreviewWorker: thread de cálculo com um único pedido pendente. Um pedido
+      novo substitui o que ainda não começou (pedidos obsoletos são
+      descartados) e cada resultado sai numa fila com o número da geração,
+      para a GUI ignorar os que já foram superados.
+"""
+import os
+import queue
+import threading
+from collections import OrderedDict
+from threading import Lock
+
+from .core import filter_spectrum, filter_spectrum_roi, process_spectrum
+from .resonances import find_resonances, ranges_span
+
+# Limite padrão de memória dos resultados em cache (pode ser trocado pela variável de ambiente LPG_PREVIEW_MB)
+DEFAULT_PREVIEW_MAX_BYTES = int(float(os.environ.get('LPG_PREVIEW_MB', 256)) * 1024 * 1024)
+
+
+def compute_filter_result(wavelengths, intensities, window_size, poly_order, range_start=None, range_end=None,
+                          normalize=False, ranges=None, min_prominence=0.0, roi=False):
+    """
+    Filtra um espectro e busca o vale. Com 'ranges' o vale principal é o da primeira
+    ressonância encontrada. Com 'roi' só a faixa de busca (ou das ressonâncias) mais
+    meia janela é filtrada, e o sinal é NaN fora dela.
+    Devolve (sinal_filtrado, vale ou None, dict de ressonâncias ou None).
+    """
+    if not ranges:
+        filtered, valley = process_spectrum(wavelengths, intensities, window_size, poly_order,
+                                            range_start, range_end, normalize, roi)
+        return filtered, valley, None
+
+    if roi:
+        filtered = filter_spectrum_roi(wavelengths, intensities, window_size, poly_order, *ranges_span(ranges), normalize)
+    else:
+        filtered = filter_spectrum(intensities, window_size, poly_order, normalize)
+    resonances = find_resonances(wavelengths, filtered, ranges, min_prominence)
+    found = [resonance for resonance in resonances.values() if resonance is not None]
+    valley = found[0][:2] if found else None
+    return filtered, valley, resonances
+
+
+class FilterResultCache:
+    """Cache LRU de resultados de compute_filter_result por chave (arquivo, parâmetros), limitado a 'max_bytes'."""
+
+    def __init__(self, max_bytes=DEFAULT_PREVIEW_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._results = OrderedDict()
+        self._lock = Lock() # a thread de pré-visualização grava, a GUI lê
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Resultado guardado para 'key' ou None."""
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._results.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        size = result[0].nbytes
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return
+            if size > self.max_bytes:
+                return
+            self._results[key] = result
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self.current_bytes -= self._results.popitem(last=False)[1][0].nbytes
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._results)
+
+    def __contains__(self, key):
+        return key in self._results
+
+
+class PreviewWorker:
+    """
+    Thread que calcula só o pedido mais recente. Resultados vão para 'result_queue' como
+    ('preview', geração, chave, resultado) ou ('preview_error', geração, chave, mensagem),
+    e os bem-sucedidos também entram em 'cache'.
+    """
+
+    def __init__(self, cache, result_queue=None):
+        self.cache = cache
+        self.result_queue = result_queue if result_queue is not None else queue.Queue()
+        self.generation = 0
+        self.dropped = 0 # pedidos substituídos antes de começar
+        self._pending = None
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='lpg-preview', daemon=True)
+        self._thread.start()
+
+    def submit(self, key, wavelengths, intensities, params):
+        """
+        Pede o cálculo de compute_filter_result(wavelengths, intensities, **params).
+        Devolve a geração do pedido (a GUI mostra só o resultado da última).
+        """
+        with self._condition:
+            self.generation += 1
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = (self.generation, key, wavelengths, intensities, params)
+            self._condition.notify()
+            return self.generation
+
+    def cancel(self):
+        """Descarta o pedido pendente e invalida o que estiver em cálculo."""
+        with self._condition:
+            self.generation += 1
+            self._pending = None
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._pending = None
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                generation, key, wavelengths, intensities, params = self._pending
+                self._pending = None
+
+            try:
+                result = compute_filter_result(wavelengths, intensities, **params)
+            except Exception as e:
+                self.result_queue.put(('preview_error', generation, key, str(e)))
+                continue
+            self.cache.put(key, result) # Mesmo um resultado já obsoleto serve para uma próxima visita
+            self.result_queue.put(('preview', generation, key, result))
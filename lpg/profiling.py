@@ -0,0 +1,157 @@
+"""
+Medição de tempo e memória por etapa do lote (v14).
+
+StageProfiler registra, para cada etapa (leitura, cache, filtro, vale, exportação,
+dataframe, log), o tempo de parede e o pico de memória alocada durante a etapa (via
+tracemalloc), por arquivo ou por bloco de arquivos. O resumo pode ser mostrado
+na GUI e gravado em JSON e CSV ao lado do log.
+
+Sem medição, o código usa NULL_PROFILER, cujo stage() devolve um contexto
+vazio: o custo é de uma chamada de função por bloco.
+
+StartupTimer marca as fases da abertura da GUI (imports, janela, primeiro
+ciclo ocioso, figuras, pré-carga) para o relatório de inicialização.
+"""
+import contextlib
+import csv
+import json
+import time
+import tracemalloc
+
+# Ordem das etapas nos resumos
+STAGES = ('leitura', 'cache', 'filtro', 'vale', 'exportacao', 'dataframe', 'log')
+
+RECORD_FIELDS = ['etapa', 'item', 'arquivos', 'segundos', 'pico_memoria_bytes']
+
+
+class StageProfiler:
+    """Acumula registros (etapa, item, arquivos, segundos, pico de memória) de um lote."""
+
+    enabled = True
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.records = []
+        self._owns_tracemalloc = False
+        self._start_time = None
+        self.total_seconds = None
+
+    def start(self):
+        self._start_time = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+
+    def stop(self):
+        if self._start_time is not None:
+            self.total_seconds = time.perf_counter() - self._start_time
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+    @contextlib.contextmanager
+    def stage(self, name, item='', files=1):
+        """Mede o bloco 'with' como uma execução da etapa 'name' sobre 'files' arquivos."""
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            base_memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] - base_memory if tracing else None
+            self.records.append({'etapa': name, 'item': item, 'arquivos': files,
+                                 'segundos': seconds, 'pico_memoria_bytes': peak})
+
+    def summary(self):
+        """Totais por etapa: execuções, arquivos, tempo total, ms por arquivo, pico de memória e fração do tempo."""
+        by_stage = {}
+        for record in self.records:
+            entry = by_stage.setdefault(record['etapa'], {'etapa': record['etapa'], 'execucoes': 0, 'arquivos': 0,
+                                                          'segundos': 0.0, 'pico_memoria_bytes': None})
+            entry['execucoes'] += 1
+            entry['arquivos'] += record['arquivos']
+            entry['segundos'] += record['segundos']
+            if record['pico_memoria_bytes'] is not None:
+                entry['pico_memoria_bytes'] = max(entry['pico_memoria_bytes'] or 0, record['pico_memoria_bytes'])
+
+        measured = sum(entry['segundos'] for entry in by_stage.values()) or 1.0
+        order = {name: i for i, name in enumerate(STAGES)}
+        summary = sorted(by_stage.values(), key=lambda e: order.get(e['etapa'], len(order)))
+        for entry in summary:
+            entry['ms_por_arquivo'] = 1000.0 * entry['segundos'] / max(entry['arquivos'], 1)
+            entry['fracao'] = entry['segundos'] / measured
+        return summary
+
+    def format_summary(self):
+        """Resumo em texto (uma linha por etapa) para a GUI e a saída padrão."""
+        lines = []
+        for entry in self.summary():
+            peak = entry['pico_memoria_bytes']
+            peak_text = f" | pico {peak / 1024 ** 2:.1f} MB" if peak is not None else ""
+            lines.append(f"{entry['etapa']}: {entry['segundos']:.3f} s ({entry['fracao']:.0%}) | "
+                         f"{entry['ms_por_arquivo']:.2f} ms/arquivo{peak_text}")
+        if self.total_seconds is not None:
+            lines.append(f"total: {self.total_seconds:.3f} s")
+        return "\n".join(lines)
+
+    def write(self, base_path):
+        """Grava '<base_path>.json' (resumo + registros) e '<base_path>.csv' (registros). Devolve os caminhos."""
+        json_path = base_path + '.json'
+        csv_path = base_path + '.csv'
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump({'total_segundos': self.total_seconds, 'resumo': self.summary(), 'registros': self.records},
+                      f, indent=2, ensure_ascii=False)
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=RECORD_FIELDS, delimiter=';')
+            writer.writeheader()
+            writer.writerows(self.records)
+        return json_path, csv_path
+
+
+class NullProfiler:
+    """Substituto sem custo quando a medição está desligada."""
+
+    enabled = False
+    _context = contextlib.nullcontext()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def stage(self, name, item='', files=1):
+        return self._context
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class StartupTimer:
+    """Instantes (desde a criação) das fases da inicialização, na ordem em que foram marcadas."""
+
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.marks = []
+
+    def mark(self, name):
+        """Registra a fase 'name' agora. Devolve os segundos desde o início."""
+        elapsed = time.perf_counter() - self.start
+        self.marks.append((name, elapsed))
+        return elapsed
+
+    def elapsed(self, name):
+        """Segundos até a fase 'name' (a primeira marca com esse nome) ou None."""
+        return next((seconds for mark, seconds in self.marks if mark == name), None)
+
+    def format_report(self):
+        """Uma linha por fase: tempo acumulado e tempo desde a fase anterior."""
+        lines = []
+        previous = 0.0
+        for name, seconds in self.marks:
+            lines.append(f"{name}: {seconds * 1000:.0f} ms (+{(seconds - previous) * 1000:.0f} ms)")
+            previous = seconds
+        return "\n".join(lines)
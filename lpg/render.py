@@ -0,0 +1,200 @@
+"""
+Imagens "só filtro" de um lote inteiro (v14).
+
+FilteredPlotRenderer mantém UMA figura fora da tela (Agg, sem pyplot) e, a
+cada espectro, só atualiza os dados da linha, as anotações dos vales, as
+linhas da faixa e o título antes de salvar. Recriar a figura, os eixos e a
+legenda para cada arquivo custava mais que o próprio desenho. A figura já é
+criada no dpi final, e PNGs são gravados direto do buffer Agg (RGB, via
+Pillow): savefig redesenhava a figura e codificava o canal alfa, o dobro do
+tempo.
+
+render_filtered_plots distribui os arquivos num pool de processos; cada
+processo cria o seu renderizador uma única vez (initializer) e recebe blocos
+de arquivos, filtrando e buscando o vale antes de desenhar.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
+
+from .core import filter_spectrum, find_valley, load_spectrum, resolve_range
+from .resonances import find_resonances
+
+DEFAULT_FIGSIZE = (10, 6)
+DEFAULT_DPI = 300
+
+
+def valley_label(wavelength, intensity, name=None):
+    """Texto da anotação do vale, como no gráfico principal."""
+    prefix = f"{name}: " if name else "Vale: "
+    return f"{prefix}{intensity:.2f} dB\n@ {wavelength:.2f} nm"
+
+
+class FilteredPlotRenderer:
+    """Figura reaproveitada para salvar o gráfico do sinal filtrado de vários espectros."""
+
+    def __init__(self, color='red', figsize=DEFAULT_FIGSIZE, dpi=DEFAULT_DPI):
+        self.color = color
+        self.dpi = dpi
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot()
+        self.line, = self.ax.plot([], [], '-', color=color, linewidth=2, label="Sinal Filtrado")
+        self.title = self.ax.set_title("")
+        self.ax.set_xlabel("Comprimento de Onda (nm)")
+        self.ax.set_ylabel("Potência (dB)")
+        self.ax.legend(); self.ax.grid(True, linestyle=':', alpha=0.7)
+        self._annotations = []
+        self._range_lines = []
+        self._layout_done = False
+
+    def _annotation(self, k):
+        while len(self._annotations) <= k:
+            self._annotations.append(self.ax.annotate(
+                "", xy=(0, 0), xytext=(0, 0), ha='left', va='bottom',
+                arrowprops=dict(arrowstyle='->', color=self.color, connectionstyle='arc3,rad=0.3'),
+                bbox=dict(boxstyle='round,pad=0.3', fc=self.color, alpha=0.2)))
+        return self._annotations[k]
+
+    def _range_line(self, k):
+        while len(self._range_lines) <= k:
+            self._range_lines.append(self.ax.axvline(0, color='blue', linestyle='dashed', alpha=0.5))
+        return self._range_lines[k]
+
+    def render(self, filepath, wavelengths, filtered, title, valleys=(), range_limits=(), xlim=None, ylim=None):
+        """
+        Desenha e salva um espectro. 'valleys': [(comprimento_onda, intensidade, texto)];
+        'range_limits': posições das linhas tracejadas; 'xlim'/'ylim': limites fixos (ex: o zoom da GUI).
+        """
+        self.line.set_data(wavelengths, filtered)
+        for artist in self._annotations + self._range_lines:
+            artist.set_visible(False)
+
+        # Limites automáticos só pelos dados, como numa figura nova
+        self.ax.set_autoscale_on(True)
+        self.ax.relim(visible_only=True)
+        self.ax.autoscale_view()
+        auto_xlim, auto_ylim = self.ax.get_xlim(), self.ax.get_ylim()
+        x_span = auto_xlim[1] - auto_xlim[0]
+
+        for k, (valley_wl, valley_intensity, text_label) in enumerate(valleys):
+            annotation = self._annotation(k)
+            annotation.xy = (valley_wl, valley_intensity)
+            annotation.set_position((valley_wl + x_span * 0.05, valley_intensity + abs(valley_intensity) * 0.1))
+            annotation.set_text(text_label)
+            annotation.set_visible(True)
+        for k, position in enumerate(range_limits):
+            range_line = self._range_line(k)
+            range_line.set_xdata([position, position])
+            range_line.set_visible(True)
+
+        # Limites fixados: artistas criados acima não podem reabrir o autoescalonamento
+        self.ax.set_xlim(xlim if xlim is not None else auto_xlim)
+        self.ax.set_ylim(ylim if ylim is not None else auto_ylim)
+        self.title.set_text(title)
+
+        if not self._layout_done: # Mesmos rótulos em todas as imagens: o layout é calculado uma vez
+            self.fig.tight_layout()
+            self._layout_done = True
+        if filepath.lower().endswith('.png'):
+            self.fig.canvas.draw()
+            rgb = np.asarray(self.fig.canvas.buffer_rgba())[..., :3]
+            Image.fromarray(np.ascontiguousarray(rgb)).save(filepath, dpi=(self.dpi, self.dpi))
+        else: # PDF/SVG
+            self.fig.savefig(filepath, dpi=self.dpi)
+
+
+def plot_annotations(wavelengths, filtered, options):
+    """Vales (com texto) e linhas de faixa de um espectro filtrado, conforme as opções do lote."""
+    valleys = []
+    range_limits = []
+    ranges = options.get('ranges')
+    if ranges:
+        for name, valley in find_resonances(wavelengths, filtered, ranges, options.get('min_prominence', 0.0)).items():
+            if valley is not None:
+                valleys.append((valley[0], valley[1], valley_label(valley[0], valley[1], name)))
+        range_limits = [limit for _, start, end in ranges for limit in (start, end)]
+    else:
+        range_start, range_end = resolve_range(wavelengths, options.get('range_start'), options.get('range_end'))
+        valley = find_valley(wavelengths, filtered, range_start, range_end)
+        if valley is not None:
+            valleys.append((valley[0], valley[1], valley_label(*valley)))
+        range_limits = [limit for limit in (options.get('range_start'), options.get('range_end')) if limit is not None]
+
+    if not options.get('include_annotation', True): valleys = []
+    if not options.get('include_range', True): range_limits = []
+    return valleys, range_limits
+
+
+# ===================================================================
+# LOTE (POOL DE PROCESSOS)
+# ===================================================================
+
+_worker_state = {} # Renderizador e opções de cada processo do pool
+
+
+def _init_worker(options):
+    _worker_state['options'] = options
+    _worker_state['renderer'] = FilteredPlotRenderer(options.get('color', 'red'), options.get('figsize', DEFAULT_FIGSIZE),
+                                                     options.get('dpi', DEFAULT_DPI))
+
+
+def _render_chunk_task(jobs):
+    """
+    Tarefa de cada processo: filtra, busca o vale e salva cada imagem do bloco.
+    'jobs': [(caminho_da_imagem, título, origem)], origem = caminho do espectro ou (comprimento_onda, intensidade).
+    Devolve [(caminho_da_imagem, erro ou None), ...].
+    """
+    options = _worker_state['options']
+    renderer = _worker_state['renderer']
+    read_func = options.get('read_func', load_spectrum)
+    results = []
+    for image_path, title, source in jobs:
+        try:
+            wavelengths, intensities = read_func(source) if isinstance(source, str) else source
+            wavelengths = np.asarray(wavelengths); intensities = np.asarray(intensities)
+            filtered = filter_spectrum(intensities, options['window_size'], options['poly_order'],
+                                       options.get('normalize', False))
+            valleys, range_limits = plot_annotations(wavelengths, filtered, options)
+            renderer.render(image_path, wavelengths, filtered, title, valleys, range_limits,
+                            options.get('xlim'), options.get('ylim'))
+            results.append((image_path, None))
+        except Exception as e:
+            results.append((image_path, str(e)))
+    return results
+
+
+def render_filtered_plots(jobs, options, workers=None, chunksize=16, cancel_event=None):
+    """
+    Salva a imagem "só filtro" de cada job [(caminho_da_imagem, título, origem)].
+    'options': window_size, poly_order e, opcionalmente, normalize, range_start/range_end
+    ou ranges/min_prominence, include_annotation, include_range, color, xlim, ylim, dpi,
+    figsize e read_func (picklable). Gera (caminho_da_imagem, erro ou None) na ordem dos jobs.
+    workers=None usa todas as CPUs; com workers=1 tudo roda no processo atual. O pool usa 'spawn': a GUI chama esta função
+    de uma thread de trabalho, e fork com threads (Tk, matplotlib) não é seguro.
+    """
+    jobs = list(jobs)
+    workers = workers or os.cpu_count() or 1
+    tasks = [jobs[i:i + chunksize] for i in range(0, len(jobs), chunksize)]
+
+    if workers == 1 or len(tasks) <= 1:
+        _init_worker(options)
+        for task in tasks:
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            yield from _render_chunk_task(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(options,)) as executor:
+        futures = [executor.submit(_render_chunk_task, task) for task in tasks]
+        for future in futures:
+            if cancel_event is not None and cancel_event.is_set():
+                for pending in futures: pending.cancel()
+                return
+            yield from future.result()
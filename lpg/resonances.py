@@ -0,0 +1,191 @@
+"""
+Detecção de várias ressonâncias (bandas de atenuação) por espectro (v14).
+
+Cada ressonância tem um nome e uma faixa de busca (ex: "LP05:1520-1540").
+O espectro é filtrado UMA vez e, em cada faixa, o vale escolhido é o mínimo
+local de maior proeminência (scipy.signal.find_peaks sobre o sinal
+invertido). Um mínimo na borda da faixa (encosta de outra banda) não conta
+como vale. Acompanhar N ressonâncias custa um filtro por espectro mais N
+buscas baratas, em vez de N lotes completos.
+
+No log, as colunas originais (comprimento_onda_filtrado / intensidade) recebem
+a primeira ressonância, e cada ressonância ganha as suas próprias colunas
+(resonance_columns).
+"""
+import numpy as np
+
+from .core import (LOG_COLUMNS, filter_matrix, filter_spectrum, filter_spectrum_roi, has_shared_grid, range_index,
+                   roi_columns)
+from .lazy import LazyModule
+from .profiling import NULL_PROFILER
+
+_signal = LazyModule('scipy.signal')
+
+# Sufixos das colunas de cada ressonância no log
+RESONANCE_FIELDS = ('comprimento_onda (nm)', 'intensidade (dB)', 'proeminencia (dB)')
+
+
+def parse_ranges(text):
+    """
+    Lê faixas nomeadas no formato 'LP05:1520-1540; LP06:1550-1570' (nome opcional:
+    '1520-1540' vira R1, R2...). Devolve [(nome, início, fim), ...] na ordem dada.
+    """
+    ranges = []
+    for part in (p.strip() for p in text.replace('\n', ';').split(';')):
+        if not part:
+            continue
+        name, _, limits = part.rpartition(':')
+        name = name.strip() or f"R{len(ranges) + 1}"
+        try:
+            start_text, end_text = limits.split('-', 1)
+            start, end = float(start_text), float(end_text)
+        except ValueError:
+            raise ValueError(f"Faixa inválida: '{part}' (use nome:início-fim, ex: LP05:1520-1540)") from None
+        if start >= end:
+            raise ValueError(f"Faixa '{name}': o início deve ser menor que o fim.")
+        if any(existing == name for existing, _, _ in ranges):
+            raise ValueError(f"Nome de ressonância repetido: '{name}'")
+        ranges.append((name, start, end))
+    return ranges
+
+
+def format_ranges(ranges):
+    """Inverso de parse_ranges."""
+    return '; '.join(f"{name}:{start:g}-{end:g}" for name, start, end in ranges)
+
+
+def ranges_span(ranges):
+    """(v14) Menor faixa que contém todas as ressonâncias (a região filtrada no modo ROI)."""
+    return min(start for _, start, _ in ranges), max(end for _, _, end in ranges)
+
+
+def resonance_columns(names):
+    """Colunas do log de ressonâncias: as originais mais três por ressonância."""
+    extra = [f"{name} {field}" for name in names for field in RESONANCE_FIELDS]
+    return LOG_COLUMNS[:3] + extra + LOG_COLUMNS[3:]
+
+
+def most_prominent_valley(intensities, min_prominence=0.0):
+    """Posição e proeminência do mínimo local mais proeminente de um trecho, ou None."""
+    peaks, properties = _signal.find_peaks(-intensities, prominence=min_prominence)
+    if peaks.size == 0:
+        return None
+    best = np.argmax(properties['prominences'])
+    return int(peaks[best]), float(properties['prominences'][best])
+
+
+def find_resonances(wavelengths, filtered, ranges, min_prominence=0.0):
+    """
+    Vales de um espectro já filtrado, um por faixa nomeada.
+    Devolve {nome: (comprimento_onda, intensidade, proeminência) ou None}.
+    """
+    return find_resonances_matrix(wavelengths, filtered[np.newaxis, :], ranges, min_prominence)[0]
+
+
+def find_resonances_matrix(wavelengths, filtered_matrix, ranges, min_prominence=0.0):
+    """Vales de cada linha de uma matriz filtrada (grade comum). Devolve uma lista de dicts, um por linha."""
+    n_rows = filtered_matrix.shape[0]
+    results = [{} for _ in range(n_rows)]
+    for name, range_start, range_end in ranges:
+        index = range_index(wavelengths, range_start, range_end)
+        if index is None:
+            for result in results: result[name] = None # Faixa fora do espectro
+            continue
+        wavelength_in_range = wavelengths[index]
+        intensity_in_range = filtered_matrix[:, index]
+        for row, result in enumerate(results):
+            valley = most_prominent_valley(intensity_in_range[row], min_prominence)
+            if valley is None:
+                result[name] = None
+            else:
+                position, prominence = valley
+                result[name] = (wavelength_in_range[position], intensity_in_range[row, position], prominence)
+    return results
+
+
+def process_batch_resonances(wavelength_list, intensity_list, window_size, poly_order, ranges, normalize=False,
+                             min_prominence=0.0, chunk_rows=512, progress_callback=None, cancel_event=None,
+                             profiler=None, filtered_callback=None, roi=False):
+    """
+    Como core.process_batch, mas devolve, por espectro, o dict de find_resonances.
+    Espectros numa grade comum são filtrados em blocos (uma chamada por bloco).
+    v14: com roi=True só ranges_span(ranges) mais meia janela é filtrada (NaN fora, para 'filtered_callback').
+    """
+    profiler = profiler or NULL_PROFILER
+    n_files = len(intensity_list)
+    if n_files == 0:
+        return []
+
+    results = []
+    if not has_shared_grid(wavelength_list):
+        for i, (wavelengths, intensities) in enumerate(zip(wavelength_list, intensity_list)):
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            with profiler.stage('filtro', item=i):
+                if roi:
+                    filtered = filter_spectrum_roi(wavelengths, intensities, window_size, poly_order,
+                                                   *ranges_span(ranges), normalize)
+                else:
+                    filtered = filter_spectrum(intensities, window_size, poly_order, normalize)
+            if filtered_callback: filtered_callback(i, wavelengths, filtered[np.newaxis, :])
+            with profiler.stage('vale', item=i):
+                results.append(find_resonances(wavelengths, filtered, ranges, min_prominence))
+            if progress_callback: progress_callback(i + 1)
+        return results
+
+    wavelengths = wavelength_list[0]
+    columns = None # Colunas filtradas no modo ROI (None: o espectro inteiro)
+    roi_wavelengths = wavelengths
+    if roi:
+        index = range_index(wavelengths, *ranges_span(ranges))
+        if index is not None:
+            columns, _ = roi_columns(len(wavelengths), index, window_size)
+            roi_wavelengths = wavelengths[columns]
+    for chunk_start in range(0, n_files, chunk_rows):
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        chunk = intensity_list[chunk_start:chunk_start + chunk_rows]
+        item = f"{chunk_start}-{chunk_start + len(chunk) - 1}"
+        with profiler.stage('filtro', item=item, files=len(chunk)):
+            if columns is not None:
+                roi_matrix = np.vstack([intensities[columns] for intensities in chunk])
+                if normalize: # Máximo do espectro inteiro, como no caminho completo
+                    roi_matrix = roi_matrix - np.array([np.max(intensities) for intensities in chunk])[:, np.newaxis]
+                filtered_matrix = filter_matrix(roi_matrix, window_size, poly_order)
+            else:
+                filtered_matrix = filter_matrix(np.vstack(chunk), window_size, poly_order, normalize)
+        if filtered_callback:
+            if columns is not None:
+                padded = np.full((len(chunk), len(wavelengths)), np.nan)
+                padded[:, columns] = filtered_matrix
+                filtered_callback(chunk_start, wavelengths, padded)
+            else:
+                filtered_callback(chunk_start, wavelengths, filtered_matrix)
+        with profiler.stage('vale', item=item, files=len(chunk)):
+            results.extend(find_resonances_matrix(roi_wavelengths, filtered_matrix, ranges, min_prominence))
+        if progress_callback: progress_callback(len(results))
+    return results
+
+
+def make_resonance_row(timestamp, resonances, sample_name, filename):
+    """
+    Linha do log com todas as ressonâncias (NaN onde não houve vale).
+    As colunas originais recebem a primeira ressonância.
+    """
+    row = {'horario': timestamp}
+    first = True
+    for name, valley in resonances.items():
+        wavelength, intensity, prominence = valley if valley is not None else (np.nan, np.nan, np.nan)
+        if first:
+            row['comprimento_onda_filtrado (nm)'] = wavelength
+            row['intensidade_filtrada_vale (dB)'] = intensity
+            first = False
+        for field, value in zip(RESONANCE_FIELDS, (wavelength, intensity, prominence)):
+            row[f"{name} {field}"] = value
+    row['amostra'] = sample_name
+    row['arquivo_origem'] = filename
+    return row
+
+
+def has_any_valley(resonances):
+    return any(valley is not None for valley in resonances.values())
@@ -0,0 +1,252 @@
+"""
+Cache persistente dos resultados do lote (v14).
+
+Cada resultado (vale, ou o dict de ressonâncias) é guardado numa tabela SQLite
+sob uma chave que combina o hash do CONTEÚDO do espectro (comprimentos de onda
+e intensidades) com os parâmetros que o definem: janela, ordem, normalização,
+faixa de busca e, com ressonâncias, as faixas nomeadas e a proeminência
+mínima. Reprocessar o mesmo lote (ou o lote com alguns arquivos novos) só
+calcula os espectros novos ou alterados; renomear ou copiar um arquivo não
+invalida a entrada.
+
+Opcionalmente o sinal filtrado também é guardado (necessário para exportar os
+espectros do lote sem refiltrar). RESULT_VERSION entra na chave: mudar o
+algoritmo do filtro ou do vale invalida as entradas antigas.
+
+O cache é limitado em bytes ('max_bytes', 512 MB por padrão ou
+LPG_RESULT_CACHE_MB): depois de cada gravação as entradas usadas há mais tempo
+são removidas até o total caber no limite. O SQLite reaproveita as páginas
+liberadas, então o arquivo não passa muito do limite; clear() esvazia o cache.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+# Arquivo padrão do cache (pode ser trocado pela variável de ambiente LPG_RESULT_CACHE)
+DEFAULT_RESULT_CACHE_PATH = os.environ.get(
+    'LPG_RESULT_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'lpg_filter', 'resultados.sqlite'))
+# Limite de tamanho do cache (resultados + sinais filtrados), trocado pela variável de ambiente LPG_RESULT_CACHE_MB
+DEFAULT_RESULT_CACHE_MAX_BYTES = int(float(os.environ.get('LPG_RESULT_CACHE_MB', 512)) * 1024 * 1024)
+RESULT_TABLE = 'resultados'
+RESULT_VERSION = 1
+_MISSING = object() # Entrada ausente (diferente de um resultado None: espectro sem vale)
+
+
+def content_hash(wavelengths, intensities):
+    """Hash do conteúdo numérico de um espectro (independe do nome e da data do arquivo)."""
+    digest = hashlib.blake2b(digest_size=20)
+    for values in (wavelengths, intensities):
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        digest.update(len(values).to_bytes(8, 'little'))
+        digest.update(values.data)
+    return digest.hexdigest()
+
+
+def result_params(window_size, poly_order, range_start, range_end, normalize, ranges=None, min_prominence=0.0,
+                  roi=False):
+    """Parâmetros que definem um resultado, em forma canônica (texto JSON) para a chave."""
+    params = {'versao': RESULT_VERSION, 'janela': int(window_size), 'ordem': int(poly_order),
+              'normalizar': bool(normalize), 'inicio': range_start, 'fim': range_end}
+    if ranges:
+        params['ressonancias'] = [[name, float(start), float(end)] for name, start, end in ranges]
+        params['proeminencia_min'] = float(min_prominence)
+    if roi: # Mesmo vale, mas o sinal filtrado guardado só cobre a faixa
+        params['roi'] = True
+    return json.dumps(params, sort_keys=True)
+
+
+def _encode_result(result):
+    """Vale (comprimento de onda, intensidade), dict de ressonâncias ou None -> texto JSON."""
+    if isinstance(result, dict):
+        return json.dumps({'ressonancias': [[name, None if valley is None else [float(v) for v in valley]]
+                                            for name, valley in result.items()]})
+    return json.dumps(None if result is None else [float(v) for v in result])
+
+
+def _decode_result(text):
+    value = json.loads(text)
+    if isinstance(value, dict):
+        return {name: None if valley is None else tuple(valley) for name, valley in value['ressonancias']}
+    return None if value is None else tuple(value)
+
+
+class ResultCache:
+    """
+    Resultados do lote em SQLite, por (conteúdo do espectro, parâmetros). Conta acertos e falhas.
+    'max_bytes' limita o tamanho das entradas (None: sem limite).
+    """
+
+    def __init__(self, filepath=None, max_bytes=DEFAULT_RESULT_CACHE_MAX_BYTES):
+        self.filepath = filepath or DEFAULT_RESULT_CACHE_PATH
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.enabled = True
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.filepath)), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {RESULT_TABLE} "
+                             "(chave TEXT PRIMARY KEY, resultado TEXT NOT NULL, filtrado BLOB, usado REAL)")
+        except (OSError, sqlite3.Error):
+            self.enabled = False # Cache é só otimização: sem permissão de escrita, tudo é calculado
+
+    def _connect(self):
+        return sqlite3.connect(self.filepath, timeout=30)
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(wavelengths, intensities, params):
+        """Chave de um espectro para os parâmetros 'params' (texto de result_params)."""
+        return hashlib.sha1(f"{content_hash(wavelengths, intensities)}|{params}".encode('utf-8')).hexdigest()
+
+    def get_many(self, keys, with_filtered=False):
+        """
+        Busca várias chaves numa consulta. Devolve {chave: (resultado, filtrado ou None)}
+        só para as encontradas; com 'with_filtered', entradas sem sinal filtrado contam como ausentes.
+        """
+        if not self.enabled or not keys:
+            return {}
+        found = {}
+        conn = self._connect()
+        try:
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), 500): # Limite de parâmetros por consulta do SQLite
+                batch = unique_keys[start:start + 500]
+                columns = 'chave, resultado, filtrado' if with_filtered else 'chave, resultado, NULL'
+                rows = conn.execute(f"SELECT {columns} FROM {RESULT_TABLE} WHERE chave IN "
+                                    f"({', '.join('?' * len(batch))})", batch)
+                for key, result, filtered in rows:
+                    if with_filtered and filtered is None: continue
+                    found[key] = (_decode_result(result),
+                                  None if filtered is None else np.frombuffer(filtered, dtype=np.float64))
+            with conn:
+                conn.executemany(f"UPDATE {RESULT_TABLE} SET usado = ? WHERE chave = ?",
+                                 [(time.time(), key) for key in found])
+        except sqlite3.Error:
+            return {}
+        finally:
+            conn.close()
+        return found
+
+    def put_many(self, entries):
+        """Grava [(chave, resultado, filtrado ou None), ...] numa única transação e aplica o limite de tamanho."""
+        if not self.enabled or not entries:
+            return
+        now = time.time()
+        rows = [(key, _encode_result(result),
+                 None if filtered is None else np.ascontiguousarray(filtered, dtype=np.float64).tobytes(), now)
+                for key, result, filtered in entries]
+        conn = self._connect()
+        try:
+            with conn:
+                # Mantém um sinal filtrado já guardado quando a nova entrada não traz o seu
+                conn.executemany(f"INSERT INTO {RESULT_TABLE} (chave, resultado, filtrado, usado) VALUES (?, ?, ?, ?) "
+                                 "ON CONFLICT(chave) DO UPDATE SET resultado = excluded.resultado, "
+                                 "filtrado = COALESCE(excluded.filtrado, filtrado), usado = excluded.usado", rows)
+        except sqlite3.Error:
+            pass
+        finally:
+            conn.close()
+        self.prune()
+
+    def prune(self, max_bytes=None):
+        """
+        Remove as entradas usadas há mais tempo até o total (resultado + sinal filtrado) caber
+        em 'max_bytes' (padrão: self.max_bytes). Devolve o número de entradas removidas.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if not self.enabled or max_bytes is None: return 0
+        conn = self._connect()
+        try:
+            with conn:
+                # Soma acumulada do tamanho, das entradas mais recentes para as mais antigas
+                cursor = conn.execute(
+                    f"DELETE FROM {RESULT_TABLE} WHERE chave IN (SELECT chave FROM (SELECT chave, "
+                    "SUM(length(resultado) + COALESCE(length(filtrado), 0)) OVER (ORDER BY usado DESC, chave) "
+                    f"AS acumulado FROM {RESULT_TABLE}) WHERE acumulado > ?)", (int(max_bytes),))
+                return cursor.rowcount
+        except sqlite3.Error:
+            return 0
+        finally:
+            conn.close()
+
+    def clear(self):
+        """Remove todas as entradas."""
+        if not self.enabled: return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(f"DELETE FROM {RESULT_TABLE}")
+        finally:
+            conn.close()
+
+    def format_stats(self):
+        total = self.hits + self.misses
+        rate = f" ({self.hits / total:.0%} do cache)" if total else ""
+        return f"Cache de resultados: {self.hits} acertos, {self.misses} calculados{rate}."
+
+
+def process_batch_cached(cache, wavelength_list, intensity_list, params, compute, filtered_callback=None,
+                         profiler=None):
+    """
+    Resultados do lote com o cache: só os espectros ausentes vão para
+    'compute(wavelength_list, intensity_list, filtered_callback)' (ex: core.process_batch
+    com os demais argumentos fixados), e os novos resultados são gravados.
+    'params': texto de result_params. Com 'filtered_callback', os acertos precisam ter o
+    sinal filtrado guardado, e o callback recebe o lote na ordem de entrada (uma matriz
+    se a grade for comum, senão uma linha por espectro). Um 'compute' interrompido
+    (cancelamento) devolve menos resultados: a lista final para no primeiro que faltou.
+    """
+    from .core import has_shared_grid # import local: core não depende deste módulo
+    from .profiling import NULL_PROFILER
+
+    profiler = profiler or NULL_PROFILER
+    n_files = len(intensity_list)
+    with_filtered = filtered_callback is not None
+    with profiler.stage('cache', item='consulta', files=n_files):
+        keys = [cache.make_key(wavelengths, intensities, params)
+                for wavelengths, intensities in zip(wavelength_list, intensity_list)]
+        found = cache.get_many(keys, with_filtered)
+
+    results = [_MISSING] * n_files
+    filtered_rows = [None] * n_files
+    missing = []
+    for i, key in enumerate(keys):
+        entry = found.get(key)
+        if entry is None:
+            missing.append(i)
+        else:
+            results[i], filtered_rows[i] = entry
+    cache.hits += n_files - len(missing)
+
+    if missing:
+        def collect(first, wavelengths, filtered_matrix):
+            for k, row in enumerate(filtered_matrix):
+                filtered_rows[missing[first + k]] = row
+
+        computed = compute([wavelength_list[i] for i in missing], [intensity_list[i] for i in missing],
+                           collect if with_filtered else None)
+        for k, result in enumerate(computed):
+            results[missing[k]] = result
+        cache.misses += len(computed)
+        with profiler.stage('cache', item='gravacao', files=len(computed)):
+            cache.put_many([(keys[missing[k]], result, filtered_rows[missing[k]] if with_filtered else None)
+                            for k, result in enumerate(computed)])
+        if len(computed) < len(missing): # Cancelado: só até o primeiro espectro sem resultado
+            n_files = missing[len(computed)]
+            results = results[:n_files]
+
+    if with_filtered and n_files:
+        if has_shared_grid(wavelength_list[:n_files]):
+            filtered_callback(0, wavelength_list[0], np.vstack(filtered_rows[:n_files]))
+        else:
+            for i in range(n_files):
+                filtered_callback(i, wavelength_list[i], filtered_rows[i][np.newaxis, :])
+    return results
@@ -0,0 +1,262 @@
+"""
+Filtro Savitzky-Golay com cache de coeficientes (v14).
+
+Os coeficientes de mínimos quadrados de cada combinação (janela, ordem,
+derivada, delta, modo) são calculados uma vez e guardados num cache LRU
+limitado. Para mode='interp' (o padrão do savgol_filter) as bordas também
+viram matrizes pré-calculadas, no lugar do polyfit refeito a cada chamada.
+
+A convolução é direta (scipy.ndimage.convolve1d) para janelas pequenas e por
+FFT em blocos (overlap-add) a partir de FFT_WINDOW_THRESHOLD pontos, onde
+passa a ser mais rápida. O tamanho dos blocos só depende da janela, e cada
+bloco só das suas amostras: filtrar um trecho alinhado aos blocos
+(exact_columns) dá os mesmos valores, bit a bit, que o sinal inteiro. O mesmo objeto (default_filter) é usado
+pelo caminho interativo e pelo lote, que dão resultados idênticos; em relação
+ao scipy.signal.savgol_filter a diferença fica no arredondamento (ordem de
+1e-13 do sinal), pela ordem diferente das somas.
+
+Para resultados idênticos, bit a bit, ao savgol_filter do scipy (o caminho da
+GUI até a v13), use method='scipy', ou LPG_SAVGOL_METHOD=scipy para o
+default_filter. Nesse modo cada linha de uma matriz é filtrada como vetor
+1-D, o que é mais lento que os kernels em cache.
+"""
+import os
+
+import math
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+
+from .lazy import LazyModule
+
+# scipy.signal e scipy.ndimage levam ~1 s para importar: só no primeiro filtro
+_signal = LazyModule('scipy.signal')
+_ndimage = LazyModule('scipy.ndimage')
+_fft = LazyModule('scipy.fft')
+
+# Janela a partir da qual a convolução por FFT fica mais rápida que a direta
+# (medido em espectros de 50k pontos, tanto 1-D quanto em matrizes de lote)
+FFT_WINDOW_THRESHOLD = 101
+
+# Tamanho da FFT de cada bloco, em múltiplos da janela (blocos de ~7 janelas de amostras)
+FFT_BLOCK_FACTOR = 8
+
+# Métodos de SavgolFilter; o do default_filter pode ser trocado pela variável de ambiente LPG_SAVGOL_METHOD
+SAVGOL_METHODS = ('auto', 'direct', 'fft', 'scipy')
+DEFAULT_SAVGOL_METHOD = os.environ.get('LPG_SAVGOL_METHOD', 'auto')
+
+# Número máximo de kernels (combinações de parâmetros) mantidos no cache
+KERNEL_CACHE_SIZE = 32
+
+# Modos de borda do scipy.ndimage -> np.pad (usados no caminho por FFT)
+_PAD_MODES = {'mirror': 'reflect', 'nearest': 'edge', 'wrap': 'wrap', 'constant': 'constant'}
+
+
+class SavgolKernel:
+    """Coeficientes de convolução (e matrizes de borda, para 'interp') de uma combinação de parâmetros."""
+
+    def __init__(self, window_length, polyorder, deriv=0, delta=1.0, mode='interp'):
+        if mode not in ('interp',) + tuple(_PAD_MODES):
+            raise ValueError("mode deve ser 'mirror', 'constant', 'nearest', 'wrap' ou 'interp'.")
+
+        self.window_length = window_length
+        self.polyorder = polyorder
+        self.deriv = deriv
+        self.delta = delta
+        self.mode = mode
+        self.coeffs = _signal.savgol_coeffs(window_length, polyorder, deriv=deriv, delta=delta)
+
+        self.edge_left = None
+        self.edge_right = None
+        if mode == 'interp':
+            self.edge_left, self.edge_right = self._edge_matrices()
+
+    def _edge_matrices(self):
+        """
+        Matrizes (halflen x janela) equivalentes ao ajuste polinomial das bordas
+        do savgol_filter(mode='interp'): bordas = x[:janela] @ esquerda.T, etc.
+        """
+        halflen = self.window_length // 2
+        # Posições centradas e escaladas em [-1, 1] para um ajuste bem condicionado
+        scale = float(max(halflen, 1))
+        positions = (np.arange(self.window_length, dtype=float) - halflen) / scale
+        vander = np.vander(positions, self.polyorder + 1, increasing=True)
+        fit = np.linalg.pinv(vander) # coeficientes do polinômio = fit @ x_janela
+
+        # Derivada do polinômio avaliada em cada posição de borda
+        powers = np.arange(self.polyorder + 1)
+        factor = np.array([math.perm(p, self.deriv) if p >= self.deriv else 0 for p in powers], dtype=float)
+        exps = np.clip(powers - self.deriv, 0, None)
+
+        def evaluate_at(points):
+            return (points[:, None] ** exps) * factor / (scale * self.delta) ** self.deriv
+
+        left = evaluate_at(positions[:halflen]) @ fit
+        right = evaluate_at(positions[self.window_length - halflen:]) @ fit
+        return left, right
+
+
+class SavgolFilter:
+    """
+    Aplica o filtro Savitzky-Golay com kernels em cache (LRU limitado a 'cache_size').
+    method: 'auto' (direta ou FFT conforme a janela), 'direct', 'fft' ou 'scipy'
+    (scipy.signal.savgol_filter linha a linha, sem kernels em cache).
+    """
+
+    def __init__(self, method='auto', fft_threshold=FFT_WINDOW_THRESHOLD, cache_size=KERNEL_CACHE_SIZE):
+        if method not in SAVGOL_METHODS:
+            raise ValueError(f"method deve ser um de {SAVGOL_METHODS}.")
+        self.method = method
+        self.fft_threshold = fft_threshold
+        self.cache_size = cache_size
+        self._kernels = OrderedDict()
+        self._lock = Lock() # o lote roda numa thread de trabalho
+        self.hits = 0
+        self.misses = 0
+
+    def kernel(self, window_length, polyorder, deriv=0, delta=1.0, mode='interp'):
+        """Kernel da combinação de parâmetros, calculado só na primeira vez."""
+        key = (window_length, polyorder, deriv, float(delta), mode)
+        with self._lock:
+            kernel = self._kernels.get(key)
+            if kernel is not None:
+                self._kernels.move_to_end(key)
+                self.hits += 1
+                return kernel
+
+        kernel = SavgolKernel(window_length, polyorder, deriv, delta, mode)
+        with self._lock:
+            self.misses += 1
+            self._kernels[key] = kernel
+            self._kernels.move_to_end(key)
+            while len(self._kernels) > self.cache_size:
+                self._kernels.popitem(last=False)
+        return kernel
+
+    def use_fft(self, window_length):
+        if self.method == 'auto':
+            return window_length >= self.fft_threshold
+        return self.method == 'fft'
+
+    def exact_columns(self, n_points, start, stop, window_length):
+        """
+        Colunas [início, fim) a filtrar (mode='interp') para que os pontos start..stop-1 saiam
+        idênticos aos do sinal inteiro: meia janela de cada lado na convolução direta; por FFT,
+        blocos inteiros, no mesmo alinhamento do sinal inteiro, que cubram essa margem.
+        Com menos de uma janela, o trecho é estendido até uma janela inteira.
+        """
+        halflen = window_length // 2
+        if self.use_fft(window_length):
+            block = _block_length(window_length)
+            first = max((start - halflen) // block, 0) * block
+            last = min(((stop - 1 + halflen) // block + 1) * block, n_points)
+            while last - first < window_length and first > 0: # Só no fim do sinal: recua blocos inteiros
+                first = max(first - block, 0)
+            return first, last
+
+        first = max(start - halflen, 0)
+        last = min(stop + halflen, n_points)
+        if last - first < window_length:
+            first = max(min(first, n_points - window_length), 0)
+            last = min(first + window_length, n_points)
+        return first, last
+
+    def __call__(self, x, window_length, polyorder, deriv=0, delta=1.0, axis=-1, mode='interp', cval=0.0):
+        """
+        Mesma assinatura de scipy.signal.savgol_filter e o mesmo resultado até o arredondamento
+        (|diferença| < 1e-12 * max|x|; idêntico com method='scipy'). Cada linha de uma entrada
+        2-D sai idêntica, bit a bit, à mesma linha filtrada como vetor 1-D.
+        """
+        x = np.asarray(x)
+        if x.dtype != np.float64 and x.dtype != np.float32:
+            x = x.astype(np.float64)
+        if mode == 'interp' and window_length > x.shape[axis]:
+            raise ValueError("Se mode é 'interp', window_length deve ser menor ou igual ao tamanho de x.")
+
+        x = np.moveaxis(x, axis, -1)
+        if self.method == 'scipy':
+            y = np.empty(x.shape, dtype=x.dtype)
+            for row in np.ndindex(x.shape[:-1]): # O scipy ajusta as bordas de uma matriz com outro arredondamento
+                y[row] = _signal.savgol_filter(x[row], window_length, polyorder, deriv=deriv, delta=delta,
+                                               mode=mode, cval=cval)
+            return np.moveaxis(y, -1, axis)
+
+        kernel = self.kernel(window_length, polyorder, deriv, delta, mode)
+
+        if self.use_fft(window_length):
+            y = self._convolve_fft(x, kernel, cval)
+        else:
+            conv_mode = 'constant' if mode == 'interp' else mode
+            y = _ndimage.convolve1d(x, kernel.coeffs, axis=-1, mode=conv_mode, cval=cval)
+
+        if mode == 'interp':
+            halflen = window_length // 2
+            if halflen > 0:
+                # Linha a linha (matriz x vetor): o produto de matrizes do BLAS arredonda diferente,
+                # e cada linha de uma matriz de lote deve sair idêntica ao espectro filtrado sozinho
+                for row in np.ndindex(x.shape[:-1]):
+                    y[row][:halflen] = x[row][:window_length] @ kernel.edge_left.T
+                    y[row][-halflen:] = x[row][-window_length:] @ kernel.edge_right.T
+
+        return np.moveaxis(y, -1, axis)
+
+    @staticmethod
+    def _convolve_fft(x, kernel, cval):
+        """Convolução por FFT em blocos ('same'), com o mesmo tratamento de borda do convolve1d."""
+        halflen = kernel.window_length // 2
+        if kernel.mode == 'interp':
+            # Bordas são recalculadas depois; basta o preenchimento com zeros do 'same'
+            return _overlap_add(x, kernel.coeffs)[..., halflen:halflen + x.shape[-1]]
+
+        pad_width = [(0, 0)] * (x.ndim - 1) + [(halflen, halflen)]
+        pad_mode = _PAD_MODES[kernel.mode]
+        if pad_mode == 'constant':
+            padded = np.pad(x, pad_width, mode='constant', constant_values=cval)
+        else:
+            padded = np.pad(x, pad_width, mode=pad_mode)
+        return _overlap_add(padded, kernel.coeffs)[..., 2 * halflen:2 * halflen + x.shape[-1]]
+
+
+def _fft_length(n_taps):
+    return _fft.next_fast_len(FFT_BLOCK_FACTOR * n_taps, real=True)
+
+
+def _block_length(n_taps):
+    """Amostras por bloco do overlap-add (só depende do tamanho do kernel)."""
+    return _fft_length(n_taps) - n_taps + 1
+
+
+def _overlap_add(x, coeffs):
+    """
+    Convolução completa ('full') de cada linha de x por overlap-add. Os blocos começam em
+    múltiplos de _block_length(len(coeffs)) e cada ponto da saída é a soma de exatamente
+    duas parcelas (o bloco que o contém e a cauda do anterior), então o resultado de um
+    ponto não depende do tamanho do sinal nem de quantas linhas são filtradas juntas.
+    """
+    n_taps = len(coeffs)
+    nfft = _fft_length(n_taps)
+    block = nfft - n_taps + 1
+    n_points = x.shape[-1]
+    n_blocks = -(-n_points // block)
+    lead = x.shape[:-1]
+
+    blocks = np.zeros(lead + (n_blocks * block,))
+    blocks[..., :n_points] = x
+    blocks = blocks.reshape(lead + (n_blocks, block))
+    pieces = _fft.irfft(_fft.rfft(blocks, nfft, axis=-1) * _fft.rfft(coeffs, nfft), nfft, axis=-1)
+
+    out = np.zeros(lead + (n_blocks + 1, block))
+    out[..., :n_blocks, :] = pieces[..., :block]
+    # Cauda de cada bloco (n_taps - 1 amostras, menos que um bloco) somada ao início do seguinte
+    out[..., 1:, :n_taps - 1] += pieces[..., block:]
+    return out.reshape(lead + (-1,))[..., :n_points + n_taps - 1]
+
+
+# Instância compartilhada pela GUI (filtro interativo e lote) e pela CLI
+default_filter = SavgolFilter(method=DEFAULT_SAVGOL_METHOD)
+
+
+def savgol_filter(x, window_length, polyorder, deriv=0, delta=1.0, axis=-1, mode='interp', cval=0.0):
+    """Atalho para default_filter(...), com a assinatura de scipy.signal.savgol_filter."""
+    return default_filter(x, window_length, polyorder, deriv=deriv, delta=delta, axis=axis, mode=mode, cval=cval)
@@ -0,0 +1,84 @@
+"""
+Cache binário de espectros em disco (v14).
+
+Cada espectro lido de um .txt é guardado como um .npy (matriz 2 x n:
+comprimento de onda e intensidade) identificado pelo caminho absoluto, tamanho
+e data de modificação do arquivo de origem. Nas leituras seguintes o .npy é
+aberto com np.load(mmap_mode='r'), sem converter texto; só arquivos novos ou
+alterados voltam a ser lidos pelo leitor de texto.
+"""
+import glob
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from .core import load_spectrum
+
+# Diretório padrão do cache (pode ser trocado pela variável de ambiente LPG_CACHE_DIR)
+DEFAULT_CACHE_DIR = os.environ.get(
+    'LPG_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'lpg_filter', 'spectra'))
+
+
+class SpectrumCache:
+    """Cache de espectros em .npy, com uma entrada por arquivo de origem."""
+
+    def __init__(self, cache_dir=None, read_func=load_spectrum):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.read_func = read_func
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_prefix(self, abs_path):
+        return os.path.join(self.cache_dir, hashlib.sha1(abs_path.encode('utf-8')).hexdigest())
+
+    def entry_path(self, filepath):
+        """Caminho do .npy correspondente ao estado atual (tamanho, mtime) do arquivo."""
+        abs_path = os.path.abspath(filepath)
+        stat = os.stat(abs_path)
+        return f"{self._entry_prefix(abs_path)}_{stat.st_size}_{stat.st_mtime_ns}.npy"
+
+    def load(self, filepath):
+        """Devolve (comprimento_onda, intensidade), do cache se possível (somente leitura, mmap)."""
+        entry = self.entry_path(filepath)
+        if os.path.exists(entry):
+            try:
+                data = np.load(entry, mmap_mode='r')
+                self.hits += 1
+                return np.asarray(data[0]), np.asarray(data[1])
+            except (OSError, ValueError):
+                pass # Entrada corrompida: lê o texto de novo e regrava
+
+        self.misses += 1
+        wavelength, intensity = self.read_func(filepath)
+        self._store(filepath, entry, wavelength, intensity)
+        return wavelength, intensity
+
+    __call__ = load
+
+    def _store(self, filepath, entry, wavelength, intensity):
+        """Grava a entrada de forma atômica e remove versões antigas do mesmo arquivo."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            prefix = self._entry_prefix(os.path.abspath(filepath))
+            for old_entry in glob.glob(glob.escape(prefix) + '_*.npy'):
+                if old_entry != entry:
+                    os.remove(old_entry)
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    np.save(f, np.vstack([wavelength, intensity]))
+                os.replace(tmp_path, entry)
+            except OSError:
+                os.remove(tmp_path)
+                raise
+        except OSError:
+            pass # Cache é só otimização: sem permissão de escrita, segue sem cache
+
+    def clear(self):
+        """Remove todas as entradas do cache."""
+        for entry in glob.glob(os.path.join(glob.escape(self.cache_dir), '*.npy')):
+            try: os.remove(entry)
+            except OSError: pass
@@ -0,0 +1,74 @@
+"""
+Espectros carregados sob demanda com limite de memória (v14).
+
+No modo sob demanda a lista de arquivos guarda só caminhos e metadados; os
+arrays são lidos quando um espectro é pedido (seleção na lista ou lote) e
+ficam num cache LRU limitado em bytes. Ao passar do limite, os espectros
+usados há mais tempo são descartados, então a memória não cresce com o
+número de arquivos listados.
+"""
+import os
+from collections import OrderedDict
+from threading import Lock
+
+from .core import load_spectrum
+
+# Limite padrão de memória dos espectros em cache (pode ser trocado pela variável de ambiente LPG_STORE_MB)
+DEFAULT_MAX_BYTES = int(float(os.environ.get('LPG_STORE_MB', 512)) * 1024 * 1024)
+
+
+class SpectrumStore:
+    """Cache LRU de espectros (comprimento_onda, intensidade) por caminho, limitado a 'max_bytes'."""
+
+    def __init__(self, read_func=load_spectrum, max_bytes=DEFAULT_MAX_BYTES):
+        self.read_func = read_func
+        self.max_bytes = max_bytes
+        self._spectra = OrderedDict()
+        self._lock = Lock() # o lote lê espectros numa thread de trabalho
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, filepath):
+        """Devolve (comprimento_onda, intensidade), lendo o arquivo só se não estiver em cache."""
+        with self._lock:
+            spectrum = self._spectra.get(filepath)
+            if spectrum is not None:
+                self._spectra.move_to_end(filepath)
+                self.hits += 1
+                return spectrum
+
+        # Leitura fora do lock: várias threads podem ler arquivos diferentes ao mesmo tempo
+        wavelength, intensity = self.read_func(filepath)
+        spectrum = (wavelength, intensity)
+        size = wavelength.nbytes + intensity.nbytes
+
+        with self._lock:
+            self.misses += 1
+            if filepath in self._spectra: # Outra thread leu o mesmo arquivo
+                return self._spectra[filepath]
+            if size <= self.max_bytes:
+                self._spectra[filepath] = spectrum
+                self.current_bytes += size
+                self._evict()
+        return spectrum
+
+    __call__ = get
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes and self._spectra:
+            wavelength, intensity = self._spectra.popitem(last=False)[1]
+            self.current_bytes -= wavelength.nbytes + intensity.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._spectra.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._spectra)
+
+    def __contains__(self, filepath):
+        return filepath in self._spectra
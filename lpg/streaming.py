@@ -0,0 +1,170 @@
+"""
+Filtro Savitzky-Golay e busca de vale sobre um fluxo de amostras (v14).
+
+Na interrogação contínua as intensidades chegam em blocos, na ordem do
+comprimento de onda. StreamingSavgol guarda só as últimas 'janela' amostras
+e, a cada bloco, devolve os pontos filtrados que já têm meia janela de
+amostras à direita; finish() completa a borda final. Com janelas menores que
+savgol.FFT_WINDOW_THRESHOLD o resultado concatenado é idêntico, bit a bit, ao
+do lote (mesma convolução direta e mesmas matrizes de borda de
+savgol.SavgolKernel), qualquer que seja o tamanho dos blocos; com janelas
+maiores o lote convolui por FFT e a diferença fica no arredondamento (~1e-13).
+O mesmo vale para o lote com LPG_SAVGOL_METHOD=scipy (bordas ajustadas pelo scipy).
+
+OnlineValleyTracker acompanha o mínimo dentro da faixa de busca à medida que
+os pontos filtrados saem. O custo por bloco depende só do tamanho do bloco e da
+janela, não do tamanho do espectro: a estimativa do vale é atualizada um bloco
+(mais meia janela de amostras) depois da chegada dos dados.
+"""
+import numpy as np
+
+from .core import validate_filter_params
+from .lazy import LazyModule
+from .savgol import default_filter
+
+_ndimage = LazyModule('scipy.ndimage')
+
+_EMPTY = np.empty(0)
+
+
+class StreamingSavgol:
+    """
+    Filtro Savitzky-Golay incremental (mode='interp').
+    push(amostras, posições) devolve (posições, filtrado) dos pontos já definitivos;
+    'posições' (ex: comprimentos de onda) acompanham as amostras e são opcionais.
+    """
+
+    def __init__(self, window_length, polyorder):
+        self.window_length = window_length
+        self.polyorder = polyorder
+        self.halflen = window_length // 2
+        kernel = default_filter.kernel(window_length, polyorder)
+        self._coeffs = kernel.coeffs
+        self._edge_left = kernel.edge_left
+        self._edge_right = kernel.edge_right
+        self.reset()
+
+    def reset(self):
+        """Começa um novo espectro."""
+        self.n_in = 0   # amostras recebidas
+        self.n_out = 0  # pontos filtrados já devolvidos
+        self._samples = _EMPTY
+        self._positions = _EMPTY
+        self.finished = False
+
+    def push(self, samples, positions=None):
+        samples = np.asarray(samples, dtype=float).ravel()
+        if positions is None:
+            positions = np.arange(self.n_in, self.n_in + len(samples), dtype=float)
+        positions = np.asarray(positions, dtype=float).ravel()
+        if len(positions) != len(samples):
+            raise ValueError("Amostras e posições com tamanhos diferentes.")
+        if self.finished:
+            raise ValueError("Fluxo já encerrado: chame reset() para um novo espectro.")
+
+        buffer_start = self.n_in - len(self._samples)
+        data = np.concatenate((self._samples, samples))
+        data_positions = np.concatenate((self._positions, positions))
+        self.n_in += len(samples)
+        if self.n_in < self.window_length: # Ainda sem uma janela completa: só acumula
+            self._samples, self._positions = data, data_positions
+            return _EMPTY, _EMPTY
+
+        emit_start = self.n_out
+        pieces = []
+        if self.n_out == 0 and self.halflen > 0: # Borda inicial (ajuste polinomial da primeira janela)
+            pieces.append(data[:self.window_length] @ self._edge_left.T)
+            self.n_out = self.halflen
+
+        # Centros com meia janela completa de cada lado: convolução 'valid' sobre o trecho necessário
+        segment = data[self.n_out - self.halflen - buffer_start:]
+        # Mesma rotina do caminho direto (convolve1d): cada ponto sai idêntico ao do espectro inteiro
+        pieces.append(_ndimage.convolve1d(segment, self._coeffs, mode='constant')[self.halflen:len(segment) - self.halflen])
+        self.n_out = self.n_in - self.halflen
+        emitted_positions = data_positions[emit_start - buffer_start:self.n_out - buffer_start]
+
+        # Guarda só a última janela (a borda final de finish() usa exatamente ela)
+        self._samples = data[-self.window_length:]
+        self._positions = data_positions[-self.window_length:]
+        return emitted_positions, np.concatenate(pieces)
+
+    def finish(self):
+        """Encerra o espectro e devolve os últimos 'meia janela' pontos (borda final)."""
+        if self.n_in < self.window_length:
+            raise ValueError("Se mode é 'interp', window_length deve ser menor ou igual ao tamanho de x.")
+        self.finished = True
+        if self.halflen == 0:
+            return _EMPTY, _EMPTY
+        self.n_out = self.n_in
+        return self._positions[-self.halflen:], self._samples @ self._edge_right.T
+
+
+class OnlineValleyTracker:
+    """Mínimo corrente dentro de [range_start, range_end] (mesmo critério de core.find_valley)."""
+
+    def __init__(self, range_start=None, range_end=None):
+        self.range_start = -np.inf if range_start is None else range_start
+        self.range_end = np.inf if range_end is None else range_end
+        self.reset()
+
+    def reset(self):
+        self.valley_wl = None
+        self.valley_intensity = None
+
+    def update(self, wavelengths, filtered):
+        """Considera novos pontos filtrados. Devolve o vale atual (comprimento de onda, intensidade) ou None."""
+        if len(filtered):
+            range_mask = (wavelengths >= self.range_start) & (wavelengths <= self.range_end)
+            if np.any(range_mask):
+                intensity_in_range = filtered[range_mask]
+                i_min = np.argmin(intensity_in_range)
+                # '<' mantém o primeiro mínimo em caso de empate, como o argmin do espectro inteiro
+                if self.valley_intensity is None or intensity_in_range[i_min] < self.valley_intensity:
+                    self.valley_wl = wavelengths[range_mask][i_min]
+                    self.valley_intensity = intensity_in_range[i_min]
+        return self.valley
+
+    @property
+    def valley(self):
+        return None if self.valley_wl is None else (self.valley_wl, self.valley_intensity)
+
+
+class StreamingValleyDetector:
+    """
+    Filtro incremental + vale online para um espectro que chega em blocos.
+    Com normalize=True a intensidade do vale é relativa ao máximo recebido até
+    agora (o filtro preserva constantes); ao final ela coincide com a do lote
+    até o arredondamento, já que o lote filtra o espectro já normalizado.
+    """
+
+    def __init__(self, window_size, poly_order, range_start=None, range_end=None, normalize=False):
+        window_size, poly_order = validate_filter_params(window_size, poly_order)
+        self.filter = StreamingSavgol(window_size, poly_order)
+        self.tracker = OnlineValleyTracker(range_start, range_end)
+        self.normalize = normalize
+        self._max = -np.inf
+
+    def reset(self):
+        self.filter.reset()
+        self.tracker.reset()
+        self._max = -np.inf
+
+    def push(self, wavelengths, intensities):
+        """Recebe um bloco (comprimentos de onda, intensidades). Devolve o vale atual ou None."""
+        intensities = np.asarray(intensities, dtype=float)
+        if self.normalize and len(intensities):
+            self._max = max(self._max, float(np.max(intensities)))
+        self.tracker.update(*self.filter.push(intensities, wavelengths))
+        return self.valley
+
+    def finish(self):
+        """Encerra o espectro (borda final do filtro). Devolve o vale final ou None."""
+        self.tracker.update(*self.filter.finish())
+        return self.valley
+
+    @property
+    def valley(self):
+        valley = self.tracker.valley
+        if valley is None or not self.normalize:
+            return valley
+        return valley[0], valley[1] - self._max
@@ -0,0 +1,195 @@
+"""
+Varredura de parâmetros do filtro (janela x ordem) sobre um lote (v14).
+
+Para cada par (janela, ordem) o lote inteiro é filtrado como uma matriz
+(filter_matrix) e os vales saem de um argmin por linha, como em
+process_batch. Só a faixa de busca, acrescida de meia janela de cada lado, é
+filtrada: dentro da faixa o resultado é idêntico ao do espectro inteiro.
+
+O resultado é uma tabela com, para cada par, o vale médio, a profundidade e
+a estabilidade entre arquivos (desvio padrão, deriva por arquivo e ruído
+ponto a ponto).
+
+Os espectros podem ser entregues em blocos (ParameterSweep.add), então a
+varredura não precisa do lote inteiro em memória.
+"""
+import numpy as np
+
+from .core import filter_matrix, has_shared_grid, range_index, resolve_range, roi_columns, validate_filter_params
+from .lazy import LazyModule
+
+pd = LazyModule('pandas')
+
+# Colunas da tabela de resultados
+SWEEP_COLUMNS = [
+    'janela',
+    'ordem',
+    'n_vales',
+    'vale_medio (nm)',
+    'vale_std (nm)',
+    'deriva (nm/arquivo)',
+    'ruido_vale (nm)',
+    'intensidade_media_vale (dB)',
+    'profundidade_media (dB)',
+    'profundidade_std (dB)',
+]
+
+
+def parse_int_list(text):
+    """
+    Lê uma lista de inteiros no formato '5,7,9', '5-45' ou '5-45:2' (passo),
+    combinados por vírgula. Devolve a lista ordenada e sem repetições.
+    """
+    values = set()
+    for part in text.replace(';', ',').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        step = 1
+        if ':' in part:
+            part, step_text = part.split(':', 1)
+            step = int(step_text)
+            if step <= 0:
+                raise ValueError(f"Passo inválido: {step_text}")
+        if '-' in part.lstrip('-'):
+            start_text, end_text = part.rsplit('-', 1)
+            values.update(range(int(start_text), int(end_text) + 1, step))
+        else:
+            values.add(int(part))
+    if not values:
+        raise ValueError("Nenhum valor informado.")
+    return sorted(values)
+
+
+def parameter_pairs(windows, orders):
+    """Pares (janela, ordem) válidos: janelas corrigidas para ímpar como na GUI, ordem menor que a janela."""
+    pairs = []
+    for window in windows:
+        for order in orders:
+            if order < 0:
+                continue
+            valid_window, valid_order = validate_filter_params(window, order)
+            if valid_order == order and (valid_window, order) not in pairs:
+                pairs.append((valid_window, order))
+    return pairs
+
+
+class ParameterSweep:
+    """Acumula, bloco a bloco, os vales de cada par (janela, ordem) e monta a tabela final."""
+
+    def __init__(self, windows, orders, range_start=None, range_end=None, normalize=False):
+        self.pairs = parameter_pairs(windows, orders)
+        if not self.pairs:
+            raise ValueError("Nenhum par (janela, ordem) válido: a ordem deve ser menor que a janela.")
+        self.range_start = range_start
+        self.range_end = range_end
+        self.normalize = normalize
+        self.n_files = 0
+        self._valley_wls = {pair: [] for pair in self.pairs}
+        self._valley_intensities = {pair: [] for pair in self.pairs}
+        self._depths = {pair: [] for pair in self.pairs}
+
+    def add(self, wavelength_list, intensity_list, cancel_event=None):
+        """
+        Processa um bloco de espectros para todos os pares. Devolve False se 'cancel_event'
+        interrompeu o bloco; só os espectros processados por todos os pares entram em 'n_files'.
+        """
+        if not intensity_list:
+            return True
+        if has_shared_grid(wavelength_list):
+            if not self._add_matrix(wavelength_list[0], np.vstack(intensity_list), cancel_event):
+                return False
+            self.n_files += len(intensity_list)
+            return True
+
+        for wavelengths, intensities in zip(wavelength_list, intensity_list):
+            if not self._add_matrix(wavelengths, intensities[np.newaxis, :], cancel_event):
+                return False
+            self.n_files += 1
+        return True
+
+    def _add_matrix(self, wavelengths, intensity_matrix, cancel_event):
+        """Vales da matriz para todos os pares; nada é guardado se o cancelamento chegar no meio."""
+        range_start, range_end = resolve_range(wavelengths, self.range_start, self.range_end)
+        index = range_index(wavelengths, range_start, range_end)
+        n_rows = intensity_matrix.shape[0]
+
+        if self.normalize: # Normaliza uma vez (máximo do espectro inteiro), antes de recortar a faixa
+            intensity_matrix = intensity_matrix - np.max(intensity_matrix, axis=1, keepdims=True)
+
+        pair_results = []
+        for pair in self.pairs:
+            if cancel_event is not None and cancel_event.is_set():
+                return False
+            window_size, poly_order = pair
+            if index is None or window_size > intensity_matrix.shape[1]:
+                nan = np.full(n_rows, np.nan)
+                pair_results.append((pair, nan, nan, nan))
+                continue
+
+            columns, local = roi_columns(intensity_matrix.shape[1], index, window_size)
+            filtered = filter_matrix(intensity_matrix[:, columns], window_size, poly_order)
+            in_range = filtered[:, local]
+            min_indices = np.argmin(in_range, axis=1)
+            valley_intensities = in_range[np.arange(n_rows), min_indices]
+            pair_results.append((pair, wavelengths[index][min_indices], valley_intensities,
+                                 np.max(in_range, axis=1) - valley_intensities))
+
+        for pair, valley_wls, valley_intensities, depths in pair_results:
+            self._valley_wls[pair].append(valley_wls)
+            self._valley_intensities[pair].append(valley_intensities)
+            self._depths[pair].append(depths)
+        return True
+
+    def valleys(self, pair):
+        """Vales (comprimentos de onda, intensidades) de um par, um por arquivo processado."""
+        return (np.concatenate(self._valley_wls[pair]) if self._valley_wls[pair] else np.empty(0),
+                np.concatenate(self._valley_intensities[pair]) if self._valley_intensities[pair] else np.empty(0))
+
+    def results(self):
+        """Tabela (DataFrame com SWEEP_COLUMNS), uma linha por par (janela, ordem)."""
+        rows = []
+        for pair in self.pairs:
+            valley_wls, valley_intensities = self.valleys(pair)
+            depths = np.concatenate(self._depths[pair]) if self._depths[pair] else np.empty(0)
+            valid = ~np.isnan(valley_wls)
+            rows.append((*pair, int(valid.sum()), *_stability(np.flatnonzero(valid), valley_wls[valid]),
+                         _nan_stat(np.mean, valley_intensities[valid]),
+                         _nan_stat(np.mean, depths[valid]), _nan_stat(np.std, depths[valid])))
+        return pd.DataFrame(rows, columns=SWEEP_COLUMNS)
+
+
+def _nan_stat(func, values):
+    return float(func(values)) if len(values) else np.nan
+
+
+def _stability(file_indices, valley_wls):
+    """Média, desvio padrão, deriva (inclinação da reta, nm/arquivo) e ruído ponto a ponto dos vales."""
+    if len(valley_wls) == 0:
+        return np.nan, np.nan, np.nan, np.nan
+    mean = float(np.mean(valley_wls))
+    std = float(np.std(valley_wls))
+    if len(valley_wls) < 2:
+        return mean, std, np.nan, np.nan
+    x = file_indices - file_indices.mean()
+    drift = float(np.dot(x, valley_wls - mean) / np.dot(x, x))
+    # Ruído sem a deriva: desvio das diferenças entre arquivos vizinhos / sqrt(2)
+    noise = float(np.std(np.diff(valley_wls)) / np.sqrt(2.0))
+    return mean, std, drift, noise
+
+
+def sweep_parameters(wavelength_list, intensity_list, windows, orders, range_start=None, range_end=None,
+                     normalize=False, chunk_rows=256, progress_callback=None, cancel_event=None):
+    """
+    Varre todos os pares (janela, ordem) sobre o lote e devolve a tabela de resultados.
+    'progress_callback(n_processados)' é chamado após cada bloco de 'chunk_rows' espectros.
+    """
+    sweep = ParameterSweep(windows, orders, range_start, range_end, normalize)
+    for chunk_start in range(0, len(intensity_list), chunk_rows):
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        if not sweep.add(wavelength_list[chunk_start:chunk_start + chunk_rows],
+                         intensity_list[chunk_start:chunk_start + chunk_rows], cancel_event):
+            break
+        if progress_callback: progress_callback(sweep.n_files)
+    return sweep.results()
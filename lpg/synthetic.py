@@ -0,0 +1,76 @@
+"""
+Espectros LPG sintéticos para benchmarks e testes manuais (v14).
+
+Gera espectros de transmissão (dB) com vales de ressonância Lorentzianos ou
+Gaussianos, ruído, deriva da linha de base e deslocamento do vale entre
+arquivos (como num ensaio de temperatura ou índice de refração). Com a mesma
+semente ('seed') o resultado é sempre o mesmo.
+"""
+import os
+
+import numpy as np
+
+# Ressonância padrão: (centro em nm, profundidade em dB, largura a meia altura em nm)
+DEFAULT_RESONANCES = ((1550.0, 15.0, 6.0),)
+
+
+def wavelength_grid(n_points, start=1500.0, stop=1600.0):
+    """Eixo de comprimento de onda uniforme, como o de uma varredura do OSA."""
+    return np.linspace(start, stop, n_points)
+
+
+def resonance_profile(wavelengths, center, fwhm, profile='lorentzian'):
+    """Forma do vale normalizada (1 no centro)."""
+    offset = (wavelengths - center) / fwhm
+    if profile == 'lorentzian':
+        return 1.0 / (1.0 + 4.0 * offset ** 2)
+    if profile == 'gaussian':
+        return np.exp(-4.0 * np.log(2.0) * offset ** 2)
+    raise ValueError("profile deve ser 'lorentzian' ou 'gaussian'.")
+
+
+def lpg_spectrum(wavelengths, resonances=DEFAULT_RESONANCES, profile='lorentzian', baseline_db=-10.0,
+                 drift_db=0.0, noise_db=0.05, rng=None):
+    """
+    Intensidade (dB) de um espectro de transmissão com os vales em 'resonances'.
+    drift_db: inclinação da linha de base de uma ponta à outra do espectro.
+    noise_db: desvio padrão do ruído branco.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    span = max(wavelengths[-1] - wavelengths[0], 1e-12)
+    intensities = baseline_db + drift_db * (wavelengths - wavelengths[0]) / span
+    for center, depth_db, fwhm in resonances:
+        intensities = intensities - depth_db * resonance_profile(wavelengths, center, fwhm, profile)
+    if noise_db:
+        intensities = intensities + rng.normal(0.0, noise_db, len(wavelengths))
+    return intensities
+
+
+def lpg_batch(n_files, n_points, resonances=DEFAULT_RESONANCES, shift_nm=0.01, profile='lorentzian',
+              baseline_db=-10.0, drift_db=0.0, noise_db=0.05, start=1500.0, stop=1600.0, seed=0):
+    """
+    Lote de espectros numa grade comum; o vale desloca 'shift_nm' por arquivo.
+    Devolve (comprimento_onda, matriz n_files x n_points, centros do primeiro vale).
+    """
+    rng = np.random.default_rng(seed)
+    wavelengths = wavelength_grid(n_points, start, stop)
+    intensity_matrix = np.empty((n_files, n_points))
+    centers = np.empty(n_files)
+    for i in range(n_files):
+        shifted = [(center + i * shift_nm, depth, fwhm) for center, depth, fwhm in resonances]
+        centers[i] = shifted[0][0]
+        intensity_matrix[i] = lpg_spectrum(wavelengths, shifted, profile, baseline_db, drift_db, noise_db, rng)
+    return wavelengths, intensity_matrix, centers
+
+
+def write_spectrum_files(directory, n_files, n_points, delimiter='\t', prefix='espectro', seed=0, **kwargs):
+    """Grava um lote sintético como arquivos de texto (duas colunas) e devolve os caminhos."""
+    os.makedirs(directory, exist_ok=True)
+    wavelengths, intensity_matrix, _ = lpg_batch(n_files, n_points, seed=seed, **kwargs)
+    width = len(str(max(n_files - 1, 0)))
+    filepaths = []
+    for i, intensities in enumerate(intensity_matrix):
+        filepath = os.path.join(directory, f"{prefix}_{i:0{width}d}.txt")
+        np.savetxt(filepath, np.column_stack((wavelengths, intensities)), delimiter=delimiter, fmt='%.6f')
+        filepaths.append(filepath)
+    return filepaths
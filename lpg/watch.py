@@ -0,0 +1,209 @@
+"""
+Observação de pasta para aquisição contínua (v14).
+
+O OSA grava um novo arquivo de espectro a cada poucos segundos. FolderWatcher
+devolve apenas os arquivos novos cujo tamanho já estabilizou; cada um é
+processado com os parâmetros atuais e só a sua linha é acrescentada ao log.
+
+Há dois modos de detectar os arquivos novos:
+
+    * notificações do sistema (inotify, FSEvents, ReadDirectoryChangesW), pelo
+      pacote opcional watchdog (pip install watchdog): cada arquivo novo custa
+      um evento e alguns os.stat até estabilizar, sem listar a pasta. Uma
+      listagem completa de segurança é feita a cada 'safety_rescan' segundos,
+      para o caso de eventos perdidos (ex: fila do inotify cheia);
+    * polling, quando o watchdog não está instalado ou não pode observar a
+      pasta (ex: compartilhamento de rede): a cada mudança na data de
+      modificação da pasta, e a cada 'rescan_every' verificações, a pasta
+      inteira é listada e filtrada pelo padrão. Esse custo cresce com o número
+      de arquivos na pasta (alguns ms para dezenas de milhares de arquivos
+      num disco local); com aquisições muito longas, prefira o watchdog ou
+      uma pasta nova por sessão.
+
+Nos dois modos os arquivos já vistos ficam num set e os que ainda não
+estabilizaram são verificados com um os.stat por chamada de poll().
+"""
+import collections
+import fnmatch
+import os
+import time
+
+from .core import filter_spectrum, filter_spectrum_roi, load_spectrum, make_log_row, make_timestamp, process_spectrum
+from .resonances import find_resonances, has_any_valley, make_resonance_row, ranges_span
+
+# Intervalo padrão entre verificações da pasta (segundos)
+DEFAULT_POLL_INTERVAL = 2.0
+
+# Intervalo entre listagens completas de segurança no modo por notificações (segundos)
+SAFETY_RESCAN_INTERVAL = 60.0
+
+WATCH_BACKENDS = ('auto', 'watchdog', 'poll')
+
+
+class _EventQueue:
+    """Recebe os eventos do watchdog (na thread do observador) e guarda os nomes dos arquivos criados."""
+
+    def __init__(self):
+        self.names = collections.deque() # append/popleft são seguros entre threads
+
+    def dispatch(self, event):
+        if event.is_directory:
+            return
+        if event.event_type == 'created':
+            self.names.append(os.path.basename(event.src_path))
+        elif event.event_type == 'moved': # Arquivo gravado com outro nome e renomeado ao final
+            self.names.append(os.path.basename(event.dest_path))
+
+
+class FolderWatcher:
+    """
+    Detecta arquivos novos numa pasta.
+    backend: 'auto' (watchdog se disponível, senão polling), 'watchdog' ou 'poll'; o modo
+    em uso fica em 'self.backend'. Chame close() ao terminar (para a thread do watchdog).
+    """
+
+    def __init__(self, directory, pattern='*.txt', include_existing=False, rescan_every=10, backend='auto',
+                 safety_rescan=SAFETY_RESCAN_INTERVAL):
+        if backend not in WATCH_BACKENDS:
+            raise ValueError(f"backend deve ser um de {WATCH_BACKENDS}.")
+        self.directory = directory
+        self.pattern = pattern
+        self.rescan_every = rescan_every
+        self.safety_rescan = safety_rescan
+        self._seen = set()
+        self._pending = {} # caminho -> (tamanho, mtime) da última verificação
+        self._dir_mtime = None
+        self._polls_since_scan = 0
+        self._events = None
+        self._observer = None
+        self._last_scan = time.monotonic()
+
+        self.backend = 'poll'
+        if backend != 'poll':
+            self._start_observer(required=(backend == 'watchdog'))
+
+        # Listagem inicial (depois de iniciado o observador): os arquivos já presentes são
+        # ignorados ou entram na fila, nos dois modos
+        if include_existing:
+            self._add_pending(self._scan())
+        else:
+            self._seen.update(self._scan())
+        self._dir_mtime = os.stat(directory).st_mtime_ns
+
+    def _start_observer(self, required):
+        """Inicia o observador do watchdog antes da primeira listagem, para não perder arquivos."""
+        try:
+            from watchdog.observers import Observer
+        except ImportError:
+            if required:
+                raise ImportError("Observar por notificações requer o pacote 'watchdog' (pip install watchdog).") from None
+            return
+
+        events = _EventQueue()
+        observer = Observer()
+        try:
+            observer.schedule(events, self.directory, recursive=False)
+            observer.start()
+        except OSError:
+            if required:
+                raise
+            return # Ex: limite de inotify atingido ou sistema de arquivos sem notificações
+        self._events = events
+        self._observer = observer
+        self.backend = 'watchdog'
+
+    def close(self):
+        """Para o observador do watchdog (no modo por polling não há nada a liberar)."""
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+
+    def _scan(self):
+        with os.scandir(self.directory) as entries:
+            return [entry.path for entry in entries
+                    if entry.is_file() and fnmatch.fnmatch(entry.name, self.pattern)]
+
+    def _add_pending(self, paths):
+        for path in paths:
+            if path not in self._seen and path not in self._pending:
+                self._pending[path] = None
+
+    def _collect_new(self):
+        """Acrescenta a '_pending' os arquivos que apareceram desde a última chamada."""
+        if self._events is not None:
+            names = self._events.names
+            new_paths = []
+            while names:
+                name = names.popleft()
+                if fnmatch.fnmatch(name, self.pattern):
+                    new_paths.append(os.path.join(self.directory, name))
+            self._add_pending(new_paths)
+            now = time.monotonic()
+            if now - self._last_scan >= self.safety_rescan:
+                self._last_scan = now
+                self._add_pending(self._scan())
+            return
+
+        dir_mtime = os.stat(self.directory).st_mtime_ns
+        self._polls_since_scan += 1
+        if dir_mtime != self._dir_mtime or self._polls_since_scan >= self.rescan_every:
+            self._dir_mtime = dir_mtime
+            self._polls_since_scan = 0
+            self._add_pending(self._scan())
+
+    def poll(self):
+        """
+        Devolve os arquivos novos prontos para leitura, em ordem de chegada.
+        Um arquivo fica pronto quando tamanho e data não mudaram desde a verificação anterior
+        (o OSA pode ainda estar escrevendo).
+        """
+        self._collect_new()
+
+        ready = []
+        for path, last_state in list(self._pending.items()):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                del self._pending[path]
+                continue
+
+            state = (stat.st_size, stat.st_mtime_ns)
+            if state == last_state and stat.st_size > 0:
+                ready.append((stat.st_mtime_ns, path))
+                del self._pending[path]
+                self._seen.add(path)
+            else:
+                self._pending[path] = state
+
+        return [path for _, path in sorted(ready)]
+
+
+def process_new_file(filepath, window_size, poly_order, range_start, range_end, normalize,
+                     sample_name, read_func=load_spectrum, ranges=None, min_prominence=0.0, roi=False):
+    """
+    Processa um arquivo recém-chegado. Devolve a linha do log (dict) ou None se não houver vale.
+    Com 'ranges' (ressonâncias nomeadas, lpg.resonances), a linha traz um vale por faixa.
+    'roi': filtra só a faixa de busca (ou das ressonâncias) mais meia janela, como no lote.
+    """
+    wavelengths, intensities = read_func(filepath)
+    if ranges:
+        if roi:
+            filtered = filter_spectrum_roi(wavelengths, intensities, window_size, poly_order, *ranges_span(ranges),
+                                           normalize)
+        else:
+            filtered = filter_spectrum(intensities, window_size, poly_order, normalize)
+        resonances = find_resonances(wavelengths, filtered, ranges, min_prominence)
+        if not has_any_valley(resonances):
+            return None
+        return make_resonance_row(make_timestamp(with_millis=True), resonances, sample_name,
+                                  os.path.basename(filepath))
+
+    _, valley_result = process_spectrum(wavelengths, intensities, window_size, poly_order,
+                                        range_start, range_end, normalize, roi)
+    if valley_result is None:
+        return None
+
+    valley_wl, valley_intensity = valley_result
+    return make_log_row(make_timestamp(with_millis=True), valley_wl, valley_intensity,
+                        sample_name, os.path.basename(filepath))
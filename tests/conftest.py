@@ -0,0 +1,16 @@
+import pytest
+
+from lpg.synthetic import lpg_batch, write_spectrum_files
+
+
+@pytest.fixture
+def batch():
+    """Lote sintético numa grade comum: (comprimentos de onda, matriz arquivos x pontos)."""
+    wavelengths, intensity_matrix, _ = lpg_batch(8, 3000, seed=1)
+    return wavelengths, intensity_matrix
+
+
+@pytest.fixture
+def spectrum_files(tmp_path):
+    """Seis arquivos de espectro (duas colunas, tab) numa pasta temporária."""
+    return write_spectrum_files(str(tmp_path / 'espectros'), 6, 1500, seed=2)
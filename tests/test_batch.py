@@ -0,0 +1,77 @@
+import threading
+
+import numpy as np
+
+from lpg import core
+
+
+def _per_file(wavelength_list, intensity_list, window_size, poly_order, range_start, range_end, normalize=False):
+    return [core.process_spectrum(wavelengths, intensities, window_size, poly_order, range_start, range_end,
+                                  normalize)[1]
+            for wavelengths, intensities in zip(wavelength_list, intensity_list)]
+
+
+def test_shared_grid_matches_per_file_path(batch):
+    wavelengths, intensity_matrix = batch
+    wavelength_list = [wavelengths] * len(intensity_matrix)
+    intensity_list = list(intensity_matrix)
+    for normalize in (False, True):
+        results = core.process_batch(wavelength_list, intensity_list, 31, 3, 1530, 1570, normalize, chunk_rows=3)
+        assert results == _per_file(wavelength_list, intensity_list, 31, 3, 1530, 1570, normalize)
+
+
+def test_filtered_callback_delivers_every_row(batch):
+    wavelengths, intensity_matrix = batch
+    delivered = {}
+    core.process_batch([wavelengths] * len(intensity_matrix), list(intensity_matrix), 31, 3, 1530, 1570,
+                       chunk_rows=3, filtered_callback=lambda first, wl, m: delivered.update(
+                           {first + k: row for k, row in enumerate(m)}))
+    assert sorted(delivered) == list(range(len(intensity_matrix)))
+    for i, row in delivered.items():
+        np.testing.assert_allclose(row, core.filter_spectrum(intensity_matrix[i], 31, 3), rtol=0, atol=1e-12)
+
+
+def test_different_grids_fall_back_to_per_file(batch):
+    wavelengths, intensity_matrix = batch
+    wavelength_list = [wavelengths + 0.01 * i for i in range(len(intensity_matrix))]
+    intensity_list = list(intensity_matrix)
+    assert not core.has_shared_grid(wavelength_list)
+    results = core.process_batch(wavelength_list, intensity_list, 31, 3, 1530, 1570)
+    assert results == _per_file(wavelength_list, intensity_list, 31, 3, 1530, 1570)
+
+
+def test_range_outside_spectrum_gives_none(batch):
+    wavelengths, intensity_matrix = batch
+    results = core.process_batch([wavelengths] * 3, list(intensity_matrix[:3]), 31, 3, 1700, 1800)
+    assert results == [None, None, None]
+    assert core.process_batch([], [], 31, 3, 1530, 1570) == []
+
+
+def test_cancel_between_chunks_keeps_finished_rows(batch):
+    wavelengths, intensity_matrix = batch
+    cancel_event = threading.Event()
+    progress = []
+
+    def on_progress(n_done):
+        progress.append(n_done)
+        if n_done >= 3: cancel_event.set()
+
+    results = core.process_batch([wavelengths] * len(intensity_matrix), list(intensity_matrix), 31, 3, 1530, 1570,
+                                 chunk_rows=3, progress_callback=on_progress, cancel_event=cancel_event)
+    assert progress == [3]
+    assert results == core.process_batch([wavelengths] * 3, list(intensity_matrix[:3]), 31, 3, 1530, 1570)
+
+
+def test_cancel_on_per_file_path(batch):
+    wavelengths, intensity_matrix = batch
+    cancel_event = threading.Event()
+    progress = []
+
+    def on_progress(n_done):
+        progress.append(n_done)
+        if n_done == 2: cancel_event.set()
+
+    wavelength_list = [wavelengths + 0.01 * i for i in range(len(intensity_matrix))]
+    results = core.process_batch(wavelength_list, list(intensity_matrix), 31, 3, 1530, 1570,
+                                 progress_callback=on_progress, cancel_event=cancel_event)
+    assert progress == [1, 2] and len(results) == 2
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from lpg.batch_export import BatchExportWriter, export_format, make_export_params, open_batch_export
+
+FORMATS = ['lote.npz', 'lote.h5', 'lote.parquet']
+OPTIONAL_PACKAGES = {'lote.h5': 'h5py', 'lote.parquet': 'pyarrow'}
+
+
+def _write(filepath, wavelengths, original, filtered, chunk_rows=4, sizes=(3, 1, 6, 2)):
+    params = make_export_params(21, 3, 1530.0, 1570.0, False)
+    metadata = pd.DataFrame({'arquivo': [f"e{i}.txt" for i in range(len(original))],
+                             'vale (nm)': np.linspace(1550.0, 1551.0, len(original))})
+    with BatchExportWriter(filepath, wavelengths, params, chunk_rows=chunk_rows) as writer:
+        start = 0
+        for size in sizes:
+            writer.append(original[start:start + size], filtered[start:start + size],
+                          metadata.iloc[start:start + size], wavelengths=wavelengths)
+            start += size
+    return params, metadata
+
+
+@pytest.mark.parametrize('name', FORMATS)
+def test_every_slice_round_trips(batch, tmp_path, name):
+    if name in OPTIONAL_PACKAGES:
+        pytest.importorskip(OPTIONAL_PACKAGES[name])
+    wavelengths, intensity_matrix = batch
+    original = np.vstack([intensity_matrix, intensity_matrix[:4] + 1.0]) # 12 espectros, 3 blocos de 4
+    filtered = original * 0.5
+    filepath = str(tmp_path / name)
+    params, metadata = _write(filepath, wavelengths, original, filtered)
+
+    with open_batch_export(filepath) as export:
+        assert len(export) == 12 and export.params == params
+        np.testing.assert_array_equal(export.wavelengths, wavelengths)
+        pd.testing.assert_frame_equal(export.metadata, metadata, check_dtype=False)
+        for i in range(13):
+            for j in range(i, 13):
+                np.testing.assert_array_equal(export.read(i, j), filtered[i:j])
+        np.testing.assert_array_equal(export.read(kind='original'), original)
+        np.testing.assert_array_equal(export.spectrum(-1, kind='original'), original[-1])
+        with pytest.raises(IndexError):
+            export.spectrum(12)
+        with pytest.raises(ValueError):
+            export.read(kind='suavizado')
+
+
+def test_mismatched_grid_and_shapes_are_rejected(batch, tmp_path):
+    wavelengths, intensity_matrix = batch
+    with BatchExportWriter(str(tmp_path / 'lote.npz'), wavelengths) as writer:
+        with pytest.raises(ValueError):
+            writer.append(intensity_matrix[:2], intensity_matrix[:2], wavelengths=wavelengths + 1.0)
+        with pytest.raises(ValueError):
+            writer.append(intensity_matrix[:2, :-1], intensity_matrix[:2, :-1])
+        with pytest.raises(ValueError):
+            writer.append(intensity_matrix[:2], intensity_matrix[:2], metadata=[{'arquivo': 'a'}])
+        writer.append(intensity_matrix[0], intensity_matrix[0]) # Um espectro 1-D vira uma linha
+    with open_batch_export(str(tmp_path / 'lote.npz')) as export:
+        assert len(export) == 1
+
+
+def test_unknown_extension():
+    assert export_format('LOTE.HDF5') == 'hdf5'
+    with pytest.raises(ValueError):
+        export_format('lote.mat')
@@ -0,0 +1,57 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from lpg import cli, core
+
+
+def test_batch_to_csv_log(spectrum_files, tmp_path):
+    log_path = str(tmp_path / 'log.csv')
+    directory = os.path.dirname(spectrum_files[0])
+    assert cli.main([directory, '--start', '1530', '--end', '1570', '--sample', 'S1', '--log', log_path,
+                     '--no-cache', '-j', '1']) == 0
+
+    df_log = pd.read_csv(log_path, sep=';')
+    assert list(df_log['arquivo_origem']) == [os.path.basename(fp) for fp in spectrum_files]
+    assert set(df_log['amostra']) == {'S1'}
+    wavelengths, intensities = core.load_spectrum(spectrum_files[0])
+    valley_wl, _ = core.process_spectrum(wavelengths, intensities, 21, 3, 1530, 1570)[1]
+    assert df_log['comprimento_onda_filtrado (nm)'][0] == pytest.approx(valley_wl)
+
+
+def test_stdout_without_log_and_roi_gives_same_valleys(spectrum_files, capsys):
+    directory = os.path.dirname(spectrum_files[0])
+    outputs = []
+    for extra in ([], ['--roi']):
+        assert cli.main([directory, '--start', '1530', '--end', '1570', '--no-cache', '-j', '1'] + extra) == 0
+        outputs.append(pd.read_csv(io.StringIO(capsys.readouterr().out), sep=';'))
+
+    assert len(outputs[0]) == len(spectrum_files)
+    columns = ['comprimento_onda_filtrado (nm)', 'intensidade_filtrada_vale (dB)', 'arquivo_origem']
+    pd.testing.assert_frame_equal(outputs[0][columns], outputs[1][columns])
+
+
+def test_invalid_range_is_rejected(spectrum_files):
+    with pytest.raises(SystemExit):
+        cli.main([spectrum_files[0], '--start', '1600', '--end', '1500'])
+
+
+def test_sweep_skips_unreadable_files(spectrum_files, tmp_path, capsys):
+    directory = os.path.dirname(spectrum_files[0])
+    with open(os.path.join(directory, 'corrompido.txt'), 'w') as f:
+        f.write("sem dados\n")
+    output = str(tmp_path / 'varredura.csv')
+    assert cli.main([directory, '--start', '1530', '--end', '1570', '--sweep-windows', '21,31', '--sweep-orders', '3',
+                     '--sweep-output', output, '--no-cache']) == 2
+    assert 'corrompido.txt' in capsys.readouterr().err
+
+    df_sweep = pd.read_csv(output, sep=';')
+    assert list(df_sweep['janela']) == [21, 31] and list(df_sweep['n_vales']) == [len(spectrum_files)] * 2
+
+
+@pytest.mark.parametrize('option', [['--roi'], ['-j', '4']])
+def test_sweep_rejects_options_it_does_not_use(spectrum_files, option):
+    with pytest.raises(SystemExit):
+        cli.main([spectrum_files[0], '--sweep-windows', '21,31', '--no-cache'] + option)
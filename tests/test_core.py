@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.signal
+
+from lpg import core
+
+
+def test_validate_filter_params_corrects_like_the_gui():
+    assert core.validate_filter_params(20, 3) == (21, 3)
+    assert core.validate_filter_params(5, 7) == (5, 3)
+    assert core.validate_filter_params(5, 0) == (5, 1)
+
+
+@pytest.mark.parametrize('window_size', [31, 151]) # Convolução direta e por FFT
+def test_process_spectrum_matches_scipy_reference(batch, window_size):
+    # O filtro com kernels em cache difere do scipy só no arredondamento (tolerância fixada aqui)
+    wavelengths, intensity_matrix = batch
+    intensities = intensity_matrix[0]
+    filtered, (valley_wl, valley_intensity) = core.process_spectrum(wavelengths, intensities, window_size, 3, 1530, 1570)
+
+    reference = scipy.signal.savgol_filter(intensities, window_size, 3)
+    np.testing.assert_allclose(filtered, reference, rtol=0, atol=1e-12 * np.abs(intensities).max())
+    in_range = (wavelengths >= 1530) & (wavelengths <= 1570)
+    i_min = np.argmin(reference[in_range])
+    assert valley_wl == wavelengths[in_range][i_min]
+    assert valley_intensity == pytest.approx(reference[in_range][i_min], abs=1e-10)
+
+
+def test_scipy_method_is_bit_identical_to_scipy(batch, monkeypatch):
+    import lpg.savgol
+    exact = lpg.savgol.SavgolFilter(method='scipy')
+    monkeypatch.setattr(lpg.savgol, 'default_filter', exact)
+    monkeypatch.setattr(core, 'default_filter', exact)
+    wavelengths, intensity_matrix = batch
+    for window_size in (31, 151):
+        for normalize in (False, True):
+            expected = intensity_matrix - intensity_matrix.max(axis=1, keepdims=True) if normalize else intensity_matrix
+            expected = [scipy.signal.savgol_filter(row, window_size, 3) for row in expected]
+            np.testing.assert_array_equal(core.filter_matrix(intensity_matrix, window_size, 3, normalize), expected)
+            np.testing.assert_array_equal(core.filter_spectrum(intensity_matrix[0], window_size, 3, normalize), expected[0])
+
+            index = core.range_index(wavelengths, 1530, 1570)
+            roi = core.filter_spectrum_roi(wavelengths, intensity_matrix[0], window_size, 3, 1530, 1570, normalize)
+            np.testing.assert_array_equal(roi[index], expected[0][index])
+
+    with pytest.raises(ValueError):
+        lpg.savgol.SavgolFilter(method='numba')
+
+
+def test_filter_spectrum_normalizes_to_the_peak(batch):
+    intensities = batch[1][0]
+    normalized = core.filter_spectrum(intensities, 21, 3, normalize=True)
+    np.testing.assert_array_equal(normalized, core.filter_spectrum(intensities - intensities.max(), 21, 3))
+    assert intensities.max() == batch[1][0].max() # A entrada não é alterada
+
+
+def test_find_valley_outside_spectrum_is_none(batch):
+    wavelengths, intensity_matrix = batch
+    assert core.find_valley(wavelengths, intensity_matrix[0], 1700, 1800) is None
+
+
+def test_process_files_pool_matches_single_process(spectrum_files, tmp_path):
+    broken = tmp_path / 'quebrado.txt'
+    broken.write_text("sem dados aqui\n")
+    filepaths = spectrum_files[:3] + [str(broken)] + spectrum_files[3:]
+
+    serial = list(core.process_files(filepaths, 21, 3, 1530, 1570, workers=1, chunksize=2))
+    pooled = list(core.process_files(filepaths, 21, 3, 1530, 1570, workers=2, chunksize=2))
+
+    assert [fp for fp, _, _ in serial] == filepaths
+    assert serial == pooled
+    assert serial[3][1] is None and serial[3][2]
+    for filepath, valley, error in serial[:3] + serial[4:]:
+        wavelengths, intensities = core.load_spectrum(filepath)
+        assert error is None
+        assert valley == core.process_spectrum(wavelengths, intensities, 21, 3, 1530, 1570)[1]
+
+
+def test_append_to_log_xlsx_rewrites_with_previous_rows(tmp_path):
+    log_path = str(tmp_path / 'log.xlsx')
+    for name in ('a.txt', 'b.txt'):
+        row = core.make_log_row(core.make_timestamp(), 1550.0, -20.0, 'S1', name)
+        core.append_to_log(pd.DataFrame([row], columns=core.LOG_COLUMNS), log_path)
+
+    df_log = pd.read_excel(log_path)
+    assert list(df_log.columns) == core.LOG_COLUMNS
+    assert list(df_log['arquivo_origem']) == ['a.txt', 'b.txt']
+    assert os.path.getsize(log_path) > 0
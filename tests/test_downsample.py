@@ -0,0 +1,91 @@
+import warnings
+
+import numpy as np
+
+from lpg import downsample
+
+
+def test_minmax_keeps_every_block_extreme_in_order():
+    rng = np.random.default_rng(0)
+    x = np.arange(10_007, dtype=float)
+    y = rng.normal(size=x.size)
+    y[5000] = -50.0 # Vale estreito de um ponto só
+    x_dec, y_dec = downsample.minmax_decimate(x, y, 100)
+
+    assert len(x_dec) <= 2 * 100 + 4
+    assert np.all(np.diff(x_dec) > 0)
+    assert x_dec[0] == x[0] and x_dec[-1] == x[-1]
+    assert y_dec.min() == y.min() == -50.0 and y_dec.max() == y.max()
+    np.testing.assert_array_equal(y_dec, y[x_dec.astype(int)])
+
+
+def test_minmax_short_series_is_unchanged():
+    x = np.arange(50.0)
+    x_dec, y_dec = downsample.minmax_decimate(x, x ** 2, 100)
+    assert x_dec is x and len(y_dec) == 50
+
+
+def test_decimate_for_view_covers_visible_part_plus_one_point():
+    x = np.linspace(1500.0, 1600.0, 100_000)
+    y = np.sin(x)
+    x_view, _, (start, end) = downsample.decimate_for_view(x, y, 1540.0, 1560.0, 500)
+    assert x[start] < 1540.0 <= x[start + 1] and x[end - 2] <= 1560.0 < x[end - 1]
+    assert x_view[0] == x[start] and x_view[-1] == x[end - 1]
+    assert len(x_view) <= 2 * 500 + 4
+
+    assert downsample.visible_range(x[::-1], 1540.0, 1560.0, x_sorted=False) == (0, len(x))
+    assert downsample.is_sorted(x) and not downsample.is_sorted(x[::-1])
+
+
+def _lttb_reference(x, y, n_out):
+    """LTTB ponto a ponto, como no artigo original (mesmos limites de bloco)."""
+    n_points = len(y)
+    every = (n_points - 2) / (n_out - 2)
+    indices = [0]
+    a = 0
+    for i in range(n_out - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n_points)
+        if i == n_out - 3: next_start, next_end = n_points - 1, n_points
+        mean_x, mean_y = np.mean(x[next_start:next_end]), np.mean(y[next_start:next_end])
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((x[a] - mean_x) * (y[j] - y[a]) - (x[a] - x[j]) * (mean_y - y[a]))
+            if area > best_area: best, best_area = j, area
+        indices.append(best)
+        a = best
+    return np.array(indices + [n_points - 1])
+
+
+def test_lttb_matches_reference_and_keeps_spikes():
+    rng = np.random.default_rng(3)
+    x = np.cumsum(rng.uniform(0.5, 1.5, 5_003))
+    y = np.cumsum(rng.normal(size=x.size))
+    y[2500] += 200.0 # Pico isolado
+    for n_out in (3, 10, 333, 1000):
+        indices = downsample.lttb_indices(x, y, n_out)
+        np.testing.assert_array_equal(indices, _lttb_reference(x, y, n_out))
+        assert len(indices) == n_out and np.all(np.diff(indices) > 0)
+    assert 2500 in downsample.lttb_indices(x, y, 333)
+
+
+def test_lttb_short_series_and_view():
+    assert list(downsample.lttb_indices(np.arange(5.0), np.arange(5.0), 10)) == [0, 1, 2, 3, 4]
+    assert list(downsample.lttb_indices(np.arange(5.0), np.arange(5.0), 2)) == [0, 1, 2, 3, 4]
+
+    x = np.arange(100_000.0)
+    y = np.sin(x / 500.0)
+    indices, (start, end) = downsample.lttb_for_view(x, y, 20_000.0, 30_000.0, 200)
+    assert (start, end) == (19_999, 30_002)
+    assert indices[0] == start and indices[-1] == end - 1 and len(indices) == 200
+
+
+def test_fill_nan_without_warnings():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error') # np.nanmean avisaria com tudo NaN
+        assert list(downsample.fill_nan(np.array([1.0, np.nan, 3.0]))) == [1.0, 2.0, 3.0]
+        assert list(downsample.fill_nan(np.full(3, np.nan))) == [0.0, 0.0, 0.0]
+        assert len(downsample.fill_nan(np.empty(0))) == 0
+        x = np.arange(10.0)
+        assert downsample.fill_nan(x) is x
+        assert list(downsample.lttb_indices(x, downsample.fill_nan(np.full(10, np.nan)), 4))[0] == 0
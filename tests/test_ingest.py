@@ -0,0 +1,129 @@
+import socket
+import time
+
+import numpy as np
+import pytest
+
+from lpg import ingest
+from lpg.core import process_batch
+from lpg.loader import read_spectrum
+from lpg.synthetic import lpg_batch
+
+
+@pytest.fixture
+def server():
+    server = ingest.SpectrumServer(port=0).start()
+    yield server
+    server.stop()
+
+
+def _send(server, *messages, chunk_size=None):
+    with socket.create_connection((server.host, server.port)) as sock:
+        for message in messages:
+            if chunk_size is None:
+                sock.sendall(message)
+            else: # Quadros e linhas cortados em pedaços arbitrários
+                for i in range(0, len(message), chunk_size):
+                    sock.sendall(message[i:i + chunk_size])
+        sock.shutdown(socket.SHUT_WR)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+@pytest.mark.parametrize('chunk_size', [None, 7, 1000])
+def test_binary_frames_round_trip(server, batch, chunk_size):
+    wavelengths, intensity_matrix = batch
+    _send(server, *(ingest.encode_spectrum(wavelengths, row, f"espectro_{i}.txt")
+                    for i, row in enumerate(intensity_matrix[:4])), chunk_size=chunk_size)
+    _wait_for(lambda: server.received == 4)
+    received = server.take()
+    assert [name for name, _, _ in received] == [f"espectro_{i}.txt" for i in range(4)]
+    for (_, wl, intensities), expected in zip(received, intensity_matrix):
+        np.testing.assert_array_equal(wl, wavelengths)
+        np.testing.assert_array_equal(intensities, expected)
+    assert server.errors == 0 and server.pending() == 0
+
+
+@pytest.mark.parametrize('chunk_size', [None, 5, 4096])
+def test_text_spectra_round_trip(server, batch, chunk_size):
+    wavelengths, intensity_matrix = batch
+    messages = [ingest.encode_spectrum_text(wavelengths, intensity_matrix[0], 'a.txt'),
+                ingest.encode_spectrum_text(wavelengths, intensity_matrix[1])]
+    messages.append(messages[0].rstrip(b'\n')) # Último espectro sem linha em branco no fim
+    _send(server, *messages, chunk_size=chunk_size)
+    _wait_for(lambda: server.received == 3)
+    received = server.take()
+    assert [name for name, _, _ in received] == ['a.txt', 'tcp_000002', 'a.txt']
+    for (_, wl, intensities), expected in zip(received, intensity_matrix[[0, 1, 0]]):
+        np.testing.assert_allclose(wl, wavelengths, rtol=1e-9)
+        np.testing.assert_allclose(intensities, expected, rtol=1e-9)
+
+
+def test_invalid_frame_closes_only_its_connection(server, batch):
+    wavelengths, intensity_matrix = batch
+    frame = ingest.encode_spectrum(wavelengths, intensity_matrix[0], 'ok')
+    _send(server, frame, b'XXXX' + frame[4:])
+    _send(server, frame[:len(frame) // 2])
+    _wait_for(lambda: server.errors == 2)
+    _send(server, frame)
+    _wait_for(lambda: server.received == 2)
+    assert [name for name, _, _ in server.take()] == ['ok', 'ok']
+
+
+def test_full_queue_holds_the_sender(batch):
+    wavelengths, intensity_matrix = batch
+    server = ingest.SpectrumServer(port=0, max_pending=2).start()
+    try:
+        _send(server, *(ingest.encode_spectrum(wavelengths, row) for row in intensity_matrix[:5]))
+        _wait_for(lambda: server.pending() == 2)
+        time.sleep(0.05)
+        assert server.received == 2
+        taken = server.take()
+        _wait_for(lambda: server.received == 4)
+        taken += server.take()
+        _wait_for(lambda: server.received == 5)
+        taken += server.take()
+    finally:
+        server.stop()
+    for (_, _, intensities), expected in zip(taken, intensity_matrix[:5]):
+        np.testing.assert_array_equal(intensities, expected)
+
+
+@pytest.mark.parametrize('text', [False, True])
+def test_replay_files_delivers_every_file(server, spectrum_files, text):
+    n_sent, _ = ingest.replay_files(spectrum_files, server.host, server.port, rate=0, text=text, repeat=2)
+    assert n_sent == 2 * len(spectrum_files)
+    _wait_for(lambda: server.received == n_sent)
+    received = server.take()
+    for (name, wl, intensities), filepath in zip(received, spectrum_files * 2):
+        expected_wl, expected_intensities = read_spectrum(filepath)
+        assert name == filepath.rsplit('/', 1)[-1]
+        np.testing.assert_allclose(wl, expected_wl, rtol=1e-9)
+        np.testing.assert_allclose(intensities, expected_intensities, rtol=1e-9)
+
+
+def test_process_received_matches_batch():
+    wavelengths, intensity_matrix, _ = lpg_batch(5, 2000, seed=4)
+    spectra = [(f"s{i}", wavelengths, row) for i, row in enumerate(intensity_matrix)]
+    rows = ingest.process_received(spectra, 31, 3, 1530, 1570, False, 'S1')
+    expected = process_batch([wavelengths] * 5, list(intensity_matrix), 31, 3, 1530, 1570, False)
+    assert [row['arquivo_origem'] for row in rows] == [f"s{i}" for i in range(5)]
+    assert [(row['comprimento_onda_filtrado (nm)'], row['intensidade_filtrada_vale (dB)']) for row in rows] == expected
+    assert ingest.process_received(spectra, 31, 3, 1700, 1800, False, 'S1') == [None] * 5
+    assert ingest.process_received([], 31, 3, 1530, 1570, False, 'S1') == []
+
+
+def test_parse_address():
+    assert ingest.parse_address('10.0.0.2:6000') == ('10.0.0.2', 6000)
+    assert ingest.parse_address('osa') == ('osa', ingest.DEFAULT_INGEST_PORT)
+    assert ingest.parse_address(':7000') == (ingest.DEFAULT_INGEST_HOST, 7000)
+
+
+def test_encode_rejects_mismatched_lengths():
+    with pytest.raises(ValueError):
+        ingest.encode_spectrum(np.arange(3.0), np.arange(4.0))
@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import lpg
+from lpg.lazy import LazyModule, preload
+from lpg.profiling import StartupTimer
+
+
+def test_lazy_module_imports_on_first_attribute():
+    json_module = LazyModule('json')
+    assert 'não carregado' in repr(json_module)
+    assert json_module.dumps([1]) == '[1]'
+    assert 'dumps' in json_module.__dict__ and "'json' (carregado)" in repr(json_module)
+    with pytest.raises(ModuleNotFoundError):
+        LazyModule('modulo_que_nao_existe').algo
+
+
+def test_preload_reports_failed_imports():
+    done = threading.Event()
+    errors = {}
+    preload('json', 'modulo_que_nao_existe', on_done=lambda e: (errors.update(e), done.set()))
+    assert done.wait(10)
+    assert list(errors) == ['modulo_que_nao_existe']
+
+
+def test_every_export_resolves():
+    for name in lpg.__all__:
+        assert getattr(lpg, name) is not None
+    with pytest.raises(AttributeError):
+        lpg.nao_exportado
+
+
+def test_core_and_cli_imports_do_not_load_heavy_modules():
+    code = ("import sys, lpg.core, lpg.savgol, lpg.logstore, lpg.cli\n"
+            "print(sorted(m for m in ('pandas', 'scipy.signal', 'matplotlib') if m in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+    assert output.strip() == '[]'
+
+
+def test_startup_timer_marks_in_order():
+    timer = StartupTimer(start=0.0)
+    timer.marks = [('imports', 0.2), ('janela', 0.5)]
+    assert timer.elapsed('janela') == 0.5 and timer.elapsed('figuras') is None
+    assert timer.format_report().splitlines() == ['imports: 200 ms (+200 ms)', 'janela: 500 ms (+300 ms)']
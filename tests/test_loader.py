@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from lpg import loader
+from lpg.core import load_spectrum_loadtxt
+
+WAVELENGTHS = np.round(np.linspace(1500.0, 1600.0, 50), 4)
+INTENSITIES = np.round(-20.0 - 5.0 * np.sin(WAVELENGTHS / 7.0), 4)
+
+
+def _write(tmp_path, name, lines):
+    path = tmp_path / name
+    path.write_text('\n'.join(lines) + '\n', encoding='latin-1')
+    return str(path)
+
+
+def _rows(delimiter, decimal=','):
+    rows = [f"{wl:.4f}{delimiter}{inten:.4f}" for wl, inten in zip(WAVELENGTHS, INTENSITIES)]
+    return [r.replace('.', decimal) for r in rows] if decimal != '.' else rows
+
+
+@pytest.mark.parametrize('lines', [
+    _rows('\t', '.'),
+    _rows(',', '.'),
+    _rows(';', ','),
+    _rows(' ', ','),
+    [f"{wl:.4f}  {inten:.4f}  0.0" for wl, inten in zip(WAVELENGTHS, INTENSITIES)],
+    ['"Instrumento: OSA"', 'Resolução: 0.02 nm', '[Dados]'] + _rows(';', '.') + ['[Fim]', 'Total: 50'],
+])
+def test_formats_are_read_like_the_original(tmp_path, lines):
+    wavelengths, intensities = loader.read_spectrum(_write(tmp_path, 'espectro.txt', lines))
+    np.testing.assert_array_equal(wavelengths, WAVELENGTHS)
+    np.testing.assert_array_equal(intensities, INTENSITIES)
+
+
+def test_large_file_reads_from_disk_and_matches_loadtxt(tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, 'HEAD_BYTES', 256)
+    monkeypatch.setattr(loader, 'TAIL_BYTES', 128)
+    filepath = _write(tmp_path, 'grande.txt', ['# OSA'] + _rows('\t', '.'))
+    wavelengths, intensities = loader.read_spectrum(filepath)
+    original = load_spectrum_loadtxt(filepath)
+    np.testing.assert_array_equal(wavelengths, original[0])
+    np.testing.assert_array_equal(intensities, original[1])
+
+
+def test_text_without_data_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        loader.read_spectrum(_write(tmp_path, 'vazio.txt', ['cabeçalho', 'sem números']))
+
+
+def test_load_spectra_keeps_order_across_threads(spectrum_files):
+    threaded = loader.load_spectra(spectrum_files, workers=4)
+    serial = loader.load_spectra(spectrum_files, workers=1)
+    for (wl_a, in_a), (wl_b, in_b) in zip(threaded, serial):
+        np.testing.assert_array_equal(wl_a, wl_b)
+        np.testing.assert_array_equal(in_a, in_b)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from lpg import log_analysis
+from lpg.core import LOG_COLUMNS, append_to_log, make_log_row
+
+DRIFT_NM_PER_HOUR = 0.05
+T0 = pd.Timestamp('2026-03-01 08:00:00').value / 1e9
+
+
+def _write_log(filepath, n_rows=2000, step_s=30.0, shuffle=False):
+    """Log com o vale derivando DRIFT_NM_PER_HOUR, mais duas linhas inválidas."""
+    times = T0 + np.arange(n_rows) * step_s
+    wavelengths = 1550.0 + DRIFT_NM_PER_HOUR * (times - T0) / 3600.0
+    rows = [make_log_row(pd.Timestamp(t, unit='s').strftime('%Y-%m-%d %H:%M:%S.%f')[:-3], wl, -20.0 - i % 3, 'S1',
+                         f"{i}.txt") for i, (t, wl) in enumerate(zip(times, wavelengths))]
+    rows.append(make_log_row('sem horário', 1550.0, -20.0, 'S1', 'x.txt'))
+    rows.append(make_log_row('2026-03-01 09:00:00', np.nan, np.nan, 'S1', 'sem_vale.txt'))
+    if shuffle:
+        rows = [rows[i] for i in np.random.default_rng(0).permutation(len(rows))]
+    append_to_log(pd.DataFrame(rows, columns=LOG_COLUMNS), filepath)
+    return times, wavelengths
+
+
+@pytest.mark.parametrize('name', ['log.csv', 'log.sqlite', 'log.xlsx'])
+def test_read_log_series_sorts_and_drops_invalid_rows(tmp_path, name):
+    if name.endswith('.xlsx'):
+        pytest.importorskip('openpyxl')
+    filepath = str(tmp_path / name)
+    times, wavelengths = _write_log(filepath, n_rows=300, shuffle=True)
+    progress = []
+    series = log_analysis.read_log_series(filepath, chunk_rows=100, progress_callback=progress.append)
+    assert len(series) == 300 and progress[-1] == 302
+    np.testing.assert_allclose(series.times, times, atol=1e-3)
+    np.testing.assert_allclose(series.wavelengths, wavelengths, atol=1e-9)
+
+
+def test_csv_readers_agree(tmp_path, monkeypatch):
+    filepath = str(tmp_path / 'log.csv')
+    _write_log(filepath)
+    series = log_analysis.read_log_series(filepath)
+
+    def no_arrow(filepath):
+        raise ImportError("pyarrow")
+        yield
+
+    monkeypatch.setattr(log_analysis, '_iter_arrow_arrays', no_arrow)
+    fallback = log_analysis.read_log_series(filepath, chunk_rows=333)
+    np.testing.assert_allclose(fallback.times, series.times, atol=1e-6)
+    np.testing.assert_array_equal(fallback.wavelengths, series.wavelengths)
+    np.testing.assert_array_equal(fallback.intensities, series.intensities)
+
+
+def test_drift_rate_and_summary(tmp_path):
+    filepath = str(tmp_path / 'log.csv')
+    times, wavelengths = _write_log(filepath)
+    assert log_analysis.drift_rate(times, wavelengths) == pytest.approx(DRIFT_NM_PER_HOUR, rel=1e-6)
+    assert np.isnan(log_analysis.drift_rate(times[:1], wavelengths[:1]))
+    assert np.isnan(log_analysis.drift_rate(np.zeros(3), np.ones(3)))
+
+    series = log_analysis.read_log_series(filepath)
+    t_min, t_max = times[100], times[219]
+    summary = series.summary(t_min, t_max)
+    assert summary['n'] == 120 and series.view(t_min, t_max) == (100, 220)
+    assert summary['media_wl'] == pytest.approx(wavelengths[100:220].mean())
+    assert summary['deriva_wl'] == pytest.approx(DRIFT_NM_PER_HOUR, rel=1e-4)
+    assert summary['media_int'] == pytest.approx(-21.0, abs=0.01)
+    assert series.summary(0, 1)['n'] == 0
+
+
+def test_rolling_statistics_follow_the_time_window(tmp_path):
+    filepath = str(tmp_path / 'log.csv')
+    _, wavelengths = _write_log(filepath)
+    series = log_analysis.read_log_series(filepath)
+    stats = series.rolling(window_hours=1.0)
+    per_window = int(3600 / 30) # Registros dentro de uma hora (janela aberta à esquerda)
+    i = 1000
+    np.testing.assert_allclose(stats['media_wl'][i], wavelengths[i - per_window + 1:i + 1].mean(), rtol=1e-12)
+    np.testing.assert_allclose(stats['std_wl'][i], wavelengths[i - per_window + 1:i + 1].std(ddof=1), rtol=1e-6)
+    np.testing.assert_allclose(stats['deriva_wl'][per_window:], DRIFT_NM_PER_HOUR, rtol=1e-4)
+    assert np.isnan(stats['deriva_wl'][0])
+
+    empty = log_analysis.LogSeries(np.empty(0), np.empty(0), np.empty(0)).rolling()
+    assert all(len(values) == 0 for values in empty.values())
+
+
+def test_missing_log_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        log_analysis.read_log_series(str(tmp_path / 'nao_existe.csv'))
@@ -0,0 +1,178 @@
+import threading
+import time
+
+import sqlite3
+
+import pytest
+
+from lpg.log_writer import LogJournal, LogWriter
+from lpg.profiling import StageProfiler
+
+
+class FakeLog:
+    """write_func que guarda as linhas em memória; 'fail' simula o arquivo aberto em outro programa."""
+
+    def __init__(self, fail=False):
+        self.rows = []
+        self.fail = fail
+        self.threads = set()
+
+    def __call__(self, df, log_filepath):
+        self.threads.add(threading.current_thread().name)
+        if self.fail:
+            raise PermissionError("arquivo aberto")
+        self.rows.extend((log_filepath, row['arquivo']) for row in df.to_dict('records'))
+
+
+def _writer(journal_path, log, **kwargs):
+    kwargs.setdefault('coalesce_seconds', 0.01)
+    return LogWriter(LogJournal(journal_path), write_func=log, retry_initial=0.01, retry_max=0.02, **kwargs)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / 'diario.sqlite')
+
+
+def test_rows_are_written_and_leave_the_journal(journal_path):
+    log = FakeLog()
+    writer = _writer(journal_path, log)
+    writer.submit('a.csv', [{'arquivo': 'x'}, {'arquivo': 'y'}])
+    writer.submit('b.csv', [{'arquivo': 'z'}])
+    assert writer.stop(5) == 0
+    assert sorted(log.rows) == [('a.csv', 'x'), ('a.csv', 'y'), ('b.csv', 'z')]
+    assert writer.written == 3 and writer.recovered == 0
+    assert LogJournal(journal_path).pending() == []
+
+
+def test_submit_does_not_touch_the_journal(journal_path, monkeypatch):
+    journal_threads = []
+    original_add = LogJournal.add
+
+    def add(self, log_filepath, rows):
+        journal_threads.append(threading.current_thread().name)
+        return original_add(self, log_filepath, rows)
+
+    monkeypatch.setattr(LogJournal, 'add', add)
+    writer = _writer(journal_path, FakeLog())
+    writer.submit('a.csv', [{'arquivo': 'x'}])
+    assert writer.pending_count() in (0, 1)
+    writer.stop(5)
+    assert journal_threads == ['lpg-log-journal']
+
+
+def test_unwritten_rows_are_recovered_by_the_next_session(journal_path):
+    writer = _writer(journal_path, FakeLog(fail=True))
+    writer.submit('a.csv', [{'arquivo': 'x'}, {'arquivo': 'y'}])
+    assert writer.stop(5) == 2
+
+    log = FakeLog()
+    writer = _writer(journal_path, log)
+    _wait_for(lambda: writer.recovered is not None)
+    assert writer.recovered == 2
+    assert writer.events.get(timeout=5) == ('log_recovered', 'a.csv', 2)
+    writer.stop(5)
+    assert log.rows == [('a.csv', 'x'), ('a.csv', 'y')]
+    assert LogJournal(journal_path).pending() == []
+
+
+def test_open_sessions_do_not_take_each_other_rows(journal_path):
+    stuck = FakeLog(fail=True)
+    first = _writer(journal_path, stuck)
+    first.submit('a.csv', [{'arquivo': 'x'}])
+    _wait_for(lambda: stuck.threads)
+
+    log = FakeLog()
+    second = _writer(journal_path, log)
+    _wait_for(lambda: second.recovered is not None)
+    assert second.recovered == 0
+    second.submit('a.csv', [{'arquivo': 'y'}])
+    second.stop(5)
+    assert log.rows == [('a.csv', 'y')]
+
+    assert first.stop(5) == 1
+    journal = LogJournal(journal_path)
+    assert journal.claim_orphans() == 1 # Só depois de fechada a primeira sessão
+    assert [row['arquivo'] for _, _, row in journal.pending()] == ['x']
+    assert LogJournal(journal_path).claim_orphans() == 0 # Já assumidas por uma sessão aberta
+
+
+def test_rows_of_an_older_journal_without_owner_are_claimed(journal_path):
+    with sqlite3.connect(journal_path) as conn:
+        conn.execute("CREATE TABLE pendentes (id INTEGER PRIMARY KEY, log TEXT NOT NULL, linha TEXT NOT NULL, "
+                     "criado REAL, erro TEXT)")
+        conn.execute("INSERT INTO pendentes (log, linha, criado) VALUES ('a.csv', '{\"arquivo\": \"x\"}', 0)")
+    conn.close()
+    journal = LogJournal(journal_path)
+    assert journal.claim_orphans() == 1
+    assert journal.pending() == [(1, 'a.csv', {'arquivo': 'x'})]
+
+
+def test_rejected_rows_stay_marked_and_are_not_repeated(journal_path):
+    def reject(df, log_filepath):
+        raise ValueError("colunas diferentes")
+
+    writer = LogWriter(LogJournal(journal_path), write_func=reject, coalesce_seconds=0.01)
+    writer.submit('a.csv', [{'arquivo': 'x'}])
+    kind = None
+    while kind != 'log_error':
+        kind = writer.events.get(timeout=5)[0]
+    assert writer.stop(5) == 0
+    journal = LogJournal(journal_path)
+    assert journal.claim_orphans() == 0 and journal.pending() == []
+
+
+def test_default_write_func_appends_to_csv(journal_path, tmp_path):
+    from lpg.core import LOG_COLUMNS, make_log_row
+    from lpg.logstore import read_log
+    log_path = str(tmp_path / 'log.csv')
+    writer = LogWriter(LogJournal(journal_path), coalesce_seconds=0.01)
+    writer.submit(log_path, [make_log_row('2026-01-01 10:00:00', 1550.0, -20.0, 'S1', 'a.txt')])
+    assert writer.stop(10) == 0
+    assert list(read_log(log_path).columns) == LOG_COLUMNS
+
+
+def test_rows_are_journaled_while_a_slow_write_runs(journal_path):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_write(df, log_filepath):
+        started.set()
+        release.wait(5)
+
+    writer = _writer(journal_path, slow_write)
+    writer.submit('a.csv', [{'arquivo': 'x'}])
+    assert started.wait(5)
+    writer.submit('a.csv', [{'arquivo': 'y'}]) # Chega durante a gravação de 'x'
+    _wait_for(lambda: len(_journal_rows(journal_path)) == 2)
+    release.set()
+    writer.stop(5)
+    assert _journal_rows(journal_path) == []
+
+
+def _journal_rows(journal_path):
+    conn = sqlite3.connect(journal_path)
+    try:
+        return conn.execute("SELECT linha FROM pendentes WHERE erro IS NULL").fetchall()
+    finally:
+        conn.close()
+
+
+def test_write_is_profiled_on_the_writer_thread(journal_path):
+    def write(df, log_filepath):
+        time.sleep(0.05)
+
+    profiler = StageProfiler(trace_memory=False)
+    writer = _writer(journal_path, write)
+    done = writer.submit('/logs/a.csv', [{'arquivo': 'x'}, {'arquivo': 'y'}], profiler=profiler)
+    assert done.wait(5)
+    writer.stop(5)
+    [record] = profiler.records
+    assert (record['etapa'], record['item'], record['arquivos']) == ('log', 'a.csv', 2)
+    assert record['segundos'] >= 0.05
@@ -0,0 +1,102 @@
+import pandas as pd
+import pytest
+
+from lpg import logstore
+from lpg.core import LOG_COLUMNS, make_log_row
+
+
+def _rows(names, sample='S1', extra=None):
+    df = pd.DataFrame([make_log_row('2026-01-01 10:00:00', 1550.0 + i, -20.0 - i, sample, name)
+                       for i, name in enumerate(names)], columns=LOG_COLUMNS)
+    for column, value in (extra or {}).items():
+        df[column] = value
+    return df
+
+
+@pytest.mark.parametrize('name', ['log.csv', 'log.sqlite'])
+def test_append_keeps_every_row_and_exports(tmp_path, name):
+    filepath = str(tmp_path / name)
+    store = logstore.open_log_store(filepath)
+    store.append(_rows(['a.txt', 'b.txt']))
+    logstore.open_log_store(filepath).append(_rows(['c.txt']))
+
+    df_log = logstore.read_log(filepath)
+    assert list(df_log.columns) == LOG_COLUMNS
+    assert list(df_log['arquivo_origem']) == ['a.txt', 'b.txt', 'c.txt']
+    assert list(df_log['comprimento_onda_filtrado (nm)']) == [1550.0, 1551.0, 1550.0]
+
+    xlsx_path = str(tmp_path / 'export.xlsx')
+    logstore.export_log_to_excel(filepath, xlsx_path)
+    pd.testing.assert_frame_equal(pd.read_excel(xlsx_path), df_log, check_dtype=False)
+
+
+def test_csv_without_trailing_newline_and_reordered_columns(tmp_path):
+    filepath = tmp_path / 'log.csv'
+    logstore.CsvLogStore(str(filepath)).append(_rows(['a.txt']))
+    filepath.write_text(filepath.read_text(encoding='utf-8').rstrip('\n'), encoding='utf-8')
+
+    logstore.CsvLogStore(str(filepath)).append(_rows(['b.txt'])[LOG_COLUMNS[::-1]])
+    assert list(logstore.read_log(str(filepath))['arquivo_origem']) == ['a.txt', 'b.txt']
+
+
+def test_new_columns_grow_sqlite_but_not_csv(tmp_path):
+    sqlite_path = str(tmp_path / 'log.db')
+    logstore.open_log_store(sqlite_path).append(_rows(['a.txt']))
+    logstore.open_log_store(sqlite_path).append(_rows(['b.txt'], extra={'R1 vale (nm)': 1549.5}))
+    df_log = logstore.read_log(sqlite_path)
+    assert pd.isna(df_log['R1 vale (nm)'][0]) and df_log['R1 vale (nm)'][1] == 1549.5
+
+    csv_path = str(tmp_path / 'log.csv')
+    logstore.open_log_store(csv_path).append(_rows(['a.txt']))
+    with pytest.raises(ValueError):
+        logstore.open_log_store(csv_path).append(_rows(['b.txt'], extra={'R1 vale (nm)': 1549.5}))
+
+
+def test_xlsx_is_not_append_only(tmp_path):
+    assert logstore.open_log_store(str(tmp_path / 'log.xlsx')) is None
+    assert not logstore.is_append_only('log.xlsx') and logstore.is_append_only('LOG.CSV')
+    with pytest.raises(ValueError):
+        logstore.export_log_to_excel(str(tmp_path / 'log.xlsx'), str(tmp_path / 'x.xlsx'))
+
+
+def test_failed_csv_append_is_rolled_back_before_retry(tmp_path, monkeypatch):
+    filepath = str(tmp_path / 'log.csv')
+    store = logstore.open_log_store(filepath)
+    store.append(_rows(['a.txt']))
+    size = (tmp_path / 'log.csv').stat().st_size
+
+    class FailingFile:
+        """Arquivo que grava metade dos bytes e falha (ex: disco de rede desconectado)."""
+
+        def __init__(self, f):
+            self.f = f
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.f.close()
+
+        def seek(self, *args):
+            return self.f.seek(*args)
+
+        def truncate(self, size):
+            return self.f.truncate(size)
+
+        def write(self, data):
+            if not data: return 0
+            self.f.write(data[:len(data) // 2])
+            raise OSError("falha no meio da gravação")
+
+    def failing_open(filepath, mode='r', **kwargs):
+        f = open(filepath, mode, **kwargs)
+        return FailingFile(f) if 'a' in mode else f
+
+    monkeypatch.setattr(logstore, 'open', failing_open, raising=False)
+    with pytest.raises(OSError):
+        store.append(_rows(['b.txt', 'c.txt']))
+    assert (tmp_path / 'log.csv').stat().st_size == size
+
+    monkeypatch.undo()
+    store.append(_rows(['b.txt', 'c.txt'])) # Nova tentativa
+    assert list(logstore.read_log(filepath)['arquivo_origem']) == ['a.txt', 'b.txt', 'c.txt']
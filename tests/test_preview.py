@@ -0,0 +1,102 @@
+import queue
+import threading
+
+import numpy as np
+import pytest
+
+import lpg.preview
+from lpg.core import process_spectrum
+from lpg.preview import FilterResultCache, PreviewWorker, compute_filter_result
+from lpg.resonances import find_resonances, parse_ranges
+
+PARAMS = dict(window_size=31, poly_order=3, range_start=1530.0, range_end=1570.0)
+
+
+def test_compute_matches_apply_filter_path(batch):
+    wavelengths, intensity_matrix = batch
+    filtered, valley, resonances = compute_filter_result(wavelengths, intensity_matrix[0], **PARAMS)
+    expected_filtered, expected_valley = process_spectrum(wavelengths, intensity_matrix[0], 31, 3, 1530.0, 1570.0)
+    np.testing.assert_array_equal(filtered, expected_filtered)
+    assert valley == expected_valley and resonances is None
+
+    ranges = parse_ranges('Fora:1700-1710; LP:1530-1570')
+    filtered, valley, resonances = compute_filter_result(wavelengths, intensity_matrix[0], 31, 3, ranges=ranges)
+    assert resonances == find_resonances(wavelengths, filtered, ranges)
+    assert valley == resonances['LP'][:2] # Primeira ressonância encontrada
+
+
+def test_cache_is_lru_bounded_in_bytes():
+    cache = FilterResultCache(max_bytes=3 * 800)
+    result = lambda: (np.zeros(100), None, None)
+    for name in 'abc':
+        cache.put((name,), result())
+    assert cache.get(('a',)) is not None # 'b' passa a ser o menos usado
+    cache.put(('d',), result())
+    assert ('b',) not in cache and len(cache) == 3 and cache.current_bytes == 3 * 800
+    assert cache.get(('b',)) is None and (cache.hits, cache.misses) == (1, 1)
+
+    cache.put(('grande',), (np.zeros(1000), None, None))
+    assert ('grande',) not in cache
+    cache.clear()
+    assert len(cache) == 0 and cache.current_bytes == 0
+
+
+@pytest.fixture
+def blocking_compute(monkeypatch):
+    """compute_filter_result que espera 'release' antes de calcular (para pedidos em andamento)."""
+    started, release = threading.Event(), threading.Event()
+    original = lpg.preview.compute_filter_result
+
+    def compute(*args, **kwargs):
+        started.set()
+        assert release.wait(10)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(lpg.preview, 'compute_filter_result', compute)
+    return started, release
+
+
+def test_only_latest_request_is_computed(batch, blocking_compute):
+    wavelengths, intensity_matrix = batch
+    started, release = blocking_compute
+    cache = FilterResultCache()
+    worker = PreviewWorker(cache)
+    try:
+        first = worker.submit(('a', 1), wavelengths, intensity_matrix[0], PARAMS)
+        assert started.wait(10)
+        worker.submit(('a', 2), wavelengths, intensity_matrix[1], PARAMS) # Substituído antes de começar
+        latest = worker.submit(('a', 3), wavelengths, intensity_matrix[2], PARAMS)
+        release.set()
+
+        messages = [worker.result_queue.get(timeout=10) for _ in range(2)]
+        assert [(m[0], m[1], m[2]) for m in messages] == [('preview', first, ('a', 1)), ('preview', latest, ('a', 3))]
+        assert worker.dropped == 1 and ('a', 3) in cache and ('a', 2) not in cache
+    finally:
+        worker.stop()
+
+
+def test_cancel_invalidates_request_in_progress(batch, blocking_compute):
+    wavelengths, intensity_matrix = batch
+    started, release = blocking_compute
+    worker = PreviewWorker(FilterResultCache())
+    try:
+        generation = worker.submit(('a',), wavelengths, intensity_matrix[0], PARAMS)
+        assert started.wait(10)
+        worker.cancel()
+        release.set()
+        message = worker.result_queue.get(timeout=10)
+        assert message[1] == generation and worker.generation > generation # A GUI descarta pela geração
+    finally:
+        worker.stop()
+
+
+def test_errors_are_reported_with_generation(batch):
+    wavelengths, intensity_matrix = batch
+    result_queue = queue.Queue()
+    worker = PreviewWorker(FilterResultCache(), result_queue)
+    try:
+        generation = worker.submit(('a',), wavelengths[:10], intensity_matrix[0][:10], PARAMS) # Janela > espectro
+        kind, message_generation, key, text = result_queue.get(timeout=10)
+        assert (kind, message_generation, key) == ('preview_error', generation, ('a',)) and text
+    finally:
+        worker.stop()
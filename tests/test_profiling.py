@@ -0,0 +1,48 @@
+import csv
+import json
+
+import pytest
+
+from lpg import core
+from lpg.profiling import NULL_PROFILER, StageProfiler
+
+
+def test_batch_records_filter_and_valley_stages(batch):
+    wavelengths, intensity_matrix = batch
+    core.filter_matrix(intensity_matrix[:1], 31, 3) # Import do scipy e kernel fora da medição (tracemalloc é lento)
+    profiler = StageProfiler()
+    profiler.start()
+    core.process_batch([wavelengths] * len(intensity_matrix), list(intensity_matrix), 31, 3, 1530, 1570,
+                       chunk_rows=3, profiler=profiler)
+    profiler.stop()
+
+    summary = {entry['etapa']: entry for entry in profiler.summary()}
+    assert list(summary) == ['filtro', 'vale']
+    assert summary['filtro']['execucoes'] == 3 and summary['filtro']['arquivos'] == len(intensity_matrix)
+    assert summary['filtro']['pico_memoria_bytes'] > 0
+    assert sum(entry['fracao'] for entry in summary.values()) == pytest.approx(1.0)
+    assert profiler.total_seconds >= sum(entry['segundos'] for entry in summary.values())
+    assert 'filtro:' in profiler.format_summary() and 'total:' in profiler.format_summary()
+
+
+def test_write_json_and_csv(tmp_path):
+    profiler = StageProfiler(trace_memory=False)
+    with profiler.stage('log', files=4):
+        pass
+    with profiler.stage('leitura', item='a.txt'):
+        pass
+    json_path, csv_path = profiler.write(str(tmp_path / 'perfil'))
+
+    with open(json_path, encoding='utf-8') as f:
+        report = json.load(f)
+    assert [entry['etapa'] for entry in report['resumo']] == ['leitura', 'log'] # Ordem de STAGES
+    assert report['resumo'][1]['pico_memoria_bytes'] is None
+    with open(csv_path, encoding='utf-8') as f:
+        rows = list(csv.DictReader(f, delimiter=';'))
+    assert [row['etapa'] for row in rows] == ['log', 'leitura'] and rows[0]['arquivos'] == '4'
+
+
+def test_null_profiler_records_nothing():
+    with NULL_PROFILER.stage('filtro'):
+        pass
+    assert not NULL_PROFILER.enabled and not hasattr(NULL_PROFILER, 'records')
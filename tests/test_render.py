@@ -0,0 +1,59 @@
+import threading
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from lpg.core import filter_spectrum, load_spectrum
+from lpg.render import FilteredPlotRenderer, plot_annotations, render_filtered_plots, valley_label
+
+OPTIONS = {'window_size': 21, 'poly_order': 3, 'range_start': 1530.0, 'range_end': 1570.0, 'dpi': 40}
+
+
+def test_annotations_follow_options(batch):
+    wavelengths, intensity_matrix = batch
+    filtered = filter_spectrum(intensity_matrix[0], 21, 3)
+    valleys, range_limits = plot_annotations(wavelengths, filtered, OPTIONS)
+    assert len(valleys) == 1 and range_limits == [1530.0, 1570.0]
+    assert valleys[0][2] == valley_label(valleys[0][0], valleys[0][1]) and '@' in valleys[0][2]
+
+    hidden = plot_annotations(wavelengths, filtered, dict(OPTIONS, include_annotation=False, include_range=False))
+    assert hidden == ([], [])
+
+
+def test_reused_figure_draws_like_a_new_one(batch, tmp_path):
+    wavelengths, intensity_matrix = batch
+    filtered = [filter_spectrum(intensities, 21, 3) for intensities in intensity_matrix[:2]]
+    annotations = [plot_annotations(wavelengths, f, OPTIONS) for f in filtered]
+
+    reused = FilteredPlotRenderer(dpi=40)
+    for k in range(2):
+        reused.render(str(tmp_path / f'reusada_{k}.png'), wavelengths, filtered[k], f"Espectro {k}", *annotations[k])
+    FilteredPlotRenderer(dpi=40).render(str(tmp_path / 'nova.png'), wavelengths, filtered[1], "Espectro 1",
+                                        *annotations[1])
+
+    image = np.asarray(Image.open(tmp_path / 'reusada_1.png'))
+    assert image.shape == (6 * 40, 10 * 40, 3)
+    np.testing.assert_array_equal(image, np.asarray(Image.open(tmp_path / 'nova.png')))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_batch_writes_every_image_and_reports_errors(spectrum_files, tmp_path, workers):
+    jobs = [(str(tmp_path / f'img_{k}.png'), f"Espectro {k}", fp) for k, fp in enumerate(spectrum_files[:3])]
+    jobs.append((str(tmp_path / 'falha.png'), "Falha", str(tmp_path / 'nao_existe.txt')))
+    jobs.append((str(tmp_path / 'memoria.png'), "Memória", load_spectrum(spectrum_files[0])))
+
+    results = list(render_filtered_plots(jobs, OPTIONS, workers=workers, chunksize=2))
+    assert [path for path, _ in results] == [job[0] for job in jobs]
+    assert [error is None for _, error in results] == [True, True, True, False, True]
+    assert all((tmp_path / f'img_{k}.png').stat().st_size > 0 for k in range(3))
+
+
+def test_cancel_stops_before_next_chunk(spectrum_files, tmp_path):
+    cancel_event = threading.Event()
+    jobs = [(str(tmp_path / f'img_{k}.png'), "", fp) for k, fp in enumerate(spectrum_files)]
+    results = []
+    for result in render_filtered_plots(jobs, OPTIONS, workers=1, chunksize=2, cancel_event=cancel_event):
+        results.append(result)
+        cancel_event.set()
+    assert len(results) == 2
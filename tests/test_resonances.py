@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from lpg import resonances
+from lpg.core import filter_spectrum
+from lpg.synthetic import lpg_batch
+
+TWO_BANDS = ((1530.0, 12.0, 4.0), (1565.0, 8.0, 5.0))
+
+
+@pytest.fixture
+def two_band_batch():
+    wavelengths, intensity_matrix, _ = lpg_batch(6, 4000, resonances=TWO_BANDS, seed=4)
+    return wavelengths, intensity_matrix
+
+
+def test_parse_and_format_ranges():
+    ranges = resonances.parse_ranges('LP05:1520-1540; 1555-1575')
+    assert ranges == [('LP05', 1520.0, 1540.0), ('R2', 1555.0, 1575.0)]
+    assert resonances.parse_ranges(resonances.format_ranges(ranges)) == ranges
+    assert resonances.ranges_span(ranges) == (1520.0, 1575.0)
+    for bad in ('LP05:1540-1520', 'LP05:abc', 'A:1-2; A:3-4'):
+        with pytest.raises(ValueError):
+            resonances.parse_ranges(bad)
+
+
+def test_each_range_finds_its_band(two_band_batch):
+    wavelengths, intensity_matrix = two_band_batch
+    ranges = resonances.parse_ranges('LP05:1520-1540; LP06:1555-1575')
+    found = resonances.find_resonances(wavelengths, filter_spectrum(intensity_matrix[0], 31, 3), ranges)
+    assert found['LP05'][0] == pytest.approx(1530.0, abs=0.1) and found['LP05'][2] > 10.0
+    assert found['LP06'][0] == pytest.approx(1565.0, abs=0.1)
+
+
+def test_minimum_at_range_edge_is_not_a_valley():
+    wavelengths, intensity_matrix, _ = lpg_batch(1, 4000, resonances=TWO_BANDS, noise_db=0.0)
+    slope_only = resonances.parse_ranges('Encosta:1570-1590') # Só a encosta da banda de 1565 nm
+    assert resonances.find_resonances(wavelengths, intensity_matrix[0], slope_only) == {'Encosta': None}
+
+
+def test_batch_matches_per_file_and_log_row(two_band_batch):
+    wavelengths, intensity_matrix = two_band_batch
+    ranges = resonances.parse_ranges('LP05:1520-1540; LP06:1555-1575; Fora:1700-1710')
+    batch_results = resonances.process_batch_resonances([wavelengths] * 6, list(intensity_matrix), 31, 3, ranges,
+                                                        chunk_rows=4)
+    for intensities, result in zip(intensity_matrix, batch_results):
+        assert result == resonances.find_resonances(wavelengths, filter_spectrum(intensities, 31, 3), ranges)
+        assert result['Fora'] is None
+
+    row = resonances.make_resonance_row('2026-01-01 10:00:00', batch_results[0], 'S1', 'a.txt')
+    assert list(row) == resonances.resonance_columns(['LP05', 'LP06', 'Fora'])
+    assert row['comprimento_onda_filtrado (nm)'] == batch_results[0]['LP05'][0]
+    assert np.isnan(row['Fora comprimento_onda (nm)'])
+    assert resonances.has_any_valley(batch_results[0])
+
+
+def test_min_prominence_discards_shallow_valleys(two_band_batch):
+    wavelengths, intensity_matrix = two_band_batch
+    ranges = resonances.parse_ranges('LP06:1555-1575')
+    filtered = filter_spectrum(intensity_matrix[0], 31, 3)
+    assert resonances.find_resonances(wavelengths, filtered, ranges, min_prominence=20.0) == {'LP06': None}
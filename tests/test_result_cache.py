@@ -0,0 +1,81 @@
+import itertools
+import types
+
+import numpy as np
+
+import lpg.result_cache
+from lpg import core
+from lpg.result_cache import ResultCache, process_batch_cached, result_params
+
+
+def _compute(calls, **kwargs):
+    def compute(wavelength_list, intensity_list, filtered_callback):
+        calls.append(len(intensity_list))
+        return core.process_batch(wavelength_list, intensity_list, 31, 3, 1530, 1570,
+                                  filtered_callback=filtered_callback, **kwargs)
+    return compute
+
+
+def test_second_run_comes_from_cache(batch, tmp_path):
+    wavelengths, intensity_matrix = batch
+    cache = ResultCache(str(tmp_path / 'cache.sqlite'))
+    params = result_params(31, 3, 1530, 1570, False)
+    wavelength_list, intensity_list = [wavelengths] * 8, list(intensity_matrix)
+    expected = core.process_batch(wavelength_list, intensity_list, 31, 3, 1530, 1570)
+    calls = []
+
+    assert process_batch_cached(cache, wavelength_list[:5], intensity_list[:5], params, _compute(calls)) == expected[:5]
+    assert process_batch_cached(cache, wavelength_list, intensity_list, params, _compute(calls)) == expected
+    assert calls == [5, 3] and (cache.hits, cache.misses) == (5, 8)
+
+    other_params = result_params(31, 3, 1530, 1570, True)
+    process_batch_cached(cache, wavelength_list[:2], intensity_list[:2], other_params, _compute(calls, normalize=True))
+    assert calls[-1] == 2 # Outros parâmetros: outra chave
+
+
+def test_filtered_signal_is_stored_and_returned(batch, tmp_path):
+    wavelengths, intensity_matrix = batch
+    cache = ResultCache(str(tmp_path / 'cache.sqlite'))
+    params = result_params(31, 3, 1530, 1570, False)
+    for _ in range(2):
+        delivered = []
+        process_batch_cached(cache, [wavelengths] * 4, list(intensity_matrix[:4]), params, _compute([]),
+                             filtered_callback=lambda first, wl, matrix: delivered.append(matrix))
+        np.testing.assert_array_equal(delivered[0], core.filter_matrix(intensity_matrix[:4], 31, 3))
+    assert cache.hits == 4
+
+
+def test_cancelled_compute_stops_at_first_missing(batch, tmp_path):
+    wavelengths, intensity_matrix = batch
+    cache = ResultCache(str(tmp_path / 'cache.sqlite'))
+    params = result_params(31, 3, 1530, 1570, False)
+    process_batch_cached(cache, [wavelengths], [intensity_matrix[2]], params, _compute([]))
+
+    results = process_batch_cached(cache, [wavelengths] * 6, list(intensity_matrix[:6]), params,
+                                   lambda wl, intensities, callback: _compute([])(wl[:1], intensities[:1], callback))
+    assert len(results) == 1 # O espectro 0 foi calculado; o 1 faltou (o 2 estava no cache)
+
+
+def test_size_limit_keeps_most_recently_used(tmp_path, monkeypatch):
+    clock = itertools.count(1000.0)
+    monkeypatch.setattr(lpg.result_cache, 'time', types.SimpleNamespace(time=lambda: next(clock)))
+    cache = ResultCache(str(tmp_path / 'cache.sqlite'), max_bytes=None)
+    filtered = np.zeros(100) # 800 bytes por entrada
+    for i in range(10):
+        cache.put_many([(f"k{i}", (1550.0, -20.0), filtered)])
+    cache.get_many(['k0'])
+
+    assert cache.prune(3 * 850) == 7
+    assert sorted(cache.get_many([f"k{i}" for i in range(10)])) == ['k0', 'k8', 'k9']
+
+    cache.max_bytes = 2 * 850 # put_many aplica o limite sozinho
+    cache.put_many([('novo', None, filtered)])
+    assert sorted(cache.get_many(['k0', 'k8', 'k9', 'novo'])) == ['k9', 'novo']
+    assert cache.get_many(['novo'])['novo'][0] is None # Espectro sem vale também é um resultado
+
+
+def test_unwritable_location_disables_cache(tmp_path):
+    blocker = tmp_path / 'arquivo'
+    blocker.write_text('')
+    cache = ResultCache(str(blocker / 'cache.sqlite'))
+    assert not cache.enabled and cache.get_many(['k']) == {} and cache.prune() == 0
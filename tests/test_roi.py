@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from lpg import core
+from lpg.resonances import parse_ranges, process_batch_resonances
+from lpg.savgol import FFT_WINDOW_THRESHOLD, SavgolFilter, default_filter
+from lpg.sweep import ParameterSweep
+from lpg.synthetic import lpg_batch
+from lpg.watch import process_new_file
+
+WINDOWS = [21, 99, FFT_WINDOW_THRESHOLD, 151, 301, 1001]
+RANGES = [(1530.0, 1570.0), (1500.0, 1500.5), (1599.7, 1600.0), (1549.95, 1550.05), (1400.0, 1700.0)]
+
+
+@pytest.fixture(scope='module')
+def long_batch():
+    wavelengths, intensity_matrix, _ = lpg_batch(3, 20_000, seed=5)
+    return wavelengths, intensity_matrix
+
+
+@pytest.mark.parametrize('window_size', WINDOWS)
+@pytest.mark.parametrize('range_start, range_end', RANGES)
+def test_roi_equals_full_filtering(long_batch, window_size, range_start, range_end):
+    wavelengths, intensity_matrix = long_batch
+    index = core.range_index(wavelengths, range_start, range_end)
+    for normalize in (False, True):
+        for intensities in intensity_matrix:
+            full = core.filter_spectrum(intensities, window_size, 3, normalize)
+            roi = core.filter_spectrum_roi(wavelengths, intensities, window_size, 3, range_start, range_end, normalize)
+            np.testing.assert_array_equal(roi[index], full[index])
+
+
+@pytest.mark.parametrize('window_size', [151, 301])
+def test_fft_columns_are_block_aligned(window_size):
+    savgol = SavgolFilter(method='auto')
+    start, stop = savgol.exact_columns(20_000, 9_000, 9_050, window_size)
+    direct_start, direct_stop = SavgolFilter(method='direct').exact_columns(20_000, 9_000, 9_050, window_size)
+    assert (direct_start, direct_stop) == (9_000 - window_size // 2, 9_050 + window_size // 2)
+    assert start <= direct_start and stop >= direct_stop and stop - start < 20_000
+    assert savgol.exact_columns(20_000, 19_990, 20_000, window_size)[1] == 20_000
+    assert savgol.exact_columns(300, 290, 300, 301) == (0, 300) # Sinal mais curto que um bloco
+
+
+@pytest.mark.parametrize('window_size', [31, 151])
+def test_batch_and_resonances_roi_give_same_valleys(long_batch, window_size):
+    wavelengths, intensity_matrix = long_batch
+    wavelength_list, intensity_list = [wavelengths] * 3, list(intensity_matrix)
+    assert (core.process_batch(wavelength_list, intensity_list, window_size, 3, 1530, 1570, roi=True)
+            == core.process_batch(wavelength_list, intensity_list, window_size, 3, 1530, 1570))
+
+    ranges = parse_ranges('A:1520-1540; B:1545-1560')
+    assert (process_batch_resonances(wavelength_list, intensity_list, window_size, 3, ranges, roi=True)
+            == process_batch_resonances(wavelength_list, intensity_list, window_size, 3, ranges))
+
+    delivered = []
+    core.process_batch(wavelength_list, intensity_list, window_size, 3, 1530, 1570, roi=True,
+                       filtered_callback=lambda first, wl, matrix: delivered.append(matrix))
+    index = core.range_index(wavelengths, 1530, 1570)
+    np.testing.assert_array_equal(delivered[0][:, index], core.filter_matrix(intensity_matrix, window_size, 3)[:, index])
+    assert np.isnan(delivered[0][:, 0]).all()
+
+
+def test_sweep_with_fft_windows_matches_batch(long_batch):
+    wavelengths, intensity_matrix = long_batch
+    sweep = ParameterSweep([151, 301], [3], 1530, 1570)
+    sweep.add([wavelengths] * 3, list(intensity_matrix))
+    for pair in sweep.pairs:
+        expected = core.process_batch([wavelengths] * 3, list(intensity_matrix), *pair, 1530, 1570)
+        assert list(zip(*sweep.valleys(pair))) == expected
+
+
+def test_watch_roi_with_fft_window(spectrum_files):
+    full = process_new_file(spectrum_files[0], 151, 3, 1530, 1570, False, 'S1')
+    roi = process_new_file(spectrum_files[0], 151, 3, 1530, 1570, False, 'S1', roi=True)
+    del full['horario'], roi['horario']
+    assert roi == full
+
+
+def test_default_filter_is_shared():
+    assert core.roi_columns(1000, slice(400, 500), 21) == (slice(390, 510), slice(10, 110))
+    assert default_filter.exact_columns(1000, 400, 500, 21) == (390, 510)
@@ -0,0 +1,53 @@
+import types
+
+import pytest
+
+pytest.importorskip('tkinter')
+
+import filtro_savitzkygolay as gui
+
+
+class _Toolbar:
+    def __init__(self):
+        self.saved = 0
+
+    def save_figure(self):
+        self.saved += 1
+
+
+class _Figure:
+    def __init__(self):
+        self.saved = []
+
+    def savefig(self, filepath, dpi=None):
+        self.saved.append(filepath)
+
+
+@pytest.fixture
+def app(monkeypatch):
+    app = object.__new__(gui.LpgFilterApp)
+    for tab in ('spectrum_tab', 'time_series_tab', 'sweep_tab', 'history_tab'):
+        setattr(app, tab, f".notebook.{tab}")
+    for attr, toolbar in (('canvas', _Toolbar()), ('ts_canvas', _Toolbar()), ('sweep_canvas', None),
+                          ('history_canvas', _Toolbar())):
+        setattr(app, attr, types.SimpleNamespace(toolbar=toolbar, figure=_Figure()))
+    app._ask_save_filepath = lambda title, suggested, filetypes=None: f"/tmp/{suggested}"
+    monkeypatch.setattr(gui.messagebox, 'showerror', lambda title, message: pytest.fail(message))
+    return app
+
+
+@pytest.mark.parametrize('tab, canvas', [('spectrum_tab', 'canvas'), ('time_series_tab', 'ts_canvas'),
+                                         ('history_tab', 'history_canvas')])
+def test_saves_the_figure_of_the_selected_tab(app, tab, canvas):
+    app.notebook = types.SimpleNamespace(select=lambda: getattr(app, tab))
+    app.save_plot_image()
+    saved = {attr: getattr(app, attr).toolbar.saved for attr in ('canvas', 'ts_canvas', 'history_canvas')}
+    assert saved == {attr: int(attr == canvas) for attr in saved}
+    assert app.sweep_canvas.figure.saved == []
+
+
+def test_sweep_tab_without_toolbar_saves_through_dialog(app):
+    app.notebook = types.SimpleNamespace(select=lambda: app.sweep_tab)
+    app.save_plot_image()
+    assert app.sweep_canvas.figure.saved == ["/tmp/varredura_parametros.png"]
+    assert app.history_canvas.toolbar.saved == 0
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+import scipy.signal
+
+from lpg.savgol import SavgolFilter, savgol_filter
+
+
+def _tolerance(x):
+    return 1e-12 * np.abs(x).max()
+
+
+@pytest.mark.parametrize('method', ['direct', 'fft'])
+@pytest.mark.parametrize('mode', ['interp', 'mirror', 'nearest', 'wrap', 'constant'])
+@pytest.mark.parametrize('window_length, polyorder, deriv', [(5, 2, 0), (21, 3, 0), (31, 4, 1), (151, 3, 0), (301, 5, 2)])
+def test_matches_scipy_within_rounding(batch, method, mode, window_length, polyorder, deriv):
+    x = batch[1][0]
+    y = SavgolFilter(method=method)(x, window_length, polyorder, deriv=deriv, delta=0.02, mode=mode, cval=-30.0)
+    reference = scipy.signal.savgol_filter(x, window_length, polyorder, deriv=deriv, delta=0.02, mode=mode, cval=-30.0)
+    np.testing.assert_allclose(y, reference, rtol=0, atol=_tolerance(x) / 0.02 ** deriv)
+
+
+@pytest.mark.parametrize('window_length', [21, 151])
+def test_matrix_rows_equal_1d_results(batch, window_length):
+    intensity_matrix = batch[1]
+    filtered_matrix = savgol_filter(intensity_matrix, window_length, 3, axis=1)
+    for row, intensities in zip(filtered_matrix, intensity_matrix):
+        np.testing.assert_array_equal(row, savgol_filter(intensities, window_length, 3))
+    np.testing.assert_array_equal(savgol_filter(intensity_matrix.T, window_length, 3, axis=0), filtered_matrix.T)
+
+
+def test_kernels_are_cached_with_lru_limit():
+    savgol = SavgolFilter(cache_size=2)
+    x = np.linspace(0.0, 1.0, 100) ** 2
+    savgol(x, 11, 3)
+    savgol(x, 11, 3)
+    assert (savgol.hits, savgol.misses) == (1, 1)
+    savgol(x, 13, 3)
+    savgol(x, 15, 3)
+    assert len(savgol._kernels) == 2
+    assert savgol.kernel(15, 3) is savgol.kernel(15, 3)
+
+
+def test_interp_window_longer_than_signal_is_rejected():
+    with pytest.raises(ValueError):
+        savgol_filter(np.zeros(10), 11, 3)
@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+
+from lpg.core import load_spectrum
+from lpg.spectrum_cache import SpectrumCache
+
+
+def test_second_load_comes_from_npy(spectrum_files, tmp_path):
+    cache = SpectrumCache(str(tmp_path / 'cache'))
+    first = cache.load(spectrum_files[0])
+    second = cache(spectrum_files[0])
+    assert (cache.hits, cache.misses) == (1, 1)
+    for a, b, c in zip(first, second, load_spectrum(spectrum_files[0])):
+        np.testing.assert_array_equal(a, c)
+        np.testing.assert_array_equal(b, c)
+
+
+def test_modified_file_replaces_its_entry(spectrum_files, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    cache = SpectrumCache(str(cache_dir))
+    cache.load(spectrum_files[0])
+    with open(spectrum_files[0], 'a') as f:
+        f.write("1700.000000\t-10.000000\n")
+    wavelengths, intensities = cache.load(spectrum_files[0])
+
+    assert cache.misses == 2 and wavelengths[-1] == 1700.0 and intensities[-1] == -10.0
+    assert len(os.listdir(cache_dir)) == 1
+
+
+def test_corrupt_entry_is_reread_and_clear_empties(spectrum_files, tmp_path):
+    cache = SpectrumCache(str(tmp_path / 'cache'))
+    cache.load(spectrum_files[0])
+    with open(cache.entry_path(spectrum_files[0]), 'wb') as f:
+        f.write(b'lixo')
+    np.testing.assert_array_equal(cache.load(spectrum_files[0])[1], load_spectrum(spectrum_files[0])[1])
+    assert cache.misses == 2
+
+    cache.clear()
+    assert os.listdir(tmp_path / 'cache') == []
+
+
+def test_unwritable_cache_still_reads(spectrum_files, tmp_path):
+    blocker = tmp_path / 'arquivo'
+    blocker.write_text('')
+    cache = SpectrumCache(str(blocker / 'cache')) # Não dá para criar um diretório dentro de um arquivo
+    np.testing.assert_array_equal(cache.load(spectrum_files[0])[0], load_spectrum(spectrum_files[0])[0])
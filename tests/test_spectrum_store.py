@@ -0,0 +1,51 @@
+import threading
+
+import numpy as np
+
+from lpg.spectrum_store import SpectrumStore
+
+
+def _fake_reader(calls):
+    def read(filepath):
+        calls.append(filepath)
+        return np.arange(100, dtype=float), np.full(100, float(len(calls)))
+    return read
+
+
+def test_repeated_get_reads_once():
+    calls = []
+    store = SpectrumStore(_fake_reader(calls), max_bytes=10_000)
+    first = store.get('a.txt')
+    assert store('a.txt') is first
+    assert calls == ['a.txt'] and (store.hits, store.misses) == (1, 1)
+    assert 'a.txt' in store and store.current_bytes == 1600
+
+
+def test_byte_budget_evicts_least_recently_used():
+    calls = []
+    store = SpectrumStore(_fake_reader(calls), max_bytes=3 * 1600)
+    for name in ('a', 'b', 'c'):
+        store.get(name)
+    store.get('a') # 'b' passa a ser o menos usado
+    store.get('d')
+
+    assert 'b' not in store and all(name in store for name in ('a', 'c', 'd'))
+    assert len(store) == 3 and store.current_bytes == 3 * 1600 and store.evictions == 1
+
+    store.clear()
+    assert len(store) == 0 and store.current_bytes == 0
+
+
+def test_spectrum_larger_than_budget_is_returned_but_not_kept():
+    store = SpectrumStore(_fake_reader([]), max_bytes=1000)
+    wavelengths, _ = store.get('grande')
+    assert len(wavelengths) == 100 and len(store) == 0 and store.current_bytes == 0
+
+
+def test_concurrent_gets_keep_byte_count_consistent():
+    store = SpectrumStore(_fake_reader([]), max_bytes=10 * 1600)
+    threads = [threading.Thread(target=lambda k=k: [store.get(f"f{(k + i) % 15}") for i in range(200)])
+               for k in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert len(store) <= 10 and store.current_bytes == 1600 * len(store)
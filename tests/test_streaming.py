@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+import scipy.signal
+
+from lpg.core import filter_spectrum, process_spectrum
+from lpg.streaming import OnlineValleyTracker, StreamingSavgol, StreamingValleyDetector
+
+
+def _stream(x, positions, window_length, polyorder, chunk_sizes):
+    streaming = StreamingSavgol(window_length, polyorder)
+    emitted_positions, filtered = [], []
+    start = 0
+    for size in chunk_sizes:
+        p, y = streaming.push(x[start:start + size], positions[start:start + size])
+        emitted_positions.append(p); filtered.append(y)
+        start += size
+    p, y = streaming.finish()
+    emitted_positions.append(p); filtered.append(y)
+    return np.concatenate(emitted_positions), np.concatenate(filtered)
+
+
+def _random_chunks(n, seed, max_size):
+    rng = np.random.default_rng(seed)
+    sizes = []
+    while sum(sizes) < n:
+        sizes.append(int(rng.integers(1, max_size)))
+    return sizes
+
+
+@pytest.mark.parametrize('window_length, polyorder', [(3, 1), (5, 2), (21, 3), (99, 4), (151, 3)])
+@pytest.mark.parametrize('max_chunk', [2, 37, 500, 5000])
+def test_arbitrary_chunks_match_scipy_and_batch(batch, window_length, polyorder, max_chunk):
+    wavelengths, intensity_matrix = batch
+    x = intensity_matrix[0]
+    positions, y = _stream(x, wavelengths, window_length, polyorder, _random_chunks(len(x), max_chunk, max_chunk))
+
+    np.testing.assert_array_equal(positions, wavelengths)
+    reference = scipy.signal.savgol_filter(x, window_length, polyorder)
+    np.testing.assert_allclose(y, reference, rtol=0, atol=1e-12 * np.abs(x).max())
+    batch_filtered = filter_spectrum(x, window_length, polyorder)
+    if window_length < 101: # Mesma convolução direta do lote
+        np.testing.assert_array_equal(y, batch_filtered)
+    else:
+        np.testing.assert_allclose(y, batch_filtered, rtol=0, atol=1e-12 * np.abs(x).max())
+
+
+def test_detector_final_valley_equals_batch(batch):
+    wavelengths, intensity_matrix = batch
+    for normalize in (False, True):
+        detector = StreamingValleyDetector(31, 3, 1530, 1570, normalize)
+        for intensities in intensity_matrix[:3]:
+            detector.reset()
+            for start in range(0, len(intensities), 250):
+                detector.push(wavelengths[start:start + 250], intensities[start:start + 250])
+            valley = detector.finish()
+            expected = process_spectrum(wavelengths, intensities, 31, 3, 1530, 1570, normalize)[1]
+            if normalize: # O lote filtra o espectro já normalizado: igual até o arredondamento
+                assert valley[0] == expected[0] and valley[1] == pytest.approx(expected[1], abs=1e-12)
+            else:
+                assert valley == expected
+
+
+def test_short_stream_and_closed_stream_are_rejected():
+    streaming = StreamingSavgol(21, 3)
+    assert len(streaming.push(np.zeros(10))[1]) == 0
+    with pytest.raises(ValueError):
+        streaming.finish()
+
+    streaming.push(np.zeros(20))
+    streaming.finish()
+    with pytest.raises(ValueError):
+        streaming.push(np.zeros(5))
+    with pytest.raises(ValueError):
+        StreamingSavgol(5, 2).push(np.zeros(5), np.zeros(4))
+
+
+def test_tracker_keeps_first_of_tied_minima():
+    tracker = OnlineValleyTracker(2.0, 8.0)
+    tracker.update(np.array([1.0, 3.0, 4.0]), np.array([-9.0, -5.0, -5.0]))
+    assert tracker.update(np.array([5.0, 9.0]), np.array([-5.0, -9.0])) == (3.0, -5.0)
@@ -0,0 +1,76 @@
+import threading
+
+import numpy as np
+import pytest
+
+import lpg.sweep
+from lpg import core
+from lpg.sweep import ParameterSweep, parameter_pairs, parse_int_list, sweep_parameters
+
+
+def test_parse_int_list_and_pairs():
+    assert parse_int_list('5-9:2, 21;7') == [5, 7, 9, 21]
+    with pytest.raises(ValueError):
+        parse_int_list(' , ')
+    assert parameter_pairs([20, 21, 5], [3, 5]) == [(21, 3), (21, 5), (5, 3)]
+
+
+def test_valleys_match_batch_for_every_pair(batch):
+    wavelengths, intensity_matrix = batch
+    sweep = ParameterSweep([21, 51], [2, 3], 1530, 1570)
+    for chunk_start in (0, 5):
+        sweep.add([wavelengths] * len(intensity_matrix[chunk_start:chunk_start + 5]),
+                  list(intensity_matrix[chunk_start:chunk_start + 5]))
+    assert sweep.n_files == len(intensity_matrix)
+
+    for window_size, poly_order in sweep.pairs:
+        expected = core.process_batch([wavelengths] * len(intensity_matrix), list(intensity_matrix), window_size,
+                                      poly_order, 1530, 1570)
+        valley_wls, valley_intensities = sweep.valleys((window_size, poly_order))
+        assert list(zip(valley_wls, valley_intensities)) == expected
+
+    table = sweep.results()
+    assert list(table['n_vales']) == [len(intensity_matrix)] * 4
+    assert (table['deriva (nm/arquivo)'] > 0).all() # O vale sintético desloca 0,01 nm por arquivo
+
+
+def test_cancel_mid_chunk_leaves_consistent_state(batch, monkeypatch):
+    wavelengths, intensity_matrix = batch
+    sweep = ParameterSweep([21, 51, 101], [3], 1530, 1570)
+    assert sweep.add([wavelengths] * 4, list(intensity_matrix[:4]))
+
+    cancel_event = threading.Event()
+    calls = []
+
+    def cancel_after_first_pair(*args, **kwargs):
+        calls.append(1)
+        cancel_event.set()
+        return core.filter_matrix(*args, **kwargs)
+
+    monkeypatch.setattr(lpg.sweep, 'filter_matrix', cancel_after_first_pair)
+    assert not sweep.add([wavelengths] * 4, list(intensity_matrix[4:]), cancel_event)
+
+    assert calls == [1] and sweep.n_files == 4
+    assert all(len(sweep.valleys(pair)[0]) == 4 for pair in sweep.pairs)
+    assert list(sweep.results()['n_vales']) == [4, 4, 4]
+
+
+def test_cancel_on_per_file_path_counts_finished_rows(batch):
+    wavelengths, intensity_matrix = batch
+    cancel_event = threading.Event()
+    progress = []
+
+    def on_progress(n_done):
+        progress.append(n_done)
+        cancel_event.set()
+
+    wavelength_list = [wavelengths + 0.001 * i for i in range(len(intensity_matrix))]
+    table = sweep_parameters(wavelength_list, list(intensity_matrix), [21], [3], 1530, 1570, chunk_rows=3,
+                             progress_callback=on_progress, cancel_event=cancel_event)
+    assert progress == [3] and list(table['n_vales']) == [3]
+
+
+def test_window_longer_than_spectrum_gives_nan(batch):
+    wavelengths, intensity_matrix = batch
+    table = sweep_parameters([wavelengths[:50]] * 2, [row[:50] for row in intensity_matrix[:2]], [21, 61], [3])
+    assert list(table['n_vales']) == [2, 0] and np.isnan(table['vale_medio (nm)'][1])
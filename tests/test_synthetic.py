@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+import pytest
+
+from lpg import synthetic
+from lpg.core import find_valley, load_spectrum
+
+
+def test_same_seed_gives_same_batch():
+    a = synthetic.lpg_batch(3, 500, seed=7)
+    b = synthetic.lpg_batch(3, 500, seed=7)
+    for x, y in zip(a, b):
+        np.testing.assert_array_equal(x, y)
+    assert not np.array_equal(a[1], synthetic.lpg_batch(3, 500, seed=8)[1])
+
+
+def test_valley_moves_by_shift_per_file():
+    wavelengths, intensity_matrix, centers = synthetic.lpg_batch(4, 20_001, shift_nm=0.5, noise_db=0.0)
+    np.testing.assert_allclose(centers, [1550.0, 1550.5, 1551.0, 1551.5])
+    for intensities, center in zip(intensity_matrix, centers):
+        valley_wl, valley_intensity = find_valley(wavelengths, intensities, 1530, 1570)
+        assert valley_wl == pytest.approx(center, abs=0.005)
+        assert valley_intensity == pytest.approx(-25.0, abs=1e-6)
+
+
+def test_profiles_and_drift():
+    wavelengths = synthetic.wavelength_grid(1001)
+    half = synthetic.resonance_profile(np.array([1550.0 + 3.0]), 1550.0, 6.0, 'gaussian')
+    assert half[0] == pytest.approx(0.5)
+    flat = synthetic.lpg_spectrum(wavelengths, resonances=(), drift_db=2.0, noise_db=0.0)
+    assert flat[0] == -10.0 and flat[-1] == pytest.approx(-8.0)
+    with pytest.raises(ValueError):
+        synthetic.resonance_profile(wavelengths, 1550.0, 6.0, 'voigt')
+
+
+def test_written_files_read_back(tmp_path):
+    filepaths = synthetic.write_spectrum_files(str(tmp_path), 12, 300, seed=3)
+    assert [os.path.basename(fp) for fp in filepaths[:2]] == ['espectro_00.txt', 'espectro_01.txt']
+    wavelengths, intensities = load_spectrum(filepaths[5])
+    expected_wl, expected_matrix, _ = synthetic.lpg_batch(12, 300, seed=3)
+    np.testing.assert_allclose(wavelengths, expected_wl, atol=5e-7)
+    np.testing.assert_allclose(intensities, expected_matrix[5], atol=5e-7)
@@ -0,0 +1,119 @@
+import types
+import warnings
+
+import numpy as np
+import pytest
+
+pytest.importorskip('tkinter')
+backend_agg = pytest.importorskip('matplotlib.backends.backend_agg')
+
+import filtro_savitzkygolay as gui
+
+
+class _Widget:
+    def grid(self, **kwargs): pass
+    def update(self): pass
+
+
+class _Canvas(backend_agg.FigureCanvasAgg):
+    """FigureCanvasTkAgg sem Tk: desenha em memória e conta os desenhos completos."""
+
+    def __init__(self, figure, master=None):
+        super().__init__(figure)
+        self.full_draws = 0
+        self.blits = 0
+
+    def draw(self):
+        self.full_draws += 1
+        super().draw()
+
+    def draw_idle(self, *args, **kwargs):
+        self.draw()
+
+    def blit(self, bbox=None):
+        self.blits += 1
+
+    def get_tk_widget(self):
+        return _Widget()
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(gui, 'backend_tkagg', types.SimpleNamespace(
+        FigureCanvasTkAgg=_Canvas, NavigationToolbar2Tk=lambda *args, **kwargs: _Widget()))
+    app = object.__new__(gui.LpgFilterApp)
+    app.time_series_tab = None
+    app.ts_buffer = np.empty((256, 3))
+    app.ts_count = 0
+    app._build_time_series_figure()
+    app._reset_time_series("Aquisição Contínua: teste")
+    return app
+
+
+def _points(start, stop):
+    i = np.arange(start, stop, dtype=float)
+    return list(zip(i, 1550.0 + 1e-3 * np.sin(i), -20.0 - 1e-2 * np.cos(i)))
+
+
+def test_appends_reuse_artists_and_keep_every_point(app):
+    n_lines = (len(app.ts_ax.lines), len(app.ts_ax2.lines))
+    expected = []
+    for start in range(0, 1000, 37): # Passa várias vezes da capacidade inicial do buffer
+        points = _points(start, min(start + 37, 1000))
+        app._append_time_series(points)
+        expected += points
+
+    expected = np.array(expected)
+    assert app.ts_count == 1000 and (len(app.ts_ax.lines), len(app.ts_ax2.lines)) == n_lines
+    np.testing.assert_array_equal(np.column_stack(app.ts_wl_line.get_data()), expected[:, :2])
+    np.testing.assert_array_equal(app.ts_int_line.get_data()[1], expected[:, 2])
+
+
+def test_points_inside_the_view_are_blitted(app):
+    app._append_time_series(_points(0, 10)) # Primeiro lote: limites com folga e desenho completo
+    assert app.ts_background is not None
+    x_lo, x_hi = app.ts_ax.get_xlim()
+    draws = app.ts_canvas.full_draws
+
+    app._append_time_series(_points(10, 15))
+    assert app.ts_canvas.full_draws == draws and app.ts_canvas.blits == 1
+    assert app.ts_ax.get_xlim() == (x_lo, x_hi)
+    np.testing.assert_array_equal(app.ts_wl_segment.get_data()[0], np.arange(9.0, 15.0)) # Ligado ao ponto anterior
+
+    app._append_time_series([(15.0, 1551.0, -20.0)]) # Fora dos limites: redesenho completo com limites novos
+    assert app.ts_canvas.full_draws == draws + 1 and app.ts_canvas.blits == 1
+    assert app.ts_ax.get_ylim()[1] > 1551.0 and app.ts_ax.get_xlim()[1] > x_hi
+
+
+def test_reset_empties_the_series(app):
+    app._append_time_series(_points(0, 300))
+    app._reset_time_series("Nova pasta")
+    assert app.ts_count == 0 and len(app.ts_wl_line.get_data()[0]) == 0
+    assert app.ts_ax.get_title() == "Nova pasta"
+    app._append_time_series(_points(0, 3))
+    assert app.ts_count == 3
+
+
+def test_history_view_with_all_nan_intensities_has_no_warnings(monkeypatch):
+    from lpg.log_analysis import LogSeries
+    monkeypatch.setattr(gui, 'backend_tkagg', types.SimpleNamespace(
+        FigureCanvasTkAgg=_Canvas, NavigationToolbar2Tk=lambda *args, **kwargs: _Widget()))
+    app = object.__new__(gui.LpgFilterApp)
+    app.history_tab = None
+    app.history_series = None
+    app.history_band = None
+    app.history_view = None
+    app.history_status_prefix = ''
+    app.history_after_id = None
+    app.master = types.SimpleNamespace(after=lambda ms, func: None, after_cancel=lambda after_id: None)
+    app.history_label = types.SimpleNamespace(config=lambda **kwargs: None)
+    app._build_history_figure()
+
+    times = 1.7e9 + 60.0 * np.arange(500)
+    app.history_series = LogSeries(times, 1550.0 + 1e-3 * np.sin(np.arange(500)), np.full(500, np.nan))
+    app.history_rolling = app.history_series.rolling(1.0)
+    app.history_ax_wl.set_xlim(times[0] / 86400.0, times[-1] / 86400.0)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error') # np.nanmean de uma janela toda NaN avisava a cada zoom
+        app._update_history_view()
+    assert len(app.history_int_line.get_xdata()) == len(app.history_wl_line.get_xdata()) > 0
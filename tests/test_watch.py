@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+
+import pytest
+
+from lpg.resonances import parse_ranges
+from lpg.watch import FolderWatcher, process_new_file
+
+
+def _wait_ready(watcher, timeout=5.0):
+    """Chama poll() até algum arquivo ficar pronto (os eventos do watchdog chegam por outra thread)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        ready = watcher.poll()
+        if ready:
+            return ready
+        time.sleep(0.05)
+    return []
+
+
+def test_polling_returns_only_new_stable_files(tmp_path):
+    (tmp_path / 'antigo.txt').write_text("1 2\n")
+    watcher = FolderWatcher(str(tmp_path), backend='poll')
+    assert watcher.backend == 'poll' and watcher.poll() == []
+
+    (tmp_path / 'novo.txt').write_text("1 2\n")
+    (tmp_path / 'ignorado.csv').write_text("1 2\n")
+    (tmp_path / 'vazio.txt').write_text("")
+    assert watcher.poll() == [] # Primeira vez que o arquivo é visto: ainda pode estar sendo escrito
+    assert watcher.poll() == [str(tmp_path / 'novo.txt')]
+    assert watcher.poll() == []
+    watcher.close()
+
+
+@pytest.mark.parametrize('backend', ['poll', 'watchdog'])
+def test_include_existing_returns_files_already_there(tmp_path, backend):
+    if backend == 'watchdog':
+        pytest.importorskip('watchdog')
+    (tmp_path / 'antigo.txt').write_text("1 2\n")
+    watcher = FolderWatcher(str(tmp_path), include_existing=True, rescan_every=1, backend=backend, safety_rescan=3600)
+    try:
+        assert watcher.backend == backend
+        assert _wait_ready(watcher) == [str(tmp_path / 'antigo.txt')]
+        assert watcher.poll() == []
+    finally:
+        watcher.close()
+
+
+def test_polling_periodic_rescan_finds_files_with_unchanged_folder_mtime(tmp_path):
+    watcher = FolderWatcher(str(tmp_path), rescan_every=2, backend='poll')
+    dir_mtime = os.stat(tmp_path).st_mtime_ns
+    (tmp_path / 'novo.txt').write_text("1 2\n")
+    os.utime(tmp_path, ns=(dir_mtime, dir_mtime)) # Sistemas de arquivos com data de pasta grosseira
+    assert _wait_ready(watcher) == [str(tmp_path / 'novo.txt')]
+
+
+def test_watchdog_backend_sees_created_and_renamed_files(tmp_path):
+    pytest.importorskip('watchdog')
+    watcher = FolderWatcher(str(tmp_path), backend='watchdog', safety_rescan=3600)
+    try:
+        assert watcher.backend == 'watchdog'
+        (tmp_path / 'a.txt').write_text("1 2\n")
+        assert _wait_ready(watcher) == [str(tmp_path / 'a.txt')]
+
+        (tmp_path / 'b.tmp').write_text("1 2\n")
+        os.replace(tmp_path / 'b.tmp', tmp_path / 'b.txt')
+        assert _wait_ready(watcher) == [str(tmp_path / 'b.txt')]
+    finally:
+        watcher.close()
+
+
+def test_without_watchdog_auto_falls_back_to_polling(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'watchdog.observers', None) # Import falha como se não estivesse instalado
+    assert FolderWatcher(str(tmp_path)).backend == 'poll'
+    with pytest.raises(ImportError):
+        FolderWatcher(str(tmp_path), backend='watchdog')
+
+
+def test_invalid_backend_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        FolderWatcher(str(tmp_path), backend='inotify')
+
+
+@pytest.mark.parametrize('ranges', [None, parse_ranges('R1:1530-1570')])
+def test_process_new_file_roi_gives_same_row(spectrum_files, ranges):
+    full = process_new_file(spectrum_files[0], 51, 3, 1530, 1570, False, 'S1', ranges=ranges)
+    roi = process_new_file(spectrum_files[0], 51, 3, 1530, 1570, False, 'S1', ranges=ranges, roi=True)
+    del full['horario'], roi['horario']
+    assert roi == full